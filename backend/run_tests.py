@@ -14,6 +14,35 @@ sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 from tests.test_auth import AuthTestCase
 from tests.test_documents import DocumentTestCase
 from tests.test_ai import AITestCase
+from tests.test_text_chunker import TextChunkerTestCase
+from tests.test_analysis_stages import AnalysisStagesTestCase
+from tests.test_text_service import TextServiceTestCase
+from tests.test_llm_cache import LLMCacheTestCase
+from tests.test_bm25 import BM25TestCase
+from tests.test_json_stream import JSONStreamTestCase
+from tests.test_category_cache import ClauseCategoryCacheTestCase
+from tests.test_token_budget import TokenBudgetTestCase
+from tests.test_text_diff import TextDiffTestCase
+from tests.test_rate_limiter import RateLimiterTestCase
+from tests.test_tasks import TasksTestCase
+from tests.test_worker_pool import WorkerPoolTestCase
+from tests.test_analysis_tracker import AnalysisTrackerTestCase
+from tests.test_archive import ArchiveTestCase
+from tests.test_scheduler import SchedulerTestCase
+from tests.test_storage import StorageTestCase
+from tests.test_obligation_service import ObligationServiceTestCase
+from tests.test_event_bus import EventBusTestCase
+from tests.test_event_bus import EventPublishingTestCase
+from tests.test_extraction_pool import ExtractionPoolTestCase
+from tests.test_file_processors import FileProcessorsTestCase
+from tests.test_ocr import OcrTestCase
+from tests.test_config import ConfigTestCase
+from tests.test_reanalysis import ReanalysisTestCase
+from tests.test_batch_service import BatchServiceTestCase
+from tests.test_task_service import TaskServiceTestCase
+from tests.test_file_sharing import FileSharingTestCase
+from tests.test_periodic import PeriodicTestCase
+from tests.test_ocr_service import OcrServiceTestCase
 
 
 def run_tests():
@@ -25,6 +54,35 @@ def run_tests():
     test_suite.addTest(unittest.makeSuite(AuthTestCase))
     test_suite.addTest(unittest.makeSuite(DocumentTestCase))
     test_suite.addTest(unittest.makeSuite(AITestCase))
+    test_suite.addTest(unittest.makeSuite(TextChunkerTestCase))
+    test_suite.addTest(unittest.makeSuite(AnalysisStagesTestCase))
+    test_suite.addTest(unittest.makeSuite(TextServiceTestCase))
+    test_suite.addTest(unittest.makeSuite(LLMCacheTestCase))
+    test_suite.addTest(unittest.makeSuite(BM25TestCase))
+    test_suite.addTest(unittest.makeSuite(JSONStreamTestCase))
+    test_suite.addTest(unittest.makeSuite(ClauseCategoryCacheTestCase))
+    test_suite.addTest(unittest.makeSuite(TokenBudgetTestCase))
+    test_suite.addTest(unittest.makeSuite(TextDiffTestCase))
+    test_suite.addTest(unittest.makeSuite(RateLimiterTestCase))
+    test_suite.addTest(unittest.makeSuite(TasksTestCase))
+    test_suite.addTest(unittest.makeSuite(WorkerPoolTestCase))
+    test_suite.addTest(unittest.makeSuite(AnalysisTrackerTestCase))
+    test_suite.addTest(unittest.makeSuite(ArchiveTestCase))
+    test_suite.addTest(unittest.makeSuite(SchedulerTestCase))
+    test_suite.addTest(unittest.makeSuite(StorageTestCase))
+    test_suite.addTest(unittest.makeSuite(ObligationServiceTestCase))
+    test_suite.addTest(unittest.makeSuite(EventBusTestCase))
+    test_suite.addTest(unittest.makeSuite(EventPublishingTestCase))
+    test_suite.addTest(unittest.makeSuite(ExtractionPoolTestCase))
+    test_suite.addTest(unittest.makeSuite(FileProcessorsTestCase))
+    test_suite.addTest(unittest.makeSuite(OcrTestCase))
+    test_suite.addTest(unittest.makeSuite(ConfigTestCase))
+    test_suite.addTest(unittest.makeSuite(ReanalysisTestCase))
+    test_suite.addTest(unittest.makeSuite(BatchServiceTestCase))
+    test_suite.addTest(unittest.makeSuite(TaskServiceTestCase))
+    test_suite.addTest(unittest.makeSuite(FileSharingTestCase))
+    test_suite.addTest(unittest.makeSuite(PeriodicTestCase))
+    test_suite.addTest(unittest.makeSuite(OcrServiceTestCase))
     
     # Run the tests
     runner = unittest.TextTestRunner(verbosity=2)
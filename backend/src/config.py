@@ -25,15 +25,90 @@ class Config:
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB max upload size
     ALLOWED_EXTENSIONS = {'pdf', 'docx', 'txt'}
     
+    # Data room archive uploads
+    DATA_ROOM_MAX_SIZE = int(os.environ.get('DATA_ROOM_MAX_SIZE', 2 * 1024 * 1024 * 1024))  # 2GB max archive size
+    DATA_ROOM_MAX_FILE_SIZE = int(os.environ.get('DATA_ROOM_MAX_FILE_SIZE', 16 * 1024 * 1024))  # largest document in an archive
+    DATA_ROOM_MAX_FILES = int(os.environ.get('DATA_ROOM_MAX_FILES', 1000))  # documents per archive
+    DATA_ROOM_COMMIT_SIZE = int(os.environ.get('DATA_ROOM_COMMIT_SIZE', 25))  # documents inserted and queued per transaction
+    
     # S3 configuration
     AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
     AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY')
     S3_BUCKET = os.environ.get('S3_BUCKET')
     S3_REGION = os.environ.get('S3_REGION', 'us-east-1')
+    STORAGE_SPOOL_MAX_SIZE = int(os.environ.get('STORAGE_SPOOL_MAX_SIZE', 8 * 1024 * 1024))  # bytes of an S3 object kept in memory for extraction before spilling to disk
     
     # OpenAI configuration
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
-    
+    OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4')
+    OPENAI_CONTEXT_WINDOW = int(os.environ.get('OPENAI_CONTEXT_WINDOW', 0)) or None  # tokens; None uses the model's known window
+
+    # AI analysis configuration
+    AI_CHUNK_TOKENS = int(os.environ.get('AI_CHUNK_TOKENS', 3000))  # document tokens per clause extraction request
+    AI_CHUNK_OVERLAP_TOKENS = int(os.environ.get('AI_CHUNK_OVERLAP_TOKENS', 150))  # tokens shared by adjacent chunks
+    AI_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY', 4))  # parallel model requests per document
+    TEXT_CACHE_SIZE = int(os.environ.get('TEXT_CACHE_SIZE', 32))  # extracted texts kept in memory per process
+    SEARCH_TOP_K = int(os.environ.get('SEARCH_TOP_K', 5))  # passages sent to the model per search query
+
+    # Redis configuration
+    REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+
+    # Background task configuration
+    TASK_BACKEND = os.environ.get('TASK_BACKEND', 'celery')  # celery, or thread to run in the web process
+    TASK_WORKERS = int(os.environ.get('TASK_WORKERS', 4))  # analysis threads per web process with the thread backend
+    EXTRACTION_WORKERS = int(os.environ.get('EXTRACTION_WORKERS', os.cpu_count() or 1))  # text extraction processes per web or worker process; 0 extracts inline
+    EXTRACTION_TIMEOUT = int(os.environ.get('EXTRACTION_TIMEOUT', 120))  # seconds allowed to extract one file
+    EXTRACTION_MEMORY_LIMIT_MB = int(os.environ.get('EXTRACTION_MEMORY_LIMIT_MB', 1024))  # address space of an extraction process
+    PDF_RANGE_WORKERS = int(os.environ.get('PDF_RANGE_WORKERS', 0))  # most pdftotext processes splitting one large PDF into page ranges, on CPUs no other extraction is using; 1 extracts in one pass, 0 for no limit
+    PDF_RANGE_MIN_PAGES = int(os.environ.get('PDF_RANGE_MIN_PAGES', 50))  # PDFs with fewer pages are extracted in one pass
+    OCR_ENABLED = os.environ.get('OCR_ENABLED', 'true').lower() == 'true'  # recognize PDF pages without a text layer with tesseract
+    OCR_WORKERS = int(os.environ.get('OCR_WORKERS', 0))  # most pdftoppm and tesseract processes run at once for one document, on CPUs no other extraction is using; 0 for no limit
+    OCR_DPI = int(os.environ.get('OCR_DPI', 300))  # resolution pages are rendered at for OCR
+    OCR_LANGUAGE = os.environ.get('OCR_LANGUAGE', 'eng')  # tesseract language(s), e.g. "eng+deu"
+    OCR_MIN_PAGE_CHARS = int(os.environ.get('OCR_MIN_PAGE_CHARS', 10))  # pages with fewer non-blank characters are treated as images
+    OCR_PAGE_TIMEOUT = int(os.environ.get('OCR_PAGE_TIMEOUT', 120))  # seconds allowed to render or recognize one page
+    TASK_QUEUE_DEPTH = int(os.environ.get('TASK_QUEUE_DEPTH', 50))  # waiting tasks before new work is refused
+    TASK_RETRY_AFTER = int(os.environ.get('TASK_RETRY_AFTER', 30))  # seconds suggested to clients when the queue is full
+    ANALYSIS_ORG_MAX_CONCURRENCY = int(os.environ.get('ANALYSIS_ORG_MAX_CONCURRENCY', 2))  # analyses one organization may run at once; 0 for no cap
+    ANALYSIS_ORG_WEIGHTS = os.environ.get('ANALYSIS_ORG_WEIGHTS', '')  # fair-share weights as "org_id:weight,..."; others weigh 1
+    ANALYSIS_LEASE_SECONDS = int(os.environ.get('ANALYSIS_LEASE_SECONDS', 900))  # a running analysis that makes no progress for this long is requeued
+    ANALYSIS_MAX_ATTEMPTS = int(os.environ.get('ANALYSIS_MAX_ATTEMPTS', 3))  # attempts of one analysis run before it is failed
+    ANALYSIS_DISPATCH_TIMEOUT = int(os.environ.get('ANALYSIS_DISPATCH_TIMEOUT', 300))  # seconds a dispatched analysis may take to start before it is requeued
+    ANALYSIS_REAPER_INTERVAL = int(os.environ.get('ANALYSIS_REAPER_INTERVAL', 60))  # seconds between checks for expired leases
+    OBLIGATION_SWEEP_INTERVAL = int(os.environ.get('OBLIGATION_SWEEP_INTERVAL', 3600))  # seconds between overdue-obligation sweeps
+    OBLIGATION_SWEEP_BATCH_SIZE = int(os.environ.get('OBLIGATION_SWEEP_BATCH_SIZE', 500))  # organizations swept per UPDATE
+    EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', '')  # redis or memory; empty picks redis with Celery workers
+    EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 100))  # undelivered events kept per client before new ones are dropped
+    EVENTS_HEARTBEAT_INTERVAL = int(os.environ.get('EVENTS_HEARTBEAT_INTERVAL', 15))  # seconds between keepalive comments
+    EVENTS_MAX_DURATION = int(os.environ.get('EVENTS_MAX_DURATION', 300))  # seconds before a stream ends and the client reconnects
+    EVENTS_RETRY_MS = int(os.environ.get('EVENTS_RETRY_MS', 3000))  # reconnection delay suggested to clients
+    EVENTS_MAX_STREAMS = int(os.environ.get('EVENTS_MAX_STREAMS', 16))  # event streams one web process serves at once; the events service's gevent workers raise it, threaded workers keep it low as each stream holds a thread; 0 for no cap
+    EVENTS_STREAM_RETRY_AFTER = int(os.environ.get('EVENTS_STREAM_RETRY_AFTER', 30))  # Retry-After seconds when a process serves its maximum streams
+    CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', REDIS_URL)
+    CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'false').lower() == 'true'
+    CELERY_VISIBILITY_TIMEOUT = int(os.environ.get('CELERY_VISIBILITY_TIMEOUT', 7200))  # seconds before an unacknowledged task is redelivered
+    CELERY_TASK_TIME_LIMIT = int(os.environ.get('CELERY_TASK_TIME_LIMIT', 3600))  # seconds
+    CELERY_QUEUE_CONCURRENCY = {  # worker processes per queue
+        'analysis': int(os.environ.get('CELERY_ANALYSIS_CONCURRENCY', 4)),
+        'maintenance': int(os.environ.get('CELERY_MAINTENANCE_CONCURRENCY', 1))
+    }
+
+    # LLM response cache configuration
+    LLM_CACHE_BACKEND = os.environ.get('LLM_CACHE_BACKEND', 'memory')  # redis, sqlite, memory or none
+    LLM_CACHE_SIZE = int(os.environ.get('LLM_CACHE_SIZE', 1024))  # responses kept in memory per process
+    LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL', 30 * 24 * 3600))  # 30 days
+    LLM_CACHE_SQLITE_PATH = os.environ.get('LLM_CACHE_SQLITE_PATH', 'llm_cache.db')
+
+    # Model API rate limiting
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')  # redis, memory or none
+    OPENAI_RPM_LIMIT = int(os.environ.get('OPENAI_RPM_LIMIT', 500))  # requests per minute for the API key
+    OPENAI_TPM_LIMIT = int(os.environ.get('OPENAI_TPM_LIMIT', 40000))  # tokens per minute for the API key
+    RATE_LIMIT_INTERACTIVE_RESERVE = float(os.environ.get('RATE_LIMIT_INTERACTIVE_RESERVE', 0.2))  # share kept for interactive requests
+    RATE_LIMIT_MAX_WAIT = int(os.environ.get('RATE_LIMIT_MAX_WAIT', 300))  # seconds a request may wait for capacity
+    OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES', 5))
+    OPENAI_RETRY_BASE_DELAY = float(os.environ.get('OPENAI_RETRY_BASE_DELAY', 1.0))  # seconds
+    OPENAI_RETRY_MAX_DELAY = float(os.environ.get('OPENAI_RETRY_MAX_DELAY', 60.0))  # seconds
+
     # Stripe configuration
     STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY')
     STRIPE_PUBLISHABLE_KEY = os.environ.get('STRIPE_PUBLISHABLE_KEY')
@@ -54,12 +129,20 @@ class TestingConfig(Config):
     
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    LLM_CACHE_BACKEND = 'memory'
+    RATE_LIMIT_BACKEND = 'none'
+    OPENAI_MAX_RETRIES = 0
+    EXTRACTION_WORKERS = 0
+    CELERY_TASK_ALWAYS_EAGER = True
+    CELERY_BROKER_URL = 'memory://'
     
 
 class ProductionConfig(Config):
     """Production configuration."""
     
     DEBUG = False
+    LLM_CACHE_BACKEND = os.environ.get('LLM_CACHE_BACKEND', 'redis')
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'redis')
     
 
 # Configuration dictionary
@@ -71,6 +154,21 @@ config = {
 }
 
 # Get configuration by name
-def get_config(config_name='default'):
+def get_config(config_name=None):
+    """
+    Get a configuration class.
+    
+    Without a name, the class is chosen by the FLASK_CONFIG environment
+    variable, falling back to FLASK_ENV, so the web app and the Celery
+    workers of one deployment load the same configuration.
+    
+    Args:
+        config_name (str, optional): 'development', 'testing' or 'production'. Defaults to None.
+        
+    Returns:
+        type: The configuration class
+    """
+    if config_name is None:
+        config_name = os.environ.get('FLASK_CONFIG') or os.environ.get('FLASK_ENV', 'default')
     return config.get(config_name, config['default'])
 
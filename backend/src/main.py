@@ -7,7 +7,7 @@ from flask import Flask, send_from_directory
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from src.config import get_config
-from src.models import init_app as init_db
+from src.models import db, init_app as init_db
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
 from src.routes.subscription import subscription_bp
@@ -17,9 +17,12 @@ from src.routes.document import document_bp
 from src.routes.ai import ai_bp
 from src.middleware.error_handler import register_error_handlers
 from src.middleware.logging_middleware import init_logging
+from src.tasks import init_celery
+from src.services.event_bus import init_events
+from src.services.periodic import init_periodic_tasks
 
-def create_app(config_name='default'):
-    """Create and configure the Flask application."""
+def create_app(config_name=None):
+    """Create and configure the Flask application, configured from FLASK_CONFIG or FLASK_ENV by default."""
     app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
     
     # Load configuration
@@ -29,6 +32,8 @@ def create_app(config_name='default'):
     CORS(app, origins=app.config['CORS_ORIGINS'])
     jwt = JWTManager(app)
     init_db(app)
+    init_celery(app)
+    init_events(db.session)
     
     # Initialize middleware
     register_error_handlers(app)
@@ -60,6 +65,9 @@ def create_app(config_name='default'):
             else:
                 return "index.html not found", 404
     
+    # The thread task backend has no beat process; run its schedule here
+    init_periodic_tasks(app)
+    
     return app
 
 app = create_app()
@@ -1,7 +1,11 @@
+import math
 from flask import jsonify
 from werkzeug.exceptions import HTTPException
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from jwt.exceptions import PyJWTError
+from src.services.rate_limiter import RateLimitTimeout
+from src.services.worker_pool import QueueFullError
+from src.services.event_bus import StreamLimitError
 
 def register_error_handlers(app):
     """Register error handlers for the Flask application."""
@@ -91,6 +95,34 @@ def register_error_handlers(app):
             'message': 'Invalid or expired token'
         }), 401
     
+    @app.errorhandler(RateLimitTimeout)
+    def handle_rate_limit_timeout(error):
+        response = jsonify({
+            'error': 'Too Many Requests',
+            'message': str(error)
+        })
+        if error.retry_after:
+            response.headers['Retry-After'] = str(math.ceil(error.retry_after))
+        return response, 429
+    
+    @app.errorhandler(QueueFullError)
+    def handle_queue_full(error):
+        response = jsonify({
+            'error': 'Service Unavailable',
+            'message': 'The processing queue is full, please retry later'
+        })
+        response.headers['Retry-After'] = str(math.ceil(error.retry_after or 30))
+        return response, 503
+    
+    @app.errorhandler(StreamLimitError)
+    def handle_stream_limit(error):
+        response = jsonify({
+            'error': 'Service Unavailable',
+            'message': 'Too many event streams are open, please retry later'
+        })
+        response.headers['Retry-After'] = str(math.ceil(error.retry_after or 30))
+        return response, 503
+    
     @app.errorhandler(Exception)
     def handle_generic_exception(error):
         app.logger.error(f"Unhandled exception: {str(error)}")
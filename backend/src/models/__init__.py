@@ -10,9 +10,14 @@ from src.models.user import User
 from src.models.subscription import Subscription
 from src.models.organization import Organization, OrganizationUser
 from src.models.document import Document, DocumentVersion
+from src.models.document_text import DocumentText
+from src.models.ocr_page import OcrPage
+from src.models.document_batch import DocumentBatch
+from src.models.analysis_run import AnalysisRun, AnalysisStage, AnalysisCheckpoint
 from src.models.clause import Clause, ClauseCategory, ClauseCategoryMapping
 from src.models.comment import Comment
 from src.models.obligation import Obligation
+from src.models.obligation_sweep import ObligationSweep
 from src.models.document_share import DocumentShare
 from src.models.document_summary import DocumentSummary
 from src.models.search_query import SearchQuery
@@ -0,0 +1,137 @@
+from datetime import datetime
+from src.models import db
+
+# Pipeline stages recorded for every analysis run, in order
+ANALYSIS_STAGES = ['download', 'text_extraction', 'clause_extraction', 'summary', 'obligations', 'persistence']
+
+class AnalysisRun(db.Model):
+    """Analysis run model for tracking one execution of the document analysis pipeline."""
+
+    __tablename__ = 'analysis_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id', ondelete='CASCADE'), nullable=False, index=True)
+    document_version_id = db.Column(db.Integer, db.ForeignKey('document_versions.id', ondelete='SET NULL'), nullable=True)
+    status = db.Column(db.String(20), default='queued', nullable=False)  # 'queued', 'running', 'completed', 'failed'
+    priority = db.Column(db.String(20), default='normal', nullable=False)  # scheduler class: 'interactive', 'normal', 'bulk'
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    lease_expires_at = db.Column(db.DateTime, index=True)  # renewed by the worker; a running run past it is requeued
+
+    # Relationships
+    stages = db.relationship('AnalysisStage', backref='run', lazy=True, cascade='all, delete-orphan', order_by='AnalysisStage.id')
+    checkpoints = db.relationship('AnalysisCheckpoint', backref='run', lazy='dynamic', cascade='all, delete-orphan')
+
+    def __init__(self, document_id, document_version_id=None, status='queued', priority='normal'):
+        self.document_id = document_id
+        self.document_version_id = document_version_id
+        self.status = status
+        self.priority = priority
+        self.attempts = 0
+        self.stages = [AnalysisStage(name=name) for name in ANALYSIS_STAGES]
+
+    def to_dict(self):
+        """Convert analysis run to dictionary."""
+        finished = [stage for stage in self.stages if stage.status in ('completed', 'skipped')]
+        end = self.finished_at or (datetime.utcnow() if self.started_at else None)
+
+        return {
+            'id': self.id,
+            'document_id': self.document_id,
+            'document_version_id': self.document_version_id,
+            'status': self.status,
+            'priority': self.priority,
+            'progress': round(100 * len(finished) / len(self.stages)) if self.stages else 0,
+            'attempts': self.attempts,
+            'error': self.error,
+            'duration_seconds': (end - self.started_at).total_seconds() if self.started_at else None,
+            'prompt_tokens': sum(stage.prompt_tokens or 0 for stage in self.stages),
+            'completion_tokens': sum(stage.completion_tokens or 0 for stage in self.stages),
+            'stages': [stage.to_dict() for stage in self.stages],
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None
+        }
+
+    def __repr__(self):
+        return f'<AnalysisRun {self.id} - {self.status}>'
+
+
+class AnalysisStage(db.Model):
+    """Timing, token usage and outcome of one stage of an analysis run."""
+
+    __tablename__ = 'analysis_stages'
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey('analysis_runs.id', ondelete='CASCADE'), nullable=False, index=True)
+    name = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # 'pending', 'running', 'completed', 'failed', 'skipped'
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    model_requests = db.Column(db.Integer, default=0, nullable=False)
+    cached_requests = db.Column(db.Integer, default=0, nullable=False)  # requests answered from the LLM cache
+    prompt_tokens = db.Column(db.Integer, default=0, nullable=False)
+    completion_tokens = db.Column(db.Integer, default=0, nullable=False)
+    error = db.Column(db.Text)
+
+    __table_args__ = (
+        db.UniqueConstraint('run_id', 'name', name='uix_run_stage'),
+    )
+
+    def __init__(self, name, status='pending'):
+        self.name = name
+        self.status = status
+        self.model_requests = 0
+        self.cached_requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def to_dict(self):
+        """Convert analysis stage to dictionary."""
+        end = self.finished_at or (datetime.utcnow() if self.status == 'running' else None)
+
+        return {
+            'name': self.name,
+            'status': self.status,
+            'duration_seconds': (end - self.started_at).total_seconds() if self.started_at and end else None,
+            'model_requests': self.model_requests,
+            'cached_requests': self.cached_requests,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'error': self.error,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<AnalysisStage {self.run_id} - {self.name}>'
+
+
+class AnalysisCheckpoint(db.Model):
+    """Durable output of a stage, or of one model request within a stage, of an analysis run."""
+
+    __tablename__ = 'analysis_checkpoints'
+
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey('analysis_runs.id', ondelete='CASCADE'), nullable=False)
+    stage = db.Column(db.String(50), nullable=False)
+    key = db.Column(db.String(100), nullable=False)  # 'result' for the whole stage, or the request's text span
+    data = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('run_id', 'stage', 'key', name='uix_run_checkpoint'),
+    )
+
+    def __init__(self, run_id, stage, key, data=None):
+        self.run_id = run_id
+        self.stage = stage
+        self.key = key
+        self.data = data
+
+    def __repr__(self):
+        return f'<AnalysisCheckpoint {self.run_id} - {self.stage}:{self.key}>'
@@ -16,6 +16,7 @@ class Document(db.Model):
     file_size = db.Column(db.Integer, nullable=False)  # in bytes
     status = db.Column(db.String(20), default='processing', nullable=False)  # 'processing', 'processed', 'error'
     processing_error = db.Column(db.Text)
+    batch_id = db.Column(db.Integer, db.ForeignKey('document_batches.id', ondelete='SET NULL'), nullable=True, index=True)  # archive the document was uploaded in
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
@@ -25,6 +26,7 @@ class Document(db.Model):
     obligations = db.relationship('Obligation', backref='document', lazy=True, cascade='all, delete-orphan')
     shares = db.relationship('DocumentShare', backref='document', lazy=True, cascade='all, delete-orphan')
     summary = db.relationship('DocumentSummary', backref='document', uselist=False, lazy=True, cascade='all, delete-orphan')
+    analysis_runs = db.relationship('AnalysisRun', backref='document', lazy=True, cascade='all, delete-orphan')
     
     def __init__(self, organization_id, uploaded_by_user_id, title, file_path, file_type, file_size, description=None):
         self.organization_id = organization_id
@@ -48,6 +50,7 @@ class Document(db.Model):
             'file_size': self.file_size,
             'status': self.status,
             'processing_error': self.processing_error,
+            'batch_id': self.batch_id,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -66,20 +69,24 @@ class DocumentVersion(db.Model):
     version_number = db.Column(db.Integer, nullable=False)
     file_path = db.Column(db.String(512), nullable=False)
     created_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    content_hash = db.Column(db.String(64), index=True)  # SHA-256 of the file, computed on upload
+    analyzed_at = db.Column(db.DateTime)  # when the document's analysis was last brought up to this version
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     
-    # Relationship
+    # Relationships
     created_by_user = db.relationship('User', backref='document_versions')
+    extracted_text = db.relationship('DocumentText', backref='version', uselist=False, lazy=True, cascade='all, delete-orphan')
     
     __table_args__ = (
         db.UniqueConstraint('document_id', 'version_number', name='uix_doc_version'),
     )
     
-    def __init__(self, document_id, version_number, file_path, created_by_user_id=None):
+    def __init__(self, document_id, version_number, file_path, created_by_user_id=None, content_hash=None):
         self.document_id = document_id
         self.version_number = version_number
         self.file_path = file_path
         self.created_by_user_id = created_by_user_id
+        self.content_hash = content_hash
     
     def to_dict(self):
         """Convert document version to dictionary."""
@@ -89,6 +96,8 @@ class DocumentVersion(db.Model):
             'version_number': self.version_number,
             'file_path': self.file_path,
             'created_by_user_id': self.created_by_user_id,
+            'content_hash': self.content_hash,
+            'analyzed_at': self.analyzed_at.isoformat() if self.analyzed_at else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
     
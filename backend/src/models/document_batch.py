@@ -0,0 +1,51 @@
+from datetime import datetime
+from src.models import db
+
+class DocumentBatch(db.Model):
+    """Document batch model for archives of documents uploaded together, such as a data room."""
+    
+    __tablename__ = 'document_batches'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    organization_id = db.Column(db.Integer, db.ForeignKey('organizations.id', ondelete='CASCADE'), nullable=False, index=True)
+    uploaded_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    filename = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), default='extracting', nullable=False)  # 'extracting', 'extracted', 'failed'
+    total_files = db.Column(db.Integer, default=0, nullable=False)  # documents created from the archive
+    processed_files = db.Column(db.Integer, default=0, nullable=False)  # accepted archive members stored or skipped so far
+    archive_path = db.Column(db.String(512))  # the stored archive, until it is unpacked
+    skipped_files = db.Column(db.JSON)  # list of {'name', 'reason'} for entries not ingested
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    extracted_at = db.Column(db.DateTime)
+    
+    # Relationships
+    documents = db.relationship('Document', backref='batch', lazy='dynamic')
+    
+    def __init__(self, organization_id, uploaded_by_user_id, filename):
+        self.organization_id = organization_id
+        self.uploaded_by_user_id = uploaded_by_user_id
+        self.filename = filename
+        self.status = 'extracting'
+        self.total_files = 0
+        self.processed_files = 0
+        self.skipped_files = []
+    
+    def to_dict(self):
+        """Convert document batch to dictionary."""
+        return {
+            'id': self.id,
+            'organization_id': self.organization_id,
+            'uploaded_by_user_id': self.uploaded_by_user_id,
+            'filename': self.filename,
+            'status': self.status,
+            'total_files': self.total_files,
+            'processed_files': self.processed_files,
+            'skipped_files': self.skipped_files or [],
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'extracted_at': self.extracted_at.isoformat() if self.extracted_at else None
+        }
+    
+    def __repr__(self):
+        return f'<DocumentBatch {self.id} - {self.filename}>'
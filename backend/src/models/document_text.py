@@ -0,0 +1,62 @@
+import json
+import zlib
+from datetime import datetime
+from src.models import db
+
+class DocumentText(db.Model):
+    """Extracted text of a document version, stored compressed so it is parsed only once."""
+
+    __tablename__ = 'document_texts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    document_version_id = db.Column(db.Integer, db.ForeignKey('document_versions.id', ondelete='CASCADE'), unique=True, nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False, index=True)  # SHA-256 of the source file
+    compressed_text = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed UTF-8 text
+    text_length = db.Column(db.Integer, nullable=False)  # in characters
+    page_offsets = db.Column(db.JSON)  # character offset where each page starts
+    blocks = db.Column(db.JSON)  # offsets of each DOCX paragraph and table cell
+    compressed_index = db.Column(db.LargeBinary)  # zlib-compressed JSON of the BM25 passage index
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __init__(self, document_version_id, content_hash, text=None, compressed_text=None, text_length=None, page_offsets=None,
+                 blocks=None, compressed_index=None):
+        self.document_version_id = document_version_id
+        self.content_hash = content_hash
+        if text is not None:
+            compressed_text = zlib.compress(text.encode('utf-8'))
+            text_length = len(text)
+        self.compressed_text = compressed_text
+        self.text_length = text_length
+        self.page_offsets = page_offsets or [0]
+        self.blocks = blocks
+        self.compressed_index = compressed_index
+
+    @property
+    def text(self):
+        """Decompressed document text."""
+        return zlib.decompress(self.compressed_text).decode('utf-8')
+
+    @property
+    def passage_index(self):
+        """Decompressed passage index dictionary, or None if not built."""
+        if not self.compressed_index:
+            return None
+        return json.loads(zlib.decompress(self.compressed_index).decode('utf-8'))
+
+    @passage_index.setter
+    def passage_index(self, data):
+        self.compressed_index = zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8')) if data else None
+
+    def to_dict(self):
+        """Convert document text to dictionary."""
+        return {
+            'id': self.id,
+            'document_version_id': self.document_version_id,
+            'content_hash': self.content_hash,
+            'text_length': self.text_length,
+            'page_count': len(self.page_offsets or [0]),
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<DocumentText {self.document_version_id} - {self.content_hash[:12]}>'
@@ -12,17 +12,27 @@ class Obligation(db.Model):
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, nullable=False)
     due_date = db.Column(db.Date)
+    start_position = db.Column(db.Integer)  # character position of the source text in document
+    end_position = db.Column(db.Integer)  # character position of the source text in document
     status = db.Column(db.String(20), default='pending', nullable=False)  # 'pending', 'completed', 'overdue'
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
-    def __init__(self, document_id, title, description, clause_id=None, due_date=None, status='pending'):
+    __table_args__ = (
+        # Serves the overdue sweep, which only touches pending obligations past their due date
+        db.Index('ix_obligations_status_due_date', 'status', 'due_date'),
+    )
+    
+    def __init__(self, document_id, title, description, clause_id=None, due_date=None, status='pending',
+                 start_position=None, end_position=None):
         self.document_id = document_id
         self.clause_id = clause_id
         self.title = title
         self.description = description
         self.due_date = due_date
         self.status = status
+        self.start_position = start_position
+        self.end_position = end_position
     
     def to_dict(self):
         """Convert obligation to dictionary."""
@@ -34,6 +44,8 @@ class Obligation(db.Model):
             'description': self.description,
             'due_date': self.due_date.isoformat() if self.due_date else None,
             'status': self.status,
+            'start_position': self.start_position,
+            'end_position': self.end_position,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
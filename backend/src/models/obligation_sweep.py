@@ -0,0 +1,37 @@
+from datetime import datetime
+from src.models import db
+
+class ObligationSweep(db.Model):
+    """Per-organization result of the daily overdue-obligation sweep, read by dashboards and digests."""
+
+    __tablename__ = 'obligation_sweeps'
+
+    id = db.Column(db.Integer, primary_key=True)
+    organization_id = db.Column(db.Integer, db.ForeignKey('organizations.id', ondelete='CASCADE'), nullable=False)
+    swept_on = db.Column(db.Date, nullable=False)  # the day the obligations were compared against
+    newly_overdue = db.Column(db.Integer, default=0, nullable=False)  # obligations that became overdue that day
+    overdue_count = db.Column(db.Integer, default=0, nullable=False)  # all overdue obligations after the sweep
+    swept_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('organization_id', 'swept_on', name='uix_org_sweep_day'),
+    )
+
+    def __init__(self, organization_id, swept_on, newly_overdue=0, overdue_count=0):
+        self.organization_id = organization_id
+        self.swept_on = swept_on
+        self.newly_overdue = newly_overdue
+        self.overdue_count = overdue_count
+
+    def to_dict(self):
+        """Convert obligation sweep to dictionary."""
+        return {
+            'organization_id': self.organization_id,
+            'swept_on': self.swept_on.isoformat() if self.swept_on else None,
+            'newly_overdue': self.newly_overdue,
+            'overdue_count': self.overdue_count,
+            'swept_at': self.swept_at.isoformat() if self.swept_at else None
+        }
+
+    def __repr__(self):
+        return f'<ObligationSweep {self.organization_id} - {self.swept_on}>'
@@ -0,0 +1,36 @@
+import zlib
+from datetime import datetime
+from src.models import db
+
+class OcrPage(db.Model):
+    """OCR text of a rendered PDF page, keyed by the hash of its image so an unchanged page is recognized once."""
+
+    __tablename__ = 'ocr_pages'
+
+    id = db.Column(db.Integer, primary_key=True)
+    page_hash = db.Column(db.String(64), unique=True, nullable=False)  # SHA-256 of the OCR settings and the rendered page
+    compressed_text = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed UTF-8 text
+    text_length = db.Column(db.Integer, nullable=False)  # in characters
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __init__(self, page_hash, text):
+        self.page_hash = page_hash
+        self.compressed_text = zlib.compress(text.encode('utf-8'))
+        self.text_length = len(text)
+
+    @property
+    def text(self):
+        """Decompressed page text."""
+        return zlib.decompress(self.compressed_text).decode('utf-8')
+
+    def to_dict(self):
+        """Convert OCR page to dictionary."""
+        return {
+            'id': self.id,
+            'page_hash': self.page_hash,
+            'text_length': self.text_length,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<OcrPage {self.page_hash[:12]}>'
@@ -8,22 +8,27 @@ class SearchQuery(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id', ondelete='CASCADE'), nullable=True, index=True)
     query_text = db.Column(db.Text, nullable=False)
+    result = db.Column(db.JSON)  # answer, context and explanation returned by the model
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     
-    def __init__(self, user_id, query_text):
+    def __init__(self, user_id, query_text, document_id=None, result=None):
         self.user_id = user_id
         self.query_text = query_text
+        self.document_id = document_id
+        self.result = result
     
     def to_dict(self):
         """Convert search query to dictionary."""
         return {
             'id': self.id,
             'user_id': self.user_id,
+            'document_id': self.document_id,
             'query_text': self.query_text,
+            'result': self.result,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
     
     def __repr__(self):
         return f'<SearchQuery {self.query_text}>'
-
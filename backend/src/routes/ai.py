@@ -1,4 +1,5 @@
-from flask import Blueprint, jsonify, request
+import json
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models import db
 from src.models.document import Document
@@ -6,9 +7,15 @@ from src.models.clause import Clause, ClauseCategory
 from src.models.document_summary import DocumentSummary
 from src.models.obligation import Obligation
 from src.models.search_query import SearchQuery
+from src.models.analysis_run import AnalysisRun
 from src.services.ai_service import AIService
 from src.services.task_service import TaskService
-from src.middleware.auth_middleware import document_access_required
+from src.services.analysis_tracker import AnalysisTracker
+from src.services.text_service import TextService
+from src.services.llm_cache import get_llm_cache
+from src.services.rate_limiter import get_rate_governor
+from src.services.scheduler import INTERACTIVE
+from src.middleware.auth_middleware import admin_required, document_access_required
 from src.middleware.logging_middleware import log_audit_event
 
 ai_bp = Blueprint('ai', __name__)
@@ -27,14 +34,17 @@ def analyze_document(document_id):
     if document.status == 'processing':
         return jsonify({'error': 'Document is already being processed'}), 400
     
+    # Refuse the analysis while the processing queue is full
+    TaskService.check_capacity(INTERACTIVE)
+    
     # Update document status
     document.status = 'queued'
     db.session.commit()
     
-    # Queue document for analysis
-    success = TaskService.process_document_async(document_id)
+    # Queue document for analysis; capacity was checked above
+    run = TaskService.process_document_async(document_id, priority=INTERACTIVE, enforce_capacity=False)
     
-    if not success:
+    if not run:
         document.status = 'error'
         db.session.commit()
         return jsonify({'error': 'Failed to queue document for analysis'}), 500
@@ -44,10 +54,45 @@ def analyze_document(document_id):
     
     return jsonify({
         'message': 'Document analysis started',
-        'document': document.to_dict()
+        'document': document.to_dict(),
+        'analysis_run': run.to_dict()
     }), 202
 
 
+@ai_bp.route('/documents/<int:document_id>/analysis-status', methods=['GET'])
+@jwt_required()
+@document_access_required()
+def get_analysis_status(document_id):
+    """Get the latest analysis run of a document with its stage timings."""
+    # Get document
+    document = Document.query.get(document_id)
+    if not document:
+        return jsonify({'error': 'Document not found'}), 404
+    
+    run = AnalysisTracker.get_latest_run(document_id)
+    
+    return jsonify({
+        'document_id': document_id,
+        'status': document.status,
+        'analysis_run': run.to_dict() if run else None
+    }), 200
+
+
+@ai_bp.route('/documents/<int:document_id>/analysis-runs/<int:run_id>', methods=['GET'])
+@jwt_required()
+@document_access_required()
+def get_analysis_run(document_id, run_id):
+    """Get an analysis run of a document."""
+    # Get run
+    run = AnalysisRun.query.filter_by(id=run_id, document_id=document_id).first()
+    if not run:
+        return jsonify({'error': 'Analysis run not found'}), 404
+    
+    return jsonify({
+        'analysis_run': run.to_dict()
+    }), 200
+
+
 @ai_bp.route('/documents/<int:document_id>/clauses', methods=['GET'])
 @jwt_required()
 @document_access_required()
@@ -73,7 +118,8 @@ def get_document_clauses(document_id):
     result = [clause.to_dict() for clause in clauses]
     
     return jsonify({
-        'clauses': result
+        'clauses': result,
+        'page_offsets': TextService.get_page_offsets(Document.query.get(document_id))
     }), 200
 
 
@@ -109,6 +155,26 @@ def get_document_obligations(document_id):
     }), 200
 
 
+@ai_bp.route('/documents/<int:document_id>/estimate', methods=['GET'])
+@jwt_required()
+@document_access_required()
+def estimate_analysis(document_id):
+    """Estimate the tokens and cost of analyzing a document."""
+    # Get document
+    document = Document.query.get(document_id)
+    if not document:
+        return jsonify({'error': 'Document not found'}), 404
+    
+    estimate = AIService.estimate_analysis(document)
+    
+    if not estimate:
+        return jsonify({'error': 'Failed to extract document text'}), 500
+    
+    return jsonify({
+        'estimate': estimate
+    }), 200
+
+
 @ai_bp.route('/documents/<int:document_id>/search', methods=['POST'])
 @jwt_required()
 @document_access_required()
@@ -121,7 +187,7 @@ def search_document(document_id):
         return jsonify({'error': 'Query is required'}), 400
     
     # Search document
-    result = AIService.search_document(document_id, data['query'])
+    result = AIService.search_document(document_id, data['query'], user_id=get_jwt_identity())
     
     if not result:
         return jsonify({'error': 'Failed to search document'}), 500
@@ -134,6 +200,36 @@ def search_document(document_id):
     }), 200
 
 
+@ai_bp.route('/documents/<int:document_id>/search/stream', methods=['POST'])
+@jwt_required()
+@document_access_required()
+def search_document_stream(document_id):
+    """Search a document, streaming the answer as Server-Sent Events."""
+    data = request.json
+    
+    # Validate required fields
+    if not data or not data.get('query'):
+        return jsonify({'error': 'Query is required'}), 400
+    
+    # Log audit event
+    log_audit_event('search', 'document', document_id, {'query': data['query'], 'stream': True})
+    
+    events = AIService.search_document_stream(document_id, data['query'], user_id=get_jwt_identity())
+    
+    def generate():
+        for event, payload in events:
+            yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Disable proxy buffering so tokens reach the client immediately
+        }
+    )
+
+
 @ai_bp.route('/documents/<int:document_id>/search-history', methods=['GET'])
 @jwt_required()
 @document_access_required()
@@ -164,3 +260,17 @@ def get_clause_categories():
         'categories': result
     }), 200
 
+
+@ai_bp.route('/admin/metrics', methods=['GET'])
+@jwt_required()
+@admin_required()
+def get_ai_metrics():
+    """Get model cache, rate limiting and task queue metrics (admin only)."""
+    cache = get_llm_cache()
+    governor = get_rate_governor()
+    
+    return jsonify({
+        'llm_cache': cache.stats() if cache else None,
+        'rate_limiter': governor.stats() if governor else None,
+        'tasks': TaskService.stats()
+    }), 200
@@ -1,11 +1,17 @@
-from flask import Blueprint, jsonify, request, send_file, current_app
+from flask import Blueprint, jsonify, request, send_file, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import io
+import json
+import time
 from src.models import db
 from src.models.document import Document
 from src.models.document_share import DocumentShare
+from src.models.document_batch import DocumentBatch
 from src.services.document_service import DocumentService
 from src.services.task_service import TaskService
+from src.services.batch_service import BatchService
+from src.services.scheduler import BULK
+from src.services.event_bus import get_event_bus
 from src.middleware.auth_middleware import organization_access_required, document_access_required
 from src.middleware.logging_middleware import log_audit_event
 
@@ -70,6 +76,9 @@ def upload_document(organization_id):
     if not title:
         return jsonify({'error': 'Title is required'}), 400
     
+    # Refuse the upload while the processing queue is full
+    TaskService.check_capacity()
+    
     # Upload document
     document, error = DocumentService.upload_document(
         file=file,
@@ -82,8 +91,8 @@ def upload_document(organization_id):
     if not document:
         return jsonify({'error': error}), 400
     
-    # Queue document for analysis
-    TaskService.process_document_async(document.id)
+    # Queue document for analysis; capacity was checked before the document was stored
+    TaskService.process_document_async(document.id, enforce_capacity=False)
     
     # Log audit event
     log_audit_event('upload', 'document', document.id, {'title': title})
@@ -94,6 +103,102 @@ def upload_document(organization_id):
     }), 201
 
 
+@document_bp.route('/organizations/<int:organization_id>/documents/archive', methods=['POST'])
+@jwt_required()
+@organization_access_required()
+def upload_archive(organization_id):
+    """Upload a ZIP archive of documents, such as a data room, to an organization."""
+    current_user_id = get_jwt_identity()
+    
+    # Archives may exceed the single-upload limit; the form parser spools them to disk
+    request.max_content_length = current_app.config.get('DATA_ROOM_MAX_SIZE', 2 * 1024 * 1024 * 1024)
+    
+    # Check if file is provided
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    
+    file = request.files['file']
+    
+    # Check if file is empty
+    if file.filename == '':
+        return jsonify({'error': 'Empty file provided'}), 400
+    
+    # Refuse the archive while the bulk queue is full; once accepted, all its documents are queued
+    TaskService.check_capacity(BULK)
+    
+    # Ingest archive
+    batch, error = BatchService.ingest_archive(
+        file=file,
+        organization_id=organization_id,
+        user_id=current_user_id
+    )
+    
+    if not batch:
+        return jsonify({'error': error}), 400
+    
+    # Log audit event
+    log_audit_event('upload', 'document_batch', batch.id, {
+        'filename': batch.filename
+    })
+    
+    return jsonify({
+        'message': 'Archive uploaded successfully',
+        'batch': batch.to_dict(),
+        'progress': BatchService.get_progress(batch)
+    }), 202
+
+
+@document_bp.route('/organizations/<int:organization_id>/batches/<int:batch_id>', methods=['GET'])
+@jwt_required()
+@organization_access_required()
+def get_batch(organization_id, batch_id):
+    """Get a document batch with its aggregate analysis progress."""
+    # Get batch
+    batch = DocumentBatch.query.filter_by(id=batch_id, organization_id=organization_id).first()
+    if not batch:
+        return jsonify({'error': 'Batch not found'}), 404
+    
+    return jsonify({
+        'batch': batch.to_dict(),
+        'progress': BatchService.get_progress(batch)
+    }), 200
+
+
+@document_bp.route('/organizations/<int:organization_id>/events', methods=['GET'])
+@jwt_required()
+@organization_access_required()
+def stream_organization_events(organization_id):
+    """Stream document status and analysis stage changes as Server-Sent Events."""
+    heartbeat = current_app.config.get('EVENTS_HEARTBEAT_INTERVAL', 15)
+    deadline = time.monotonic() + current_app.config.get('EVENTS_MAX_DURATION', 300)
+    subscription = get_event_bus().subscribe(organization_id)
+    
+    # Access was checked once; an open stream holds no database connection
+    db.session.remove()
+    
+    def generate():
+        # Clients reconnect after the stream ends, which re-checks their token and access
+        yield f"retry: {current_app.config.get('EVENTS_RETRY_MS', 3000)}\n\n"
+        while time.monotonic() < deadline:
+            message = subscription.get(timeout=heartbeat)
+            if message is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Disable proxy buffering so events reach the client immediately
+        }
+    )
+    # Frees the stream slot even when the client leaves before the first event
+    response.call_on_close(subscription.close)
+    return response
+
+
 @document_bp.route('/documents/<int:document_id>', methods=['GET'])
 @jwt_required()
 @document_access_required()
@@ -3,6 +3,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models import db
 from src.models.user import User
 from src.models.organization import Organization, OrganizationUser
+from src.services.obligation_service import ObligationService
 
 organization_bp = Blueprint('organization', __name__)
 
@@ -186,6 +187,35 @@ def get_organization_users(organization_id):
     }), 200
 
 
+@organization_bp.route('/<int:organization_id>/obligations/overdue', methods=['GET'])
+@jwt_required()
+def get_overdue_obligations(organization_id):
+    """Get the overdue obligation counts recorded by the daily sweeps."""
+    current_user_id = get_jwt_identity()
+    
+    # Check if organization exists
+    organization = Organization.query.get(organization_id)
+    if not organization:
+        return jsonify({'error': 'Organization not found'}), 404
+    
+    # Check if user is a member of the organization
+    org_user = OrganizationUser.query.filter_by(
+        organization_id=organization_id,
+        user_id=current_user_id
+    ).first()
+    
+    if not org_user:
+        return jsonify({'error': 'Unauthorized access'}), 403
+    
+    days = min(max(request.args.get('days', 30, type=int), 1), 365)
+    sweeps = ObligationService.get_overdue_history(organization_id, days)
+    
+    return jsonify({
+        'overdue_count': sweeps[0].overdue_count if sweeps else 0,
+        'sweeps': [sweep.to_dict() for sweep in sweeps]
+    }), 200
+
+
 @organization_bp.route('/<int:organization_id>/users', methods=['POST'])
 @jwt_required()
 def add_organization_user(organization_id):
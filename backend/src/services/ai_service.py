@@ -1,27 +1,460 @@
 import os
 import json
+import time
+import threading
+from contextvars import copy_context
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import insert, update
+from dateutil import parser as date_parser
 from flask import current_app
-import openai
+from openai import OpenAI, RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
 from src.models import db
-from src.models.document import Document
-from src.models.clause import Clause, ClauseCategory
+from src.models.document import Document, DocumentVersion
+from src.models.clause import Clause, ClauseCategoryMapping
 from src.models.document_summary import DocumentSummary
 from src.models.obligation import Obligation
-from src.utils.file_processors import FileProcessor
+from src.models.search_query import SearchQuery
+from src.services.text_service import TextService
+from src.services.analysis_tracker import AnalysisTracker
+from src.services.llm_cache import get_llm_cache, make_cache_key
+from src.services.category_cache import ClauseCategoryCache
+from src.services.rate_limiter import get_rate_governor, get_retry_after, backoff_delay, RateLimitTimeout, INTERACTIVE, BACKGROUND
+from src.utils.text_chunker import split_into_chunks, locate_span, merge_spans
+from src.utils.json_stream import JSONFieldStreamParser
+from src.utils.text_diff import TextDiff
+from src.utils.token_budget import count_tokens, count_message_tokens, text_budget, truncate_to_tokens, estimate_cost
+
+# Clause categories offered to the model
+CLAUSE_CATEGORIES = [
+    "Termination",
+    "Liability",
+    "Confidentiality",
+    "Intellectual Property",
+    "Payment",
+    "Indemnification",
+    "Force Majeure",
+    "Governing Law",
+    "Dispute Resolution",
+    "Assignment",
+    "Amendment",
+    "Entire Agreement",
+    "Severability",
+    "Notices",
+    "Waiver",
+    "Counterparts",
+    "Term",
+    "Representations and Warranties",
+    "Compliance with Laws",
+    "Insurance",
+    "Other"
+]
+
+SYSTEM_PROMPT = "You are a legal AI assistant specialized in contract analysis."
+
+# Fields of the search result streamed to the client as they are generated
+SEARCH_RESULT_FIELDS = ['answer', 'context', 'explanation']
+
+# Response token limits of each prompt
+CLAUSE_MAX_TOKENS = 2000
+SUMMARY_MAX_TOKENS = 1000
+OBLIGATION_MAX_TOKENS = 1000
+SEARCH_MAX_TOKENS = 500
+
+# Separator between search passages in the prompt
+PASSAGE_SEPARATOR = '\n\n[...]\n\n'
+PASSAGE_SEPARATOR_TOKENS = 5
+
+# Process-wide OpenAI client, shared by all threads so connections are reused
+_client = None
+_client_lock = threading.Lock()
 
 class AIService:
     """Service for handling AI operations."""
     
     @staticmethod
-    def init_openai():
-        """Initialize OpenAI API."""
-        openai.api_key = current_app.config['OPENAI_API_KEY']
+    def get_client():
+        """
+        Get the shared OpenAI client.
+        
+        The client is thread-safe and keeps a pooled HTTP connection, so it is
+        created once per process and reused by every analysis stage. Its own
+        retries are disabled; _create_completion retries through the rate
+        governor instead.
+        
+        Returns:
+            OpenAI: The OpenAI client
+        """
+        global _client
+        
+        if _client is None:
+            with _client_lock:
+                if _client is None:
+                    _client = OpenAI(api_key=current_app.config['OPENAI_API_KEY'], max_retries=0)
+        
+        return _client
+    
+    @staticmethod
+    def _chat_completion(prompt, max_tokens, temperature=0.2, organization_id=None, lane=BACKGROUND):
+        """
+        Send a prompt to the chat model.
+        
+        Responses are cached by a hash of the model, messages, temperature and
+        max_tokens, so re-analyzing an identical text costs no model call.
+        Each organization gets its own cache namespace.
+        
+        Args:
+            prompt (str): The user prompt
+            max_tokens (int): Maximum number of tokens in the response
+            temperature (float, optional): Sampling temperature. Defaults to 0.2.
+            organization_id (int, optional): The organization the request is made for. Defaults to None.
+            lane (str, optional): Rate limit lane, 'interactive' or 'background'. Defaults to 'background'.
+            
+        Returns:
+            str: The response content
+        """
+        model = AIService._model()
+        messages = AIService._build_messages(prompt)
+        
+        cache = get_llm_cache()
+        cache_key = make_cache_key(model, messages, temperature, max_tokens)
+        namespace = f"org:{organization_id}" if organization_id else None
+        
+        if cache is not None:
+            content = cache.get(cache_key, namespace)
+            if content is not None:
+                AnalysisTracker.record_usage(0, 0, cached=True)
+                return content
+        
+        response = AIService._create_completion(
+            lane,
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        content = response.choices[0].message.content
+        
+        usage = getattr(response, 'usage', None)
+        if usage:
+            AnalysisTracker.record_usage(usage.prompt_tokens, usage.completion_tokens)
+        
+        if cache is not None and content:
+            cache.set(cache_key, content, namespace)
+        
+        return content
+    
+    @staticmethod
+    def _stream_chat_completion(prompt, max_tokens, temperature=0.2, organization_id=None, lane=INTERACTIVE):
+        """
+        Stream the chat model's response as it is generated.
+        
+        A cached response is yielded as a single fragment; a fresh response is
+        cached once the stream completes.
+        
+        Args:
+            prompt (str): The user prompt
+            max_tokens (int): Maximum number of tokens in the response
+            temperature (float, optional): Sampling temperature. Defaults to 0.2.
+            organization_id (int, optional): The organization the request is made for. Defaults to None.
+            lane (str, optional): Rate limit lane, 'interactive' or 'background'. Defaults to 'interactive'.
+            
+        Yields:
+            str: Fragments of the response content
+        """
+        model = AIService._model()
+        messages = AIService._build_messages(prompt)
+        
+        cache = get_llm_cache()
+        cache_key = make_cache_key(model, messages, temperature, max_tokens)
+        namespace = f"org:{organization_id}" if organization_id else None
+        
+        if cache is not None:
+            content = cache.get(cache_key, namespace)
+            if content is not None:
+                yield content
+                return
+        
+        stream = AIService._create_completion(
+            lane,
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        
+        parts = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            fragment = chunk.choices[0].delta.content
+            if fragment:
+                parts.append(fragment)
+                yield fragment
+        
+        content = ''.join(parts)
+        if cache is not None and content:
+            cache.set(cache_key, content, namespace)
+    
+    @staticmethod
+    def _create_completion(lane, **kwargs):
+        """
+        Create a chat completion through the shared rate governor.
+        
+        Each attempt waits for request and token capacity in its lane. Rate
+        limits, timeouts, connection errors and server errors are retried with
+        jittered exponential backoff, waiting at least as long as the API's
+        Retry-After; a rate limit also pauses every other caller. The last
+        error is raised so callers never mistake a failure for an empty result.
+        
+        Args:
+            lane (str): Rate limit lane, 'interactive' or 'background'
+            **kwargs: Arguments for chat.completions.create
+            
+        Returns:
+            The completion, or a stream of chunks if stream=True
+        """
+        config = current_app.config
+        governor = get_rate_governor()
+        max_retries = config.get('OPENAI_MAX_RETRIES', 5)
+        
+        estimated_tokens = count_message_tokens(kwargs['messages'], kwargs['model']) + kwargs.get('max_tokens', 0)
+        
+        attempt = 0
+        while True:
+            if governor is not None:
+                governor.acquire(estimated_tokens, lane)
+            
+            try:
+                response = AIService.get_client().chat.completions.create(**kwargs)
+            except (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError) as e:
+                rate_limited = isinstance(e, RateLimitError)
+                if attempt >= max_retries or (rate_limited and getattr(e, 'code', None) == 'insufficient_quota'):
+                    raise
+                
+                delay = backoff_delay(
+                    attempt,
+                    retry_after=get_retry_after(e),
+                    base=config.get('OPENAI_RETRY_BASE_DELAY', 1.0),
+                    cap=config.get('OPENAI_RETRY_MAX_DELAY', 60.0)
+                )
+                if governor is not None:
+                    governor.record_retry(rate_limited)
+                    if rate_limited:
+                        governor.pause(delay)
+                
+                current_app.logger.warning(f"Model request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            
+            # Return unused reserved tokens to the bucket
+            usage = getattr(response, 'usage', None)
+            if governor is not None and usage is not None and getattr(usage, 'total_tokens', None):
+                governor.settle(estimated_tokens, usage.total_tokens)
+            
+            return response
+    
+    @staticmethod
+    def _build_messages(prompt):
+        """Build the chat messages for a prompt."""
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    
+    @staticmethod
+    def _model():
+        """Get the configured chat model name."""
+        return current_app.config.get('OPENAI_MODEL', 'gpt-4')
+    
+    @staticmethod
+    def _text_budget(build_prompt, max_tokens):
+        """
+        Compute how many tokens of document text fit in a prompt.
+        
+        The overhead of the prompt template is measured by rendering it with
+        no text, so each template gets exactly the room it leaves.
+        
+        Args:
+            build_prompt (callable): Function rendering the prompt for a text
+            max_tokens (int): Tokens reserved for the response
+            
+        Returns:
+            int: The number of tokens available for the text
+        """
+        model = AIService._model()
+        overhead = count_message_tokens(AIService._build_messages(build_prompt('')), model)
+        
+        return text_budget(overhead, max_tokens, model, current_app.config.get('OPENAI_CONTEXT_WINDOW'))
+    
+    @staticmethod
+    def _clauses_prompt(text):
+        """Render the clause extraction prompt."""
+        return f"""
+        You are a legal AI assistant specialized in contract analysis. Extract clauses from the following contract text.
+        For each clause, identify:
+        1. The clause category (choose from: {', '.join(CLAUSE_CATEGORIES)})
+        2. The clause text, quoted exactly as it appears in the contract
+        3. Any potential risks or issues with the clause
+        
+        Format your response as a JSON array of objects with the following structure:
+        [
+            {{
+                "category": "Category name",
+                "text": "Full clause text",
+                "risk_level": "high/medium/low/none",
+                "risk_description": "Description of any risks or issues"
+            }}
+        ]
+        
+        Contract text:
+        {text}
+        """
+    
+    @staticmethod
+    def _summary_prompt(text):
+        """Render the summary prompt."""
+        return f"""
+        You are a legal AI assistant specialized in contract analysis. Generate a comprehensive summary of the following contract.
+        Include:
+        1. A brief overview of the contract purpose
+        2. Key parties involved
+        3. Main terms and conditions
+        4. Important dates and deadlines
+        5. Any notable provisions or unusual terms
+        
+        Format your response as a JSON object with the following structure:
+        {{
+            "overview": "Brief overview of the contract",
+            "parties": ["Party 1", "Party 2"],
+            "key_terms": ["Term 1", "Term 2"],
+            "important_dates": ["Date 1: Description", "Date 2: Description"],
+            "notable_provisions": ["Provision 1", "Provision 2"]
+        }}
+        
+        Contract text:
+        {text}
+        """
+    
+    @staticmethod
+    def _obligations_prompt(text):
+        """Render the obligation extraction prompt."""
+        return f"""
+        You are a legal AI assistant specialized in contract analysis. Extract key obligations and deadlines from the following contract text.
+        For each obligation, identify:
+        1. The party responsible
+        2. The obligation description
+        3. The deadline or timeframe (if any)
+        4. The consequence of non-compliance (if any)
+        5. The sentence creating the obligation, quoted exactly as it appears in the contract
+        
+        Format your response as a JSON array of objects with the following structure:
+        [
+            {{
+                "party": "Party name",
+                "description": "Obligation description",
+                "deadline": "Deadline or timeframe (if any)",
+                "consequence": "Consequence of non-compliance (if any)",
+                "text": "Sentence creating the obligation"
+            }}
+        ]
+        
+        Contract text:
+        {text}
+        """
+    
+    @staticmethod
+    def _search_prompt(query, text):
+        """Render the search prompt."""
+        return f"""
+        You are a legal AI assistant specialized in contract analysis. Search the following contract excerpts for information related to this query: "{query}"
+        
+        Return your response as a JSON object with the following structure:
+        {{
+            "answer": "Direct answer to the query",
+            "context": "Relevant clause or section from the contract",
+            "explanation": "Brief explanation of the answer"
+        }}
+        
+        The excerpts are the passages of the contract most relevant to the query, in document order.
+        If the query cannot be answered based on the excerpts, indicate that in your answer.
+        
+        Contract excerpts:
+        {text}
+        """
+    
+    @staticmethod
+    def _parse_json(content, opening='{', closing='}'):
+        """
+        Extract the JSON value embedded in a model response.
+        
+        Args:
+            content (str): The response content
+            opening (str, optional): Opening bracket of the value. Defaults to '{'.
+            closing (str, optional): Closing bracket of the value. Defaults to '}'.
+            
+        Returns:
+            The parsed value, or None if the response holds no JSON
+        """
+        json_start = content.find(opening)
+        json_end = content.rfind(closing) + 1
+        
+        if json_start == -1 or json_end == 0:
+            current_app.logger.error("Failed to extract JSON from OpenAI response")
+            return None
+        
+        return json.loads(content[json_start:json_end])
+    
+    @staticmethod
+    def _run_stage(app, name, stage, *args):
+        """
+        Run an analysis stage in a worker thread.
+        
+        Each worker pushes its own application context, so it gets its own
+        database session instead of sharing the caller's. The stage is timed
+        on the current analysis run, if any, and its result checkpointed, so
+        a retried run does not call the model for a stage that completed.
+        
+        Args:
+            app: The Flask application
+            name (str): The stage name recorded on the analysis run
+            stage (callable): The stage function
+            *args: Arguments for the stage function
+            
+        Returns:
+            The stage result
+        """
+        with app.app_context(), AnalysisTracker.stage(name):
+            try:
+                return AnalysisTracker.checkpointed(name, 'result', stage, *args)
+            except Exception as e:
+                # Fail the analysis rather than save it with a stage missing
+                app.logger.error(f"Error in analysis stage {stage.__name__}: {str(e)}")
+                raise
     
     @staticmethod
     def analyze_document(document_id):
         """
         Analyze a document using OpenAI API.
         
+        The clause, summary and obligation stages are independent, so they run
+        concurrently and the document takes one model latency instead of three.
+        Their results are saved and committed together once all stages finish.
+        
+        When the organization already analyzed an identical file, its results
+        are copied instead. When an earlier version of the document was
+        analyzed, the new text is
+        diffed against it and only the changed sections are sent to the model;
+        clauses and obligations in unchanged sections are kept with their
+        offsets remapped to the new text.
+        
+        Model output is checkpointed on the analysis run, so a retried run
+        resumes from the first incomplete stage. The persistence stage is
+        completed in the transaction that saves the results; a run whose
+        results were saved before its worker died has nothing left to do.
+        
         Args:
             document_id (int): The document ID
             
@@ -34,155 +467,590 @@ class AIService:
             current_app.logger.error(f"Document not found: {document_id}")
             return False
         
+        if AnalysisTracker.stage_completed('persistence'):
+            return True
+        
         # Get document content
         try:
-            # Get file processor based on document type
-            processor = FileProcessor.get_processor(document.file_type)
+            version = TextService.get_current_version(document)
+            
+            # An identical file the organization already analyzed needs no model calls
+            source = AIService._find_analyzed_duplicate(document, version)
+            if source:
+                with AnalysisTracker.stage('persistence'):
+                    if not AnalysisTracker.complete_persistence():
+                        db.session.rollback()
+                        return True
+                    AIService._clone_analysis(source.document_id, document_id)
+                    version.analyzed_at = datetime.utcnow()
+                    document.status = 'analyzed'
+                    db.session.commit()
+                return True
             
-            # Extract text from document
-            text = processor.extract_text(document.file_path)
+            # Get the stored extracted text, extracting it on first use
+            extracted = TextService.get_document_text(document)
             
-            if not text:
+            if not extracted or not extracted.text:
                 current_app.logger.error(f"Failed to extract text from document: {document_id}")
                 return False
             
-            # Extract clauses
-            clauses = AIService.extract_clauses(text, document_id)
+            text = extracted.text
+            organization_id = document.organization_id
             
-            # Generate summary
-            summary = AIService.generate_summary(text, document_id)
+            plan = AIService._plan_incremental_analysis(document, version, text)
+            if plan:
+                clause_regions = plan['clause_regions']
+                obligation_regions = plan['obligation_regions']
+                needs_summary = plan['needs_summary']
+            else:
+                clause_regions = obligation_regions = None
+                needs_summary = True
             
-            # Extract obligations
-            obligations = AIService.extract_obligations(text, document_id)
+            # Run the model stages concurrently, skipping those with nothing to re-read
+            app = current_app._get_current_object()
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                clauses_future = obligations_future = summary_future = None
+                # Each stage runs in a copy of this context so it is recorded on the current run
+                if clause_regions is None or clause_regions:
+                    clauses_future = executor.submit(copy_context().run, AIService._run_stage, app, 'clause_extraction', AIService._collect_clauses, text, organization_id, clause_regions)
+                if needs_summary:
+                    summary_future = executor.submit(copy_context().run, AIService._run_stage, app, 'summary', AIService._request_summary, text, organization_id)
+                if obligation_regions is None or obligation_regions:
+                    obligations_future = executor.submit(copy_context().run, AIService._run_stage, app, 'obligations', AIService._collect_obligations, text, organization_id, obligation_regions)
+                
+                clauses_data = clauses_future.result() if clauses_future else []
+                summary_data = summary_future.result() if summary_future else None
+                obligations_data = obligations_future.result() if obligations_future else []
             
-            # Update document status
-            document.status = 'analyzed'
-            db.session.commit()
+            # New categories are committed on their own connection, before the session writes
+            category_ids = AIService._get_category_ids(clauses_data or [])
+            
+            with AnalysisTracker.stage('persistence'):
+                # Another attempt of this run already saved its results
+                if not AnalysisTracker.complete_persistence():
+                    db.session.rollback()
+                    return True
+                
+                # Re-extracted obligations keep the status users gave them
+                previous_statuses = {}
+                if plan:
+                    previous_statuses = {
+                        (obligation.title, obligation.description): obligation.status
+                        for obligation in plan['obligations']['stale']
+                    }
+                    AIService._apply_carry_over(Clause, plan['clauses'], extracted)
+                    AIService._apply_carry_over(Obligation, plan['obligations'])
+                
+                # Pages let the viewer jump to a clause without searching the text
+                for clause_data in clauses_data or []:
+                    clause_data['page_number'] = extracted.page_for_offset(clause_data.get('start_position'))
+                
+                # Save all results in one transaction
+                AIService._save_clauses(clauses_data or [], document_id, category_ids)
+                if summary_data:
+                    AIService._save_summary(summary_data, document_id)
+                AIService._save_obligations(obligations_data or [], document_id, previous_statuses)
+                
+                # Update document status
+                if version:
+                    version.analyzed_at = datetime.utcnow()
+                document.status = 'analyzed'
+                db.session.commit()
             
             return True
         except Exception as e:
+            db.session.rollback()
             current_app.logger.error(f"Error analyzing document: {str(e)}")
             return False
     
+    @staticmethod
+    def _find_analyzed_duplicate(document, version):
+        """
+        Find an analyzed version of another document with the same file content.
+        
+        Only documents that were never analyzed are copied to; later versions
+        go through incremental analysis, which keeps comments on unchanged
+        clauses. Only versions whose analysis is the source document's
+        current one qualify, and only within the document's organization.
+        
+        Args:
+            document (Document): The document to analyze
+            version (DocumentVersion): Its current version
+            
+        Returns:
+            DocumentVersion: The analyzed version, or None if there is none
+        """
+        if not version or not version.content_hash:
+            return None
+        
+        analyzed = DocumentVersion.query.filter(
+            DocumentVersion.document_id == document.id,
+            DocumentVersion.analyzed_at.isnot(None)
+        ).first()
+        if analyzed:
+            return None
+        
+        return DocumentVersion.query.join(
+            Document, Document.id == DocumentVersion.document_id
+        ).filter(
+            DocumentVersion.content_hash == version.content_hash,
+            DocumentVersion.analyzed_at.isnot(None),
+            DocumentVersion.file_path == Document.file_path,
+            Document.organization_id == document.organization_id,
+            Document.status == 'analyzed',
+            Document.id != document.id
+        ).order_by(DocumentVersion.analyzed_at.desc()).first()
+    
+    @staticmethod
+    def _clone_analysis(source_document_id, document_id):
+        """
+        Copy another document's analysis to a document, in the current transaction.
+        
+        Clauses, their category mappings, the summary and obligations are
+        copied with one insert per table. Obligations start out pending.
+        
+        Args:
+            source_document_id (int): The analyzed document
+            document_id (int): The document to copy the analysis to
+        """
+        clauses = Clause.query.filter_by(document_id=source_document_id).order_by(Clause.id).all()
+        clause_ids = {}
+        if clauses:
+            result = db.session.execute(
+                insert(Clause).returning(Clause.id, sort_by_parameter_order=True),
+                [
+                    {
+                        'document_id': document_id,
+                        'clause_type': clause.clause_type,
+                        'title': clause.title,
+                        'content': clause.content,
+                        'page_number': clause.page_number,
+                        'start_position': clause.start_position,
+                        'end_position': clause.end_position,
+                        'risk_level': clause.risk_level,
+                        'risk_explanation': clause.risk_explanation
+                    }
+                    for clause in clauses
+                ]
+            )
+            clause_ids = dict(zip((clause.id for clause in clauses), result.scalars()))
+            
+            mappings = ClauseCategoryMapping.query.filter(
+                ClauseCategoryMapping.clause_id.in_(clause_ids.keys())
+            ).all()
+            if mappings:
+                db.session.execute(insert(ClauseCategoryMapping), [
+                    {
+                        'clause_id': clause_ids[mapping.clause_id],
+                        'category_id': mapping.category_id,
+                        'confidence_score': mapping.confidence_score
+                    }
+                    for mapping in mappings
+                ])
+        
+        obligations = Obligation.query.filter_by(document_id=source_document_id).all()
+        if obligations:
+            db.session.execute(insert(Obligation), [
+                {
+                    'document_id': document_id,
+                    'clause_id': clause_ids.get(obligation.clause_id),
+                    'title': obligation.title,
+                    'description': obligation.description,
+                    'due_date': obligation.due_date,
+                    'start_position': obligation.start_position,
+                    'end_position': obligation.end_position,
+                    'status': 'pending'
+                }
+                for obligation in obligations
+            ])
+        
+        summary = DocumentSummary.query.filter_by(document_id=source_document_id).first()
+        if summary:
+            AIService._save_summary(json.loads(summary.summary_text), document_id)
+    
+    @staticmethod
+    def _plan_incremental_analysis(document, version, text):
+        """
+        Work out which parts of a new version need to be re-analyzed.
+        
+        Args:
+            document (Document): The document
+            version (DocumentVersion): The version being analyzed
+            text (str): The version's text
+            
+        Returns:
+            dict: The changed regions per stage and the results to carry over,
+                or None if the whole document must be analyzed
+        """
+        if not version:
+            return None
+        
+        previous = DocumentVersion.query.filter(
+            DocumentVersion.document_id == document.id,
+            DocumentVersion.analyzed_at.isnot(None)
+        ).order_by(DocumentVersion.version_number.desc()).first()
+        if not previous:
+            return None
+        
+        previous_extracted = TextService.get_version_text(document, previous)
+        if not previous_extracted:
+            return None
+        
+        previous_text = previous_extracted.text
+        diff = TextDiff.compute(previous_text, text)
+        sections = diff.changed_sections(text)
+        
+        clauses = AIService._carry_over(document.clauses, previous_text, diff, sections)
+        obligations = AIService._carry_over(document.obligations, previous_text, diff, sections)
+        
+        current_app.logger.info(
+            f"Incremental analysis of document {document.id} against version {previous.version_number}: "
+            f"{len(sections)} changed sections"
+        )
+        
+        # Results that cannot be anchored in the old text are re-extracted from the whole document
+        return {
+            'clause_regions': sections if clauses else None,
+            'obligation_regions': sections if obligations else None,
+            'needs_summary': not diff.is_identical or not document.summary,
+            'clauses': clauses or {'carried': [], 'stale': list(document.clauses)},
+            'obligations': obligations or {'carried': [], 'stale': list(document.obligations)}
+        }
+    
+    @staticmethod
+    def _carry_over(items, previous_text, diff, sections):
+        """
+        Split existing clauses or obligations into those kept and those re-extracted.
+        
+        Args:
+            items (list): Clause or Obligation objects of the previous analysis
+            previous_text (str): The analyzed version's text
+            diff (TextDiff): Diff from the analyzed version to the new one
+            sections (list): Changed sections of the new text
+            
+        Returns:
+            dict: 'carried' list of (item, start, end) and 'stale' list of items,
+                or None if an item has no position in the old text
+        """
+        carried = []
+        stale = []
+        
+        for item in items:
+            start, end = item.start_position, item.end_position
+            if start is None and getattr(item, 'content', None):
+                start, end = locate_span(previous_text, item.content, 0, len(previous_text))
+            if start is None:
+                return None
+            
+            span = diff.remap(start, end)
+            if span is None or any(span[0] < section_end and section_start < span[1] for section_start, section_end in sections):
+                stale.append(item)
+            else:
+                carried.append((item, span[0], span[1]))
+        
+        return {'carried': carried, 'stale': stale}
+    
+    @staticmethod
+    def _apply_carry_over(model, plan, extracted=None):
+        """
+        Remove re-extracted results and move carried-over ones to their new offsets.
+        
+        Args:
+            model: The Clause or Obligation model
+            plan (dict): The 'carried' and 'stale' lists from _carry_over
+            extracted (ExtractedText, optional): The new text, to move clauses
+                to their new pages too. Defaults to None.
+        """
+        for item in plan['stale']:
+            db.session.delete(item)
+        
+        rows = []
+        for item, start, end in plan['carried']:
+            row = {'id': item.id, 'start_position': start, 'end_position': end}
+            if extracted:
+                row['page_number'] = extracted.page_for_offset(start)
+            if any(getattr(item, key) != value for key, value in row.items()):
+                rows.append(row)
+        
+        if rows:
+            db.session.execute(update(model), rows)
+    
+    @staticmethod
+    def estimate_analysis(document):
+        """
+        Estimate the tokens and cost of analyzing a document before running it.
+        
+        Prompts are rendered exactly as the analysis would send them, so the
+        estimate covers the template overhead and budget truncation. Output
+        tokens are the response limits, so the cost is an upper bound.
+        
+        Args:
+            document (Document): The document
+            
+        Returns:
+            dict: The estimate, or None if the document text could not be extracted
+        """
+        extracted = TextService.get_document_text(document)
+        
+        if not extracted or not extracted.text:
+            current_app.logger.error(f"Failed to extract text from document: {document.id}")
+            return None
+        
+        text = extracted.text
+        model = AIService._model()
+        
+        prompts = []
+        for chunk in AIService._clause_chunks(text):
+            budget = AIService._text_budget(AIService._clauses_prompt, CLAUSE_MAX_TOKENS)
+            prompts.append((AIService._clauses_prompt(truncate_to_tokens(chunk['text'], budget, model)), CLAUSE_MAX_TOKENS))
+        
+        for build_prompt, max_tokens in [
+            (AIService._summary_prompt, SUMMARY_MAX_TOKENS),
+            (AIService._obligations_prompt, OBLIGATION_MAX_TOKENS)
+        ]:
+            budget = AIService._text_budget(build_prompt, max_tokens)
+            prompts.append((build_prompt(truncate_to_tokens(text, budget, model)), max_tokens))
+        
+        input_tokens = sum(count_message_tokens(AIService._build_messages(prompt), model) for prompt, _ in prompts)
+        output_tokens = sum(max_tokens for _, max_tokens in prompts)
+        
+        return {
+            'model': model,
+            'document_tokens': count_tokens(text, model),
+            'requests': len(prompts),
+            'input_tokens': input_tokens,
+            'max_output_tokens': output_tokens,
+            'estimated_cost': estimate_cost(input_tokens, output_tokens, model)
+        }
+    
     @staticmethod
     def extract_clauses(text, document_id):
         """
         Extract clauses from document text.
         
+        The text is split into overlapping, section-aligned chunks that are sent
+        to the model in parallel, so contracts of any length are analyzed in full.
+        The per-chunk results are merged and de-duplicated by character offset.
+        
         Args:
             text (str): The document text
             document_id (int): The document ID
             
         Returns:
-            list: List of extracted clauses
+            list: List of extracted clause IDs
         """
-        AIService.init_openai()
+        try:
+            clauses_data = AIService._collect_clauses(text)
+            category_ids = AIService._get_category_ids(clauses_data)
+            clause_ids = AIService._save_clauses(clauses_data, document_id, category_ids)
+            db.session.commit()
+            return clause_ids
         
-        # Truncate text if too long
-        max_length = 8000  # Adjust based on token limits
-        if len(text) > max_length:
-            text = text[:max_length]
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error extracting clauses: {str(e)}")
+            return []
+    
+    @staticmethod
+    def _collect_clauses(text, organization_id=None, regions=None):
+        """
+        Extract clause data from the document without saving it.
         
-        try:
-            # Define common clause categories
-            categories = [
-                "Termination",
-                "Liability",
-                "Confidentiality",
-                "Intellectual Property",
-                "Payment",
-                "Indemnification",
-                "Force Majeure",
-                "Governing Law",
-                "Dispute Resolution",
-                "Assignment",
-                "Amendment",
-                "Entire Agreement",
-                "Severability",
-                "Notices",
-                "Waiver",
-                "Counterparts",
-                "Term",
-                "Representations and Warranties",
-                "Compliance with Laws",
-                "Insurance",
-                "Other"
-            ]
+        Args:
+            text (str): The document text
+            organization_id (int, optional): The organization ID. Defaults to None.
+            regions (list, optional): (start, end) offsets to read instead of the
+                whole document. Defaults to None.
             
-            # Create prompt for clause extraction
-            prompt = f"""
-            You are a legal AI assistant specialized in contract analysis. Extract clauses from the following contract text.
-            For each clause, identify:
-            1. The clause category (choose from: {', '.join(categories)})
-            2. The clause text
-            3. Any potential risks or issues with the clause
-            
-            Format your response as a JSON array of objects with the following structure:
-            [
-                {{
-                    "category": "Category name",
-                    "text": "Full clause text",
-                    "risk_level": "high/medium/low/none",
-                    "risk_description": "Description of any risks or issues"
-                }}
+        Returns:
+            list: Merged list of clause dicts with character offsets
+        """
+        chunks = AIService._clause_chunks(text, regions)
+        max_concurrency = current_app.config.get('AI_MAX_CONCURRENCY', 4)
+        if not chunks:
+            return []
+        
+        # Send chunks to the model in parallel; latency follows the slowest chunk
+        app = current_app._get_current_object()
+        max_workers = max(1, min(max_concurrency, len(chunks)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(copy_context().run, AIService._extract_chunk_clauses, app, text, chunk, organization_id)
+                for chunk in chunks
             ]
+            results = [future.result() for future in futures]
+        
+        return merge_spans([clause for result in results for clause in result])
+    
+    @staticmethod
+    def _clause_chunks(text, regions=None):
+        """
+        Split a document into chunks that fit the clause prompt's token budget.
+        
+        Args:
+            text (str): The document text
+            regions (list, optional): (start, end) offsets to split instead of the
+                whole document. Defaults to None.
             
-            Contract text:
-            {text}
-            """
-            
-            # Call OpenAI API
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a legal AI assistant specialized in contract analysis."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                max_tokens=2000
-            )
+        Returns:
+            list: List of chunk dicts with 'start', 'end' and 'text' keys
+        """
+        if not text:
+            return []
+        
+        chunk_tokens = min(
+            current_app.config.get('AI_CHUNK_TOKENS', 3000),
+            AIService._text_budget(AIService._clauses_prompt, CLAUSE_MAX_TOKENS)
+        )
+        overlap_tokens = current_app.config.get('AI_CHUNK_OVERLAP_TOKENS', 150)
+        
+        # Convert token sizes to characters using this document's own density,
+        # so dense text (numbers, tables) gets smaller chunks than plain prose
+        chars_per_token = len(text) / max(1, count_tokens(text, AIService._model()))
+        chunk_size = max(1, int(chunk_tokens * chars_per_token))
+        chunk_overlap = int(overlap_tokens * chars_per_token)
+        
+        if regions is None:
+            return split_into_chunks(text, chunk_size, chunk_overlap)
+        
+        chunks = []
+        for region_start, region_end in regions:
+            for chunk in split_into_chunks(text[region_start:region_end], chunk_size, chunk_overlap):
+                chunks.append({
+                    'start': region_start + chunk['start'],
+                    'end': region_start + chunk['end'],
+                    'text': chunk['text']
+                })
+        return chunks
+    
+    @staticmethod
+    def _get_category_ids(clauses_data):
+        """
+        Get the IDs of the categories of extracted clauses, creating new ones.
+        
+        Call this before the results are saved: new categories are committed
+        on a connection of their own.
+        
+        Args:
+            clauses_data (list): List of clause dicts
             
-            # Parse response
-            content = response.choices[0].message.content
-            
-            # Extract JSON from response
-            json_start = content.find('[')
-            json_end = content.rfind(']') + 1
-            
-            if json_start == -1 or json_end == 0:
-                current_app.logger.error("Failed to extract JSON from OpenAI response")
-                return []
-            
-            json_str = content[json_start:json_end]
-            clauses_data = json.loads(json_str)
-            
-            # Save clauses to database
-            saved_clauses = []
-            for clause_data in clauses_data:
-                # Get or create category
-                category = ClauseCategory.query.filter_by(name=clause_data['category']).first()
-                if not category:
-                    category = ClauseCategory(name=clause_data['category'])
-                    db.session.add(category)
-                    db.session.flush()
-                
-                # Create clause
-                clause = Clause(
-                    document_id=document_id,
-                    category_id=category.id,
-                    text=clause_data['text'],
-                    risk_level=clause_data['risk_level'],
-                    risk_description=clause_data['risk_description']
+        Returns:
+            dict: Category IDs keyed by category name
+        """
+        if not clauses_data:
+            return {}
+        
+        return ClauseCategoryCache.get_ids(clause_data['category'] for clause_data in clauses_data)
+    
+    @staticmethod
+    def _save_clauses(clauses_data, document_id, category_ids):
+        """
+        Insert extracted clauses in the current transaction.
+        
+        Clauses and their category mappings are inserted with one statement
+        per table, so the number of queries does not grow with the number of
+        clauses.
+        
+        Args:
+            clauses_data (list): List of clause dicts
+            document_id (int): The document ID
+            category_ids (dict): Category IDs keyed by category name, from _get_category_ids
+            
+        Returns:
+            list: List of inserted clause IDs
+        """
+        if not clauses_data:
+            return []
+        
+        clause_rows = [
+            {
+                'document_id': document_id,
+                'clause_type': ClauseCategoryCache.normalize(clause_data['category']),
+                'content': clause_data['text'],
+                'page_number': clause_data.get('page_number'),
+                'start_position': clause_data.get('start_position'),
+                'end_position': clause_data.get('end_position'),
+                'risk_level': (clause_data.get('risk_level') or '')[:20] or None,
+                'risk_explanation': clause_data.get('risk_description')
+            }
+            for clause_data in clauses_data
+        ]
+        
+        result = db.session.execute(
+            insert(Clause).returning(Clause.id, sort_by_parameter_order=True),
+            clause_rows
+        )
+        clause_ids = list(result.scalars())
+        
+        mapping_rows = [
+            {'clause_id': clause_id, 'category_id': category_ids[clause_data['category']]}
+            for clause_id, clause_data in zip(clause_ids, clauses_data)
+            if clause_data['category'] in category_ids
+        ]
+        if mapping_rows:
+            db.session.execute(insert(ClauseCategoryMapping), mapping_rows)
+        
+        return clause_ids
+    
+    @staticmethod
+    def _extract_chunk_clauses(app, text, chunk, organization_id=None):
+        """
+        Extract clauses from a single chunk and map them to document offsets.
+        
+        Runs in a worker thread, so it pushes its own application context. The
+        model's answer is checkpointed per chunk, so a retried run only asks
+        again for the chunks that had not been answered.
+        
+        Args:
+            app: The Flask application
+            text (str): The full document text
+            chunk (dict): The chunk with 'start', 'end' and 'text' keys
+            organization_id (int, optional): The organization ID. Defaults to None.
+            
+        Returns:
+            list: List of clause dicts with 'start_position' and 'end_position'
+        """
+        with app.app_context():
+            try:
+                clauses_data = AnalysisTracker.checkpointed(
+                    'clause_extraction', f"chunk:{chunk['start']}:{chunk['end']}",
+                    AIService._request_clauses, chunk['text'], organization_id
                 )
-                db.session.add(clause)
-                saved_clauses.append(clause)
+            except Exception as e:
+                # A missing chunk would silently drop its clauses, so fail the whole stage
+                app.logger.error(f"Error extracting clauses from chunk at offset {chunk['start']}: {str(e)}")
+                raise
+        
+        for clause_data in clauses_data:
+            start, end = locate_span(text, clause_data.get('text'), chunk['start'], chunk['end'])
+            clause_data['start_position'] = start
+            clause_data['end_position'] = end
+        
+        return clauses_data
+    
+    @staticmethod
+    def _request_clauses(text, organization_id=None):
+        """
+        Ask the model for the clauses in a piece of contract text.
+        
+        Args:
+            text (str): The contract text, small enough for a single request
+            organization_id (int, optional): The organization ID. Defaults to None.
             
-            db.session.commit()
-            return saved_clauses
+        Returns:
+            list: List of clause dicts as returned by the model
+        """
+        # Keep the chunk within the prompt's token budget
+        budget = AIService._text_budget(AIService._clauses_prompt, CLAUSE_MAX_TOKENS)
+        prompt = AIService._clauses_prompt(truncate_to_tokens(text, budget, AIService._model()))
         
-        except Exception as e:
-            current_app.logger.error(f"Error extracting clauses: {str(e)}")
-            return []
+        content = AIService._chat_completion(prompt, max_tokens=CLAUSE_MAX_TOKENS, organization_id=organization_id)
+        clauses_data = AIService._parse_json(content, '[', ']') or []
+        
+        return [
+            clause_data for clause_data in clauses_data
+            if clause_data.get('category') and clause_data.get('text')
+        ]
     
     @staticmethod
     def generate_summary(text, document_id):
@@ -196,80 +1064,65 @@ class AIService:
         Returns:
             DocumentSummary: The generated summary
         """
-        AIService.init_openai()
-        
-        # Truncate text if too long
-        max_length = 8000  # Adjust based on token limits
-        if len(text) > max_length:
-            text = text[:max_length]
-        
         try:
-            # Create prompt for summary generation
-            prompt = f"""
-            You are a legal AI assistant specialized in contract analysis. Generate a comprehensive summary of the following contract.
-            Include:
-            1. A brief overview of the contract purpose
-            2. Key parties involved
-            3. Main terms and conditions
-            4. Important dates and deadlines
-            5. Any notable provisions or unusual terms
-            
-            Format your response as a JSON object with the following structure:
-            {{
-                "overview": "Brief overview of the contract",
-                "parties": ["Party 1", "Party 2"],
-                "key_terms": ["Term 1", "Term 2"],
-                "important_dates": ["Date 1: Description", "Date 2: Description"],
-                "notable_provisions": ["Provision 1", "Provision 2"]
-            }}
-            
-            Contract text:
-            {text}
-            """
-            
-            # Call OpenAI API
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a legal AI assistant specialized in contract analysis."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                max_tokens=1000
-            )
-            
-            # Parse response
-            content = response.choices[0].message.content
-            
-            # Extract JSON from response
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
-            
-            if json_start == -1 or json_end == 0:
-                current_app.logger.error("Failed to extract JSON from OpenAI response")
+            summary_data = AIService._request_summary(text)
+            if not summary_data:
                 return None
             
-            json_str = content[json_start:json_end]
-            summary_data = json.loads(json_str)
-            
-            # Create summary
-            summary = DocumentSummary(
-                document_id=document_id,
-                overview=summary_data['overview'],
-                parties=summary_data['parties'],
-                key_terms=summary_data['key_terms'],
-                important_dates=summary_data['important_dates'],
-                notable_provisions=summary_data['notable_provisions']
-            )
-            db.session.add(summary)
+            summary = AIService._save_summary(summary_data, document_id)
             db.session.commit()
             
             return summary
         
         except Exception as e:
+            db.session.rollback()
             current_app.logger.error(f"Error generating summary: {str(e)}")
             return None
     
+    @staticmethod
+    def _request_summary(text, organization_id=None):
+        """
+        Ask the model for a structured summary of a contract.
+        
+        Args:
+            text (str): The document text
+            organization_id (int, optional): The organization ID. Defaults to None.
+            
+        Returns:
+            dict: The summary data, or None if the response could not be parsed
+        """
+        # Fill the prompt's token budget with as much of the contract as fits
+        budget = AIService._text_budget(AIService._summary_prompt, SUMMARY_MAX_TOKENS)
+        prompt = AIService._summary_prompt(truncate_to_tokens(text, budget, AIService._model()))
+        
+        content = AIService._chat_completion(prompt, max_tokens=SUMMARY_MAX_TOKENS, organization_id=organization_id)
+        return AIService._parse_json(content, '{', '}')
+    
+    @staticmethod
+    def _save_summary(summary_data, document_id):
+        """
+        Add or replace a document summary in the current session.
+        
+        Args:
+            summary_data (dict): The summary data
+            document_id (int): The document ID
+            
+        Returns:
+            DocumentSummary: The summary object
+        """
+        summary = DocumentSummary.query.filter_by(document_id=document_id).first()
+        if summary:
+            summary.summary_text = json.dumps(summary_data)
+            return summary
+        
+        summary = DocumentSummary(
+            document_id=document_id,
+            summary_text=json.dumps(summary_data)
+        )
+        db.session.add(summary)
+        
+        return summary
+    
     @staticmethod
     def extract_obligations(text, document_id):
         """
@@ -282,174 +1135,312 @@ class AIService:
         Returns:
             list: List of extracted obligations
         """
-        AIService.init_openai()
-        
-        # Truncate text if too long
-        max_length = 8000  # Adjust based on token limits
-        if len(text) > max_length:
-            text = text[:max_length]
-        
         try:
-            # Create prompt for obligation extraction
-            prompt = f"""
-            You are a legal AI assistant specialized in contract analysis. Extract key obligations and deadlines from the following contract text.
-            For each obligation, identify:
-            1. The party responsible
-            2. The obligation description
-            3. The deadline or timeframe (if any)
-            4. The consequence of non-compliance (if any)
-            
-            Format your response as a JSON array of objects with the following structure:
-            [
-                {{
-                    "party": "Party name",
-                    "description": "Obligation description",
-                    "deadline": "Deadline or timeframe (if any)",
-                    "consequence": "Consequence of non-compliance (if any)"
-                }}
-            ]
-            
-            Contract text:
-            {text}
-            """
-            
-            # Call OpenAI API
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a legal AI assistant specialized in contract analysis."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                max_tokens=1000
-            )
-            
-            # Parse response
-            content = response.choices[0].message.content
-            
-            # Extract JSON from response
-            json_start = content.find('[')
-            json_end = content.rfind(']') + 1
-            
-            if json_start == -1 or json_end == 0:
-                current_app.logger.error("Failed to extract JSON from OpenAI response")
-                return []
-            
-            json_str = content[json_start:json_end]
-            obligations_data = json.loads(json_str)
-            
-            # Save obligations to database
-            saved_obligations = []
-            for obligation_data in obligations_data:
-                obligation = Obligation(
-                    document_id=document_id,
-                    party=obligation_data['party'],
-                    description=obligation_data['description'],
-                    deadline=obligation_data['deadline'],
-                    consequence=obligation_data['consequence']
-                )
-                db.session.add(obligation)
-                saved_obligations.append(obligation)
-            
+            obligations_data = AIService._collect_obligations(text)
+            saved_obligations = AIService._save_obligations(obligations_data, document_id)
             db.session.commit()
+            
             return saved_obligations
         
         except Exception as e:
+            db.session.rollback()
             current_app.logger.error(f"Error extracting obligations: {str(e)}")
             return []
     
     @staticmethod
-    def search_document(document_id, query):
+    def _collect_obligations(text, organization_id=None, regions=None):
+        """
+        Extract obligation data from the document without saving it.
+        
+        The whole document is read in one request. When only some regions are
+        read, they are packed into as few requests as fit the token budget.
+        
+        Args:
+            text (str): The document text
+            organization_id (int, optional): The organization ID. Defaults to None.
+            regions (list, optional): (start, end) offsets to read instead of the
+                whole document. Defaults to None.
+            
+        Returns:
+            list: List of obligation dicts with character offsets
+        """
+        if regions is None:
+            groups = [[(0, len(text))]]
+        else:
+            model = AIService._model()
+            budget = AIService._text_budget(AIService._obligations_prompt, OBLIGATION_MAX_TOKENS)
+            
+            groups = []
+            used = 0
+            for region in regions:
+                tokens = count_tokens(text[region[0]:region[1]], model) + PASSAGE_SEPARATOR_TOKENS
+                if groups and used + tokens <= budget:
+                    groups[-1].append(region)
+                    used += tokens
+                else:
+                    groups.append([region])
+                    used = tokens
+        
+        obligations_data = []
+        for group in groups:
+            group_data = AnalysisTracker.checkpointed(
+                'obligations', f"group:{group[0][0]}:{group[-1][1]}",
+                AIService._request_obligations,
+                PASSAGE_SEPARATOR.join(text[start:end] for start, end in group),
+                organization_id
+            )
+            
+            for obligation_data in group_data:
+                obligation_data['start_position'] = obligation_data['end_position'] = None
+                for start, end in group:
+                    located = locate_span(text, obligation_data.get('text'), start, end)
+                    if located[0] is not None:
+                        obligation_data['start_position'], obligation_data['end_position'] = located
+                        break
+            
+            obligations_data.extend(group_data)
+        
+        return obligations_data
+    
+    @staticmethod
+    def _request_obligations(text, organization_id=None):
+        """
+        Ask the model for the obligations in a contract.
+        
+        Args:
+            text (str): The document text
+            organization_id (int, optional): The organization ID. Defaults to None.
+            
+        Returns:
+            list: List of obligation dicts as returned by the model
+        """
+        # Fill the prompt's token budget with as much of the contract as fits
+        budget = AIService._text_budget(AIService._obligations_prompt, OBLIGATION_MAX_TOKENS)
+        prompt = AIService._obligations_prompt(truncate_to_tokens(text, budget, AIService._model()))
+        
+        content = AIService._chat_completion(prompt, max_tokens=OBLIGATION_MAX_TOKENS, organization_id=organization_id)
+        return AIService._parse_json(content, '[', ']') or []
+    
+    @staticmethod
+    def _save_obligations(obligations_data, document_id, previous_statuses=None):
+        """
+        Add extracted obligations to the current session.
+        
+        Args:
+            obligations_data (list): List of obligation dicts
+            document_id (int): The document ID
+            previous_statuses (dict, optional): Statuses of the obligations these
+                replace, keyed by (title, description). An obligation extracted
+                again with the same title and text keeps its status. Defaults to None.
+            
+        Returns:
+            list: List of Obligation objects
+        """
+        saved_obligations = []
+        for obligation_data in obligations_data:
+            description = obligation_data.get('description') or ''
+            if obligation_data.get('consequence'):
+                description = f"{description}\nConsequence: {obligation_data['consequence']}"
+            
+            title = (obligation_data.get('party') or 'Unspecified party')[:255]
+            obligation = Obligation(
+                document_id=document_id,
+                title=title,
+                description=description,
+                due_date=AIService._parse_due_date(obligation_data.get('deadline')),
+                status=(previous_statuses or {}).get((title, description), 'pending'),
+                start_position=obligation_data.get('start_position'),
+                end_position=obligation_data.get('end_position')
+            )
+            db.session.add(obligation)
+            saved_obligations.append(obligation)
+        
+        return saved_obligations
+    
+    @staticmethod
+    def _parse_due_date(deadline):
+        """
+        Parse a deadline returned by the model into a date.
+        
+        Args:
+            deadline (str): The deadline text, e.g. "March 31, 2024" or "within 30 days"
+            
+        Returns:
+            date: The due date, or None for relative or missing deadlines
+        """
+        if not deadline:
+            return None
+        
+        try:
+            return date_parser.parse(deadline, fuzzy=False).date()
+        except (ValueError, OverflowError):
+            return None
+    
+    @staticmethod
+    def search_document(document_id, query, user_id=None):
         """
         Search a document for a specific query.
         
         Args:
             document_id (int): The document ID
             query (str): The search query
+            user_id (int, optional): The user making the query. Defaults to None.
             
         Returns:
             dict: Search results
+            
+        Raises:
+            RateLimitTimeout: If the model's rate limits leave no capacity in time
         """
-        AIService.init_openai()
-        
         # Get document
         document = Document.query.get(document_id)
         if not document:
             current_app.logger.error(f"Document not found: {document_id}")
             return None
         
-        # Get document content
         try:
-            # Get file processor based on document type
-            processor = FileProcessor.get_processor(document.file_type)
-            
-            # Extract text from document
-            text = processor.extract_text(document.file_path)
-            
-            if not text:
-                current_app.logger.error(f"Failed to extract text from document: {document_id}")
+            prompt = AIService._build_search_prompt(document, query)
+            if not prompt:
                 return None
             
-            # Truncate text if too long
-            max_length = 8000  # Adjust based on token limits
-            if len(text) > max_length:
-                text = text[:max_length]
-            
-            # Create prompt for search
-            prompt = f"""
-            You are a legal AI assistant specialized in contract analysis. Search the following contract for information related to this query: "{query}"
-            
-            Return your response as a JSON object with the following structure:
-            {{
-                "answer": "Direct answer to the query",
-                "context": "Relevant clause or section from the contract",
-                "explanation": "Brief explanation of the answer"
-            }}
+            content = AIService._chat_completion(prompt, max_tokens=SEARCH_MAX_TOKENS, organization_id=document.organization_id, lane=INTERACTIVE)
+            search_result = AIService._parse_json(content, '{', '}')
+            if not search_result:
+                return None
             
-            If the query cannot be answered based on the contract, indicate that in your answer.
-            
-            Contract text:
-            {text}
-            """
-            
-            # Call OpenAI API
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a legal AI assistant specialized in contract analysis."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                max_tokens=500
-            )
+            AIService._save_search_query(document_id, user_id, query, search_result)
+            db.session.commit()
             
-            # Parse response
-            content = response.choices[0].message.content
+            return search_result
+        
+        except RateLimitTimeout:
+            db.session.rollback()
+            raise
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error searching document: {str(e)}")
+            return None
+    
+    @staticmethod
+    def search_document_stream(document_id, query, user_id=None):
+        """
+        Search a document, streaming the answer as the model generates it.
+        
+        The answer, context and explanation fields are parsed out of the
+        streamed JSON incrementally and yielded as 'token' events; the complete
+        result is saved and yielded as a final 'result' event.
+        
+        Args:
+            document_id (int): The document ID
+            query (str): The search query
+            user_id (int, optional): The user making the query. Defaults to None.
             
-            # Extract JSON from response
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
+        Yields:
+            tuple: (event, data) pairs; event is 'token', 'result' or 'error'
+        """
+        # Get document
+        document = Document.query.get(document_id)
+        if not document:
+            current_app.logger.error(f"Document not found: {document_id}")
+            yield 'error', {'error': 'Document not found'}
+            return
+        
+        try:
+            prompt = AIService._build_search_prompt(document, query)
+            if not prompt:
+                yield 'error', {'error': 'Failed to extract document text'}
+                return
             
-            if json_start == -1 or json_end == 0:
-                current_app.logger.error("Failed to extract JSON from OpenAI response")
-                return None
+            parser = JSONFieldStreamParser(SEARCH_RESULT_FIELDS)
+            parts = []
+            for fragment in AIService._stream_chat_completion(prompt, max_tokens=SEARCH_MAX_TOKENS, organization_id=document.organization_id):
+                parts.append(fragment)
+                for field, text in parser.feed(fragment):
+                    yield 'token', {'field': field, 'text': text}
             
-            json_str = content[json_start:json_end]
-            search_result = json.loads(json_str)
+            search_result = AIService._parse_json(''.join(parts), '{', '}')
+            if not search_result:
+                yield 'error', {'error': 'Failed to search document'}
+                return
             
-            # Save search query to database
-            from src.models.search_query import SearchQuery
-            search_query = SearchQuery(
-                document_id=document_id,
-                query=query,
-                result=search_result
-            )
-            db.session.add(search_query)
+            AIService._save_search_query(document_id, user_id, query, search_result)
             db.session.commit()
             
-            return search_result
+            yield 'result', search_result
         
+        except RateLimitTimeout as e:
+            db.session.rollback()
+            yield 'error', {'error': 'Model rate limit reached, try again later', 'retry_after': e.retry_after}
         except Exception as e:
+            db.session.rollback()
             current_app.logger.error(f"Error searching document: {str(e)}")
+            yield 'error', {'error': 'Failed to search document'}
+    
+    @staticmethod
+    def _build_search_prompt(document, query):
+        """
+        Build the search prompt from the passages most relevant to a query.
+        
+        Args:
+            document (Document): The document
+            query (str): The search query
+            
+        Returns:
+            str: The prompt, or None if the document text could not be extracted
+        """
+        # Get the stored extracted text, extracting it on first use
+        extracted = TextService.get_document_text(document)
+        
+        if not extracted or not extracted.text:
+            current_app.logger.error(f"Failed to extract text from document: {document.id}")
             return None
-
+        
+        # Send the most relevant passages, best first, while they fit the token budget
+        model = AIService._model()
+        budget = AIService._text_budget(lambda text: AIService._search_prompt(query, text), SEARCH_MAX_TOKENS)
+        top_k = current_app.config.get('SEARCH_TOP_K', 5)
+        
+        passages = []
+        used = 0
+        for passage in sorted(extracted.search_passages(query, top_k=top_k), key=lambda passage: -passage['score']):
+            tokens = count_tokens(passage['text'], model) + PASSAGE_SEPARATOR_TOKENS
+            if passages and used + tokens > budget:
+                break
+            passages.append(passage)
+            used += tokens
+        passages.sort(key=lambda passage: passage['start'])
+        
+        if passages:
+            text = PASSAGE_SEPARATOR.join(passage['text'].strip() for passage in passages)
+        else:
+            # Nothing matched the query terms; fall back to the opening of the contract
+            text = extracted.text
+        
+        return AIService._search_prompt(query, truncate_to_tokens(text, budget, model))
+    
+    @staticmethod
+    def _save_search_query(document_id, user_id, query, search_result):
+        """
+        Add a search query and its result to the current session.
+        
+        Args:
+            document_id (int): The document ID
+            user_id (int): The user ID
+            query (str): The search query
+            search_result (dict): The search result
+            
+        Returns:
+            SearchQuery: The search query, or None if there is no user to record it for
+        """
+        if not user_id:
+            return None
+        
+        search_query = SearchQuery(
+            user_id=user_id,
+            query_text=query,
+            document_id=document_id,
+            result=search_result
+        )
+        db.session.add(search_query)
+        
+        return search_query
@@ -0,0 +1,424 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from src.models import db
+from src.models.analysis_run import AnalysisRun, AnalysisStage, AnalysisCheckpoint
+from src.models.document import Document
+from src.services.event_bus import get_event_bus
+
+# Run and stage the current thread is working on; copied into worker threads
+_current_run = ContextVar('analysis_run', default=None)
+_current_stage = ContextVar('analysis_stage', default=None)
+# (organization_id, document_id) of the current run, for the events it publishes
+_current_document = ContextVar('analysis_document', default=None)
+
+
+class AnalysisTracker:
+    """
+    Records the progress of analysis runs stage by stage.
+
+    Stage rows are written in their own short transactions, outside the
+    session holding the analysis results, so the status endpoint sees a
+    stage start, finish or fail while the analysis is still running. Code
+    outside a run (search, ad-hoc extraction) is not recorded. Each change
+    is also published to the organization's event stream.
+
+    Model output is checkpointed the same way, so a run retried after a
+    failure or a worker crash resumes from the first incomplete stage
+    without repeating a model request that already succeeded.
+    """
+
+    @staticmethod
+    def create_run(document, version=None, priority='normal'):
+        """
+        Create a queued run with a pending row per stage.
+
+        A failed run of the same version that still has attempts left is
+        queued again instead, so the retry resumes from its checkpoints.
+
+        Args:
+            document (Document): The document to analyze
+            version (DocumentVersion, optional): The version being analyzed. Defaults to None.
+            priority (str, optional): The scheduler class of the run. Defaults to 'normal'.
+
+        Returns:
+            AnalysisRun: The committed run
+        """
+        version_id = version.id if version else None
+        run = AnalysisTracker.get_latest_run(document.id)
+        if (run is not None and run.status == 'failed' and run.document_version_id == version_id
+                and run.attempts < current_app.config.get('ANALYSIS_MAX_ATTEMPTS', 3)):
+            run.status = 'queued'
+            run.priority = priority
+        else:
+            run = AnalysisRun(
+                document_id=document.id,
+                document_version_id=version_id,
+                priority=priority
+            )
+            db.session.add(run)
+        db.session.commit()
+        return run
+
+    @staticmethod
+    def get_latest_run(document_id):
+        """Get the most recent run of a document."""
+        return AnalysisRun.query.filter_by(
+            document_id=document_id
+        ).order_by(AnalysisRun.id.desc()).first()
+
+    @staticmethod
+    def start_run(run_id):
+        """
+        Mark a run as running and make it the current thread's run.
+
+        Stages an earlier attempt completed keep their timings and usage; the
+        others are reset, so a retried run shows the attempt in progress.
+
+        Args:
+            run_id (int): The run ID
+        """
+        now = datetime.utcnow()
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(AnalysisRun)
+                .where(AnalysisRun.id == run_id)
+                .values(
+                    status='running',
+                    attempts=AnalysisRun.attempts + 1,
+                    started_at=now,
+                    finished_at=None,
+                    lease_expires_at=AnalysisTracker._lease_deadline(now),
+                    error=None
+                )
+            )
+            connection.execute(
+                update(AnalysisStage)
+                .where(AnalysisStage.run_id == run_id, AnalysisStage.status != 'completed')
+                .values(
+                    status='pending',
+                    started_at=None,
+                    finished_at=None,
+                    model_requests=0,
+                    cached_requests=0,
+                    prompt_tokens=0,
+                    completion_tokens=0,
+                    error=None
+                )
+            )
+
+        _current_run.set(run_id)
+        target = db.session.execute(
+            select(Document.organization_id, Document.id)
+            .join(AnalysisRun, AnalysisRun.document_id == Document.id)
+            .where(AnalysisRun.id == run_id)
+        ).first()
+        _current_document.set(tuple(target) if target else None)
+        AnalysisTracker._publish('analysis_run', run_id=run_id, status='running')
+
+    @staticmethod
+    def finish_run(run_id, success, error=None):
+        """
+        Record the outcome of a run.
+
+        Stages that never started are marked skipped; a stage still running
+        when the run fails is marked failed with the run's error. The
+        checkpoints of a successful run are no longer needed and are deleted;
+        those of a failed run are kept for its retry.
+
+        Args:
+            run_id (int): The run ID
+            success (bool): Whether the analysis succeeded
+            error (str, optional): The error message. Defaults to None.
+        """
+        now = datetime.utcnow()
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    update(AnalysisRun)
+                    .where(AnalysisRun.id == run_id)
+                    .values(
+                        status='completed' if success else 'failed',
+                        finished_at=now,
+                        lease_expires_at=None,
+                        error=None if success else (error or 'Analysis failed')
+                    )
+                )
+                if success:
+                    connection.execute(
+                        delete(AnalysisCheckpoint).where(AnalysisCheckpoint.run_id == run_id)
+                    )
+                connection.execute(
+                    update(AnalysisStage)
+                    .where(AnalysisStage.run_id == run_id, AnalysisStage.status == 'pending')
+                    .values(status='skipped')
+                )
+                connection.execute(
+                    update(AnalysisStage)
+                    .where(AnalysisStage.run_id == run_id, AnalysisStage.status == 'running')
+                    .values(status='failed', finished_at=now, error=error)
+                )
+        except Exception as e:
+            current_app.logger.error(f"Error recording analysis run {run_id}: {str(e)}")
+        finally:
+            if _current_run.get() == run_id:
+                AnalysisTracker._publish('analysis_run', run_id=run_id, status='completed' if success else 'failed')
+                _current_run.set(None)
+                _current_document.set(None)
+
+    @staticmethod
+    @contextmanager
+    def stage(name):
+        """
+        Time a stage of the current run.
+
+        Entering a stage that already ran in this attempt (e.g. text extracted
+        for both the current and the previous version) keeps its first start.
+        A stage an earlier attempt completed keeps its recorded timings.
+
+        Args:
+            name (str): The stage name, one of ANALYSIS_STAGES
+        """
+        run_id = _current_run.get()
+        if run_id is None:
+            yield
+            return
+
+        if AnalysisTracker.stage_completed(name):
+            token = _current_stage.set(name)
+            try:
+                yield
+            finally:
+                _current_stage.reset(token)
+            return
+
+        AnalysisTracker._update_stage(
+            run_id, name,
+            status='running',
+            started_at=func.coalesce(AnalysisStage.started_at, datetime.utcnow()),
+            finished_at=None
+        )
+        AnalysisTracker.renew_lease()
+        AnalysisTracker._publish('analysis_stage', run_id=run_id, stage=name, status='running')
+        token = _current_stage.set(name)
+        try:
+            yield
+        except Exception as e:
+            AnalysisTracker._update_stage(run_id, name, status='failed', finished_at=datetime.utcnow(), error=str(e))
+            AnalysisTracker._publish('analysis_stage', run_id=run_id, stage=name, status='failed')
+            raise
+        finally:
+            _current_stage.reset(token)
+
+        AnalysisTracker._update_stage(run_id, name, status='completed', finished_at=datetime.utcnow())
+        AnalysisTracker._publish('analysis_stage', run_id=run_id, stage=name, status='completed')
+
+    @staticmethod
+    def record_usage(prompt_tokens, completion_tokens, cached=False):
+        """
+        Add a model request to the current stage.
+
+        Args:
+            prompt_tokens (int): Prompt tokens the API counted
+            completion_tokens (int): Completion tokens the API counted
+            cached (bool, optional): Whether the response came from the LLM cache,
+                in which case no tokens were spent. Defaults to False.
+        """
+        run_id = _current_run.get()
+        name = _current_stage.get()
+        if run_id is None or name is None:
+            return
+
+        if cached:
+            values = {'cached_requests': AnalysisStage.cached_requests + 1}
+        else:
+            values = {
+                'model_requests': AnalysisStage.model_requests + 1,
+                'prompt_tokens': AnalysisStage.prompt_tokens + (prompt_tokens or 0),
+                'completion_tokens': AnalysisStage.completion_tokens + (completion_tokens or 0)
+            }
+        AnalysisTracker._update_stage(run_id, name, **values)
+
+    @staticmethod
+    def stage_completed(name):
+        """Whether an attempt of the current run already completed a stage."""
+        run_id = _current_run.get()
+        if run_id is None:
+            return False
+
+        status = db.session.execute(
+            select(AnalysisStage.status)
+            .where(AnalysisStage.run_id == run_id, AnalysisStage.name == name)
+        ).scalar()
+        return status == 'completed'
+
+    @staticmethod
+    def checkpointed(stage, key, compute, *args):
+        """
+        Call ``compute`` once per run for a stage and key.
+
+        The result is stored in the run's checkpoints as soon as it is
+        returned, and a retry of the run loads it instead of calling
+        ``compute`` again. Outside a run ``compute`` is simply called.
+
+        Args:
+            stage (str): The stage the work belongs to
+            key (str): Identifies the work within the stage, e.g. the text span sent to the model
+            compute (callable): Produces a JSON-serializable result
+            *args: Arguments for ``compute``
+
+        Returns:
+            The stored or freshly computed result
+        """
+        run_id = _current_run.get()
+        if run_id is None:
+            return compute(*args)
+
+        with db.engine.connect() as connection:
+            row = connection.execute(
+                select(AnalysisCheckpoint.data)
+                .where(
+                    AnalysisCheckpoint.run_id == run_id,
+                    AnalysisCheckpoint.stage == stage,
+                    AnalysisCheckpoint.key == key
+                )
+            ).first()
+        if row is not None:
+            return row.data
+
+        result = compute(*args)
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    insert(AnalysisCheckpoint)
+                    .values(run_id=run_id, stage=stage, key=key, data=result, created_at=datetime.utcnow())
+                )
+        except IntegrityError:
+            # Another worker holding an expired lease saved the same result first
+            pass
+        except Exception as e:
+            current_app.logger.warning(f"Error saving checkpoint {stage}:{key} of run {run_id}: {str(e)}")
+        AnalysisTracker.renew_lease()
+        return result
+
+    @staticmethod
+    def complete_persistence():
+        """
+        Mark the persistence stage completed within the caller's session.
+
+        Called in the transaction that saves the analysis results, so the
+        results and the stage commit together. A worker that finds the stage
+        already completed lost a race with another attempt of the run, whose
+        results are already saved, and must roll back.
+
+        Returns:
+            bool: Whether this attempt claimed the stage; True outside a run
+        """
+        run_id = _current_run.get()
+        if run_id is None:
+            return True
+
+        result = db.session.execute(
+            update(AnalysisStage)
+            .where(
+                AnalysisStage.run_id == run_id,
+                AnalysisStage.name == 'persistence',
+                AnalysisStage.status != 'completed'
+            )
+            .values(status='completed', finished_at=datetime.utcnow())
+        )
+        return result.rowcount > 0
+
+    @staticmethod
+    def renew_lease():
+        """Extend the lease of the current run; called as the run makes progress."""
+        run_id = _current_run.get()
+        if run_id is None:
+            return
+
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    update(AnalysisRun)
+                    .where(AnalysisRun.id == run_id, AnalysisRun.status == 'running')
+                    .values(lease_expires_at=AnalysisTracker._lease_deadline(datetime.utcnow()))
+                )
+        except Exception as e:
+            current_app.logger.warning(f"Error renewing lease of analysis run {run_id}: {str(e)}")
+
+    @staticmethod
+    def claim_expired_runs(now=None):
+        """
+        Take the running runs whose lease expired away from their workers.
+
+        Each run is moved back to queued with a conditional update, so when
+        several reapers race only one of them claims it.
+
+        Args:
+            now (datetime, optional): The current time. Defaults to None.
+
+        Returns:
+            list: (AnalysisRun, bool) - each claimed run and whether it has attempts left
+        """
+        now = now or datetime.utcnow()
+        max_attempts = current_app.config.get('ANALYSIS_MAX_ATTEMPTS', 3)
+        expired = AnalysisRun.query.filter(
+            AnalysisRun.status == 'running',
+            AnalysisRun.lease_expires_at < now
+        ).all()
+
+        claimed = []
+        for run in expired:
+            retry = run.attempts < max_attempts
+            with db.engine.begin() as connection:
+                result = connection.execute(
+                    update(AnalysisRun)
+                    .where(
+                        AnalysisRun.id == run.id,
+                        AnalysisRun.status == 'running',
+                        AnalysisRun.lease_expires_at < now
+                    )
+                    .values(status='queued' if retry else 'running', lease_expires_at=None)
+                )
+                if result.rowcount:
+                    connection.execute(
+                        update(AnalysisStage)
+                        .where(AnalysisStage.run_id == run.id, AnalysisStage.status == 'running')
+                        .values(status='failed', finished_at=now, error='Worker lease expired')
+                    )
+            if result.rowcount:
+                claimed.append((run, retry))
+
+        db.session.expire_all()
+        return claimed
+
+    @staticmethod
+    def _publish(event_name, **data):
+        """Publish an event of the current run to its organization."""
+        target = _current_document.get()
+        if target is None:
+            return
+
+        organization_id, document_id = target
+        get_event_bus().publish(organization_id, event_name, dict(data, document_id=document_id))
+
+    @staticmethod
+    def _lease_deadline(now):
+        """Get the lease expiry for a run that made progress at ``now``."""
+        return now + timedelta(seconds=current_app.config.get('ANALYSIS_LEASE_SECONDS', 900))
+
+    @staticmethod
+    def _update_stage(run_id, name, **values):
+        """Update a stage row in its own transaction; tracking never fails the analysis."""
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(
+                    update(AnalysisStage)
+                    .where(AnalysisStage.run_id == run_id, AnalysisStage.name == name)
+                    .values(**values)
+                )
+        except Exception as e:
+            current_app.logger.warning(f"Error recording analysis stage {name} of run {run_id}: {str(e)}")
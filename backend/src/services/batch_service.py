@@ -0,0 +1,309 @@
+import zipfile
+import posixpath
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import exists, func, insert
+from src.models import db
+from src.models.document import Document, DocumentVersion
+from src.models.document_batch import DocumentBatch
+from src.models.analysis_run import AnalysisRun
+from src.services.storage_service import StorageService
+from src.services.document_service import DocumentService
+from src.services.task_service import TaskService
+from src.services.scheduler import BULK
+from src.services.event_bus import publish_on_commit
+from src.utils.archive import scan_archive, entry_title, get_extension
+
+# Document statuses that mean the analysis has finished, one way or the other
+FINISHED_STATUSES = ('analyzed', 'error')
+
+class BatchService:
+    """Service for ingesting archives of documents, such as due diligence data rooms."""
+
+    @staticmethod
+    def ingest_archive(file, organization_id, user_id):
+        """
+        Store an uploaded ZIP archive and queue its members for ingestion.
+
+        Only the central directory is read in the request, to reject archives
+        without supported documents. The archive is then stored as it is and
+        unpacked by the task backend, so the upload returns as soon as the
+        archive is stored and the batch reports 'extracting' while it grows.
+
+        Args:
+            file: The uploaded archive; its stream must be seekable
+            organization_id (int): The organization ID
+            user_id (int): The user ID
+
+        Returns:
+            tuple: (DocumentBatch, str) - (batch, error_message)
+        """
+        try:
+            with zipfile.ZipFile(file.stream) as archive:
+                entries, skipped = BatchService._scan(archive)
+        except (zipfile.BadZipFile, OSError):
+            return None, "File is not a valid ZIP archive"
+
+        if not entries:
+            return None, "Archive contains no supported documents"
+
+        file.stream.seek(0)
+        try:
+            archive_path, _, _ = StorageService.save_stream(file.stream, file.filename or 'archive.zip', 'zip')
+        except Exception as e:
+            current_app.logger.error(f"Error saving archive: {str(e)}")
+            return None, f"Error saving file: {str(e)}"
+
+        batch = DocumentBatch(
+            organization_id=organization_id,
+            uploaded_by_user_id=user_id,
+            filename=(file.filename or 'archive.zip')[:255]
+        )
+        batch.archive_path = archive_path
+        batch.skipped_files = skipped
+        db.session.add(batch)
+        db.session.commit()
+
+        try:
+            TaskService.extract_batch_async(batch.id)
+        except Exception as e:
+            current_app.logger.error(f"Error queueing archive {batch.id}: {str(e)}")
+            BatchService._finish(batch, str(e))
+
+        return batch, None
+
+    @staticmethod
+    def extract_batch(batch_id):
+        """
+        Unpack a stored archive into documents and queue each for analysis.
+
+        Members are decompressed one at a time and streamed straight to
+        storage. Documents and their first versions are inserted in groups
+        of DATA_ROOM_COMMIT_SIZE, and each group is queued for analysis as
+        soon as it is committed, so workers start on the first contracts
+        while the rest of the archive is still being unpacked. The number of
+        members handled is committed with each group, so a worker that
+        restarts the task continues after the last committed group, first
+        queueing the documents of that group that never got a run.
+
+        Must be called inside an application context.
+
+        Args:
+            batch_id (int): The batch ID
+
+        Returns:
+            bool: True if the archive was unpacked, False otherwise
+        """
+        batch = db.session.get(DocumentBatch, batch_id)
+        if not batch or batch.status != 'extracting':
+            return False
+
+        commit_size = max(1, current_app.config.get('DATA_ROOM_COMMIT_SIZE', 25))
+        skipped = list(batch.skipped_files or [])
+        try:
+            with StorageService.open_source(batch.archive_path) as source:
+                if source is None:
+                    raise FileNotFoundError(f"Archive not found: {batch.archive_path}")
+
+                # A worker that died between committing a group and queueing it left its documents without a run
+                for document_id in BatchService._unqueued_documents(batch):
+                    TaskService.process_document_async(document_id, priority=BULK, enforce_capacity=False)
+
+                with zipfile.ZipFile(source) as archive:
+                    entries, _ = BatchService._scan(archive)
+                    for start in range(batch.processed_files, len(entries), commit_size):
+                        group = entries[start:start + commit_size]
+                        document_ids = BatchService._store_entries(archive, group, batch, skipped)
+
+                        for document_id in document_ids:
+                            TaskService.process_document_async(document_id, priority=BULK, enforce_capacity=False)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error ingesting archive {batch.id}: {str(e)}")
+            BatchService._finish(batch, str(e))
+            return False
+
+        BatchService._finish(batch)
+        return True
+
+    @staticmethod
+    def _unqueued_documents(batch):
+        """Get the IDs of the batch's queued documents that have no analysis run."""
+        if not batch.processed_files:
+            return []
+
+        rows = db.session.query(Document.id).filter(
+            Document.batch_id == batch.id,
+            Document.status == 'queued',
+            ~exists().where(AnalysisRun.document_id == Document.id)
+        ).order_by(Document.id)
+        return [row.id for row in rows]
+
+    @staticmethod
+    def _scan(archive):
+        """Sort archive members into documents to ingest and skipped entries."""
+        config = current_app.config
+        return scan_archive(
+            archive,
+            allowed_extensions=config.get('ALLOWED_EXTENSIONS', {'pdf', 'docx', 'txt'}),
+            max_file_size=config.get('DATA_ROOM_MAX_FILE_SIZE', 16 * 1024 * 1024),
+            max_files=config.get('DATA_ROOM_MAX_FILES', 1000)
+        )
+
+    @staticmethod
+    def _finish(batch, error=None):
+        """Mark a batch extracted or failed and delete its stored archive."""
+        batch.status = 'failed' if error else 'extracted'
+        batch.error = error
+        batch.extracted_at = datetime.utcnow()
+        archive_path, batch.archive_path = batch.archive_path, None
+        BatchService._publish_progress(batch)
+        db.session.commit()
+
+        if archive_path:
+            StorageService.delete_file(archive_path)
+
+    @staticmethod
+    def _publish_progress(batch):
+        """Report the batch's extraction progress to the organization once committed."""
+        publish_on_commit(db.session, batch.organization_id, 'batch_progress', {
+            'batch_id': batch.id,
+            'status': batch.status,
+            'total_files': batch.total_files,
+            'processed_files': batch.processed_files
+        })
+
+    @staticmethod
+    def _store_entries(archive, entries, batch, skipped):
+        """
+        Stream a group of archive members to storage and insert their documents.
+
+        The documents are committed together with the batch's count of
+        members handled and the entries skipped so far. If the group cannot
+        be committed, the files it stored are deleted again.
+
+        Args:
+            archive (zipfile.ZipFile): The open archive
+            entries (list): ZipInfo entries to store
+            batch (DocumentBatch): The batch the documents belong to
+            skipped (list): Skipped entries, appended to for members that fail
+
+        Returns:
+            list: IDs of the inserted documents
+        """
+        now = datetime.utcnow()
+        document_rows = []
+        content_hashes = []
+        shared_paths = {}
+        written = []
+        try:
+            for info in entries:
+                basename = posixpath.basename(info.filename)
+                file_type = get_extension(basename)
+
+                try:
+                    with archive.open(info) as stream:
+                        file_path, file_size, content_hash = StorageService.save_stream(stream, basename, file_type)
+                except (zipfile.BadZipFile, NotImplementedError, RuntimeError) as e:
+                    # Corrupt member or unsupported compression method
+                    skipped.append({'name': info.filename, 'reason': f"Could not read file: {str(e)}"})
+                    continue
+
+                # Copies of one file in the group or already stored by the organization share one blob
+                if content_hash in shared_paths:
+                    StorageService.delete_file(file_path)
+                    file_path = shared_paths[content_hash]
+                else:
+                    stored_path = file_path
+                    file_path = DocumentService.share_stored_file(batch.organization_id, content_hash, file_path)
+                    shared_paths[content_hash] = file_path
+                    if file_path == stored_path:
+                        written.append(file_path)
+
+                folder = posixpath.dirname(info.filename)
+                content_hashes.append(content_hash)
+                document_rows.append({
+                    'organization_id': batch.organization_id,
+                    'uploaded_by_user_id': batch.uploaded_by_user_id,
+                    'title': entry_title(info.filename),
+                    'description': f"{batch.filename}: {folder}" if folder else batch.filename,
+                    'file_path': file_path,
+                    'file_type': file_type,
+                    'file_size': file_size,
+                    'status': 'queued',
+                    'batch_id': batch.id,
+                    'created_at': now,
+                    'updated_at': now
+                })
+
+            batch.processed_files += len(entries)
+            # Reassign so the JSON column is written with the entries skipped on the way
+            batch.skipped_files = list(skipped)
+            if not document_rows:
+                BatchService._publish_progress(batch)
+                db.session.commit()
+                return []
+
+            result = db.session.execute(
+                insert(Document).returning(Document.id, sort_by_parameter_order=True),
+                document_rows
+            )
+            document_ids = list(result.scalars())
+
+            db.session.execute(insert(DocumentVersion), [
+                {
+                    'document_id': document_id,
+                    'version_number': 1,
+                    'file_path': row['file_path'],
+                    'content_hash': content_hash,
+                    'created_by_user_id': batch.uploaded_by_user_id,
+                    'created_at': now
+                }
+                for document_id, row, content_hash in zip(document_ids, document_rows, content_hashes)
+            ])
+
+            batch.total_files += len(document_ids)
+            # Core inserts are not seen by the flush hook that reports status changes
+            for document_id in document_ids:
+                publish_on_commit(db.session, batch.organization_id, 'document_status', {'document_id': document_id, 'status': 'queued'})
+            BatchService._publish_progress(batch)
+            db.session.commit()
+
+            return document_ids
+        except Exception:
+            # Nothing refers to the files of a group that was not committed
+            db.session.rollback()
+            for file_path in written:
+                StorageService.delete_file(file_path)
+            raise
+
+    @staticmethod
+    def get_progress(batch):
+        """
+        Get the aggregate analysis progress of a batch.
+
+        Args:
+            batch (DocumentBatch): The batch
+
+        Returns:
+            dict: Document counts by status, finished count and percentage
+        """
+        counts = dict(
+            db.session.query(Document.status, func.count(Document.id))
+            .filter(Document.batch_id == batch.id)
+            .group_by(Document.status)
+            .all()
+        )
+
+        total = sum(counts.values())
+        finished = sum(counts.get(status, 0) for status in FINISHED_STATUSES)
+
+        return {
+            'total': total,
+            'finished': finished,
+            'analyzed': counts.get('analyzed', 0),
+            'failed': counts.get('error', 0),
+            'by_status': counts,
+            'percent': round(100 * finished / total) if total else 0,
+            'complete': batch.status != 'extracting' and finished == total
+        }
@@ -0,0 +1,89 @@
+import threading
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from src.models import db
+from src.models.clause import ClauseCategory
+
+# Process-wide clause category name -> ID map, loaded on first use
+_category_ids = None
+_category_lock = threading.Lock()
+
+# Longest category name the clause_categories table holds
+NAME_LENGTH = ClauseCategory.__table__.c.name.type.length
+
+
+class ClauseCategoryCache:
+    """Process-wide cache of clause category IDs by name."""
+
+    @staticmethod
+    def normalize(name):
+        """
+        Get the stored form of a category name.
+
+        Args:
+            name (str): A category name from the model
+
+        Returns:
+            str: The name cut to the length of the name column
+        """
+        return (name or '')[:NAME_LENGTH]
+
+    @staticmethod
+    def get_ids(names):
+        """
+        Get category IDs for a set of names, creating missing categories.
+
+        Categories are loaded with one query per process. Unknown names are
+        inserted with one statement in their own transaction, so the cache
+        never holds IDs of rows that were rolled back with an analysis. That
+        transaction needs its own connection, so call this before the session
+        writes anything: on SQLite a second writer waits on the session's lock.
+
+        Args:
+            names (iterable): Category names, as returned by the model
+
+        Returns:
+            dict: Category IDs keyed by the names as given
+        """
+        global _category_ids
+
+        names = set(names)
+        stored = {name: ClauseCategoryCache.normalize(name) for name in names}
+
+        with _category_lock:
+            if _category_ids is None:
+                _category_ids = ClauseCategoryCache._load()
+
+            # A second pass covers names skipped when another process won a race
+            for _ in range(2):
+                missing = set(stored.values()) - _category_ids.keys()
+                if not missing:
+                    break
+
+                try:
+                    with db.engine.begin() as connection:
+                        connection.execute(
+                            insert(ClauseCategory),
+                            [{'name': name} for name in sorted(missing)]
+                        )
+                except IntegrityError:
+                    # Another process created some of them first
+                    pass
+                _category_ids = ClauseCategoryCache._load()
+
+            return {name: _category_ids[stored[name]] for name in names if stored[name] in _category_ids}
+
+    @staticmethod
+    def reset():
+        """Drop the cached map so it is reloaded on next use."""
+        global _category_ids
+
+        with _category_lock:
+            _category_ids = None
+
+    @staticmethod
+    def _load():
+        """Load all category IDs."""
+        with db.engine.connect() as connection:
+            rows = connection.execute(select(ClauseCategory.id, ClauseCategory.name))
+            return {name: category_id for category_id, name in rows}
@@ -42,11 +42,13 @@ class DocumentService:
         
         # Save file
         try:
-            file_path, file_size = StorageService.save_file(file, file_type)
+            file_path, file_size, content_hash = StorageService.save_file(file, file_type)
         except Exception as e:
             current_app.logger.error(f"Error saving file: {str(e)}")
             return None, f"Error saving file: {str(e)}"
         
+        file_path = DocumentService.share_stored_file(organization_id, content_hash, file_path)
+        
         # Create document
         document = Document(
             organization_id=organization_id,
@@ -68,7 +70,8 @@ class DocumentService:
             document_id=document.id,
             version_number=1,
             file_path=file_path,
-            created_by_user_id=user_id
+            created_by_user_id=user_id,
+            content_hash=content_hash
         )
         db.session.add(version)
         
@@ -80,6 +83,70 @@ class DocumentService:
         
         return document, None
     
+    @staticmethod
+    def share_stored_file(organization_id, content_hash, file_path):
+        """
+        Point a new upload at an identical file the organization already stored.
+        
+        The new copy is deleted and the existing file is shared by reference,
+        so the same contract uploaded many times is stored once. The version
+        row that refers to the existing file is locked until the caller
+        commits, so a concurrent delete of that version waits, and its
+        release_files then sees the new reference and keeps the file.
+        
+        Args:
+            organization_id (int): The organization ID
+            content_hash (str): SHA-256 of the new file
+            file_path (str): Path of the new copy
+            
+        Returns:
+            str: The path the new document version should use
+        """
+        if not content_hash:
+            return file_path
+        
+        existing = db.session.query(DocumentVersion.file_path).join(
+            Document, Document.id == DocumentVersion.document_id
+        ).filter(
+            Document.organization_id == organization_id,
+            DocumentVersion.content_hash == content_hash,
+            DocumentVersion.file_path != file_path
+        ).with_for_update(of=DocumentVersion).first()
+        if not existing:
+            return file_path
+        
+        StorageService.delete_file(file_path)
+        return existing.file_path
+    
+    @staticmethod
+    def release_files(file_paths):
+        """
+        Delete stored files that no document or version refers to anymore.
+        
+        Call after committing the deletion of the references. Each file is
+        checked again and deleted inside one transaction that locks any row
+        still referring to it. An upload that shares the file holds a lock
+        on such a row until it commits, so it is either seen here or finds
+        no row to share.
+        
+        Args:
+            file_paths (iterable): Paths of files that lost a reference
+        """
+        for file_path in file_paths:
+            if not file_path:
+                continue
+            
+            try:
+                referenced = DocumentVersion.query.filter_by(file_path=file_path).with_for_update().first() or \
+                    Document.query.filter_by(file_path=file_path).with_for_update().first()
+                if not referenced:
+                    StorageService.delete_file(file_path)
+            except Exception as e:
+                current_app.logger.error(f"Error deleting file {file_path}: {str(e)}")
+            finally:
+                # Release the locks before the next file
+                db.session.rollback()
+    
     @staticmethod
     def queue_document_for_processing(document_id):
         """
@@ -227,11 +294,13 @@ class DocumentService:
             
             # Save file
             try:
-                file_path, file_size = StorageService.save_file(file, file_type)
+                file_path, file_size, content_hash = StorageService.save_file(file, file_type)
             except Exception as e:
                 current_app.logger.error(f"Error saving file: {str(e)}")
                 return None, f"Error saving file: {str(e)}"
             
+            file_path = DocumentService.share_stored_file(document.organization_id, content_hash, file_path)
+            
             # Update document
             document.file_path = file_path
             document.file_type = file_type
@@ -246,7 +315,8 @@ class DocumentService:
                 document_id=document_id,
                 version_number=version_number,
                 file_path=file_path,
-                created_by_user_id=user_id
+                created_by_user_id=user_id,
+                content_hash=content_hash
             )
             db.session.add(version)
             
@@ -256,6 +326,28 @@ class DocumentService:
         # Commit changes
         db.session.commit()
         
+        # Re-analyze redlines of analyzed documents; only changed sections go to the model
+        if file and DocumentVersion.query.filter(
+            DocumentVersion.document_id == document_id,
+            DocumentVersion.analyzed_at.isnot(None)
+        ).first():
+            from src.services.task_service import TaskService
+            from src.services.worker_pool import QueueFullError
+            from src.services.scheduler import INTERACTIVE
+            previous_status = document.status
+            document.status = 'queued'
+            db.session.commit()
+            try:
+                # The user who uploaded the version is waiting for its redline
+                run = TaskService.process_document_async(document_id, priority=INTERACTIVE)
+            except QueueFullError:
+                current_app.logger.warning(f"Task queue full, re-analysis of document {document_id} not queued")
+                run = None
+            
+            if not run:
+                document.status = previous_status
+                db.session.commit()
+        
         return document, None
     
     @staticmethod
@@ -287,18 +379,16 @@ class DocumentService:
         if not org_user or not org_user.is_admin():
             return False, "Unauthorized access to delete this document"
         
-        # Delete document file
-        StorageService.delete_file(document.file_path)
-        
-        # Delete document versions
-        for version in document.versions:
-            if version.file_path != document.file_path:
-                StorageService.delete_file(version.file_path)
+        # Files shared with other documents are kept
+        file_paths = {document.file_path} | {version.file_path for version in document.versions}
         
         # Delete document from database
         db.session.delete(document)
         db.session.commit()
         
+        # Delete document files
+        DocumentService.release_files(file_paths)
+        
         return True, None
     
     @staticmethod
@@ -0,0 +1,314 @@
+import json
+import queue
+import threading
+from flask import current_app
+from sqlalchemy import event, inspect
+
+# Process-wide event bus, created from the app configuration on first use
+_event_bus = None
+_event_bus_lock = threading.Lock()
+
+
+class StreamLimitError(Exception):
+    """Raised when this process already serves as many event streams as it may."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Subscription:
+    """Events of one organization delivered to one client connection."""
+
+    def __init__(self, fanout, organization_id, max_size):
+        self._fanout = fanout
+        self.organization_id = organization_id
+        self._queue = queue.Queue(maxsize=max_size)
+
+    def put(self, message):
+        """Deliver an event; a client too slow to keep up misses it rather than growing the queue."""
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            pass
+
+    def get(self, timeout=None):
+        """
+        Wait for the next event.
+
+        Args:
+            timeout (float, optional): Seconds to wait. Defaults to None.
+
+        Returns:
+            dict: The event with 'event' and 'data' keys, or None on timeout
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """Stop receiving events."""
+        self._fanout.unsubscribe(self)
+
+
+class _Fanout:
+    """Delivers each event to the local subscriptions of its organization."""
+
+    def __init__(self, max_size=100, max_subscriptions=0):
+        self.max_size = max_size
+        self.max_subscriptions = max_subscriptions
+        self._subscriptions = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, organization_id):
+        """
+        Open a subscription to an organization's events.
+
+        Raises:
+            StreamLimitError: If max_subscriptions are open already
+        """
+        subscription = Subscription(self, organization_id, self.max_size)
+        with self._lock:
+            if self.max_subscriptions and self._count >= self.max_subscriptions:
+                raise StreamLimitError(f"{self._count} event streams are open")
+            self._subscriptions.setdefault(organization_id, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Close a subscription."""
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.organization_id)
+            if subscriptions and subscription in subscriptions:
+                subscriptions.discard(subscription)
+                self._count -= 1
+                if not subscriptions:
+                    del self._subscriptions[subscription.organization_id]
+
+    def deliver(self, organization_id, message):
+        """Hand an event to every local subscription of its organization."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(organization_id, ()))
+        for subscription in subscriptions:
+            subscription.put(message)
+
+    def count(self):
+        """Get the number of open subscriptions."""
+        with self._lock:
+            return self._count
+
+
+class MemoryEventBackend(_Fanout):
+    """Events delivered within this process, for the thread task backend and tests."""
+
+    def publish(self, organization_id, message):
+        """Publish an event to the organization's subscribers."""
+        self.deliver(organization_id, message)
+
+
+class RedisEventBackend(_Fanout):
+    """
+    Events published through Redis pub/sub, so workers reach every web process.
+
+    Each process holds one pattern subscription for all organizations, read
+    by a single background thread that hands events to the local clients. A
+    connected client costs a queue, not a Redis connection.
+    """
+
+    def __init__(self, url, prefix='events:', max_size=100, max_subscriptions=0):
+        import redis
+
+        super().__init__(max_size, max_subscriptions)
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, organization_id, message):
+        """Publish an event to the organization's channel."""
+        self.client.publish(f"{self.prefix}{organization_id}", json.dumps(message))
+
+    def subscribe(self, organization_id):
+        """Open a subscription, starting the listener thread on first use."""
+        self._ensure_listener()
+        return super().subscribe(organization_id)
+
+    def _ensure_listener(self):
+        """Start the thread reading the pattern subscription."""
+        with self._listener_lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            pubsub.psubscribe(**{f"{self.prefix}*": self._handle})
+            self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def _handle(self, message):
+        """Route a pub/sub message to the subscriptions of its organization."""
+        channel = message['channel'].decode('utf-8')
+        try:
+            organization_id = int(channel[len(self.prefix):])
+            self.deliver(organization_id, json.loads(message['data']))
+        except ValueError:
+            pass
+
+
+class EventBus:
+    """Publishes document and analysis events to the clients of an organization."""
+
+    def __init__(self, backend, retry_after=30):
+        self.backend = backend
+        self.retry_after = retry_after
+
+    def publish(self, organization_id, event_name, data):
+        """
+        Publish an event; failures are logged and never fail the caller.
+
+        Args:
+            organization_id (int): The organization whose clients receive the event
+            event_name (str): The SSE event name
+            data (dict): The JSON payload
+        """
+        try:
+            self.backend.publish(organization_id, {'event': event_name, 'data': data})
+        except Exception as e:
+            current_app.logger.warning(f"Could not publish {event_name} event: {str(e)}")
+
+    def subscribe(self, organization_id):
+        """
+        Open a subscription to an organization's events.
+
+        A process serves at most EVENTS_MAX_STREAMS streams. Under threaded
+        workers each stream holds a thread, so the cap keeps the others for
+        requests; the gevent workers of the events service allow hundreds.
+
+        Args:
+            organization_id (int): The organization ID
+
+        Returns:
+            Subscription: The subscription; close it when the stream ends
+
+        Raises:
+            StreamLimitError: If the process serves its maximum number of streams
+        """
+        try:
+            return self.backend.subscribe(organization_id)
+        except StreamLimitError as e:
+            e.retry_after = self.retry_after
+            raise
+
+    def stats(self):
+        """Get the number of clients connected to this process."""
+        return {
+            'subscriptions': self.backend.count(),
+            'max_subscriptions': self.backend.max_subscriptions
+        }
+
+
+def get_event_bus():
+    """
+    Get the process-wide event bus.
+
+    Events go through Redis (REDIS_URL) when the Celery workers run the
+    analyses in other processes, and stay in this process with the thread
+    backend. EVENTS_BACKEND overrides the choice with 'redis' or 'memory'.
+
+    Returns:
+        EventBus: The event bus
+    """
+    global _event_bus
+
+    if _event_bus is None:
+        with _event_bus_lock:
+            if _event_bus is None:
+                config = current_app.config
+                backend_type = config.get('EVENTS_BACKEND')
+                if not backend_type:
+                    uses_workers = (
+                        config.get('TASK_BACKEND', 'celery') == 'celery'
+                        and not config.get('CELERY_TASK_ALWAYS_EAGER')
+                    )
+                    backend_type = 'redis' if uses_workers else 'memory'
+
+                max_size = config.get('EVENTS_QUEUE_SIZE', 100)
+                max_streams = config.get('EVENTS_MAX_STREAMS', 16)
+                if backend_type == 'redis':
+                    backend = RedisEventBackend(
+                        config.get('REDIS_URL', 'redis://localhost:6379/0'),
+                        max_size=max_size,
+                        max_subscriptions=max_streams
+                    )
+                else:
+                    backend = MemoryEventBackend(max_size, max_streams)
+
+                _event_bus = EventBus(backend, retry_after=config.get('EVENTS_STREAM_RETRY_AFTER', 30))
+
+    return _event_bus
+
+
+def init_events(session):
+    """
+    Publish a document_status event whenever a committed change sets a document's status.
+
+    Hooks the session instead of each place that changes a status, so routes,
+    services and workers all report their changes. The hook only sees
+    changes to ORM objects; code that writes with Core insert() or update()
+    statements publishes with publish_on_commit. Calling it again for the
+    same session does nothing.
+
+    Args:
+        session: The scoped session to watch
+    """
+    if event.contains(session, 'after_commit', _publish_status_changes):
+        return
+
+    event.listen(session, 'after_flush', _collect_status_changes)
+    event.listen(session, 'after_commit', _publish_status_changes)
+    event.listen(session, 'after_soft_rollback', _discard_status_changes)
+
+
+def publish_on_commit(session, organization_id, event_name, data):
+    """
+    Publish an event once the session's current transaction commits.
+
+    For changes written with Core statements, which the flush hook does not
+    see. The event is dropped if the transaction rolls back.
+
+    Args:
+        session: The session the change is written with
+        organization_id (int): The organization whose clients receive the event
+        event_name (str): The SSE event name
+        data (dict): The JSON payload
+    """
+    session.info.setdefault('pending_events', []).append((organization_id, event_name, data))
+
+
+def _collect_status_changes(session, flush_context):
+    """Remember the documents whose status a flush wrote, until the transaction commits."""
+    from src.models.document import Document
+
+    changes = session.info.setdefault('document_status_changes', {})
+    for instance in list(session.new) + list(session.dirty):
+        if isinstance(instance, Document) and inspect(instance).attrs.status.history.has_changes():
+            changes[instance.id] = (instance.organization_id, instance.status)
+
+
+def _publish_status_changes(session):
+    """Publish the status changes and pending events of a committed transaction."""
+    changes = session.info.pop('document_status_changes', None)
+    pending = session.info.pop('pending_events', None)
+    if not changes and not pending:
+        return
+
+    bus = get_event_bus()
+    for document_id, (organization_id, status) in (changes or {}).items():
+        bus.publish(organization_id, 'document_status', {'document_id': document_id, 'status': status})
+    for organization_id, event_name, data in pending or ():
+        bus.publish(organization_id, event_name, data)
+
+
+def _discard_status_changes(session, previous_transaction):
+    """Forget the status changes and pending events of a rolled back transaction."""
+    session.info.pop('document_status_changes', None)
+    session.info.pop('pending_events', None)
@@ -0,0 +1,442 @@
+import os
+import shutil
+import time
+import signal
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from flask import Flask, current_app
+from src.services.storage_service import StorageService
+from src.utils.file_processors import FileProcessor, PDFProcessor, DocxProcessor
+from src.utils.ocr import split_pages, find_image_pages, render_pages, hash_page_image, recognize_images
+
+# Process-wide pool instance, created from the app configuration on first use
+_extraction_pool = None
+_extraction_pool_lock = threading.Lock()
+
+# Minimal application for the processors' logging and storage access inside pool processes
+_worker_app = None
+
+# Semaphore counting the CPUs no extraction step is using: shared by the
+# processes of a pool, or by the threads of a process extracting inline
+_idle_cpus = None
+
+# Configuration keys a pool process needs to read stored files, split large PDFs and OCR scanned pages
+WORKER_CONFIG_KEYS = (
+    'S3_REGION', 'AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'STORAGE_SPOOL_MAX_SIZE',
+    'PDF_RANGE_WORKERS', 'PDF_RANGE_MIN_PAGES',
+    'OCR_WORKERS', 'OCR_DPI', 'OCR_LANGUAGE', 'OCR_MIN_PAGE_CHARS', 'OCR_PAGE_TIMEOUT'
+)
+
+# Seconds the parent waits beyond the per-file timeout before recycling the pool
+TIMEOUT_GRACE = 10
+
+# Seconds between checks that the pool processes are alive while waiting for a step
+LIVENESS_INTERVAL = 1
+
+
+class ExtractionError(Exception):
+    """Raised when a file could not be extracted within its time or memory limit."""
+
+
+class _ExtractionTimeout(BaseException):
+    """
+    Raised inside a pool process when a file exceeds its time limit.
+
+    Not an Exception, so the processors' own error handling cannot swallow it.
+    """
+
+
+def _init_worker(memory_limit, config=None, idle_cpus=None):
+    """
+    Prepare a pool process: cap its address space and create a bare app for logging and configuration.
+
+    The limit is inherited by the pdftotext processes it starts, so one
+    malformed file cannot exhaust the host's memory. ``idle_cpus`` is the
+    pool's semaphore of idle CPUs.
+    """
+    global _worker_app, _idle_cpus
+
+    if memory_limit:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    _worker_app = Flask('extraction')
+    _worker_app.config.update(config or {})
+    _idle_cpus = idle_cpus
+
+
+def _get_idle_cpus():
+    """Get the idle CPU semaphore, creating one for the process when it is not a pool process."""
+    global _idle_cpus
+
+    if _idle_cpus is None:
+        with _extraction_pool_lock:
+            if _idle_cpus is None:
+                _idle_cpus = threading.BoundedSemaphore(os.cpu_count() or 1)
+    return _idle_cpus
+
+
+def _run_step(fn, args):
+    """
+    Run an extraction step on a CPU of its own.
+
+    The step takes its CPU from the idle ones so that other steps do not
+    run nested processes on it. When every CPU is taken, it runs anyway.
+    """
+    idle_cpus = _get_idle_cpus()
+    owned = idle_cpus.acquire(False)
+    try:
+        return fn(*args)
+    finally:
+        if owned:
+            idle_cpus.release()
+
+
+@contextmanager
+def nested_workers(config, key):
+    """
+    Reserve idle CPUs for the nested processes of one step: PDF page ranges or OCR pages.
+
+    A step runs one process on its own CPU. It also takes every CPU that no
+    other step is using, without waiting, up to ``key`` processes in all
+    (0 for no limit). The CPUs are returned when the block exits. A large
+    PDF on an idle machine therefore uses every core, and a busy pool runs
+    one process per step instead of multiplying them.
+
+    Args:
+        config: The application configuration
+        key (str): PDF_RANGE_WORKERS or OCR_WORKERS
+
+    Yields:
+        int: The number of processes the step may run at once
+    """
+    idle_cpus = _get_idle_cpus()
+    limit = config.get(key) or 0
+    taken = 0
+    try:
+        while (not limit or taken + 1 < limit) and idle_cpus.acquire(False):
+            taken += 1
+        yield taken + 1
+    finally:
+        for _ in range(taken):
+            idle_cpus.release()
+
+
+def _on_timeout(signum, frame):
+    raise _ExtractionTimeout()
+
+
+def _extract_in_worker(fn, args, timeout):
+    """
+    Run an extraction step in a pool process, interrupted after ``timeout`` seconds.
+
+    Args:
+        fn: The step, e.g. extract_file
+        args (tuple): Its arguments
+        timeout (int): Seconds allowed for the step; 0 for no limit
+
+    Returns:
+        The step's result
+    """
+    if timeout:
+        signal.signal(signal.SIGALRM, _on_timeout)
+        signal.alarm(timeout)
+    try:
+        with _worker_app.app_context():
+            return _run_step(fn, args)
+    except _ExtractionTimeout:
+        raise ExtractionError(f"Extraction took longer than {timeout} seconds")
+    except MemoryError:
+        raise ExtractionError("Extraction exceeded the memory limit")
+    finally:
+        if timeout:
+            signal.alarm(0)
+
+
+def extract_file(file_type, file_path, ocr_directory=None):
+    """
+    Extract a stored file's text, page offsets and, for DOCX, block offsets.
+
+    The process opens the file itself, streaming S3 objects, so only the
+    path crosses the process boundary. When ``ocr_directory`` is given and
+    some PDF pages have no text layer, the file is kept for
+    render_pdf_pages: a local file by its path, an S3 object by copying
+    the already downloaded stream into the directory.
+
+    Args:
+        file_type (str): The file type
+        file_path (str): The local path or S3 URL
+        ocr_directory (str, optional): Directory to keep a PDF with pages to OCR in. Defaults to None.
+
+    Returns:
+        tuple: (str, list, list, str) - (text, page start offsets, DOCX
+            paragraph and table-cell blocks or None, local path of the PDF to
+            OCR or None)
+    """
+    processor = FileProcessor.get_processor(file_type)
+    with StorageService.open_source(file_path) as source:
+        if source is None:
+            current_app.logger.error(f"File not found for extraction: {file_path}")
+            return "", [0], None, None
+        if processor is DocxProcessor:
+            return (*processor.extract_blocks(source), None)
+        if processor is PDFProcessor:
+            with nested_workers(current_app.config, 'PDF_RANGE_WORKERS') as workers:
+                text, page_offsets = processor.extract_paged_text(source, workers=workers)
+        else:
+            text, page_offsets = processor.extract_paged_text(source)
+
+        pages = split_pages(text, page_offsets)
+        if not ocr_directory or not find_image_pages(pages, current_app.config.get('OCR_MIN_PAGE_CHARS', 10)):
+            return text, page_offsets, None, None
+        if isinstance(source, str):
+            return text, page_offsets, None, source
+
+        # pdftoppm renders single pages from a file it can seek in
+        pdf_path = os.path.join(ocr_directory, 'source.pdf')
+        source.seek(0)
+        with open(pdf_path, 'wb') as f:
+            shutil.copyfileobj(source, f, 1024 * 1024)
+        return text, page_offsets, None, pdf_path
+
+
+def render_pdf_pages(pdf_path, page_numbers, directory):
+    """
+    Render PDF pages for OCR and hash each image with the OCR settings.
+
+    Args:
+        pdf_path (str): The local PDF path
+        page_numbers (list): 1-based numbers of the pages to render
+        directory (str): Directory for the images
+
+    Returns:
+        dict: (image path, page hash) by page number, for the pages that rendered
+
+    Raises:
+        OSError: If pdftoppm is not installed
+    """
+    config = current_app.config
+    dpi = config.get('OCR_DPI', 300)
+    with nested_workers(config, 'OCR_WORKERS') as workers:
+        images = render_pages(
+            pdf_path, page_numbers, directory,
+            dpi=dpi,
+            workers=workers,
+            timeout=config.get('OCR_PAGE_TIMEOUT', 120)
+        )
+    settings = f"{dpi}:{config.get('OCR_LANGUAGE', 'eng')}"
+    return {number: (image_path, hash_page_image(image_path, settings)) for number, image_path in images.items()}
+
+
+def recognize_pdf_pages(images, directory):
+    """
+    Recognize rendered PDF pages with tesseract.
+
+    Args:
+        images (dict): Image paths by page number
+        directory (str): Directory for the recognized text
+
+    Returns:
+        dict: Recognized text by page number, for the pages that succeeded
+
+    Raises:
+        OSError: If tesseract is not installed
+    """
+    config = current_app.config
+    with nested_workers(config, 'OCR_WORKERS') as workers:
+        return recognize_images(
+            images, directory,
+            language=config.get('OCR_LANGUAGE', 'eng'),
+            workers=workers,
+            timeout=config.get('OCR_PAGE_TIMEOUT', 120)
+        )
+
+
+class ExtractionPool:
+    """
+    Process pool for CPU-bound text extraction.
+
+    Parsing a large DOCX or PDF holds the GIL for seconds. Running it in
+    separate processes keeps the threads that wait on model calls
+    responsive, so extraction of one document overlaps the model calls of
+    another. Each step, extracting a file or rendering or recognizing its
+    scanned pages, runs under a time and memory limit; a process that
+    overruns is interrupted, or the pool is recycled if it cannot be.
+    """
+
+    def __init__(self, max_workers, timeout=120, memory_limit=None, config=None, cpus=None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.config = config or {}
+        self.cpus = cpus or os.cpu_count() or 1
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def run(self, fn, args, timeout=None):
+        """
+        Run an extraction step, e.g. extract_file, in a pool process.
+
+        When a process dies or the pool is recycled, every step in flight
+        fails, not only the one that caused it. A step that failed that way,
+        or that was handed a pool another step had just broken, runs again
+        in a process of its own. Only the step that broke the pool can break
+        that process, so no other step is lost to it twice.
+
+        Args:
+            fn: The step, a module-level function
+            args (tuple): Its arguments
+            timeout (int, optional): Seconds allowed for the step. Defaults to the pool's timeout.
+
+        Returns:
+            The step's result
+
+        Raises:
+            ExtractionError: If the step exceeded its time or memory limit
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_extract_in_worker, fn, args, timeout)
+        except (BrokenProcessPool, RuntimeError):
+            # Broken or shut down by another step since it was handed out
+            self._recycle(executor)
+            return self._run_alone(fn, args, timeout)
+
+        try:
+            return self._result(future, executor, timeout)
+        except (BrokenProcessPool, CancelledError):
+            # A process was killed, most likely by the memory limit, or another step's timeout recycled the pool
+            self._recycle(executor)
+        return self._run_alone(fn, args, timeout)
+
+    def _run_alone(self, fn, args, timeout):
+        """Run a step in a new single-process pool, killed when the step ends."""
+        executor = self._create_executor(1, cpus=1)
+        try:
+            return self._result(executor.submit(_extract_in_worker, fn, args, timeout), executor, timeout)
+        except (BrokenProcessPool, CancelledError):
+            raise ExtractionError("Extraction process died")
+        finally:
+            self._kill(executor)
+
+    def _result(self, future, executor, timeout):
+        """
+        Wait for a step, recycling the pool if the step hangs past its time limit.
+
+        The executor does not notice the death of a process it started
+        while it was already waiting, so the processes are checked too.
+        """
+        deadline = time.monotonic() + timeout + TIMEOUT_GRACE if timeout else None
+        while True:
+            try:
+                return future.result(timeout=LIVENESS_INTERVAL)
+            except FutureTimeoutError:
+                pass
+
+            if any(process.exitcode is not None for process in list((executor._processes or {}).values())):
+                raise BrokenProcessPool("A process in the extraction pool died")
+            if deadline is not None and time.monotonic() >= deadline:
+                # Stuck where the alarm cannot interrupt it, e.g. inside a C parser
+                self._recycle(executor)
+                raise ExtractionError(f"Extraction took longer than {timeout} seconds")
+
+    def _get_executor(self):
+        """Create the process pool on first use."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create_executor(self.max_workers, self.cpus)
+            return self._executor
+
+    def _create_executor(self, max_workers, cpus):
+        """Create a process pool whose processes share ``cpus`` idle CPUs."""
+        # Forking a threaded web or Celery process can copy held locks
+        context = multiprocessing.get_context('spawn')
+        # A new pool gets new CPUs, as killed processes cannot return theirs
+        idle_cpus = context.BoundedSemaphore(cpus)
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.memory_limit, self.config, idle_cpus)
+        )
+
+    def _recycle(self, executor):
+        """Kill the processes of a broken or hung pool and start a new one on next use."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        self._kill(executor)
+
+    @staticmethod
+    def _kill(executor):
+        """Kill a pool's processes, failing the steps they were running."""
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """Stop the pool processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def get_extraction_pool():
+    """
+    Get the process-wide extraction pool.
+
+    Returns:
+        ExtractionPool: The pool, sized by EXTRACTION_WORKERS (the CPU count
+            by default), or None when EXTRACTION_WORKERS is 0 and files are
+            extracted in the calling thread
+    """
+    global _extraction_pool
+
+    config = current_app.config
+    max_workers = config.get('EXTRACTION_WORKERS')
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers <= 0:
+        return None
+
+    if _extraction_pool is None:
+        with _extraction_pool_lock:
+            if _extraction_pool is None:
+                memory_limit_mb = config.get('EXTRACTION_MEMORY_LIMIT_MB', 1024)
+                _extraction_pool = ExtractionPool(
+                    max_workers=max_workers,
+                    timeout=config.get('EXTRACTION_TIMEOUT', 120),
+                    memory_limit=memory_limit_mb * 1024 * 1024 if memory_limit_mb else None,
+                    config={key: config.get(key) for key in WORKER_CONFIG_KEYS if config.get(key) is not None}
+                )
+
+    return _extraction_pool
+
+
+def run_extraction(fn, args, timeout=None):
+    """
+    Run an extraction step in the extraction pool, or in the calling thread when there is no pool.
+
+    Args:
+        fn: The step: extract_file, render_pdf_pages or recognize_pdf_pages
+        args (tuple): Its arguments
+        timeout (int, optional): Seconds allowed in the pool. Defaults to EXTRACTION_TIMEOUT.
+
+    Returns:
+        The step's result
+
+    Raises:
+        ExtractionError: If the step exceeded its time or memory limit
+    """
+    pool = get_extraction_pool()
+    if pool is None:
+        return _run_step(fn, args)
+    return pool.run(fn, args, timeout)
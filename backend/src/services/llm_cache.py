@@ -0,0 +1,280 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from flask import current_app
+
+# Process-wide cache instance, created from the app configuration on first use
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def make_cache_key(model, messages, temperature, max_tokens):
+    """
+    Build a content-addressed key for a chat completion request.
+
+    Args:
+        model (str): The model name
+        messages (list): The chat messages
+        temperature (float): The sampling temperature
+        max_tokens (int): The response token limit
+
+    Returns:
+        str: The SHA-256 hex digest of the request
+    """
+    payload = json.dumps({
+        'model': model,
+        'messages': messages,
+        'temperature': temperature,
+        'max_tokens': max_tokens
+    }, sort_keys=True, separators=(',', ':'))
+
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-memory LRU cache with per-entry expiry."""
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get a value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store a value, evicting the least recently used entries."""
+        expires_at = time.time() + ttl if ttl else None
+
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Durable cache tier stored in Redis, shared by all processes."""
+
+    def __init__(self, url, prefix='llm-cache:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        """Get a value, or None if missing."""
+        value = self.client.get(self.prefix + key)
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key, value, ttl=None):
+        """Store a value; Redis expires it after ttl seconds."""
+        self.client.set(self.prefix + key, value, ex=ttl or None)
+
+    def clear(self):
+        """Remove all entries under this backend's prefix."""
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+
+class SQLiteCacheBackend:
+    """Durable cache tier stored in a local SQLite file, for development and tests."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS llm_cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)'
+            )
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection that commits on success and is closed afterwards."""
+        with closing(sqlite3.connect(self.path, timeout=30)) as connection, connection:
+            yield connection
+
+    def get(self, key):
+        """Get a value, or None if missing or expired."""
+        with self._lock, self._connect() as connection:
+            row = connection.execute(
+                'SELECT value, expires_at FROM llm_cache WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            value, expires_at = row
+            if expires_at is not None and expires_at < time.time():
+                connection.execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+                return None
+
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store a value."""
+        expires_at = time.time() + ttl if ttl else None
+
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, value, expires_at)
+            )
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock, self._connect() as connection:
+            connection.execute('DELETE FROM llm_cache')
+
+
+class LLMCache:
+    """Two-tier cache for model responses: an in-memory LRU in front of a durable backend."""
+
+    def __init__(self, memory=None, backend=None, ttl=None):
+        self.memory = memory or MemoryCacheBackend()
+        self.backend = backend
+        self.ttl = ttl
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+
+    @staticmethod
+    def _full_key(namespace, key):
+        return f"{namespace or 'global'}:{key}"
+
+    def _count(self, namespace, counter):
+        with self._stats_lock:
+            counters = self._stats.setdefault(namespace or 'global', {
+                'memory_hits': 0,
+                'backend_hits': 0,
+                'misses': 0,
+                'errors': 0
+            })
+            counters[counter] += 1
+
+    def get(self, key, namespace=None):
+        """
+        Look a response up in the memory tier, then the durable tier.
+
+        Args:
+            key (str): The request key from make_cache_key
+            namespace (str, optional): The cache namespace, e.g. 'org:12'. Defaults to None.
+
+        Returns:
+            str: The cached response content, or None on a miss
+        """
+        full_key = self._full_key(namespace, key)
+
+        value = self.memory.get(full_key)
+        if value is not None:
+            self._count(namespace, 'memory_hits')
+            return value
+
+        if self.backend is not None:
+            try:
+                value = self.backend.get(full_key)
+            except Exception as e:
+                current_app.logger.error(f"Error reading LLM cache backend: {str(e)}")
+                self._count(namespace, 'errors')
+                value = None
+
+            if value is not None:
+                self.memory.set(full_key, value, self.ttl)
+                self._count(namespace, 'backend_hits')
+                return value
+
+        self._count(namespace, 'misses')
+        return None
+
+    def set(self, key, value, namespace=None):
+        """
+        Store a response in both tiers.
+
+        Args:
+            key (str): The request key from make_cache_key
+            value (str): The response content
+            namespace (str, optional): The cache namespace. Defaults to None.
+        """
+        full_key = self._full_key(namespace, key)
+        self.memory.set(full_key, value, self.ttl)
+
+        if self.backend is not None:
+            try:
+                self.backend.set(full_key, value, self.ttl)
+            except Exception as e:
+                current_app.logger.error(f"Error writing LLM cache backend: {str(e)}")
+                self._count(namespace, 'errors')
+
+    def stats(self):
+        """
+        Get hit and miss counters per namespace.
+
+        Returns:
+            dict: Counters keyed by namespace
+        """
+        with self._stats_lock:
+            return {namespace: dict(counters) for namespace, counters in self._stats.items()}
+
+    def clear(self):
+        """Remove all cached responses from both tiers."""
+        self.memory.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+
+def get_llm_cache():
+    """
+    Get the process-wide LLM response cache.
+
+    The durable tier is chosen by LLM_CACHE_BACKEND: 'redis' (REDIS_URL),
+    'sqlite' (LLM_CACHE_SQLITE_PATH), 'memory' for the LRU tier alone, or
+    'none' to disable caching.
+
+    Returns:
+        LLMCache: The cache, or None if caching is disabled
+    """
+    global _llm_cache
+
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                config = current_app.config
+                backend_type = config.get('LLM_CACHE_BACKEND', 'memory')
+                if backend_type == 'none':
+                    return None
+
+                backend = None
+                if backend_type == 'redis':
+                    backend = RedisCacheBackend(config.get('REDIS_URL', 'redis://localhost:6379/0'))
+                elif backend_type == 'sqlite':
+                    backend = SQLiteCacheBackend(config.get('LLM_CACHE_SQLITE_PATH', 'llm_cache.db'))
+
+                _llm_cache = LLMCache(
+                    memory=MemoryCacheBackend(config.get('LLM_CACHE_SIZE', 1024)),
+                    backend=backend,
+                    ttl=config.get('LLM_CACHE_TTL', 30 * 24 * 3600)
+                )
+
+    return _llm_cache
@@ -0,0 +1,145 @@
+from collections import Counter
+from datetime import date, datetime
+from flask import current_app
+from sqlalchemy import func, select, update
+from src.models import db
+from src.models.document import Document
+from src.models.obligation import Obligation
+from src.models.obligation_sweep import ObligationSweep
+from src.models.organization import Organization
+from src.services.event_bus import publish_on_commit
+
+class ObligationService:
+    """Service for obligation deadlines across organizations."""
+
+    @staticmethod
+    def sweep_overdue(today=None, batch_size=None):
+        """
+        Mark pending obligations past their due date as overdue.
+
+        Organizations are swept in batches of OBLIGATION_SWEEP_BATCH_SIZE with
+        one UPDATE each, served by the (status, due_date) index, so no
+        obligation is loaded into Python. Each organization with overdue
+        obligations gets an ObligationSweep row for the day, which dashboards
+        and reminder digests read instead of scanning obligations. Sweeping
+        again on the same day adds to that day's row.
+
+        Args:
+            today (date, optional): The day to compare due dates against. Defaults to None.
+            batch_size (int, optional): Organizations per UPDATE. Defaults to None.
+
+        Returns:
+            dict: Counts of swept 'organizations' and 'newly_overdue' obligations
+        """
+        today = today or date.today()
+        batch_size = batch_size or current_app.config.get('OBLIGATION_SWEEP_BATCH_SIZE', 500)
+
+        organizations = 0
+        newly_overdue = 0
+        last_id = 0
+        while True:
+            organization_ids = list(db.session.execute(
+                select(Organization.id)
+                .where(Organization.id > last_id)
+                .order_by(Organization.id)
+                .limit(batch_size)
+            ).scalars())
+            if not organization_ids:
+                break
+            last_id = organization_ids[-1]
+
+            try:
+                newly = ObligationService._sweep_batch(organization_ids, today)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Error sweeping overdue obligations of organizations {organization_ids[0]}-{last_id}: {str(e)}")
+                continue
+
+            organizations += len(organization_ids)
+            newly_overdue += sum(newly.values())
+
+        return {'organizations': organizations, 'newly_overdue': newly_overdue}
+
+    @staticmethod
+    def _sweep_batch(organization_ids, today):
+        """
+        Sweep one batch of organizations and record their counts.
+
+        Args:
+            organization_ids (list): The organization IDs
+            today (date): The day to compare due dates against
+
+        Returns:
+            Counter: Newly overdue obligations by organization ID
+        """
+        result = db.session.execute(
+            update(Obligation)
+            .where(
+                Obligation.status == 'pending',
+                Obligation.due_date < today,
+                Obligation.document_id.in_(
+                    select(Document.id).where(Document.organization_id.in_(organization_ids))
+                )
+            )
+            .values(status='overdue', updated_at=datetime.utcnow())
+            .returning(Obligation.document_id)
+            .execution_options(synchronize_session=False)
+        )
+        by_document = Counter(result.scalars())
+
+        newly = Counter()
+        if by_document:
+            for document_id, organization_id in db.session.execute(
+                select(Document.id, Document.organization_id).where(Document.id.in_(list(by_document)))
+            ):
+                newly[organization_id] += by_document[document_id]
+
+        totals = dict(db.session.execute(
+            select(Document.organization_id, func.count(Obligation.id))
+            .join(Obligation, Obligation.document_id == Document.id)
+            .where(Obligation.status == 'overdue', Document.organization_id.in_(organization_ids))
+            .group_by(Document.organization_id)
+        ).all())
+
+        sweeps = {
+            sweep.organization_id: sweep
+            for sweep in ObligationSweep.query.filter(
+                ObligationSweep.organization_id.in_(organization_ids),
+                ObligationSweep.swept_on == today
+            )
+        }
+        now = datetime.utcnow()
+        for organization_id in set(totals) | set(newly) | set(sweeps):
+            sweep = sweeps.get(organization_id)
+            if sweep is None:
+                sweep = ObligationSweep(organization_id=organization_id, swept_on=today)
+                db.session.add(sweep)
+            sweep.newly_overdue = (sweep.newly_overdue or 0) + newly.get(organization_id, 0)
+            sweep.overdue_count = totals.get(organization_id, 0)
+            sweep.swept_at = now
+
+        # The UPDATE bypasses the ORM, so the change is published explicitly
+        for organization_id, count in newly.items():
+            publish_on_commit(db.session, organization_id, 'obligations_overdue', {
+                'newly_overdue': count,
+                'overdue_count': totals.get(organization_id, 0)
+            })
+
+        db.session.commit()
+        return newly
+
+    @staticmethod
+    def get_overdue_history(organization_id, days=30):
+        """
+        Get the recorded sweeps of an organization, newest first.
+
+        Args:
+            organization_id (int): The organization ID
+            days (int, optional): Most sweeps to return. Defaults to 30.
+
+        Returns:
+            list: ObligationSweep rows
+        """
+        return ObligationSweep.query.filter_by(
+            organization_id=organization_id
+        ).order_by(ObligationSweep.swept_on.desc()).limit(days).all()
@@ -0,0 +1,109 @@
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from src.models import db
+from src.models.ocr_page import OcrPage
+from src.services.extraction_pool import run_extraction, render_pdf_pages, recognize_pdf_pages
+from src.utils.ocr import split_pages, join_pages, find_image_pages
+
+
+class OcrService:
+    """Service for recognizing the text of scanned PDF pages."""
+
+    @staticmethod
+    def fill_image_pages(text, page_offsets, pdf_path, directory):
+        """
+        Replace the text of PDF pages without a text layer by OCR text.
+
+        Only the pages with fewer than OCR_MIN_PAGE_CHARS characters are
+        rendered and recognized. Recognized pages are stored by the hash of
+        their rendered image, so re-analysis and new versions of a document
+        only recognize pages that changed. Failures leave the text as it was.
+
+        Args:
+            text (str): The extracted text, with pages separated by form feeds
+            page_offsets (list): The offset where each page starts
+            pdf_path (str): The local copy of the PDF kept by extract_file
+            directory (str): Directory for the page images
+
+        Returns:
+            tuple: (str, list) - (text, page start offsets)
+        """
+        pages = split_pages(text, page_offsets)
+        image_pages = find_image_pages(pages, current_app.config.get('OCR_MIN_PAGE_CHARS', 10))
+        if not image_pages:
+            return text, page_offsets
+
+        try:
+            recognized = OcrService.recognize_pages(pdf_path, image_pages, directory)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error recognizing pages of {pdf_path}: {str(e)}")
+            return text, page_offsets
+
+        changed = False
+        for number, page_text in recognized.items():
+            if len(page_text.strip()) > len(pages[number - 1].strip()):
+                pages[number - 1] = page_text
+                changed = True
+
+        if not changed:
+            return text, page_offsets
+
+        return join_pages(pages)
+
+    @staticmethod
+    def recognize_pages(pdf_path, page_numbers, directory):
+        """
+        Get the OCR text of PDF pages, recognizing only pages not seen before.
+
+        Pages are rendered with pdftoppm, then the ones whose image is not in
+        the cache are recognized with tesseract, on as many idle CPUs as
+        OCR_WORKERS allows. Both steps run in the extraction pool, each
+        allowed OCR_PAGE_TIMEOUT seconds per page.
+
+        Args:
+            pdf_path (str): The local PDF path
+            page_numbers (list): 1-based numbers of the pages to recognize
+            directory (str): Directory for the page images
+
+        Returns:
+            dict: Text by page number, for the pages that could be recognized
+
+        Raises:
+            OSError: If pdftoppm or tesseract is not installed
+            ExtractionError: If a step exceeded its time or memory limit
+        """
+        # A step is only sure of its own CPU, so it may have to go page by page
+        timeout = current_app.config.get('OCR_PAGE_TIMEOUT', 120) * len(page_numbers)
+
+        images = run_extraction(render_pdf_pages, (pdf_path, page_numbers, directory), timeout)
+        hashes = {number: page_hash for number, (_, page_hash) in images.items()}
+
+        cached = {}
+        if hashes:
+            cached = {
+                page.page_hash: page.text
+                for page in OcrPage.query.filter(OcrPage.page_hash.in_(set(hashes.values())))
+            }
+
+        missing = {number: image_path for number, (image_path, page_hash) in images.items() if page_hash not in cached}
+        recognized = {}
+        if missing:
+            recognized = run_extraction(recognize_pdf_pages, (missing, directory), timeout)
+
+        for number, page_text in recognized.items():
+            OcrService._store(hashes[number], page_text)
+            cached[hashes[number]] = page_text
+        if recognized:
+            db.session.commit()
+
+        return {number: cached[page_hash] for number, page_hash in hashes.items() if page_hash in cached}
+
+    @staticmethod
+    def _store(page_hash, text):
+        """Add a recognized page, unless another worker stored the same page first."""
+        try:
+            with db.session.begin_nested():
+                db.session.add(OcrPage(page_hash=page_hash, text=text))
+        except IntegrityError:
+            pass
@@ -0,0 +1,103 @@
+import time
+import threading
+
+# Process-wide runner, started by init_periodic_tasks
+_periodic_runner = None
+_periodic_runner_lock = threading.Lock()
+
+
+class PeriodicRunner:
+    """
+    Run maintenance jobs on a schedule in a background thread.
+
+    Stands in for Celery beat with the thread task backend, where there is no
+    beat process. Jobs run one after another in the runner's thread, each in
+    an application context; a job that raises is logged and tried again at
+    its next due time. ``jobs`` are (name, function, interval in seconds)
+    tuples.
+    """
+
+    def __init__(self, app, jobs, tick=1.0):
+        self.app = app
+        self.jobs = list(jobs)
+        self.tick = tick
+        self._due = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the runner thread; each job first runs at once."""
+        now = time.monotonic()
+        self._due = {name: now for name, _, _ in self.jobs}
+        self._thread = threading.Thread(target=self._loop, name='periodic-tasks', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the runner thread after the job in progress, if any."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def run_pending(self, now=None):
+        """
+        Run the jobs that are due.
+
+        Args:
+            now (float, optional): The time.monotonic() time. Defaults to now.
+
+        Returns:
+            list: Names of the jobs that ran
+        """
+        now = time.monotonic() if now is None else now
+        ran = []
+        for name, fn, interval in self.jobs:
+            if self._due.get(name, now) > now:
+                continue
+
+            self._due[name] = now + interval
+            with self.app.app_context():
+                try:
+                    fn()
+                except Exception as e:
+                    self.app.logger.error(f"Error in periodic task {name}: {str(e)}")
+            ran.append(name)
+        return ran
+
+    def _loop(self):
+        while not self._stop.wait(self.tick):
+            self.run_pending()
+
+
+def init_periodic_tasks(app):
+    """
+    Run the Celery beat schedule in the web process when tasks run in threads.
+
+    With TASK_BACKEND 'celery' a beat process sends these jobs to the
+    maintenance queue; the thread backend has no such process, so the web
+    process requeues analyses of dead workers and sweeps overdue obligations
+    itself. Nothing is started under testing.
+
+    Args:
+        app: The Flask application
+
+    Returns:
+        PeriodicRunner: The started runner, or None
+    """
+    global _periodic_runner
+
+    config = app.config
+    if config.get('TASK_BACKEND', 'celery') != 'thread' or app.testing:
+        return None
+
+    from src.services.task_service import TaskService
+    from src.services.obligation_service import ObligationService
+
+    with _periodic_runner_lock:
+        if _periodic_runner is None:
+            _periodic_runner = PeriodicRunner(app, [
+                ('reap-expired-analyses', TaskService.reap_expired_runs, config.get('ANALYSIS_REAPER_INTERVAL', 60)),
+                ('sweep-overdue-obligations', ObligationService.sweep_overdue, config.get('OBLIGATION_SWEEP_INTERVAL', 3600))
+            ])
+            _periodic_runner.start()
+
+    return _periodic_runner
@@ -0,0 +1,377 @@
+import time
+import random
+import threading
+from flask import current_app
+
+# Process-wide governor instance, created from the app configuration on first use
+_rate_governor = None
+_rate_governor_lock = threading.Lock()
+
+# Lanes in priority order; background work cannot use the interactive reserve
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+LANES = (INTERACTIVE, BACKGROUND)
+
+# Longest single sleep while waiting for capacity, so waiters re-check often
+MAX_SLEEP = 5.0
+
+# Atomically refill and take from several buckets: all or nothing.
+# KEYS[1] is the pause key, KEYS[2..] the buckets. ARGV[1] is 1 to take even
+# when short (usage settlement), then amount, capacity, rate and floor per bucket.
+ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local force = ARGV[1] == '1'
+if not force then
+    local paused = tonumber(redis.call('GET', KEYS[1]) or '0')
+    if paused > now then
+        return tostring(paused - now)
+    end
+end
+local levels = {}
+local wait = 0
+for i = 2, #KEYS do
+    local base = (i - 2) * 4 + 1
+    local amount = tonumber(ARGV[base + 1])
+    local capacity = tonumber(ARGV[base + 2])
+    local rate = tonumber(ARGV[base + 3])
+    local floor = tonumber(ARGV[base + 4])
+    local state = redis.call('HMGET', KEYS[i], 'level', 'updated')
+    local level = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    level = math.min(capacity, level + math.max(0, now - updated) * rate)
+    levels[i] = level
+    if not force and level - amount < floor then
+        wait = math.max(wait, (floor + amount - level) / rate)
+    end
+end
+for i = 2, #KEYS do
+    local base = (i - 2) * 4 + 1
+    local level = levels[i]
+    if wait == 0 then
+        level = math.min(tonumber(ARGV[base + 2]), level - tonumber(ARGV[base + 1]))
+    end
+    redis.call('HSET', KEYS[i], 'level', tostring(level), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[i], 3600)
+end
+return tostring(wait)
+"""
+
+
+class RateLimitTimeout(Exception):
+    """Raised when capacity does not free up within the maximum wait."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class MemoryBucketBackend:
+    """Token buckets shared by the threads of one process."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, buckets, force=False):
+        """
+        Take from all buckets at once, or from none.
+
+        Args:
+            buckets (list): List of (name, amount, capacity, rate, floor) tuples;
+                rate is per second and a bucket may not drop below its floor
+            force (bool, optional): Take even if short. Defaults to False.
+
+        Returns:
+            float: 0 if taken, otherwise the seconds until it can be
+        """
+        with self._lock:
+            now = time.time()
+            if not force and self._paused_until > now:
+                return self._paused_until - now
+
+            levels = []
+            wait = 0.0
+            for name, amount, capacity, rate, floor in buckets:
+                level, updated = self._buckets.get(name, (capacity, now))
+                level = min(capacity, level + max(0.0, now - updated) * rate)
+                levels.append(level)
+                if not force and level - amount < floor:
+                    wait = max(wait, (floor + amount - level) / rate)
+
+            for (name, amount, capacity, rate, floor), level in zip(buckets, levels):
+                if wait == 0:
+                    level = min(capacity, level - amount)
+                self._buckets[name] = (level, now)
+
+            return wait
+
+    def pause(self, seconds):
+        """Stop handing out capacity for a number of seconds."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.time() + seconds)
+
+
+class RedisBucketBackend:
+    """Token buckets stored in Redis, shared by all processes."""
+
+    def __init__(self, url, prefix='rate-limit:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(ACQUIRE_SCRIPT)
+
+    def acquire(self, buckets, force=False):
+        """Take from all buckets at once, or from none; see MemoryBucketBackend.acquire."""
+        keys = [self.prefix + 'paused'] + [self.prefix + bucket[0] for bucket in buckets]
+        args = ['1' if force else '0']
+        for _, amount, capacity, rate, floor in buckets:
+            args.extend([amount, capacity, rate, floor])
+
+        return float(self._script(keys=keys, args=args))
+
+    def pause(self, seconds):
+        """Stop handing out capacity to every process for a number of seconds."""
+        seconds_now, microseconds = self.client.time()
+        until = seconds_now + microseconds / 1e6 + seconds
+        self.client.set(self.prefix + 'paused', until, px=max(1, int(seconds * 1000)))
+
+
+class RateGovernor:
+    """
+    Requests-per-minute and tokens-per-minute governor for the model API.
+
+    Every model call first takes one request and its estimated tokens from
+    two token buckets. Background work may not take the last
+    ``interactive_reserve`` of either bucket, so interactive requests keep
+    a lane free while analyses saturate the limits.
+    """
+
+    def __init__(self, backend, requests_per_minute, tokens_per_minute, interactive_reserve=0.2, max_wait=300):
+        self.backend = backend
+        self.fallback = MemoryBucketBackend()
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.interactive_reserve = interactive_reserve
+        self.max_wait = max_wait
+        self._stats = {lane: self._empty_lane_stats() for lane in LANES}
+        self._stats['retries'] = 0
+        self._stats['rate_limited'] = 0
+        self._stats['pauses'] = 0
+        self._stats['backend_errors'] = 0
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def _empty_lane_stats():
+        return {'requests': 0, 'throttled': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+
+    def _buckets(self, tokens, lane):
+        """Bucket arguments for a request of a number of tokens in a lane."""
+        reserve = 0.0 if lane == INTERACTIVE else self.interactive_reserve
+        request_floor = self.requests_per_minute * reserve
+        token_floor = self.tokens_per_minute * reserve
+
+        # A request larger than the usable bucket could never fit; let it through when full
+        tokens = min(tokens, self.tokens_per_minute - token_floor)
+
+        return [
+            ('requests', 1, self.requests_per_minute, self.requests_per_minute / 60.0, request_floor),
+            ('tokens', tokens, self.tokens_per_minute, self.tokens_per_minute / 60.0, token_floor)
+        ]
+
+    def _acquire(self, buckets, force=False):
+        """Take from the shared backend, falling back to this process's buckets."""
+        if self.backend is not None:
+            try:
+                return self.backend.acquire(buckets, force=force)
+            except Exception:
+                with self._stats_lock:
+                    self._stats['backend_errors'] += 1
+        return self.fallback.acquire(buckets, force=force)
+
+    def acquire(self, tokens, lane=BACKGROUND):
+        """
+        Wait until a request of a number of tokens may be sent.
+
+        Args:
+            tokens (int): Estimated prompt and response tokens
+            lane (str, optional): 'interactive' or 'background'. Defaults to 'background'.
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            RateLimitTimeout: If capacity does not free up within max_wait
+        """
+        lane = lane if lane in LANES else BACKGROUND
+        buckets = self._buckets(tokens, lane)
+        started = time.monotonic()
+        throttled = False
+
+        while True:
+            wait = self._acquire(buckets)
+            if wait <= 0:
+                break
+
+            throttled = True
+            if time.monotonic() - started + wait > self.max_wait:
+                self._record_wait(lane, time.monotonic() - started, throttled)
+                raise RateLimitTimeout(f"Model rate limit capacity not available within {self.max_wait}s", retry_after=wait)
+
+            # Jitter keeps waiters that woke together from retrying in lockstep
+            time.sleep(min(wait, MAX_SLEEP) * random.uniform(1.0, 1.2))
+
+        waited = time.monotonic() - started
+        self._record_wait(lane, waited, throttled)
+        return waited
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """
+        Correct the token bucket once a response reports its real usage.
+
+        Args:
+            estimated_tokens (int): Tokens taken by acquire
+            actual_tokens (int): Tokens the API counted
+        """
+        difference = actual_tokens - estimated_tokens
+        if not difference:
+            return
+
+        self._acquire([
+            ('tokens', difference, self.tokens_per_minute, self.tokens_per_minute / 60.0, 0)
+        ], force=True)
+
+    def pause(self, seconds):
+        """
+        Hold every caller back after the API reported a rate limit.
+
+        Args:
+            seconds (float): How long to pause
+        """
+        with self._stats_lock:
+            self._stats['pauses'] += 1
+
+        if self.backend is not None:
+            try:
+                self.backend.pause(seconds)
+            except Exception:
+                with self._stats_lock:
+                    self._stats['backend_errors'] += 1
+        self.fallback.pause(seconds)
+
+    def record_retry(self, rate_limited=False):
+        """Count a retried model request."""
+        with self._stats_lock:
+            self._stats['retries'] += 1
+            if rate_limited:
+                self._stats['rate_limited'] += 1
+
+    def _record_wait(self, lane, waited, throttled):
+        with self._stats_lock:
+            lane_stats = self._stats[lane]
+            lane_stats['requests'] += 1
+            lane_stats['wait_seconds'] += waited
+            lane_stats['max_wait_seconds'] = max(lane_stats['max_wait_seconds'], waited)
+            if throttled:
+                lane_stats['throttled'] += 1
+
+    def stats(self):
+        """
+        Get wait and throttling counters of this process.
+
+        Returns:
+            dict: Counters per lane plus retry, rate limit and pause counts
+        """
+        with self._stats_lock:
+            return {
+                key: dict(value) if isinstance(value, dict) else value
+                for key, value in self._stats.items()
+            }
+
+
+def get_retry_after(error):
+    """
+    Read the delay the API asked for from an error response.
+
+    Args:
+        error (Exception): The API error
+
+    Returns:
+        float: Seconds to wait, or None if the response did not say
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+
+    try:
+        milliseconds = headers.get('retry-after-ms')
+        if milliseconds is not None:
+            return float(milliseconds) / 1000
+        seconds = headers.get('retry-after')
+        if seconds is not None:
+            return float(seconds)
+    except (TypeError, ValueError):
+        return None
+
+    return None
+
+
+def backoff_delay(attempt, retry_after=None, base=1.0, cap=60.0):
+    """
+    Compute the delay before retrying a request.
+
+    Uses full-jitter exponential backoff; a Retry-After from the server is
+    treated as the minimum delay.
+
+    Args:
+        attempt (int): Number of the failed attempt, starting at 0
+        retry_after (float, optional): Delay requested by the server. Defaults to None.
+        base (float, optional): Delay scale in seconds. Defaults to 1.0.
+        cap (float, optional): Longest backoff in seconds. Defaults to 60.0.
+
+    Returns:
+        float: Seconds to wait
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def get_rate_governor():
+    """
+    Get the process-wide rate governor.
+
+    Buckets are shared through Redis (REDIS_URL) when RATE_LIMIT_BACKEND is
+    'redis', kept per process when it is 'memory', and the governor is
+    disabled when it is 'none'.
+
+    Returns:
+        RateGovernor: The governor, or None if rate limiting is disabled
+    """
+    global _rate_governor
+
+    if _rate_governor is None:
+        with _rate_governor_lock:
+            if _rate_governor is None:
+                config = current_app.config
+                backend_type = config.get('RATE_LIMIT_BACKEND', 'memory')
+                if backend_type == 'none':
+                    return None
+
+                backend = None
+                if backend_type == 'redis':
+                    backend = RedisBucketBackend(config.get('REDIS_URL', 'redis://localhost:6379/0'))
+
+                _rate_governor = RateGovernor(
+                    backend=backend,
+                    requests_per_minute=config.get('OPENAI_RPM_LIMIT', 500),
+                    tokens_per_minute=config.get('OPENAI_TPM_LIMIT', 40000),
+                    interactive_reserve=config.get('RATE_LIMIT_INTERACTIVE_RESERVE', 0.2),
+                    max_wait=config.get('RATE_LIMIT_MAX_WAIT', 300)
+                )
+
+    return _rate_governor
@@ -0,0 +1,463 @@
+import json
+import time
+import uuid
+import threading
+from flask import current_app
+
+# Process-wide scheduler instance, created from the app configuration on first use
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+# Priority classes, highest first: a class is only served when the ones above it are empty
+INTERACTIVE = 'interactive'
+NORMAL = 'normal'
+BULK = 'bulk'
+PRIORITIES = (INTERACTIVE, NORMAL, BULK)
+
+# Atomically pick the next job: highest class first, then the organization with
+# the lowest pass among those under the concurrency cap (stride scheduling).
+# The job is kept in the dispatched hash until the worker acknowledges it, so
+# a worker that dies before starting it does not lose it.
+# ARGV[1] is the key prefix, ARGV[2] the time, ARGV[3] the lease in seconds,
+# ARGV[4] the per-organization cap, ARGV[5] seconds a dispatched job may take
+# to be acknowledged, ARGV[6..] the classes in priority order.
+DISPATCH_SCRIPT = """
+local prefix = ARGV[1]
+local now = tonumber(ARGV[2])
+local lease = tonumber(ARGV[3])
+local cap = tonumber(ARGV[4])
+local ack_timeout = tonumber(ARGV[5])
+for i = 6, #ARGV do
+    local class = ARGV[i]
+    local orgs_key = prefix .. class .. ':orgs'
+    local orgs = redis.call('ZRANGE', orgs_key, 0, -1, 'WITHSCORES')
+    for j = 1, #orgs, 2 do
+        local org = orgs[j]
+        local pass = tonumber(orgs[j + 1])
+        local running_key = prefix .. 'running:' .. org
+        redis.call('ZREMRANGEBYSCORE', running_key, '-inf', now)
+        if cap <= 0 or redis.call('ZCARD', running_key) < cap then
+            local jobs_key = prefix .. class .. ':jobs:' .. org
+            local job = redis.call('LPOP', jobs_key)
+            if job then
+                local stride = tonumber(redis.call('HGET', prefix .. 'stride', org) or '1')
+                local decoded = cjson.decode(job)
+                redis.call('ZADD', running_key, now + lease, decoded['id'])
+                redis.call('EXPIRE', running_key, lease)
+                redis.call('HSET', prefix .. 'dispatched', decoded['id'], job)
+                redis.call('ZADD', prefix .. 'dispatched:deadlines', now + ack_timeout, decoded['id'])
+                redis.call('SET', prefix .. class .. ':vtime', tostring(pass))
+                redis.call('DECR', prefix .. class .. ':pending')
+                if redis.call('LLEN', jobs_key) > 0 then
+                    redis.call('ZADD', orgs_key, pass + stride, org)
+                else
+                    redis.call('ZREM', orgs_key, org)
+                    redis.call('HSET', prefix .. class .. ':pass', org, tostring(pass + stride))
+                end
+                return job
+            end
+            redis.call('ZREM', orgs_key, org)
+        end
+    end
+end
+return false
+"""
+
+# Add a job to its organization's queue; an organization that was idle joins at
+# the class's virtual time, so it cannot bank credit while it has no work.
+# ARGV[1] is the key prefix, ARGV[2] the class, ARGV[3] the organization,
+# ARGV[4] its stride and ARGV[5] the job.
+ENQUEUE_SCRIPT = """
+local prefix = ARGV[1]
+local class = ARGV[2]
+local org = ARGV[3]
+local orgs_key = prefix .. class .. ':orgs'
+redis.call('HSET', prefix .. 'stride', org, ARGV[4])
+redis.call('RPUSH', prefix .. class .. ':jobs:' .. org, ARGV[5])
+redis.call('INCR', prefix .. class .. ':pending')
+if not redis.call('ZSCORE', orgs_key, org) then
+    local vtime = tonumber(redis.call('GET', prefix .. class .. ':vtime') or '0')
+    local last = tonumber(redis.call('HGET', prefix .. class .. ':pass', org) or '0')
+    redis.call('ZADD', orgs_key, math.max(vtime, last), org)
+end
+return 1
+"""
+
+
+# Take back the dispatched jobs no worker acknowledged in time, freeing their
+# concurrency slots. ARGV[1] is the key prefix, ARGV[2] the time.
+CLAIM_STALLED_SCRIPT = """
+local prefix = ARGV[1]
+local now = tonumber(ARGV[2])
+local deadlines_key = prefix .. 'dispatched:deadlines'
+local ids = redis.call('ZRANGEBYSCORE', deadlines_key, '-inf', now)
+local jobs = {}
+for _, id in ipairs(ids) do
+    local job = redis.call('HGET', prefix .. 'dispatched', id)
+    redis.call('HDEL', prefix .. 'dispatched', id)
+    redis.call('ZREM', deadlines_key, id)
+    if job then
+        local decoded = cjson.decode(job)
+        redis.call('ZREM', prefix .. 'running:' .. tostring(decoded['organization_id']), id)
+        table.insert(jobs, job)
+    end
+end
+return jobs
+"""
+
+
+class AnalysisJob:
+    """A document analysis waiting for, or holding, a worker."""
+
+    def __init__(self, document_id, organization_id, priority=NORMAL, run_id=None, enqueued_at=None, id=None):
+        self.id = id or uuid.uuid4().hex
+        self.document_id = document_id
+        self.organization_id = organization_id
+        self.priority = priority if priority in PRIORITIES else NORMAL
+        self.run_id = run_id
+        self.enqueued_at = enqueued_at or time.time()
+
+    def to_dict(self):
+        """Convert the job to a dictionary."""
+        return {
+            'id': self.id,
+            'document_id': self.document_id,
+            'organization_id': self.organization_id,
+            'priority': self.priority,
+            'run_id': self.run_id,
+            'enqueued_at': self.enqueued_at
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create a job from a dictionary."""
+        return cls(**data)
+
+
+class MemorySchedulerBackend:
+    """Job queues shared by the threads of one process."""
+
+    def __init__(self):
+        self._jobs = {priority: {} for priority in PRIORITIES}  # class -> org -> list of jobs
+        self._passes = {priority: {} for priority in PRIORITIES}  # class -> org -> pass while queued
+        self._last_pass = {priority: {} for priority in PRIORITIES}  # class -> org -> pass when it went idle
+        self._vtime = {priority: 0.0 for priority in PRIORITIES}
+        self._running = {}  # org -> {job id: lease deadline}
+        self._dispatched = {}  # job id -> (job, acknowledgement deadline)
+        self._strides = {}  # org -> pass advance per job
+        self._lock = threading.Lock()
+
+    def enqueue(self, job, stride):
+        """Add a job to its organization's queue in its class."""
+        with self._lock:
+            org = str(job.organization_id)
+            self._jobs[job.priority].setdefault(org, []).append(job)
+            self._strides[org] = stride
+            passes = self._passes[job.priority]
+            if org not in passes:
+                passes[org] = max(self._vtime[job.priority], self._last_pass[job.priority].get(org, 0.0))
+
+    def dispatch(self, max_org_concurrency, lease, ack_timeout):
+        """Take the next job that may run; see FairScheduler.dispatch."""
+        with self._lock:
+            now = time.time()
+            for priority in PRIORITIES:
+                passes = self._passes[priority]
+                for org, current in sorted(passes.items(), key=lambda item: (item[1], item[0])):
+                    running = {
+                        job_id: deadline
+                        for job_id, deadline in self._running.get(org, {}).items()
+                        if deadline > now
+                    }
+                    self._running[org] = running
+                    if max_org_concurrency > 0 and len(running) >= max_org_concurrency:
+                        continue
+
+                    queue = self._jobs[priority][org]
+                    job = queue.pop(0)
+                    running[job.id] = now + lease
+                    self._dispatched[job.id] = (job, now + ack_timeout)
+                    self._vtime[priority] = current
+
+                    next_pass = current + self._strides.get(org, 1.0)
+                    if queue:
+                        passes[org] = next_pass
+                    else:
+                        del passes[org]
+                        del self._jobs[priority][org]
+                        self._last_pass[priority][org] = next_pass
+                    return job
+
+            return None
+
+    def acknowledge(self, job):
+        """Mark a dispatched job as started by its worker."""
+        with self._lock:
+            self._dispatched.pop(job.id, None)
+
+    def claim_stalled(self):
+        """Take back dispatched jobs that were not acknowledged in time."""
+        with self._lock:
+            now = time.time()
+            stalled = [job for job, deadline in self._dispatched.values() if deadline <= now]
+            for job in stalled:
+                del self._dispatched[job.id]
+                self._running.get(str(job.organization_id), {}).pop(job.id, None)
+            return stalled
+
+    def release(self, job):
+        """Free the concurrency slot a job held."""
+        with self._lock:
+            self._dispatched.pop(job.id, None)
+            self._running.get(str(job.organization_id), {}).pop(job.id, None)
+
+    def pending(self):
+        """Get the number of waiting jobs per class."""
+        with self._lock:
+            return {
+                priority: sum(len(queue) for queue in self._jobs[priority].values())
+                for priority in PRIORITIES
+            }
+
+    def running(self):
+        """Get the number of running jobs per organization."""
+        with self._lock:
+            now = time.time()
+            return {
+                org: count
+                for org, count in (
+                    (org, sum(1 for deadline in jobs.values() if deadline > now))
+                    for org, jobs in self._running.items()
+                )
+                if count
+            }
+
+
+class RedisSchedulerBackend:
+    """Job queues stored in Redis, shared by the web processes and all workers."""
+
+    def __init__(self, url, prefix='analysis-scheduler:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._enqueue = self.client.register_script(ENQUEUE_SCRIPT)
+        self._dispatch = self.client.register_script(DISPATCH_SCRIPT)
+        self._claim_stalled = self.client.register_script(CLAIM_STALLED_SCRIPT)
+
+    def enqueue(self, job, stride):
+        """Add a job to its organization's queue in its class."""
+        self._enqueue(args=[self.prefix, job.priority, str(job.organization_id), stride, json.dumps(job.to_dict())])
+
+    def dispatch(self, max_org_concurrency, lease, ack_timeout):
+        """Take the next job that may run; see FairScheduler.dispatch."""
+        args = [self.prefix, self._now(), lease, max_org_concurrency, ack_timeout] + list(PRIORITIES)
+        job = self._dispatch(args=args)
+        return AnalysisJob.from_dict(json.loads(job)) if job else None
+
+    def acknowledge(self, job):
+        """Mark a dispatched job as started by its worker."""
+        pipeline = self.client.pipeline()
+        pipeline.hdel(f"{self.prefix}dispatched", job.id)
+        pipeline.zrem(f"{self.prefix}dispatched:deadlines", job.id)
+        pipeline.execute()
+
+    def claim_stalled(self):
+        """Take back dispatched jobs that were not acknowledged in time."""
+        jobs = self._claim_stalled(args=[self.prefix, self._now()])
+        return [AnalysisJob.from_dict(json.loads(job)) for job in jobs]
+
+    def release(self, job):
+        """Free the concurrency slot a job held."""
+        pipeline = self.client.pipeline()
+        pipeline.zrem(f"{self.prefix}running:{job.organization_id}", job.id)
+        pipeline.hdel(f"{self.prefix}dispatched", job.id)
+        pipeline.zrem(f"{self.prefix}dispatched:deadlines", job.id)
+        pipeline.execute()
+
+    def _now(self):
+        """Get the Redis server's time, which every process shares."""
+        seconds, microseconds = self.client.time()
+        return seconds + microseconds / 1e6
+
+    def pending(self):
+        """Get the number of waiting jobs per class."""
+        values = self.client.mget([f"{self.prefix}{priority}:pending" for priority in PRIORITIES])
+        return {priority: max(0, int(value or 0)) for priority, value in zip(PRIORITIES, values)}
+
+    def running(self):
+        """Get the number of running jobs per organization."""
+        now = time.time()
+        result = {}
+        for key in self.client.scan_iter(f"{self.prefix}running:*"):
+            count = self.client.zcount(key, now, '+inf')
+            if count:
+                result[key.decode('utf-8').rsplit(':', 1)[1]] = count
+        return result
+
+
+class FairScheduler:
+    """
+    Priority and per-organization fair-share scheduler for analysis jobs.
+
+    Jobs wait in one queue per priority class and organization. A free worker
+    takes a job from the highest class that has one. Within a class,
+    organizations take turns in proportion to their weight (stride
+    scheduling), so a large data room does not hold back another tenant's
+    upload. No organization runs more than ``max_org_concurrency`` jobs at
+    once, which also bounds its share of the model rate limits.
+    """
+
+    def __init__(self, backend, max_org_concurrency=2, weights=None, lease=3600, ack_timeout=300):
+        self.backend = backend
+        self.max_org_concurrency = max_org_concurrency
+        self.weights = weights or {}
+        self.lease = lease
+        self.ack_timeout = ack_timeout
+
+    def stride(self, organization_id):
+        """Get how far an organization's pass advances per job: the inverse of its weight."""
+        weight = self.weights.get(str(organization_id), self.weights.get(organization_id, 1.0))
+        return 1.0 / max(float(weight), 0.001)
+
+    def enqueue(self, job):
+        """
+        Add a job to the queue of its organization and priority class.
+
+        Args:
+            job (AnalysisJob): The job
+        """
+        self.backend.enqueue(job, self.stride(job.organization_id))
+
+    def dispatch(self):
+        """
+        Take the next job a worker should run.
+
+        The job holds one of its organization's concurrency slots until it is
+        released, or until its lease runs out if the worker dies. Until the
+        worker acknowledges it, the job is also kept aside, and
+        claim_stalled hands it back if the worker dies before starting it.
+
+        Returns:
+            AnalysisJob: The job, or None if nothing may run now
+        """
+        return self.backend.dispatch(self.max_org_concurrency, self.lease, self.ack_timeout)
+
+    def acknowledge(self, job):
+        """
+        Mark a dispatched job as started, so it is no longer handed back.
+
+        Call this once the job's own progress is recorded elsewhere, e.g. its
+        analysis run is marked running.
+
+        Args:
+            job (AnalysisJob): The job
+        """
+        self.backend.acknowledge(job)
+
+    def claim_stalled(self):
+        """
+        Take back the dispatched jobs not acknowledged within ``ack_timeout``.
+
+        Their concurrency slots are freed; the caller decides whether to
+        enqueue them again.
+
+        Returns:
+            list: The AnalysisJob objects
+        """
+        return self.backend.claim_stalled()
+
+    def release(self, job):
+        """
+        Free the concurrency slot of a finished job.
+
+        Args:
+            job (AnalysisJob): The job
+        """
+        self.backend.release(job)
+
+    def pending(self, priority=None):
+        """
+        Get the number of waiting jobs.
+
+        Args:
+            priority (str, optional): Count only this class and the classes above it. Defaults to None.
+
+        Returns:
+            int: Waiting jobs
+        """
+        counts = self.backend.pending()
+        if priority in PRIORITIES:
+            return sum(counts[name] for name in PRIORITIES[:PRIORITIES.index(priority) + 1])
+        return sum(counts.values())
+
+    def stats(self):
+        """
+        Get waiting jobs per class and running jobs per organization.
+
+        Returns:
+            dict: The scheduler's gauges
+        """
+        return {
+            'max_org_concurrency': self.max_org_concurrency,
+            'pending': self.backend.pending(),
+            'running_by_organization': self.backend.running()
+        }
+
+
+def parse_weights(value):
+    """
+    Parse organization weights from a string such as ``"12:3,15:2"``.
+
+    Args:
+        value (str): Comma-separated organization:weight pairs
+
+    Returns:
+        dict: Weights keyed by organization ID string
+    """
+    weights = {}
+    for pair in (value or '').split(','):
+        if ':' in pair:
+            organization_id, weight = pair.split(':', 1)
+            weights[organization_id.strip()] = float(weight)
+    return weights
+
+
+def get_scheduler():
+    """
+    Get the process-wide analysis scheduler.
+
+    Queues are kept in Redis (CELERY_BROKER_URL) with the Celery task backend,
+    so every web process and worker shares them, and in memory with the
+    thread backend.
+
+    Returns:
+        FairScheduler: The scheduler
+    """
+    global _scheduler
+
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                config = current_app.config
+                uses_redis = (
+                    config.get('TASK_BACKEND', 'celery') == 'celery'
+                    and not config.get('CELERY_TASK_ALWAYS_EAGER')
+                )
+
+                if uses_redis:
+                    backend = RedisSchedulerBackend(
+                        config.get('CELERY_BROKER_URL') or config.get('REDIS_URL', 'redis://localhost:6379/0')
+                    )
+                else:
+                    backend = MemorySchedulerBackend()
+
+                _scheduler = FairScheduler(
+                    backend=backend,
+                    max_org_concurrency=config.get('ANALYSIS_ORG_MAX_CONCURRENCY', 2),
+                    weights=parse_weights(config.get('ANALYSIS_ORG_WEIGHTS')),
+                    lease=config.get('CELERY_TASK_TIME_LIMIT', 3600),
+                    ack_timeout=config.get('ANALYSIS_DISPATCH_TIMEOUT', 300)
+                )
+
+    return _scheduler
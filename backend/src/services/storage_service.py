@@ -1,9 +1,33 @@
 import os
 import uuid
+import shutil
+import hashlib
+import tempfile
 import boto3
+from contextlib import contextmanager
 from flask import current_app
 from werkzeug.utils import secure_filename
 
+
+class HashingReader:
+    """Read-through wrapper that computes the SHA-256 and size of a stream as it is read."""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.size = 0
+        self._digest = hashlib.sha256()
+    
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self._digest.update(data)
+        self.size += len(data)
+        return data
+    
+    def hexdigest(self):
+        """Get the SHA-256 of everything read so far."""
+        return self._digest.hexdigest()
+
+
 class StorageService:
     """Service for handling file storage operations."""
     
@@ -17,66 +41,78 @@ class StorageService:
         """
         Save a file to storage.
         
+        The SHA-256 of the content is computed while the file is written, so
+        identical uploads can be recognized without reading them again.
+        
         Args:
             file: The file object to save
             file_type (str, optional): The file type. Defaults to None.
             
         Returns:
-            tuple: (str, int) - (file_path, file_size)
+            tuple: (str, int, str) - (file_path, file_size, content_hash)
         """
-        storage_type = StorageService.get_storage_type()
+        file.seek(0)
+        return StorageService.save_stream(file.stream, file.filename, file_type=file_type)
+    
+    @staticmethod
+    def save_stream(stream, filename, file_type=None):
+        """
+        Save a readable stream to storage without reading it into memory.
+        
+        Used for uploads and for files that are not uploads of their own, such
+        as the members of an uploaded archive.
         
-        if storage_type == 's3':
-            return StorageService._save_to_s3(file, file_type)
+        Args:
+            stream: A readable binary file-like object
+            filename (str): The original filename, used for the extension
+            file_type (str, optional): The file type. Defaults to None.
+            
+        Returns:
+            tuple: (str, int, str) - (file_path, file_size, content_hash)
+        """
+        unique_filename = StorageService._unique_filename(filename, file_type)
+        reader = HashingReader(stream)
+        
+        if StorageService.get_storage_type() == 's3':
+            return StorageService._save_to_s3(reader, unique_filename), reader.size, reader.hexdigest()
         else:
-            return StorageService._save_to_local(file, file_type)
+            return StorageService._save_to_local(reader, unique_filename), reader.size, reader.hexdigest()
     
     @staticmethod
-    def _save_to_local(file, file_type=None):
+    def _save_to_local(reader, unique_filename):
         """
-        Save a file to local storage.
+        Save a stream to local storage.
         
         Args:
-            file: The file object to save
-            file_type (str, optional): The file type. Defaults to None.
+            reader: The stream to save
+            unique_filename (str): The storage filename
             
         Returns:
-            tuple: (str, int) - (file_path, file_size)
+            str: The file path
         """
         # Create upload directory if it doesn't exist
         upload_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
         os.makedirs(upload_folder, exist_ok=True)
         
-        # Generate a secure filename
-        original_filename = secure_filename(file.filename)
-        ext = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else ''
-        
-        if not ext and file_type:
-            ext = file_type.lower()
-        
-        # Generate a unique filename
-        unique_filename = f"{uuid.uuid4().hex}.{ext}"
         file_path = os.path.join(upload_folder, unique_filename)
         
         # Save the file
-        file.save(file_path)
-        
-        # Get file size
-        file_size = os.path.getsize(file_path)
+        with open(file_path, 'wb') as f:
+            shutil.copyfileobj(reader, f, 1024 * 1024)
         
-        return file_path, file_size
+        return file_path
     
     @staticmethod
-    def _save_to_s3(file, file_type=None):
+    def _save_to_s3(reader, unique_filename):
         """
-        Save a file to S3 storage.
+        Save a stream to S3 storage.
         
         Args:
-            file: The file object to save
-            file_type (str, optional): The file type. Defaults to None.
+            reader: The stream to save
+            unique_filename (str): The storage key
             
         Returns:
-            tuple: (str, int) - (file_path, file_size)
+            str: The S3 path
         """
         # Get S3 configuration
         s3_bucket = current_app.config.get('S3_BUCKET')
@@ -90,25 +126,22 @@ class StorageService:
             aws_secret_access_key=current_app.config.get('AWS_SECRET_ACCESS_KEY')
         )
         
-        # Generate a secure filename
-        original_filename = secure_filename(file.filename)
+        # upload_fileobj sends the stream in parts, reading one part at a time
+        s3.upload_fileobj(reader, s3_bucket, unique_filename)
+        
+        # Return S3 path
+        return f"s3://{s3_bucket}/{unique_filename}"
+    
+    @staticmethod
+    def _unique_filename(filename, file_type=None):
+        """Generate a unique storage filename keeping the original extension."""
+        original_filename = secure_filename(filename)
         ext = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else ''
         
         if not ext and file_type:
             ext = file_type.lower()
         
-        # Generate a unique filename
-        unique_filename = f"{uuid.uuid4().hex}.{ext}"
-        
-        # Upload to S3
-        file_size = file.tell()
-        file.seek(0)
-        s3.upload_fileobj(file, s3_bucket, unique_filename)
-        
-        # Return S3 path
-        file_path = f"s3://{s3_bucket}/{unique_filename}"
-        
-        return file_path, file_size
+        return f"{uuid.uuid4().hex}.{ext}"
     
     @staticmethod
     def get_file(file_path):
@@ -183,6 +216,85 @@ class StorageService:
         
         return file_content, file_type
     
+    @staticmethod
+    @contextmanager
+    def open_source(file_path, chunk_size=1024 * 1024):
+        """
+        Open a stored file for a file processor, without a full local copy.
+        
+        Local files are handed over by path. S3 objects are streamed into a
+        spooled temporary file that stays in memory up to
+        STORAGE_SPOOL_MAX_SIZE bytes and spills to a local temporary file
+        beyond it; either way it is removed when the block exits, so workers
+        need no shared filesystem.
+        
+        Args:
+            file_path (str): The file path
+            chunk_size (int, optional): Read size in bytes. Defaults to 1MB.
+            
+        Yields:
+            str or file: The local path, or a binary file positioned at the start;
+                None if the file does not exist
+        """
+        if not file_path.startswith('s3://'):
+            yield file_path if os.path.exists(file_path) else None
+            return
+        
+        s3_path = file_path.replace('s3://', '')
+        bucket_name, object_key = s3_path.split('/', 1)
+        
+        s3 = boto3.client(
+            's3',
+            region_name=current_app.config.get('S3_REGION', 'us-east-1'),
+            aws_access_key_id=current_app.config.get('AWS_ACCESS_KEY_ID'),
+            aws_secret_access_key=current_app.config.get('AWS_SECRET_ACCESS_KEY')
+        )
+        
+        with tempfile.SpooledTemporaryFile(max_size=current_app.config.get('STORAGE_SPOOL_MAX_SIZE', 8 * 1024 * 1024)) as spool:
+            response = s3.get_object(Bucket=bucket_name, Key=object_key)
+            for chunk in response['Body'].iter_chunks(chunk_size):
+                spool.write(chunk)
+            spool.seek(0)
+            yield spool
+    
+    @staticmethod
+    def hash_file(file_path, chunk_size=1024 * 1024):
+        """
+        Compute the SHA-256 of a stored file without loading it into memory.
+        
+        Args:
+            file_path (str): The file path
+            chunk_size (int, optional): Read size in bytes. Defaults to 1MB.
+            
+        Returns:
+            str: The hex digest, or None if the file does not exist
+        """
+        digest = hashlib.sha256()
+        
+        if file_path.startswith('s3://'):
+            s3_path = file_path.replace('s3://', '')
+            bucket_name, object_key = s3_path.split('/', 1)
+            
+            s3 = boto3.client(
+                's3',
+                region_name=current_app.config.get('S3_REGION', 'us-east-1'),
+                aws_access_key_id=current_app.config.get('AWS_ACCESS_KEY_ID'),
+                aws_secret_access_key=current_app.config.get('AWS_SECRET_ACCESS_KEY')
+            )
+            
+            response = s3.get_object(Bucket=bucket_name, Key=object_key)
+            for chunk in response['Body'].iter_chunks(chunk_size):
+                digest.update(chunk)
+        else:
+            if not os.path.exists(file_path):
+                return None
+            
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    digest.update(chunk)
+        
+        return digest.hexdigest()
+    
     @staticmethod
     def delete_file(file_path):
         """
@@ -1,76 +1,345 @@
-import threading
+import time
 from flask import current_app
 from src.models import db
 from src.models.document import Document
+from src.models.analysis_run import AnalysisRun
 from src.services.ai_service import AIService
+from src.services.analysis_tracker import AnalysisTracker
+from src.services.text_service import TextService
+from src.services.worker_pool import QueueFullError, get_worker_pool, get_queue_monitor
+from src.services.scheduler import AnalysisJob, NORMAL, get_scheduler
+from src.tasks import ANALYSIS_QUEUE
 
 class TaskService:
     """Service for handling background tasks."""
     
     @staticmethod
-    def process_document_async(document_id):
+    def process_document_async(document_id, priority=NORMAL, enforce_capacity=True):
         """
         Process a document asynchronously.
         
+        The analysis is added to the fair-share scheduler under the document's
+        organization and a worker is woken to take the next job. With
+        TASK_BACKEND 'celery' the workers are Celery processes; with 'thread'
+        they are the bounded worker pool of the web process, for local
+        development without a broker.
+        
+        Every queued analysis gets an analysis run record, which the status
+        endpoint reports stage by stage. Retrying a failed analysis resumes
+        its run from the stages and model requests already checkpointed.
+        
         Args:
             document_id (int): The document ID
+            priority (str, optional): 'interactive', 'normal' or 'bulk'. Defaults to 'normal'.
+            enforce_capacity (bool, optional): Reject the task when the queue is
+                full. Batches admitted as a whole, and endpoints that called
+                check_capacity before storing anything, pass False. Defaults to True.
             
         Returns:
-            bool: True if task was started, False otherwise
+            AnalysisRun: The queued run, or None if the task was not started
+            
+        Raises:
+            QueueFullError: If the task queue is full
         """
+        run = None
         try:
-            # Start a new thread for document processing
-            thread = threading.Thread(
-                target=TaskService._process_document,
-                args=(document_id,)
-            )
-            thread.daemon = True
-            thread.start()
-            return True
+            document = Document.query.get(document_id)
+            if not document:
+                current_app.logger.error(f"Document not found: {document_id}")
+                return None
+            
+            if enforce_capacity:
+                TaskService.check_capacity(priority)
+            run = AnalysisTracker.create_run(document, TextService.get_current_version(document), priority)
+            
+            get_scheduler().enqueue(AnalysisJob(
+                document_id=document_id,
+                organization_id=document.organization_id,
+                priority=priority,
+                run_id=run.id
+            ))
+            TaskService._wake_worker()
+            return run
+        except QueueFullError:
+            if run:
+                AnalysisTracker.finish_run(run.id, False, 'Task queue is full')
+            raise
         except Exception as e:
             current_app.logger.error(f"Error starting document processing task: {str(e)}")
+            if run:
+                AnalysisTracker.finish_run(run.id, False, str(e))
+            return None
+    
+    @staticmethod
+    def check_capacity(priority=NORMAL):
+        """
+        Make sure the task queue can take another document.
+        
+        Endpoints call this before accepting work, so a full queue is reported
+        to the client instead of growing without bound. Only jobs of the same
+        or a higher priority count, so a bulk backlog does not turn away
+        interactive requests.
+        
+        Args:
+            priority (str, optional): Priority class of the new work. Defaults to 'normal'.
+            
+        Raises:
+            QueueFullError: If the task queue is full
+        """
+        max_depth = current_app.config.get('TASK_QUEUE_DEPTH', 50)
+        depth = get_scheduler().pending(priority)
+        if depth < max_depth:
+            return
+        
+        if TaskService._uses_celery():
+            retry_after = current_app.config.get('TASK_RETRY_AFTER', 30)
+            if not current_app.config.get('CELERY_TASK_ALWAYS_EAGER'):
+                retry_after = get_queue_monitor().retry_after(ANALYSIS_QUEUE, depth)
+        else:
+            retry_after = get_worker_pool().retry_after()
+        raise QueueFullError(f"Task queue is full for {priority} work", retry_after=retry_after)
+    
+    @staticmethod
+    def stats():
+        """
+        Get task queue gauges: queue depth, active workers and wait times.
+        
+        Returns:
+            dict: The gauges of the configured task backend and the scheduler
+        """
+        if TaskService._uses_celery():
+            if current_app.config.get('CELERY_TASK_ALWAYS_EAGER'):
+                stats = {'backend': 'celery', 'eager': True}
+            else:
+                stats = get_queue_monitor().stats(current_app.config.get('CELERY_QUEUE_CONCURRENCY', {ANALYSIS_QUEUE: 4}))
+        else:
+            stats = get_worker_pool().stats()
+        
+        stats['scheduler'] = get_scheduler().stats()
+        return stats
+    
+    @staticmethod
+    def run_next_job():
+        """
+        Run the next analysis the scheduler picks, in a worker.
+        
+        Wake-ups are not tied to a job: any wake-up runs whichever job is due.
+        If none may run because their organizations are at their concurrency
+        cap, the wake-up ends; the job that frees a slot wakes a worker again.
+        
+        Returns:
+            bool: True if a job ran successfully, False otherwise
+        """
+        scheduler = get_scheduler()
+        job = scheduler.dispatch()
+        if not job:
             return False
+        
+        try:
+            # Once the run is marked running, its lease covers the job if this worker dies
+            return TaskService.run_document_analysis(
+                job.document_id,
+                job.run_id,
+                on_started=lambda: scheduler.acknowledge(job)
+            )
+        finally:
+            scheduler.release(job)
+            if scheduler.pending():
+                TaskService._wake_worker()
     
     @staticmethod
-    def _process_document(document_id):
+    def reap_expired_runs():
         """
-        Process a document.
+        Requeue analyses whose worker stopped renewing the run's lease.
+        
+        A worker that crashes or is killed mid-analysis leaves its run
+        running. Once the lease expires the run is queued again and resumes
+        from its checkpoints; a run out of attempts is failed instead.
+        
+        A worker that dies after taking a job from the scheduler but before
+        starting its run never acknowledges the job; such jobs are taken back
+        after ANALYSIS_DISPATCH_TIMEOUT and enqueued again.
+        
+        Returns:
+            dict: Counts of 'requeued' and 'failed' runs
+        """
+        requeued = failed = 0
+        scheduler = get_scheduler()
+        for job in scheduler.claim_stalled():
+            run = db.session.get(AnalysisRun, job.run_id) if job.run_id else None
+            # A run that started is requeued by its own lease instead
+            if run is not None and run.status != 'queued':
+                continue
+            
+            try:
+                scheduler.enqueue(job)
+            except Exception as e:
+                current_app.logger.error(f"Error requeueing analysis job {job.id}: {str(e)}")
+                continue
+            current_app.logger.warning(f"Requeued analysis of document {job.document_id} that was dispatched but never started")
+            requeued += 1
+        
+        for run, retry in AnalysisTracker.claim_expired_runs():
+            document = Document.query.get(run.document_id)
+            if not document:
+                continue
+            
+            if not retry:
+                AnalysisTracker.finish_run(run.id, False, f"Worker lease expired after {run.attempts} attempts")
+                document.status = 'error'
+                db.session.commit()
+                failed += 1
+                continue
+            
+            try:
+                scheduler.enqueue(AnalysisJob(
+                    document_id=document.id,
+                    organization_id=document.organization_id,
+                    priority=run.priority,
+                    run_id=run.id
+                ))
+            except Exception as e:
+                current_app.logger.error(f"Error requeueing analysis run {run.id}: {str(e)}")
+                AnalysisTracker.finish_run(run.id, False, str(e))
+                document.status = 'error'
+                db.session.commit()
+                failed += 1
+                continue
+            
+            document.status = 'queued'
+            db.session.commit()
+            current_app.logger.warning(f"Requeued analysis run {run.id} of document {document.id} after its lease expired")
+            requeued += 1
+        
+        if requeued:
+            TaskService._wake_worker()
+        return {'requeued': requeued, 'failed': failed}
+    
+    @staticmethod
+    def extract_batch_async(batch_id):
+        """
+        Unpack a stored archive in the background.
         
         Args:
-            document_id (int): The document ID
+            batch_id (int): The batch ID
+            
+        Raises:
+            QueueFullError: If the thread backend's queue is full
+        """
+        if TaskService._uses_celery():
+            from src.tasks.documents import extract_batch
+            extract_batch.apply_async(kwargs={'batch_id': batch_id, 'enqueued_at': time.time()})
+            return
+        
+        get_worker_pool().submit(TaskService._extract_batch, current_app._get_current_object(), batch_id)
+    
+    @staticmethod
+    def _extract_batch(app, batch_id):
+        """
+        Unpack a stored archive in a background thread.
+        
+        Args:
+            app: The Flask application
+            batch_id (int): The batch ID
+        """
+        from src.services.batch_service import BatchService
+        
+        with app.app_context():
+            BatchService.extract_batch(batch_id)
+    
+    @staticmethod
+    def _wake_worker():
+        """Ask a worker to take the next scheduled job."""
+        if TaskService._uses_celery():
+            from src.tasks.documents import dispatch_analysis
+            dispatch_analysis.apply_async(kwargs={'enqueued_at': time.time()})
+            return
+        
+        try:
+            get_worker_pool().submit(TaskService._process_next_job, current_app._get_current_object())
+        except QueueFullError:
+            # Enough wake-ups are queued already; each picks whichever job is due
+            pass
+    
+    @staticmethod
+    def _uses_celery():
+        """Whether tasks are sent to the Celery workers."""
+        return current_app.config.get('TASK_BACKEND', 'celery') == 'celery'
+    
+    @staticmethod
+    def _process_next_job(app):
+        """
+        Run the next scheduled job in a background thread.
+        
+        Args:
+            app: The Flask application
         """
         # Create a new application context
-        with current_app.app_context():
+        with app.app_context():
+            TaskService.run_next_job()
+    
+    @staticmethod
+    def run_document_analysis(document_id, run_id=None, on_started=None):
+        """
+        Run the analysis pipeline for a document and record its status.
+        
+        Must be called inside an application context.
+        
+        Args:
+            document_id (int): The document ID
+            run_id (int, optional): The analysis run to record stages on. Defaults to None.
+            on_started (callable, optional): Called once the run is marked running. Defaults to None.
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if run_id:
+            AnalysisTracker.start_run(run_id)
+        if on_started:
+            on_started()
+        
+        success = False
+        error = None
+        try:
+            # Get document
+            document = Document.query.get(document_id)
+            if not document:
+                current_app.logger.error(f"Document not found: {document_id}")
+                return False
+            
+            # Update document status
+            document.status = 'processing'
+            db.session.commit()
+            
+            # Process document
+            success = AIService.analyze_document(document_id)
+            
+            # Update document status
+            if success:
+                document.status = 'analyzed'
+            else:
+                document.status = 'error'
+            db.session.commit()
+            
+            return success
+        
+        except Exception as e:
+            success = False
+            error = str(e)
+            current_app.logger.error(f"Error processing document: {str(e)}")
+            
+            # Update document status
             try:
-                # Get document
+                db.session.rollback()
                 document = Document.query.get(document_id)
-                if not document:
-                    current_app.logger.error(f"Document not found: {document_id}")
-                    return
-                
-                # Update document status
-                document.status = 'processing'
-                db.session.commit()
-                
-                # Process document
-                success = AIService.analyze_document(document_id)
-                
-                # Update document status
-                if success:
-                    document.status = 'analyzed'
-                else:
+                if document:
                     document.status = 'error'
-                db.session.commit()
+                    db.session.commit()
+            except:
+                pass
             
-            except Exception as e:
-                current_app.logger.error(f"Error processing document: {str(e)}")
-                
-                # Update document status
-                try:
-                    document = Document.query.get(document_id)
-                    if document:
-                        document.status = 'error'
-                        db.session.commit()
-                except:
-                    pass
-
+            return False
+        
+        finally:
+            if run_id:
+                AnalysisTracker.finish_run(run_id, success, error)
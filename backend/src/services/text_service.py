@@ -0,0 +1,336 @@
+import bisect
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from src.models import db
+from src.models.document import DocumentVersion
+from src.models.document_text import DocumentText
+from src.services.storage_service import StorageService
+from src.services.analysis_tracker import AnalysisTracker
+from src.services.extraction_pool import ExtractionError, extract_file, run_extraction
+from src.services.ocr_service import OcrService
+from src.utils.file_processors import PAGE_BREAK
+from src.utils.bm25 import BM25Index
+
+# In-process LRU of extracted texts, keyed by document version ID
+_text_cache = OrderedDict()
+_text_cache_lock = threading.Lock()
+
+
+class ExtractedText:
+    """Extracted text of a document version with its page layout."""
+
+    def __init__(self, text, page_offsets=None, content_hash=None, version_id=None, passage_index=None, blocks=None):
+        self.text = text
+        self.page_offsets = page_offsets or [0]
+        self.blocks = blocks  # DOCX paragraphs and table cells, see DocxProcessor.extract_blocks
+        self.content_hash = content_hash
+        self.version_id = version_id
+        self._passage_index = passage_index
+
+    @property
+    def passage_index(self):
+        """BM25 index over the passages of the text, built on first use if not stored."""
+        if self._passage_index is None:
+            self._passage_index = BM25Index.build(self.text)
+        return self._passage_index
+
+    def search_passages(self, query, top_k=5):
+        """
+        Get the passages most relevant to a query, in document order.
+
+        Args:
+            query (str): The query text
+            top_k (int, optional): Number of passages to return. Defaults to 5.
+
+        Returns:
+            list: List of dicts with 'start', 'end', 'text' and 'score' keys
+        """
+        index = self.passage_index
+        ranked = index.search(query, top_k=top_k)
+
+        passages = []
+        for passage_id, score in ranked:
+            start, end = index.passages[passage_id]
+            passages.append({
+                'start': start,
+                'end': end,
+                'text': self.text[start:end],
+                'score': score
+            })
+
+        return sorted(passages, key=lambda passage: passage['start'])
+
+    def page_for_offset(self, offset):
+        """
+        Get the page number containing a character offset.
+
+        Args:
+            offset (int): The character offset
+
+        Returns:
+            int: The 1-based page number, or None if offset is None
+        """
+        if offset is None:
+            return None
+        return bisect.bisect_right(self.page_offsets, offset)
+
+
+class TextService:
+    """Service for extracting and caching document text."""
+
+    @staticmethod
+    def get_document_text(document):
+        """
+        Get the extracted text of a document's current version.
+
+        Text is extracted once per version and stored compressed in the database,
+        keyed by the SHA-256 of the file so identical uploads share one
+        extraction, together with a BM25 index over its passages. A small
+        in-process LRU sits in front of the stored copy.
+
+        Args:
+            document (Document): The document
+
+        Returns:
+            ExtractedText: The extracted text, or None if extraction failed
+        """
+        version = TextService.get_current_version(document)
+        if not version:
+            # Documents without a version row cannot be cached; extract directly
+            text, page_offsets, blocks = TextService._extract(document.file_type, document.file_path)
+            return ExtractedText(text, page_offsets, blocks=blocks) if text else None
+
+        return TextService.get_version_text(document, version)
+
+    @staticmethod
+    def get_version_text(document, version):
+        """
+        Get the extracted text of a specific document version.
+
+        Args:
+            document (Document): The document
+            version (DocumentVersion): The document version
+
+        Returns:
+            ExtractedText: The extracted text, or None if extraction failed
+        """
+        extracted = TextService._cache_get(version.id)
+        if extracted:
+            return extracted
+
+        stored = DocumentText.query.filter_by(document_version_id=version.id).first()
+        if not stored:
+            stored = TextService._store_version_text(document, version)
+            if not stored:
+                return None
+
+        index_data = stored.passage_index
+        extracted = ExtractedText(
+            text=stored.text,
+            page_offsets=stored.page_offsets,
+            blocks=stored.blocks,
+            content_hash=stored.content_hash,
+            version_id=version.id,
+            passage_index=BM25Index.from_dict(index_data) if index_data else None
+        )
+        TextService._cache_put(version.id, extracted)
+
+        return extracted
+
+    @staticmethod
+    def get_page_offsets(document):
+        """
+        Get the page start offsets of a document's current version without loading its text.
+
+        Args:
+            document (Document): The document
+
+        Returns:
+            list: Page start offsets, or None if the text was not extracted yet
+        """
+        version = TextService.get_current_version(document)
+        if not version:
+            return None
+
+        return db.session.query(DocumentText.page_offsets).filter_by(
+            document_version_id=version.id
+        ).scalar()
+
+    @staticmethod
+    def compute_page_offsets(text):
+        """
+        Compute the character offset where each page starts.
+
+        Args:
+            text (str): The extracted text, with pages separated by form feeds
+
+        Returns:
+            list: List of page start offsets, always starting with 0
+        """
+        offsets = [0]
+        index = text.find(PAGE_BREAK)
+        while index != -1:
+            offsets.append(index + 1)
+            index = text.find(PAGE_BREAK, index + 1)
+
+        # pdftotext ends the last page with a form feed too
+        if len(offsets) > 1 and offsets[-1] >= len(text):
+            offsets.pop()
+
+        return offsets
+
+    @staticmethod
+    def invalidate(version_id):
+        """
+        Drop a document version from the in-process cache.
+
+        Args:
+            version_id (int): The document version ID
+        """
+        with _text_cache_lock:
+            _text_cache.pop(version_id, None)
+
+    @staticmethod
+    def get_current_version(document):
+        """Get the version row matching the document's current file."""
+        version = DocumentVersion.query.filter_by(
+            document_id=document.id,
+            file_path=document.file_path
+        ).order_by(DocumentVersion.version_number.desc()).first()
+
+        if not version:
+            version = DocumentVersion.query.filter_by(
+                document_id=document.id
+            ).order_by(DocumentVersion.version_number.desc()).first()
+
+        return version
+
+    @staticmethod
+    def _store_version_text(document, version):
+        """
+        Extract the text of a version and store it, reusing an identical file's text.
+
+        Args:
+            document (Document): The document
+            version (DocumentVersion): The document version
+
+        Returns:
+            DocumentText: The stored text, or None if extraction failed
+        """
+        # Versions uploaded since hashes are computed on upload need no extra read
+        content_hash = version.content_hash
+        if not content_hash:
+            with AnalysisTracker.stage('download'):
+                content_hash = StorageService.hash_file(version.file_path)
+        if not content_hash:
+            current_app.logger.error(f"File not found for document version: {version.id}")
+            return None
+
+        # Identical file already extracted for another version
+        existing = DocumentText.query.filter_by(content_hash=content_hash).first()
+        if existing:
+            stored = DocumentText(
+                document_version_id=version.id,
+                content_hash=content_hash,
+                compressed_text=existing.compressed_text,
+                text_length=existing.text_length,
+                page_offsets=existing.page_offsets,
+                blocks=existing.blocks,
+                compressed_index=existing.compressed_index
+            )
+        else:
+            with AnalysisTracker.stage('text_extraction'):
+                text, page_offsets, blocks = TextService._extract(document.file_type, version.file_path)
+            if not text:
+                return None
+
+            stored = DocumentText(
+                document_version_id=version.id,
+                content_hash=content_hash,
+                text=text,
+                page_offsets=page_offsets,
+                blocks=blocks
+            )
+            stored.passage_index = BM25Index.build(text).to_dict()
+
+        try:
+            db.session.add(stored)
+            db.session.commit()
+        except IntegrityError:
+            # Another worker stored this version first
+            db.session.rollback()
+            stored = DocumentText.query.filter_by(document_version_id=version.id).first()
+
+        return stored
+
+    @staticmethod
+    def _extract(file_type, file_path):
+        """
+        Extract the text of a file, recognizing scanned PDF pages with OCR.
+
+        The file is downloaded once; a PDF with pages to recognize is kept
+        in a temporary directory, with the page images, until OCR is done.
+
+        Args:
+            file_type (str): The file type
+            file_path (str): The local path or S3 URL
+
+        Returns:
+            tuple: (str, list, list) - (text, page start offsets, DOCX
+                blocks or None), with an empty text if extraction failed
+        """
+        ocr = file_type.lower() == 'pdf' and current_app.config.get('OCR_ENABLED', True)
+        directory = tempfile.mkdtemp(prefix='ocr-') if ocr else None
+        try:
+            text, page_offsets, blocks, pdf_path = TextService._run_processor(file_type, file_path, directory)
+            if pdf_path:
+                text, page_offsets = OcrService.fill_image_pages(text, page_offsets, pdf_path, directory)
+            return text, page_offsets, blocks
+        finally:
+            if directory:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    @staticmethod
+    def _run_processor(file_type, file_path, ocr_directory=None):
+        """
+        Run the file processor for a file, in the extraction pool if there is one.
+
+        Args:
+            file_type (str): The file type
+            file_path (str): The local path or S3 URL
+            ocr_directory (str, optional): Directory to keep a PDF with pages to OCR in. Defaults to None.
+
+        Returns:
+            tuple: (str, list, list, str) - (text, page start offsets, DOCX
+                blocks or None, local path of the PDF to OCR or None), with an
+                empty text if extraction failed
+        """
+        try:
+            return run_extraction(extract_file, (file_type, file_path, ocr_directory))
+        except ExtractionError as e:
+            current_app.logger.error(f"Error extracting text from {file_path}: {str(e)}")
+            return "", [0], None, None
+
+    @staticmethod
+    def _cache_get(version_id):
+        """Get an entry from the in-process cache."""
+        with _text_cache_lock:
+            extracted = _text_cache.get(version_id)
+            if extracted:
+                _text_cache.move_to_end(version_id)
+            return extracted
+
+    @staticmethod
+    def _cache_put(version_id, extracted):
+        """Add an entry to the in-process cache, evicting the least recently used."""
+        max_size = current_app.config.get('TEXT_CACHE_SIZE', 32)
+
+        with _text_cache_lock:
+            _text_cache[version_id] = extracted
+            _text_cache.move_to_end(version_id)
+            while len(_text_cache) > max_size:
+                _text_cache.popitem(last=False)
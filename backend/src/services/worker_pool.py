@@ -0,0 +1,280 @@
+import math
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+# Process-wide pool and monitor instances, created from the app configuration on first use
+_worker_pool = None
+_queue_monitor = None
+_instance_lock = threading.Lock()
+
+
+class QueueFullError(Exception):
+    """Raised when the task queue cannot take more work."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class WorkerPool:
+    """
+    Bounded thread pool for background tasks run in the web process.
+
+    At most ``max_workers`` tasks run at once and at most ``max_queue_depth``
+    wait; further submissions are rejected instead of piling up threads and
+    database connections.
+    """
+
+    def __init__(self, max_workers, max_queue_depth):
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='task-worker')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue_depth)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._stats = {
+            'submitted': 0,
+            'rejected': 0,
+            'completed': 0,
+            'failed': 0,
+            'wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'last_wait_seconds': 0.0,
+            'run_seconds': 0.0
+        }
+
+    def submit(self, fn, *args):
+        """
+        Queue a task.
+
+        Args:
+            fn (callable): The task function
+            *args: Arguments for the task function
+
+        Raises:
+            QueueFullError: If all workers are busy and the queue is full
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise QueueFullError("Task queue is full", retry_after=self.retry_after())
+
+        with self._lock:
+            self._queued += 1
+            self._stats['submitted'] += 1
+
+        self._executor.submit(self._run, time.monotonic(), fn, args)
+
+    def _run(self, enqueued_at, fn, args):
+        """Run a task, keeping the gauges up to date."""
+        started = time.monotonic()
+        waited = started - enqueued_at
+
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._stats['wait_seconds'] += waited
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+            self._stats['last_wait_seconds'] = waited
+
+        failed = False
+        try:
+            fn(*args)
+        except Exception:
+            failed = True
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._stats['completed'] += 1
+                self._stats['run_seconds'] += time.monotonic() - started
+                if failed:
+                    self._stats['failed'] += 1
+            self._slots.release()
+
+    def retry_after(self):
+        """
+        Estimate when a slot frees up.
+
+        Returns:
+            int: Seconds, from the average task duration and the queue length
+        """
+        with self._lock:
+            completed = self._stats['completed']
+            average = self._stats['run_seconds'] / completed if completed else 30.0
+            queued = self._queued
+
+        return max(1, math.ceil(average * (queued + 1) / self.max_workers))
+
+    def stats(self):
+        """
+        Get the pool's gauges and counters.
+
+        Returns:
+            dict: Queue depth, active workers, wait times and task counters
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            started = stats['submitted'] - stats['rejected'] - self._queued
+            stats.update({
+                'backend': 'thread',
+                'max_workers': self.max_workers,
+                'max_queue_depth': self.max_queue_depth,
+                'queue_depth': self._queued,
+                'active_workers': self._active,
+                'average_wait_seconds': stats['wait_seconds'] / started if started > 0 else 0.0
+            })
+            return stats
+
+
+class BrokerQueueMonitor:
+    """
+    Queue depth limits and gauges for tasks sent to the Celery broker.
+
+    Depth is read from the Redis lists backing the queues. Workers report
+    active tasks and queue wait times into a Redis hash per queue, so the
+    gauges cover every worker pod.
+    """
+
+    def __init__(self, url, max_queue_depth, retry_after=30, prefix='task-metrics:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.max_queue_depth = max_queue_depth
+        self.default_retry_after = retry_after
+        self.prefix = prefix
+
+    def depth(self, queue):
+        """Get the number of tasks waiting in a queue."""
+        return self.client.llen(queue)
+
+    def check(self, queue):
+        """
+        Make sure a queue can take another task.
+
+        Args:
+            queue (str): The queue name
+
+        Raises:
+            QueueFullError: If the queue is at its maximum depth
+        """
+        try:
+            depth = self.depth(queue)
+        except Exception as e:
+            # The broker itself will report the error when the task is sent
+            current_app.logger.warning(f"Could not read depth of queue {queue}: {str(e)}")
+            return
+
+        if depth >= self.max_queue_depth:
+            self.client.hincrby(self.prefix + queue, 'rejected', 1)
+            raise QueueFullError(f"Task queue {queue} is full", retry_after=self.retry_after(queue, depth))
+
+    def retry_after(self, queue, depth):
+        """Estimate when a queue has room, from its average task duration."""
+        metrics = self._read(queue)
+        completed = int(metrics.get('completed', 0))
+        if not completed:
+            return self.default_retry_after
+
+        average = float(metrics.get('run_seconds', 0)) / completed
+        workers = max(1, int(metrics.get('active', 0)))
+        return max(1, math.ceil(average * (depth - self.max_queue_depth + 1) / workers))
+
+    def record_start(self, queue, waited):
+        """Record that a worker started a task after waiting in the queue."""
+        key = self.prefix + queue
+        pipeline = self.client.pipeline()
+        pipeline.hincrby(key, 'active', 1)
+        pipeline.hincrby(key, 'started', 1)
+        pipeline.hincrbyfloat(key, 'wait_seconds', waited)
+        pipeline.hset(key, 'last_wait_seconds', waited)
+        pipeline.execute()
+
+    def record_finish(self, queue, duration, failed=False):
+        """Record that a worker finished a task."""
+        key = self.prefix + queue
+        pipeline = self.client.pipeline()
+        pipeline.hincrby(key, 'active', -1)
+        pipeline.hincrby(key, 'completed', 1)
+        pipeline.hincrbyfloat(key, 'run_seconds', duration)
+        if failed:
+            pipeline.hincrby(key, 'failed', 1)
+        pipeline.execute()
+
+    def _read(self, queue):
+        """Read a queue's metrics hash."""
+        return {
+            key.decode('utf-8'): value.decode('utf-8')
+            for key, value in self.client.hgetall(self.prefix + queue).items()
+        }
+
+    def stats(self, queues):
+        """
+        Get gauges for a set of queues.
+
+        Args:
+            queues (iterable): Queue names
+
+        Returns:
+            dict: Gauges and counters keyed by queue
+        """
+        result = {'backend': 'celery', 'max_queue_depth': self.max_queue_depth, 'queues': {}}
+        for queue in queues:
+            metrics = self._read(queue)
+            started = int(metrics.get('started', 0))
+            result['queues'][queue] = {
+                'queue_depth': self.depth(queue),
+                'active_workers': int(metrics.get('active', 0)),
+                'started': started,
+                'completed': int(metrics.get('completed', 0)),
+                'failed': int(metrics.get('failed', 0)),
+                'rejected': int(metrics.get('rejected', 0)),
+                'last_wait_seconds': float(metrics.get('last_wait_seconds', 0)),
+                'average_wait_seconds': float(metrics.get('wait_seconds', 0)) / started if started else 0.0
+            }
+        return result
+
+
+def get_worker_pool():
+    """
+    Get the process-wide bounded worker pool.
+
+    Returns:
+        WorkerPool: The pool, sized by TASK_WORKERS and TASK_QUEUE_DEPTH
+    """
+    global _worker_pool
+
+    if _worker_pool is None:
+        with _instance_lock:
+            if _worker_pool is None:
+                config = current_app.config
+                _worker_pool = WorkerPool(
+                    max_workers=config.get('TASK_WORKERS', 4),
+                    max_queue_depth=config.get('TASK_QUEUE_DEPTH', 50)
+                )
+
+    return _worker_pool
+
+
+def get_queue_monitor():
+    """
+    Get the process-wide broker queue monitor.
+
+    Returns:
+        BrokerQueueMonitor: The monitor for the Celery broker's queues
+    """
+    global _queue_monitor
+
+    if _queue_monitor is None:
+        with _instance_lock:
+            if _queue_monitor is None:
+                config = current_app.config
+                _queue_monitor = BrokerQueueMonitor(
+                    url=config.get('CELERY_BROKER_URL') or config.get('REDIS_URL', 'redis://localhost:6379/0'),
+                    max_queue_depth=config.get('TASK_QUEUE_DEPTH', 50),
+                    retry_after=config.get('TASK_RETRY_AFTER', 30)
+                )
+
+    return _queue_monitor
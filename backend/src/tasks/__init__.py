@@ -0,0 +1,155 @@
+import time
+from celery import Celery, Task, signals
+from flask import current_app, has_app_context
+from kombu import Exchange, Queue
+from src.config import get_config
+
+# Queues consumed by the workers: document analysis and periodic maintenance
+ANALYSIS_QUEUE = 'analysis'
+MAINTENANCE_QUEUE = 'maintenance'
+
+
+class FlaskTask(Task):
+    """Task that runs inside a Flask application context."""
+
+    def __call__(self, *args, **kwargs):
+        # Eager tasks already run inside the caller's context
+        if has_app_context():
+            return self.run(*args, **kwargs)
+
+        # Workers use the same application as the web process
+        from src.main import app
+        with app.app_context():
+            return self.run(*args, **kwargs)
+
+
+def make_celery(config):
+    """
+    Create the Celery application.
+
+    Tasks are acknowledged only after they finish and are requeued if the
+    worker process dies, so a worker restart does not lose a running
+    analysis. Each worker reserves one task at a time for the same reason.
+
+    Args:
+        config: Configuration object or Flask config mapping
+
+    Returns:
+        Celery: The Celery application
+    """
+    celery = Celery('lexiai', task_cls=FlaskTask, include=['src.tasks.documents', 'src.tasks.obligations'])
+    configure_celery(celery, config)
+    return celery
+
+
+def configure_celery(celery, config):
+    """
+    Apply application configuration to the Celery application.
+
+    Args:
+        celery (Celery): The Celery application
+        config: Configuration object or Flask config mapping
+    """
+    get = config.get if hasattr(config, 'get') else lambda name, default=None: getattr(config, name, default)
+    queue_concurrency = get('CELERY_QUEUE_CONCURRENCY') or {ANALYSIS_QUEUE: 4}
+
+    celery.conf.update(
+        broker_url=get('CELERY_BROKER_URL'),
+        broker_transport_options={'visibility_timeout': get('CELERY_VISIBILITY_TIMEOUT', 7200)},
+        task_always_eager=get('CELERY_TASK_ALWAYS_EAGER', False),
+        task_eager_propagates=True,
+        task_ignore_result=True,
+        task_acks_late=True,
+        task_reject_on_worker_lost=True,
+        task_time_limit=get('CELERY_TASK_TIME_LIMIT', 3600),
+        worker_prefetch_multiplier=1,
+        task_default_queue=ANALYSIS_QUEUE,
+        task_queues=[Queue(name, Exchange(name), routing_key=name) for name in queue_concurrency],
+        task_serializer='json',
+        accept_content=['json'],
+        queue_concurrency=queue_concurrency,
+        beat_schedule={
+            'reap-expired-analyses': {
+                'task': 'documents.reap_expired',
+                'schedule': get('ANALYSIS_REAPER_INTERVAL', 60),
+                'options': {'queue': MAINTENANCE_QUEUE}
+            },
+            'sweep-overdue-obligations': {
+                'task': 'obligations.sweep_overdue',
+                'schedule': get('OBLIGATION_SWEEP_INTERVAL', 3600),
+                'options': {'queue': MAINTENANCE_QUEUE}
+            }
+        }
+    )
+
+
+def run_tracked(queue, enqueued_at, fn, *args):
+    """
+    Run a task function, reporting queue wait and active workers to the broker.
+
+    Args:
+        queue (str): The queue the task was taken from
+        enqueued_at (float): Epoch seconds when the task was queued, or None
+        fn (callable): The task function
+        *args: Arguments for the task function
+
+    Returns:
+        The task function's result
+    """
+    monitor = None
+    if not current_app.config.get('CELERY_TASK_ALWAYS_EAGER'):
+        from src.services.worker_pool import get_queue_monitor
+        try:
+            monitor = get_queue_monitor()
+            monitor.record_start(queue, max(0.0, time.time() - enqueued_at) if enqueued_at else 0.0)
+        except Exception as e:
+            current_app.logger.warning(f"Could not record task metrics: {str(e)}")
+            monitor = None
+
+    started = time.monotonic()
+    failed = True
+    try:
+        result = fn(*args)
+        failed = result is False
+        return result
+    finally:
+        if monitor is not None:
+            try:
+                monitor.record_finish(queue, time.monotonic() - started, failed=failed)
+            except Exception as e:
+                current_app.logger.warning(f"Could not record task metrics: {str(e)}")
+
+
+def init_celery(app):
+    """
+    Bind the Celery application to a Flask application's configuration.
+
+    Args:
+        app: The Flask application
+    """
+    configure_celery(celery, app.config)
+
+
+@signals.celeryd_init.connect
+def set_queue_concurrency(conf=None, options=None, **kwargs):
+    """
+    Size a worker's pool from the concurrency configured for its queues.
+
+    Applies when the worker is started without -c, e.g.
+    ``celery -A src.tasks.celery worker -Q analysis``; a worker consuming
+    several queues gets the sum of their settings.
+    """
+    if options is None or options.get('concurrency'):
+        return
+
+    concurrency = conf.queue_concurrency or {}
+    queues = options.get('queues') or list(concurrency)
+    if isinstance(queues, str):
+        queues = queues.split(',')
+
+    total = sum(concurrency.get(queue.strip(), 0) for queue in queues)
+    if total:
+        conf.worker_concurrency = total
+
+
+celery = make_celery(get_config())
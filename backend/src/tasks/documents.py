@@ -0,0 +1,62 @@
+from src.tasks import celery, run_tracked, ANALYSIS_QUEUE, MAINTENANCE_QUEUE
+from src.services.task_service import TaskService
+
+
+@celery.task(name='documents.dispatch', queue=ANALYSIS_QUEUE)
+def dispatch_analysis(enqueued_at=None):
+    """
+    Run the next analysis picked by the fair-share scheduler.
+
+    Args:
+        enqueued_at (float, optional): Epoch seconds when the task was queued. Defaults to None.
+
+    Returns:
+        bool: True if an analysis ran and succeeded
+    """
+    return run_tracked(ANALYSIS_QUEUE, enqueued_at, TaskService.run_next_job)
+
+
+@celery.task(name='documents.analyze', queue=ANALYSIS_QUEUE)
+def analyze_document(document_id, enqueued_at=None, run_id=None):
+    """
+    Run the analysis pipeline for a document, bypassing the scheduler.
+
+    Kept for tasks queued before analyses went through the scheduler.
+
+    Args:
+        document_id (int): The document ID
+        enqueued_at (float, optional): Epoch seconds when the task was queued. Defaults to None.
+        run_id (int, optional): The analysis run to record stages on. Defaults to None.
+
+    Returns:
+        bool: True if the analysis succeeded
+    """
+    return run_tracked(ANALYSIS_QUEUE, enqueued_at, TaskService.run_document_analysis, document_id, run_id)
+
+
+@celery.task(name='documents.extract_batch', queue=ANALYSIS_QUEUE)
+def extract_batch(batch_id, enqueued_at=None):
+    """
+    Unpack an uploaded archive into documents and queue them for analysis.
+
+    Args:
+        batch_id (int): The batch ID
+        enqueued_at (float, optional): Epoch seconds when the task was queued. Defaults to None.
+
+    Returns:
+        bool: True if the archive was unpacked
+    """
+    from src.services.batch_service import BatchService
+
+    return run_tracked(ANALYSIS_QUEUE, enqueued_at, BatchService.extract_batch, batch_id)
+
+
+@celery.task(name='documents.reap_expired', queue=MAINTENANCE_QUEUE)
+def reap_expired_analyses():
+    """
+    Requeue analyses whose worker died, run periodically by Celery beat.
+
+    Returns:
+        dict: Counts of requeued and failed runs
+    """
+    return TaskService.reap_expired_runs()
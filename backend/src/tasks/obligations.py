@@ -0,0 +1,13 @@
+from src.tasks import celery, MAINTENANCE_QUEUE
+from src.services.obligation_service import ObligationService
+
+
+@celery.task(name='obligations.sweep_overdue', queue=MAINTENANCE_QUEUE)
+def sweep_overdue_obligations():
+    """
+    Mark obligations past their due date as overdue, run periodically by Celery beat.
+
+    Returns:
+        dict: Counts of swept organizations and newly overdue obligations
+    """
+    return ObligationService.sweep_overdue()
@@ -0,0 +1,68 @@
+import posixpath
+
+# Archive members that are metadata of the tool that created the archive, not documents
+IGNORED_PREFIXES = ('__MACOSX/',)
+IGNORED_NAMES = {'.DS_Store', 'Thumbs.db', 'desktop.ini'}
+
+
+def get_extension(filename):
+    """Get the lower-case extension of a filename, without the dot."""
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+
+
+def scan_archive(archive, allowed_extensions, max_file_size, max_files=None):
+    """
+    Sort the members of a ZIP archive into documents to ingest and skipped entries.
+
+    Only the central directory is read; no member is decompressed. Sizes come
+    from the directory, which ``ZipFile.open`` also enforces while reading, so
+    a member cannot expand beyond the size checked here.
+
+    Args:
+        archive (zipfile.ZipFile): The open archive
+        allowed_extensions (set): File extensions that can be ingested
+        max_file_size (int): Largest uncompressed member size in bytes
+        max_files (int, optional): Most members to accept; later ones are skipped. Defaults to None.
+
+    Returns:
+        tuple: (list, list) - (accepted ZipInfo entries, skipped dicts with 'name' and 'reason')
+    """
+    accepted = []
+    skipped = []
+
+    for info in archive.infolist():
+        name = info.filename
+        basename = posixpath.basename(name)
+
+        if info.is_dir() or name.startswith(IGNORED_PREFIXES) or basename in IGNORED_NAMES or basename.startswith('._'):
+            continue
+
+        if info.flag_bits & 0x1:
+            skipped.append({'name': name, 'reason': 'File is encrypted'})
+        elif get_extension(basename) not in allowed_extensions:
+            skipped.append({'name': name, 'reason': 'File type not allowed'})
+        elif info.file_size == 0:
+            skipped.append({'name': name, 'reason': 'File is empty'})
+        elif info.file_size > max_file_size:
+            skipped.append({'name': name, 'reason': f"File too large. Maximum size is {max_file_size / (1024 * 1024):.1f}MB"})
+        elif max_files is not None and len(accepted) >= max_files:
+            skipped.append({'name': name, 'reason': f"Archive has more than {max_files} files"})
+        else:
+            accepted.append(info)
+
+    return accepted, skipped
+
+
+def entry_title(name):
+    """
+    Derive a document title from an archive member name.
+
+    Args:
+        name (str): The member path inside the archive
+
+    Returns:
+        str: The file name without folders and extension
+    """
+    basename = posixpath.basename(name)
+    title = basename.rsplit('.', 1)[0] if '.' in basename else basename
+    return (title or basename)[:255]
@@ -0,0 +1,153 @@
+import re
+import math
+from collections import Counter
+from src.utils.text_chunker import find_section_boundaries
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Words too common in contracts to help ranking
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have',
+    'if', 'in', 'is', 'it', 'its', 'of', 'on', 'or', 'such', 'that', 'the', 'this',
+    'to', 'was', 'were', 'will', 'with', 'shall', 'any', 'all', 'which', 'what',
+    'who', 'when', 'how', 'does', 'do', 'can', 'under', 'there', 'their', 'i', 'we'
+}
+
+
+def tokenize(text):
+    """
+    Split text into lowercase search terms.
+
+    Args:
+        text (str): The text to tokenize
+
+    Returns:
+        list: List of terms, without stopwords
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def split_into_passages(text, max_length=1500, min_length=200):
+    """
+    Split text into passages along section and paragraph boundaries.
+
+    Short paragraphs are merged with the following ones until they reach
+    ``min_length``; sections longer than ``max_length`` are cut at whitespace.
+
+    Args:
+        text (str): The document text
+        max_length (int, optional): Maximum passage length. Defaults to 1500.
+        min_length (int, optional): Preferred minimum passage length. Defaults to 200.
+
+    Returns:
+        list: List of (start, end) offsets
+    """
+    if not text:
+        return []
+
+    boundaries = find_section_boundaries(text) + [len(text)]
+    passages = []
+    start = 0
+
+    for boundary in boundaries[1:]:
+        if boundary - start < min_length and boundary < len(text):
+            continue
+
+        while boundary - start > max_length:
+            cut = text.rfind(' ', start + max_length // 2, start + max_length)
+            cut = cut + 1 if cut != -1 else start + max_length
+            passages.append((start, cut))
+            start = cut
+
+        if boundary > start:
+            passages.append((start, boundary))
+            start = boundary
+
+    return passages
+
+
+class BM25Index:
+    """Okapi BM25 inverted index over the passages of one document."""
+
+    def __init__(self, passages, postings, passage_lengths, k1=1.5, b=0.75):
+        self.passages = passages
+        self.postings = postings
+        self.passage_lengths = passage_lengths
+        self.k1 = k1
+        self.b = b
+        self.average_length = (sum(passage_lengths) / len(passage_lengths)) if passage_lengths else 0
+
+    @classmethod
+    def build(cls, text, max_length=1500):
+        """
+        Build an index over the passages of a text.
+
+        Args:
+            text (str): The document text
+            max_length (int, optional): Maximum passage length. Defaults to 1500.
+
+        Returns:
+            BM25Index: The index
+        """
+        passages = split_into_passages(text, max_length=max_length)
+        postings = {}
+        passage_lengths = []
+
+        for passage_id, (start, end) in enumerate(passages):
+            terms = tokenize(text[start:end])
+            passage_lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                postings.setdefault(term, []).append([passage_id, frequency])
+
+        return cls(passages, postings, passage_lengths)
+
+    def search(self, query, top_k=5):
+        """
+        Rank passages against a query.
+
+        Args:
+            query (str): The query text
+            top_k (int, optional): Number of passages to return. Defaults to 5.
+
+        Returns:
+            list: List of (passage_id, score) tuples, best first
+        """
+        passage_count = len(self.passages)
+        if not passage_count:
+            return []
+
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+
+            idf = math.log(1 + (passage_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for passage_id, frequency in postings:
+                length_norm = 1 - self.b + self.b * self.passage_lengths[passage_id] / (self.average_length or 1)
+                score = idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+                scores[passage_id] = scores.get(passage_id, 0.0) + score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:top_k]
+
+    def to_dict(self):
+        """Convert the index to a JSON-serializable dictionary."""
+        return {
+            'passages': [list(passage) for passage in self.passages],
+            'postings': self.postings,
+            'passage_lengths': self.passage_lengths,
+            'k1': self.k1,
+            'b': self.b
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create an index from a dictionary produced by to_dict."""
+        return cls(
+            passages=[tuple(passage) for passage in data['passages']],
+            postings=data['postings'],
+            passage_lengths=data['passage_lengths'],
+            k1=data.get('k1', 1.5),
+            b=data.get('b', 0.75)
+        )
@@ -1,9 +1,34 @@
 import os
 import io
 import tempfile
+import shutil
+import re
+import zipfile
+import threading
 import subprocess
+from collections import deque
+from xml.etree import ElementTree
 from flask import current_app
 
+# Page separator emitted by pdftotext
+PAGE_BREAK = '\f'
+
+# Characters read from pdftotext at a time
+READ_SIZE = 64 * 1024
+
+# Errors that mean a file could not be read, as opposed to a bug
+EXTRACTION_ERRORS = (subprocess.CalledProcessError, zipfile.BadZipFile, ElementTree.ParseError)
+
+# WordprocessingML element names
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_P, W_R, W_T, W_TAB, W_BR, W_CR = W + 'p', W + 'r', W + 't', W + 'tab', W + 'br', W + 'cr'
+W_TBL, W_TR, W_TC, W_TYPE = W + 'tbl', W + 'tr', W + 'tc', W + 'type'
+W_NO_BREAK_HYPHEN = W + 'noBreakHyphen'
+
+# Parts read after the body, with the prefix of their block 'part' names
+DOCX_EXTRA_PARTS = re.compile(r'word/(footnotes|endnotes|header\d*|footer\d*)\.xml$')
+DOCX_EXTRA_ORDER = ('footnotes', 'endnotes', 'header', 'footer')
+
 class FileProcessor:
     """Base class for file processors."""
     
@@ -27,18 +52,69 @@ class FileProcessor:
         return processors.get(file_type.lower(), TextProcessor)
     
     @staticmethod
-    def extract_text(file_path):
+    def extract_text(source):
         """
         Extract text from a file.
         
         Args:
-            file_path (str): The file path
+            source (str or file): The file path, or a binary file positioned at the start
             
         Returns:
             str: The extracted text
         """
         raise NotImplementedError("Subclasses must implement extract_text")
     
+    @classmethod
+    def extract_pages(cls, source):
+        """
+        Extract the text of a file page by page.
+        
+        Formats without pages yield their whole text as one page.
+        
+        Args:
+            source (str or file): The file path, or a binary file positioned at the start
+            
+        Yields:
+            str: The text of each page
+        """
+        text = cls.extract_text(source)
+        if text:
+            yield text
+    
+    @classmethod
+    def extract_paged_text(cls, source, **options):
+        """
+        Extract the text of a file with the offset where each page starts.
+        
+        Pages are joined with form feeds, as pdftotext separates them, and
+        their offsets are recorded as they stream in, so the text is never
+        scanned again to find page boundaries.
+        
+        Args:
+            source (str or file): The file path, or a binary file positioned at the start
+            **options: Options of the processor's extract_pages, e.g. workers for PDFs
+            
+        Returns:
+            tuple: (str, list) - (text, page start offsets, always starting with 0),
+                with an empty text if extraction failed
+        """
+        pages = []
+        offsets = [0]
+        length = 0
+        try:
+            for page in cls.extract_pages(source, **options):
+                if pages:
+                    pages.append(PAGE_BREAK)
+                    length += 1
+                    offsets.append(length)
+                pages.append(page)
+                length += len(page)
+        except EXTRACTION_ERRORS as e:
+            current_app.logger.error(f"Error extracting text: {str(e)}")
+            return "", [0]
+        
+        return ''.join(pages), offsets
+    
     @staticmethod
     def extract_metadata(file_path):
         """
@@ -57,28 +133,249 @@ class PDFProcessor(FileProcessor):
     """Processor for PDF files."""
     
     @staticmethod
-    def extract_text(file_path):
+    def extract_text(source):
         """
         Extract text from a PDF file.
         
+        Args:
+            source (str or file): The file path, or a binary file positioned at the start
+            
+        Returns:
+            str: The extracted text, with each page ended by a form feed
+        """
+        try:
+            return ''.join(page + PAGE_BREAK for page in PDFProcessor.extract_pages(source))
+        except subprocess.CalledProcessError as e:
+            current_app.logger.error(f"Error extracting text from PDF: {str(e)}")
+            return ""
+    
+    @staticmethod
+    def extract_pages(source, workers=1):
+        """
+        Stream the text of a PDF file page by page.
+        
+        With more than one worker, files with at least PDF_RANGE_MIN_PAGES
+        pages are split into page ranges extracted by up to ``workers``
+        pdftotext processes at once. Smaller files are extracted in one pass.
+        
+        Args:
+            source (str or file): The file path, or a binary file positioned at the start
+            workers (int, optional): Most pdftotext processes running at once. Defaults to 1.
+            
+        Yields:
+            str: The text of each page
+            
+        Raises:
+            subprocess.CalledProcessError: If pdftotext fails
+        """
+        if workers <= 1:
+            yield from PDFProcessor._stream_pages(source)
+            return
+        
+        with tempfile.TemporaryDirectory() as directory:
+            if isinstance(source, str):
+                file_path = source
+            else:
+                # Each range reads the file independently, so it needs a path
+                file_path = os.path.join(directory, 'source.pdf')
+                with open(file_path, 'wb') as f:
+                    shutil.copyfileobj(source, f, 1024 * 1024)
+            
+            page_count = PDFProcessor.count_pages(file_path)
+            if not page_count or page_count < current_app.config.get('PDF_RANGE_MIN_PAGES', 50):
+                yield from PDFProcessor._stream_pages(file_path)
+            else:
+                yield from PDFProcessor._extract_ranges(file_path, page_count, workers, directory)
+    
+    @staticmethod
+    def count_pages(file_path):
+        """
+        Get the number of pages of a PDF file.
+        
         Args:
             file_path (str): The file path
             
         Returns:
-            str: The extracted text
+            int: The page count, or None if pdfinfo could not read it
         """
         try:
-            # Use pdftotext (from poppler-utils) to extract text
             result = subprocess.run(
-                ['pdftotext', file_path, '-'],
+                ['pdfinfo', file_path],
                 capture_output=True,
                 text=True,
                 check=True
             )
-            return result.stdout
-        except subprocess.CalledProcessError as e:
-            current_app.logger.error(f"Error extracting text from PDF: {str(e)}")
-            return ""
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        
+        for line in result.stdout.splitlines():
+            key, _, value = line.partition(':')
+            if key.strip() == 'Pages':
+                try:
+                    return int(value.strip())
+                except ValueError:
+                    return None
+        
+        return None
+    
+    @staticmethod
+    def _stream_pages(source):
+        """
+        Stream the text of a PDF file page by page from a single pdftotext process.
+        
+        pdftotext writes to a pipe that is read in small blocks and split on
+        its form feeds, so only the current page is buffered, not the whole
+        output. A file object is fed to pdftotext's standard input.
+        
+        Args:
+            source (str or file): The file path, or a binary file positioned at the start
+            
+        Yields:
+            str: The text of each page
+            
+        Raises:
+            subprocess.CalledProcessError: If pdftotext fails
+        """
+        is_path = isinstance(source, str)
+        
+        # Use pdftotext (from poppler-utils) to extract text
+        process = subprocess.Popen(
+            ['pdftotext', source if is_path else '-', '-'],
+            stdin=subprocess.DEVNULL if is_path else subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding='utf-8',
+            errors='replace'
+        )
+        
+        feeder = None
+        if not is_path:
+            # Written from a thread so pdftotext's output is drained while it reads
+            feeder = threading.Thread(target=PDFProcessor._feed, args=(source, process.stdin), daemon=True)
+            feeder.start()
+        
+        finished = False
+        try:
+            yield from PDFProcessor._read_pages(process.stdout)
+            finished = True
+        finally:
+            process.stdout.close()
+            # Stop pdftotext only if the caller stopped reading early
+            if not finished and process.poll() is None:
+                process.kill()
+            returncode = process.wait()
+            if feeder is not None:
+                feeder.join()
+        
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, 'pdftotext')
+    
+    @staticmethod
+    def _extract_ranges(file_path, page_count, workers, directory):
+        """
+        Extract a PDF file in page ranges, one pdftotext process per range.
+        
+        Up to ``workers`` ranges run at once, each writing to its own file in
+        ``directory``. Ranges are read back in page order as they finish while
+        the later ones keep running, and each yields exactly its number of
+        pages so page offsets line up across ranges.
+        
+        Args:
+            file_path (str): The file path
+            page_count (int): The number of pages
+            workers (int): Most pdftotext processes running at once
+            directory (str): Directory for the range outputs
+            
+        Yields:
+            str: The text of each page
+            
+        Raises:
+            subprocess.CalledProcessError: If pdftotext fails on a range
+        """
+        range_size = -(-page_count // workers)
+        pending = deque(
+            (first, min(first + range_size - 1, page_count))
+            for first in range(1, page_count + 1, range_size)
+        )
+        running = deque()
+        
+        try:
+            while pending or running:
+                while pending and len(running) < workers:
+                    first, last = pending.popleft()
+                    output_path = os.path.join(directory, f"pages-{first}-{last}.txt")
+                    process = subprocess.Popen(
+                        ['pdftotext', '-f', str(first), '-l', str(last), file_path, output_path],
+                        stdin=subprocess.DEVNULL,
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL
+                    )
+                    running.append((first, last, output_path, process))
+                
+                first, last, output_path, process = running.popleft()
+                returncode = process.wait()
+                if returncode != 0:
+                    raise subprocess.CalledProcessError(returncode, 'pdftotext')
+                
+                expected = last - first + 1
+                with open(output_path, 'r', encoding='utf-8', errors='replace') as f:
+                    for page in PDFProcessor._read_pages(f, expected):
+                        yield page
+                os.remove(output_path)
+        finally:
+            for _, _, _, process in running:
+                if process.poll() is None:
+                    process.kill()
+                process.wait()
+    
+    @staticmethod
+    def _read_pages(stream, page_count=None):
+        """
+        Split pdftotext output into pages, reading it in blocks.
+        
+        Args:
+            stream (file): Text stream of pdftotext output
+            page_count (int, optional): Exact number of pages to yield, padding
+                with empty pages and dropping extra ones. Defaults to None.
+            
+        Yields:
+            str: The text of each page
+        """
+        emitted = 0
+        parts = []
+        for block in iter(lambda: stream.read(READ_SIZE), ''):
+            pieces = block.split(PAGE_BREAK)
+            for piece in pieces[:-1]:
+                parts.append(piece)
+                if page_count is None or emitted < page_count:
+                    yield ''.join(parts)
+                    emitted += 1
+                parts = []
+            if pieces[-1]:
+                parts.append(pieces[-1])
+        
+        # pdftotext ends the last page with a form feed too
+        if parts and (page_count is None or emitted < page_count):
+            yield ''.join(parts)
+            emitted += 1
+        
+        if page_count is not None:
+            for _ in range(page_count - emitted):
+                yield ''
+    
+    @staticmethod
+    def _feed(source, stdin):
+        """Copy a binary file to pdftotext's standard input, stopping quietly if it exits early."""
+        try:
+            shutil.copyfileobj(source, stdin.buffer, 1024 * 1024)
+        except (BrokenPipeError, ValueError):
+            pass
+        finally:
+            try:
+                stdin.close()
+            except BrokenPipeError:
+                pass
     
     @staticmethod
     def extract_metadata(file_path):
@@ -114,32 +411,206 @@ class PDFProcessor(FileProcessor):
 
 
 class DocxProcessor(FileProcessor):
-    """Processor for DOCX files."""
+    """
+    Processor for DOCX files.
+    
+    The XML parts are parsed straight from the zip with iterparse, clearing
+    each paragraph and table row once read, so memory stays bounded by the
+    largest paragraph rather than the document. The body comes first, with
+    tables row by row (cells separated by tabs), followed by footnotes,
+    endnotes, headers and footers. Explicit page breaks start a new page.
+    """
     
     @staticmethod
-    def extract_text(file_path):
+    def extract_text(source):
         """
         Extract text from a DOCX file.
         
         Args:
-            file_path (str): The file path
+            source (str or file): The file path, or a binary file positioned at the start
             
         Returns:
-            str: The extracted text
+            str: The extracted text, with explicit page breaks as form feeds
         """
         try:
-            import docx
+            return PAGE_BREAK.join(DocxProcessor.extract_pages(source))
+        except Exception as e:
+            current_app.logger.error(f"Error extracting text from DOCX: {str(e)}")
+            return ""
+    
+    @staticmethod
+    def extract_pages(source):
+        """
+        Stream the text of a DOCX file page by page.
+        
+        Args:
+            source (str or file): The file path, or a binary file positioned at the start
             
-            doc = docx.Document(file_path)
-            text = []
+        Yields:
+            str: The text of each page
             
-            for paragraph in doc.paragraphs:
-                text.append(paragraph.text)
+        Raises:
+            zipfile.BadZipFile: If the file is not a DOCX archive
+            xml.etree.ElementTree.ParseError: If a part is not well-formed
+        """
+        page = []
+        for kind, _, separator, text in DocxProcessor._iter_blocks(source):
+            if kind == 'page':
+                yield ''.join(page)
+                page = []
+                continue
+            if page:
+                page.append(separator)
+            page.append(text)
+        
+        yield ''.join(page)
+    
+    @staticmethod
+    def extract_blocks(source):
+        """
+        Extract the text of a DOCX file with the position of each paragraph and table cell.
+        
+        Args:
+            source (str or file): The file path, or a binary file positioned at the start
             
-            return '\n'.join(text)
-        except Exception as e:
+        Returns:
+            tuple: (str, list, list) - (text, page start offsets, blocks), where
+                each block is a dict with 'type' ('paragraph' or 'cell'),
+                'part' (e.g. 'document', 'footnotes', 'header1'), 'start' and
+                'end' offsets into the text, with an empty text if extraction
+                failed
+        """
+        parts = []
+        offsets = [0]
+        blocks = []
+        position = 0
+        page_start = True
+        try:
+            for kind, part, separator, text in DocxProcessor._iter_blocks(source):
+                if kind == 'page':
+                    parts.append(PAGE_BREAK)
+                    position += 1
+                    offsets.append(position)
+                    page_start = True
+                    continue
+                if not page_start:
+                    parts.append(separator)
+                    position += len(separator)
+                page_start = False
+                parts.append(text)
+                blocks.append({'type': kind, 'part': part, 'start': position, 'end': position + len(text)})
+                position += len(text)
+        except EXTRACTION_ERRORS as e:
             current_app.logger.error(f"Error extracting text from DOCX: {str(e)}")
-            return ""
+            return "", [0], []
+        
+        return ''.join(parts), offsets, blocks
+    
+    @staticmethod
+    def _iter_blocks(source):
+        """
+        Walk the parts of a DOCX file in reading order.
+        
+        Args:
+            source (str or file): The file path, or a binary file positioned at the start
+            
+        Yields:
+            tuple: (kind, part, separator, text), where kind is 'paragraph',
+                'cell' or 'page', and separator is the text that joins the
+                block to the previous one
+        """
+        with zipfile.ZipFile(source) as archive:
+            names = archive.namelist()
+            if 'word/document.xml' not in names:
+                raise zipfile.BadZipFile("No word/document.xml in archive")
+            
+            extras = [name for name in names if DOCX_EXTRA_PARTS.match(name)]
+            extras.sort(key=lambda name: (
+                DOCX_EXTRA_ORDER.index(DOCX_EXTRA_PARTS.match(name).group(1).rstrip('0123456789')),
+                len(name),
+                name
+            ))
+            
+            for index, name in enumerate(['word/document.xml'] + extras):
+                part = DOCX_EXTRA_PARTS.match(name).group(1) if index else 'document'
+                first = True
+                with archive.open(name) as stream:
+                    for kind, separator, text in DocxProcessor._iter_part(stream):
+                        if first and index and kind != 'page':
+                            # Set each part apart from the one before it
+                            separator = '\n\n'
+                            first = False
+                        yield kind, part, separator, text
+    
+    @staticmethod
+    def _iter_part(stream):
+        """
+        Stream the paragraphs, table cells and page breaks of one XML part.
+        
+        Args:
+            stream (file): The part's XML
+            
+        Yields:
+            tuple: (kind, separator, text)
+        """
+        elements = []
+        runs = []
+        cells = []
+        row_cells = 0
+        break_after = False
+        
+        for event, element in ElementTree.iterparse(stream, events=('start', 'end')):
+            tag = element.tag
+            if event == 'start':
+                elements.append(element)
+                if tag == W_TC:
+                    cells.append([])
+                elif tag == W_TR and not cells:
+                    row_cells = 0
+                continue
+            
+            elements.pop()
+            parent = elements[-1].tag if elements else None
+            
+            if tag == W_T:
+                runs.append(element.text or '')
+            elif parent == W_R and tag == W_TAB:
+                runs.append('\t')
+            elif parent == W_R and tag == W_NO_BREAK_HYPHEN:
+                runs.append('-')
+            elif parent == W_R and tag in (W_BR, W_CR):
+                if tag != W_BR or element.get(W_TYPE) != 'page':
+                    runs.append('\n')
+                elif not cells:
+                    # Page breaks inside tables are ignored; elsewhere the break
+                    # goes before the paragraph if nothing precedes it, else after
+                    if runs:
+                        break_after = True
+                    else:
+                        yield 'page', '', ''
+            elif tag == W_P:
+                text = ''.join(runs)
+                runs = []
+                if cells:
+                    cells[-1].append(text)
+                else:
+                    yield 'paragraph', '\n', text
+                    if break_after:
+                        yield 'page', '', ''
+                        break_after = False
+            elif tag == W_TC:
+                text = '\n'.join(cells.pop())
+                if cells:
+                    # A nested table's cells become lines of the outer cell
+                    cells[-1].append(text)
+                else:
+                    yield 'cell', '\t' if row_cells else '\n', text
+                    row_cells += 1
+            
+            # Drop what has been read; only open elements and their pending text remain
+            if tag in (W_P, W_TR, W_TBL) or len(elements) <= 2:
+                if elements:
+                    elements[-1].clear()
     
     @staticmethod
     def extract_metadata(file_path):
@@ -153,17 +624,22 @@ class DocxProcessor(FileProcessor):
             dict: The metadata
         """
         try:
-            import docx
+            with zipfile.ZipFile(file_path) as archive:
+                if 'docProps/core.xml' not in archive.namelist():
+                    return {}
+                with archive.open('docProps/core.xml') as stream:
+                    core_props = ElementTree.parse(stream).getroot()
             
-            doc = docx.Document(file_path)
-            metadata = {}
+            def prop(name):
+                element = core_props.find(name)
+                return element.text if element is not None else None
             
             # Extract core properties
-            core_props = doc.core_properties
-            metadata['title'] = core_props.title
-            metadata['author'] = core_props.author
-            metadata['created'] = core_props.created.isoformat() if core_props.created else None
-            metadata['modified'] = core_props.modified.isoformat() if core_props.modified else None
+            metadata = {}
+            metadata['title'] = prop('{http://purl.org/dc/elements/1.1/}title')
+            metadata['author'] = prop('{http://purl.org/dc/elements/1.1/}creator')
+            metadata['created'] = prop('{http://purl.org/dc/terms/}created')
+            metadata['modified'] = prop('{http://purl.org/dc/terms/}modified')
             
             return metadata
         except Exception as e:
@@ -175,18 +651,21 @@ class TextProcessor(FileProcessor):
     """Processor for text files."""
     
     @staticmethod
-    def extract_text(file_path):
+    def extract_text(source):
         """
         Extract text from a text file.
         
         Args:
-            file_path (str): The file path
+            source (str or file): The file path, or a binary file positioned at the start
             
         Returns:
             str: The extracted text
         """
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            if not isinstance(source, str):
+                return source.read().decode('utf-8', errors='ignore')
+            
+            with open(source, 'r', encoding='utf-8', errors='ignore') as f:
                 return f.read()
         except Exception as e:
             current_app.logger.error(f"Error extracting text from text file: {str(e)}")
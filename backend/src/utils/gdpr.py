@@ -20,7 +20,7 @@ from src.models.audit_log import AuditLog
 from src.models.document_share import DocumentShare
 from src.models.document_summary import DocumentSummary
 from src.models.obligation import Obligation
-from src.services.storage_service import StorageService
+from src.services.document_service import DocumentService
 
 
 class GDPRService:
@@ -91,21 +91,16 @@ class GDPRService:
             # Log the deletion request
             current_app.logger.info(f"Deleting all data for user_id: {user_id}")
             
-            # Get storage service
-            storage_service = StorageService()
-            
             # Delete documents and related data
+            file_paths = set()
             documents = Document.query.filter_by(created_by_id=user_id).all()
             for document in documents:
                 # Delete document versions and files
                 versions = DocumentVersion.query.filter_by(document_id=document.id).all()
                 for version in versions:
-                    # Delete file from storage
+                    # Files are deleted once committed, unless other documents share them
                     if version.file_path:
-                        try:
-                            storage_service.delete_file(version.file_path)
-                        except Exception as e:
-                            current_app.logger.error(f"Error deleting file {version.file_path}: {str(e)}")
+                        file_paths.add(version.file_path)
                     
                     # Delete clauses
                     Clause.query.filter_by(document_version_id=version.id).delete()
@@ -139,6 +134,9 @@ class GDPRService:
             # Commit all changes
             db.session.commit()
             
+            # Delete files from storage
+            DocumentService.release_files(file_paths)
+            
             return {"success": True, "message": "User data deleted successfully"}
             
         except Exception as e:
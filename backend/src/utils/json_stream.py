@@ -0,0 +1,161 @@
+ESCAPES = {
+    '"': '"',
+    '\\': '\\',
+    '/': '/',
+    'b': '\b',
+    'f': '\f',
+    'n': '\n',
+    'r': '\r',
+    't': '\t'
+}
+
+
+class JSONFieldStreamParser:
+    """
+    Incrementally extract string fields of a JSON object as it is streamed.
+
+    The model streams its JSON answer a few characters at a time. This parser
+    is fed those fragments and reports the new characters of each top-level
+    string field as soon as they arrive, so they can be forwarded to the
+    client before the object is complete. Text before the opening brace is
+    ignored, like the non-streaming response parsing does.
+    """
+
+    def __init__(self, fields=None):
+        self.fields = set(fields) if fields else None
+        self.values = {}
+        self._depth = 0
+        self._in_string = False
+        self._escape = None
+        self._high_surrogate = None
+        self._string = []
+        self._is_key = False
+        self._key = None
+        self._expect_key = False
+
+    def feed(self, fragment):
+        """
+        Feed the next fragment of the response.
+
+        Args:
+            fragment (str): The new characters
+
+        Returns:
+            list: List of (field, text) tuples with the characters each field gained
+        """
+        deltas = {}
+        order = []
+
+        for char in fragment:
+            if self._in_string:
+                decoded = self._consume_string_char(char)
+                if decoded is None:
+                    continue
+                if self._is_tracked_value():
+                    if self._key not in deltas:
+                        deltas[self._key] = []
+                        order.append(self._key)
+                    deltas[self._key].append(decoded)
+                    self.values[self._key] = self.values.get(self._key, '') + decoded
+                continue
+
+            if char == '{':
+                self._depth += 1
+                self._expect_key = self._depth == 1
+            elif char == '}':
+                self._depth = max(0, self._depth - 1)
+            elif char == '[':
+                self._depth += 1
+            elif char == ']':
+                self._depth = max(0, self._depth - 1)
+            elif char == ',' and self._depth == 1:
+                self._expect_key = True
+                self._key = None
+            elif char == ':' and self._depth == 1:
+                self._expect_key = False
+            elif char == '"' and self._depth >= 1:
+                self._in_string = True
+                self._string = []
+                self._is_key = self._depth == 1 and self._expect_key
+                if self._is_tracked_value():
+                    self.values.setdefault(self._key, '')
+
+        return [(field, ''.join(deltas[field])) for field in order]
+
+    def _is_tracked_value(self):
+        """Whether the current string is the value of a tracked top-level field."""
+        return (
+            not self._is_key
+            and self._depth == 1
+            and self._key is not None
+            and (self.fields is None or self._key in self.fields)
+        )
+
+    def _consume_string_char(self, char):
+        """
+        Consume one character inside a string.
+
+        Returns:
+            str: The decoded character to emit, or None if nothing is emitted yet
+        """
+        if self._escape is not None:
+            self._escape += char
+            if self._escape.startswith('u'):
+                if len(self._escape) < 5:
+                    return None
+                try:
+                    code = int(self._escape[1:], 16)
+                except ValueError:
+                    code = None
+                self._escape = None
+                return self._append_code_point(code)
+            else:
+                decoded = ESCAPES.get(char, char)
+            self._escape = None
+            return self._append(decoded)
+
+        if char == '\\':
+            self._escape = ''
+            return None
+
+        if char == '"':
+            # A high surrogate left unpaired at the end of the string
+            decoded = self._append('') if self._high_surrogate is not None else None
+            self._in_string = False
+            if self._is_key:
+                self._key = ''.join(self._string)
+                self._expect_key = False
+            return decoded
+
+        return self._append(char)
+
+    def _append_code_point(self, code):
+        """
+        Record a \\u escape, joining a UTF-16 surrogate pair into one character.
+
+        The two halves of a pair arrive as separate escapes, possibly in
+        separate fragments, so a high surrogate is held until the next one.
+        An unpaired surrogate cannot be encoded and becomes U+FFFD.
+        """
+        if code is None:
+            return self._append('')
+        if 0xD800 <= code <= 0xDBFF:
+            pending = self._append('') if self._high_surrogate is not None else None
+            self._high_surrogate = code
+            return pending
+        if 0xDC00 <= code <= 0xDFFF:
+            if self._high_surrogate is None:
+                return self._append('\ufffd')
+            high, self._high_surrogate = self._high_surrogate, None
+            return self._append(chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00)))
+        return self._append(chr(code))
+
+    def _append(self, decoded):
+        """Record a decoded character of the current string."""
+        if self._high_surrogate is not None:
+            self._high_surrogate = None
+            decoded = '\ufffd' + decoded
+        if self._is_key:
+            self._string.append(decoded)
+            return None
+        return decoded or None
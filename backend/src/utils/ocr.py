@@ -0,0 +1,167 @@
+import os
+import hashlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.file_processors import PAGE_BREAK
+
+
+def split_pages(text, page_offsets):
+    """
+    Split extracted text into its pages.
+
+    Args:
+        text (str): The extracted text, with pages separated by form feeds
+        page_offsets (list): The offset where each page starts
+
+    Returns:
+        list: The text of each page, without the separators
+    """
+    offsets = list(page_offsets or [0])
+    ends = [offset - len(PAGE_BREAK) for offset in offsets[1:]] + [len(text)]
+    return [text[start:end] for start, end in zip(offsets, ends)]
+
+
+def join_pages(pages):
+    """
+    Join page texts with form feeds.
+
+    Args:
+        pages (list): The text of each page
+
+    Returns:
+        tuple: (str, list) - (text, page start offsets)
+    """
+    offsets = [0]
+    for page in pages[:-1]:
+        offsets.append(offsets[-1] + len(page) + len(PAGE_BREAK))
+    return PAGE_BREAK.join(pages), offsets
+
+
+def find_image_pages(pages, min_chars=10):
+    """
+    Find the pages that have no usable text layer.
+
+    Args:
+        pages (list): The text of each page
+        min_chars (int, optional): Fewest non-blank characters of a page with text. Defaults to 10.
+
+    Returns:
+        list: 1-based numbers of the pages to recognize
+    """
+    return [
+        number for number, page in enumerate(pages, 1)
+        if sum(1 for char in page if not char.isspace()) < min_chars
+    ]
+
+
+def render_pages(pdf_path, page_numbers, directory, dpi=300, workers=1, timeout=None):
+    """
+    Render PDF pages to grayscale images with pdftoppm, several pages at once.
+
+    Args:
+        pdf_path (str): The local PDF path
+        page_numbers (list): 1-based numbers of the pages to render
+        directory (str): Directory for the images
+        dpi (int, optional): The resolution. Defaults to 300.
+        workers (int, optional): Most pdftoppm processes running at once. Defaults to 1.
+        timeout (int, optional): Seconds allowed per page. Defaults to None.
+
+    Returns:
+        dict: Image paths by page number, for the pages that rendered
+    """
+    commands = {}
+    for number in page_numbers:
+        prefix = os.path.join(directory, f"page-{number}")
+        commands[number] = [
+            'pdftoppm', '-f', str(number), '-l', str(number), '-r', str(dpi),
+            '-gray', '-singlefile', pdf_path, prefix
+        ]
+
+    rendered = _run_commands(commands, workers, timeout)
+    return {number: os.path.join(directory, f"page-{number}.pgm") for number in page_numbers if number in rendered}
+
+
+def hash_page_image(image_path, settings=''):
+    """
+    Hash a rendered page together with the OCR settings that apply to it.
+
+    Args:
+        image_path (str): The image path
+        settings (str, optional): Settings that change the OCR result, e.g. "300:eng". Defaults to ''.
+
+    Returns:
+        str: The SHA-256 hex digest
+    """
+    digest = hashlib.sha256(settings.encode('utf-8') + b'\0')
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def recognize_images(images, directory, language='eng', workers=1, timeout=None):
+    """
+    Recognize the text of page images with tesseract, several pages at once.
+
+    Each tesseract process is limited to one thread, so the pages, not
+    tesseract's internal threads, share the cores.
+
+    Args:
+        images (dict): Image paths by page number
+        directory (str): Directory for the recognized text
+        language (str, optional): The tesseract language(s). Defaults to 'eng'.
+        workers (int, optional): Most tesseract processes running at once. Defaults to 1.
+        timeout (int, optional): Seconds allowed per page. Defaults to None.
+
+    Returns:
+        dict: Recognized text by page number, for the pages that succeeded
+    """
+    commands = {
+        number: ['tesseract', image_path, os.path.join(directory, f"ocr-{number}"), '-l', language]
+        for number, image_path in images.items()
+    }
+    env = dict(os.environ, OMP_THREAD_LIMIT='1')
+
+    texts = {}
+    for number in _run_commands(commands, workers, timeout, env=env):
+        with open(os.path.join(directory, f"ocr-{number}.txt"), 'r', encoding='utf-8', errors='replace') as f:
+            # tesseract ends each page with a form feed, which would split the page
+            texts[number] = f.read().replace(PAGE_BREAK, '').strip()
+    return texts
+
+
+def _run_commands(commands, workers, timeout, env=None):
+    """
+    Run commands with at most ``workers`` running at once.
+
+    Args:
+        commands (dict): Command argument lists by key
+        workers (int): Most processes running at once
+        timeout (int): Seconds allowed per command, after which it is killed
+        env (dict, optional): The environment. Defaults to None.
+
+    Returns:
+        set: Keys of the commands that exited successfully
+
+    Raises:
+        OSError: If the program is not installed
+    """
+    def run(command):
+        try:
+            return subprocess.run(
+                command,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                env=env,
+                timeout=timeout
+            ).returncode == 0
+        except subprocess.TimeoutExpired:
+            return False
+
+    if not commands:
+        return set()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(commands)))) as executor:
+        results = executor.map(run, commands.values())
+        return {key for key, succeeded in zip(commands, results) if succeeded}
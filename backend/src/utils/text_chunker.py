@@ -0,0 +1,223 @@
+import re
+
+# Lines that usually open a new section of a contract: "ARTICLE 5", "Section 12.3",
+# "12.", "12.3 Termination", "(a)" and similar numbering schemes.
+SECTION_HEADING_PATTERN = re.compile(
+    r'^[ \t]*(?:'
+    r'(?:ARTICLE|Article|SECTION|Section|SCHEDULE|Schedule|EXHIBIT|Exhibit|ANNEX|Annex)\b'
+    r'|\d+(?:\.\d+)*[.)]?[ \t]+\S'
+    r'|\([a-zA-Z0-9]{1,4}\)[ \t]+\S'
+    r')',
+    re.MULTILINE
+)
+
+# Blank lines separate paragraphs; form feeds separate pages in pdftotext output.
+PARAGRAPH_BREAK_PATTERN = re.compile(r'\n[ \t]*\n|\f')
+
+
+def find_section_boundaries(text):
+    """
+    Find character offsets where a new section or paragraph starts.
+
+    Args:
+        text (str): The document text
+
+    Returns:
+        list: Sorted list of offsets, always starting with 0
+    """
+    boundaries = {0}
+
+    for match in SECTION_HEADING_PATTERN.finditer(text):
+        boundaries.add(match.start())
+
+    for match in PARAGRAPH_BREAK_PATTERN.finditer(text):
+        boundaries.add(match.end())
+
+    return sorted(offset for offset in boundaries if offset < len(text))
+
+
+def _last_boundary_in(boundaries, low, high):
+    """Return the largest boundary b with low < b <= high, or None."""
+    result = None
+    for boundary in boundaries:
+        if boundary > high:
+            break
+        if boundary > low:
+            result = boundary
+    return result
+
+
+def _first_boundary_in(boundaries, low, high):
+    """Return the smallest boundary b with low <= b < high, or None."""
+    for boundary in boundaries:
+        if boundary >= high:
+            break
+        if boundary >= low:
+            return boundary
+    return None
+
+
+def split_into_chunks(text, chunk_size=8000, overlap=500):
+    """
+    Split text into overlapping windows that end and start on section boundaries.
+
+    Each window is at most ``chunk_size`` characters long. A window ends at the
+    last section boundary in its second half when there is one, otherwise at the
+    last whitespace, so clauses are rarely cut in the middle. Consecutive windows
+    overlap by up to ``overlap`` characters so a clause straddling a cut is still
+    seen whole by at least one window.
+
+    Args:
+        text (str): The document text
+        chunk_size (int, optional): Maximum window length. Defaults to 8000.
+        overlap (int, optional): Maximum overlap between windows. Defaults to 500.
+
+    Returns:
+        list: List of dicts with 'start', 'end' and 'text' keys
+    """
+    if not text:
+        return []
+
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+
+    overlap = max(0, min(overlap, chunk_size // 2))
+    boundaries = find_section_boundaries(text)
+    text_length = len(text)
+    chunks = []
+    start = 0
+
+    while start < text_length:
+        end = start + chunk_size
+
+        if end >= text_length:
+            end = text_length
+        else:
+            boundary = _last_boundary_in(boundaries, start + chunk_size // 2, end)
+            if boundary is not None:
+                end = boundary
+            else:
+                whitespace = max(text.rfind(' ', start, end), text.rfind('\n', start, end))
+                if whitespace > start + chunk_size // 2:
+                    end = whitespace + 1
+
+        chunks.append({
+            'start': start,
+            'end': end,
+            'text': text[start:end]
+        })
+
+        if end >= text_length:
+            break
+
+        # Start the next window on a section boundary inside the overlap region
+        next_start = _first_boundary_in(boundaries, end - overlap, end)
+        if next_start is None and overlap and end not in boundaries:
+            # No section starts near the cut; overlap from the next word instead
+            whitespace = text.find(' ', end - overlap, end)
+            next_start = whitespace + 1 if whitespace != -1 else end - overlap
+        if next_start is None or next_start <= start:
+            next_start = end
+        start = next_start
+
+    return chunks
+
+
+def locate_span(text, snippet, start=0, end=None):
+    """
+    Locate a snippet returned by the model in the source text.
+
+    The model often normalizes whitespace when quoting, so an exact search is
+    tried first and a whitespace-insensitive search second.
+
+    Args:
+        text (str): The text to search
+        snippet (str): The snippet to locate
+        start (int, optional): Offset to start searching from. Defaults to 0.
+        end (int, optional): Offset to stop searching at. Defaults to None.
+
+    Returns:
+        tuple: (start, end) offsets in ``text``, or (None, None) if not found
+    """
+    if not snippet:
+        return None, None
+
+    if end is None:
+        end = len(text)
+
+    index = text.find(snippet, start, end)
+    if index != -1:
+        return index, index + len(snippet)
+
+    words = snippet.split()
+    if not words:
+        return None, None
+
+    pattern = re.compile(r'\s+'.join(re.escape(word) for word in words))
+    match = pattern.search(text, start, end)
+    if match:
+        return match.start(), match.end()
+
+    return None, None
+
+
+def merge_spans(items, min_overlap=0.5):
+    """
+    Merge and de-duplicate extracted items by character offset.
+
+    Items whose spans overlap by at least ``min_overlap`` of the shorter span and
+    share a category are treated as the same item seen by two overlapping
+    windows; the longer one is kept. Items without offsets are de-duplicated by
+    category and normalized text.
+
+    Args:
+        items (list): List of dicts with 'start_position', 'end_position',
+            'category' and 'text' keys
+        min_overlap (float, optional): Overlap ratio that marks a duplicate.
+            Defaults to 0.5.
+
+    Returns:
+        list: De-duplicated items ordered by position
+    """
+    located = [item for item in items if item.get('start_position') is not None]
+    unlocated = [item for item in items if item.get('start_position') is None]
+
+    located.sort(key=lambda item: (item['start_position'], -item['end_position']))
+
+    merged = []
+    for item in located:
+        duplicate_index = None
+        for index in range(len(merged) - 1, -1, -1):
+            previous = merged[index]
+            if previous['end_position'] <= item['start_position']:
+                continue
+            if previous.get('category') != item.get('category'):
+                continue
+
+            shared = min(previous['end_position'], item['end_position']) - item['start_position']
+            shorter = min(
+                previous['end_position'] - previous['start_position'],
+                item['end_position'] - item['start_position']
+            )
+            if shorter > 0 and shared / shorter >= min_overlap:
+                duplicate_index = index
+                break
+
+        if duplicate_index is None:
+            merged.append(item)
+        else:
+            previous = merged[duplicate_index]
+            if item['end_position'] - item['start_position'] > previous['end_position'] - previous['start_position']:
+                merged[duplicate_index] = item
+
+    merged.sort(key=lambda item: item['start_position'])
+
+    seen = set()
+    for item in unlocated:
+        key = (item.get('category'), ' '.join((item.get('text') or '').split()).lower())
+        if key in seen:
+            continue
+        seen.add(key)
+        merged.append(item)
+
+    return merged
@@ -0,0 +1,127 @@
+import bisect
+from difflib import SequenceMatcher
+from src.utils.text_chunker import find_section_boundaries
+
+
+def _split_lines(text):
+    """Split text into lines, keeping line endings, with their start offsets."""
+    lines = text.splitlines(keepends=True)
+    offsets = []
+    position = 0
+    for line in lines:
+        offsets.append(position)
+        position += len(line)
+    offsets.append(position)
+    return lines, offsets
+
+
+class TextDiff:
+    """
+    Line-level diff between two versions of a document's text.
+
+    Equal blocks map character offsets of the old text to the new text, so
+    spans found in the old version can be carried over; changed ranges are
+    the parts of the new text that have no counterpart in the old one.
+    """
+
+    def __init__(self, equal_blocks, changed_ranges):
+        self.equal_blocks = equal_blocks
+        self.changed_ranges = changed_ranges
+        self._old_starts = [block[0] for block in equal_blocks]
+
+    @classmethod
+    def compute(cls, old_text, new_text):
+        """
+        Diff two texts line by line.
+
+        Args:
+            old_text (str): The previous version's text
+            new_text (str): The new version's text
+
+        Returns:
+            TextDiff: The diff
+        """
+        old_lines, old_offsets = _split_lines(old_text or '')
+        new_lines, new_offsets = _split_lines(new_text or '')
+
+        matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+
+        equal_blocks = []
+        changed_ranges = []
+        for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+            if tag == 'equal':
+                equal_blocks.append((
+                    old_offsets[old_start],
+                    new_offsets[new_start],
+                    old_offsets[old_end] - old_offsets[old_start]
+                ))
+            else:
+                # Deletions are kept as empty ranges so the surrounding section is re-read
+                changed_ranges.append((new_offsets[new_start], new_offsets[new_end]))
+
+        return cls(equal_blocks, changed_ranges)
+
+    @property
+    def is_identical(self):
+        """Whether the texts are the same."""
+        return not self.changed_ranges
+
+    def remap(self, start, end):
+        """
+        Map a span of the old text to the new text.
+
+        Args:
+            start (int): Start offset in the old text
+            end (int): End offset in the old text
+
+        Returns:
+            tuple: (start, end) in the new text, or None if the span was changed
+        """
+        if start is None or end is None or end < start:
+            return None
+
+        index = bisect.bisect_right(self._old_starts, start) - 1
+        if index < 0:
+            return None
+
+        old_start, new_start, length = self.equal_blocks[index]
+        if end > old_start + length:
+            return None
+
+        shift = new_start - old_start
+        return start + shift, end + shift
+
+    def changed_sections(self, text, context=0):
+        """
+        Expand the changed ranges of the new text to whole sections.
+
+        Args:
+            text (str): The new text
+            context (int, optional): Extra characters to include around each range. Defaults to 0.
+
+        Returns:
+            list: Sorted, non-overlapping list of (start, end) offsets
+        """
+        if not self.changed_ranges:
+            return []
+
+        boundaries = find_section_boundaries(text) + [len(text)]
+
+        sections = []
+        for start, end in self.changed_ranges:
+            start = max(0, start - context)
+            end = min(len(text), end + context)
+
+            # Section containing the start, through the section containing the end
+            section_start = boundaries[max(0, bisect.bisect_right(boundaries, start) - 1)]
+            section_end = boundaries[min(len(boundaries) - 1, bisect.bisect_left(boundaries, max(end, start + 1)))]
+            sections.append((section_start, section_end))
+
+        merged = []
+        for start, end in sorted(sections):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+
+        return merged
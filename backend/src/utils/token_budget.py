@@ -0,0 +1,248 @@
+import os
+import re
+import math
+import hashlib
+import threading
+
+# Context window sizes in tokens
+MODEL_CONTEXT_WINDOWS = {
+    'gpt-4': 8192,
+    'gpt-4-32k': 32768,
+    'gpt-4-turbo': 128000,
+    'gpt-4o': 128000,
+    'gpt-4o-mini': 128000,
+    'gpt-3.5-turbo': 16385
+}
+
+# Price in USD per 1,000 tokens: (input, output)
+MODEL_PRICING = {
+    'gpt-4': (0.03, 0.06),
+    'gpt-4-32k': (0.06, 0.12),
+    'gpt-4-turbo': (0.01, 0.03),
+    'gpt-4o': (0.0025, 0.01),
+    'gpt-4o-mini': (0.00015, 0.0006),
+    'gpt-3.5-turbo': (0.0005, 0.0015)
+}
+
+# tiktoken encoding used by each model family
+MODEL_ENCODINGS = {
+    'gpt-4o': 'o200k_base',
+    'gpt-4': 'cl100k_base',
+    'gpt-3.5-turbo': 'cl100k_base'
+}
+
+ENCODING_URLS = {
+    'cl100k_base': 'https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken',
+    'o200k_base': 'https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken'
+}
+
+# Tokens added by the chat format around each message and before the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+# Headroom for tokenizer differences between the estimate and the API
+SAFETY_MARGIN = 0.03
+
+APPROXIMATE_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+|\s+|[^\w\s]|_")
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def _lookup(table, model):
+    """Look a model up in a table by exact name, then by longest matching prefix."""
+    if model in table:
+        return table[model]
+
+    for name in sorted(table, key=len, reverse=True):
+        if model.startswith(name):
+            return table[name]
+
+    return None
+
+
+def get_encoder(model):
+    """
+    Get the tiktoken encoder for a model, without touching the network.
+
+    tiktoken downloads encodings on first use. Encodings are only loaded when
+    they are already present in TIKTOKEN_CACHE_DIR (the Docker image bakes
+    them in at build time); otherwise None is returned and token counts fall
+    back to an approximation.
+
+    Args:
+        model (str): The model name
+
+    Returns:
+        The encoder, or None if tiktoken or the encoding file is unavailable
+    """
+    encoding_name = _lookup(MODEL_ENCODINGS, model) or 'cl100k_base'
+
+    with _encoders_lock:
+        if encoding_name in _encoders:
+            return _encoders[encoding_name]
+
+        encoder = None
+        cache_dir = os.environ.get('TIKTOKEN_CACHE_DIR')
+        url = ENCODING_URLS.get(encoding_name)
+        if cache_dir and url:
+            cache_file = os.path.join(cache_dir, hashlib.sha1(url.encode()).hexdigest())
+            if os.path.exists(cache_file):
+                try:
+                    import tiktoken
+                    encoder = tiktoken.get_encoding(encoding_name)
+                except Exception:
+                    encoder = None
+
+        _encoders[encoding_name] = encoder
+        return encoder
+
+
+def _approximate_tokens(text):
+    """
+    Approximate the BPE token count of a text.
+
+    Words are counted as one token per four letters, numbers as one token per
+    three digits and punctuation as one token each, which tracks cl100k counts
+    on English contract text closely.
+    """
+    count = 0
+    for piece in APPROXIMATE_TOKEN_PATTERN.findall(text):
+        if piece[0].isalpha():
+            count += math.ceil(len(piece) / 4)
+        elif piece[0].isdigit():
+            count += math.ceil(len(piece) / 3)
+        elif piece[0].isspace():
+            count += 1 if '\n' in piece or len(piece) > 1 else 0
+        else:
+            count += 1
+    return count
+
+
+def count_tokens(text, model='gpt-4'):
+    """
+    Count the tokens in a text.
+
+    Args:
+        text (str): The text
+        model (str, optional): The model name. Defaults to 'gpt-4'.
+
+    Returns:
+        int: The number of tokens
+    """
+    if not text:
+        return 0
+
+    encoder = get_encoder(model)
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+
+    return _approximate_tokens(text)
+
+
+def count_message_tokens(messages, model='gpt-4'):
+    """
+    Count the prompt tokens of a list of chat messages.
+
+    Args:
+        messages (list): The chat messages
+        model (str, optional): The model name. Defaults to 'gpt-4'.
+
+    Returns:
+        int: The number of prompt tokens
+    """
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE + count_tokens(message.get('content', ''), model)
+    return total
+
+
+def get_context_window(model, override=None):
+    """
+    Get the context window of a model.
+
+    Args:
+        model (str): The model name
+        override (int, optional): Configured context window. Defaults to None.
+
+    Returns:
+        int: The context window in tokens
+    """
+    return override or _lookup(MODEL_CONTEXT_WINDOWS, model) or 8192
+
+
+def text_budget(overhead_tokens, max_tokens, model='gpt-4', context_window=None):
+    """
+    Compute how many tokens of document text fit in a prompt.
+
+    Args:
+        overhead_tokens (int): Tokens of the prompt without the document text
+        max_tokens (int): Tokens reserved for the response
+        model (str, optional): The model name. Defaults to 'gpt-4'.
+        context_window (int, optional): Configured context window. Defaults to None.
+
+    Returns:
+        int: The number of tokens available for the text
+    """
+    window = get_context_window(model, context_window)
+    available = window - overhead_tokens - max_tokens
+    return max(0, int(available * (1 - SAFETY_MARGIN)))
+
+
+def truncate_to_tokens(text, budget, model='gpt-4'):
+    """
+    Cut a text to fit in a token budget.
+
+    Args:
+        text (str): The text
+        budget (int): The token budget
+        model (str, optional): The model name. Defaults to 'gpt-4'.
+
+    Returns:
+        str: The longest prefix of the text that fits, cut at a word boundary
+    """
+    if budget <= 0 or not text:
+        return ''
+
+    encoder = get_encoder(model)
+    if encoder is not None:
+        tokens = encoder.encode(text, disallowed_special=())
+        if len(tokens) <= budget:
+            return text
+        return encoder.decode(tokens[:budget])
+
+    total = _approximate_tokens(text)
+    if total <= budget:
+        return text
+
+    # Shrink a proportional estimate until it fits
+    cut = int(len(text) * budget / total)
+    while cut > 0:
+        whitespace = text.rfind(' ', 0, cut)
+        if whitespace > cut // 2:
+            cut = whitespace
+        if _approximate_tokens(text[:cut]) <= budget:
+            return text[:cut]
+        cut = int(cut * 0.95)
+
+    return ''
+
+
+def estimate_cost(input_tokens, output_tokens, model='gpt-4'):
+    """
+    Estimate the price of a number of tokens.
+
+    Args:
+        input_tokens (int): Prompt tokens
+        output_tokens (int): Response tokens
+        model (str, optional): The model name. Defaults to 'gpt-4'.
+
+    Returns:
+        float: The estimated cost in USD, or None if the model's price is unknown
+    """
+    pricing = _lookup(MODEL_PRICING, model)
+    if not pricing:
+        return None
+
+    input_price, output_price = pricing
+    return round(input_tokens / 1000 * input_price + output_tokens / 1000 * output_price, 4)
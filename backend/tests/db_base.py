@@ -0,0 +1,85 @@
+"""
+Base test case for services that work against the database.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from flask import Flask
+from src.models import db
+from src.models.organization import Organization
+from src.models.document import Document, DocumentVersion
+from src.services import text_service
+from src.services.category_cache import ClauseCategoryCache
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """
+    Test case with a bare application on a temporary SQLite database.
+
+    A file database rather than an in-memory one, so connections opened with
+    ``db.engine`` are separate from the session's, as they are in production.
+    """
+
+    def setUp(self):
+        """Set up test environment."""
+        self.directory = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config.update(
+            TESTING=True,
+            SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(self.directory, 'test.db')}",
+            SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            UPLOAD_FOLDER=self.directory,
+            STORAGE_TYPE='local',
+            EVENTS_BACKEND='memory',
+            LLM_CACHE_BACKEND='none',
+            RATE_LIMIT_BACKEND='none',
+            EXTRACTION_WORKERS=0,
+            OCR_ENABLED=False
+        )
+        db.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        # Process-wide caches are keyed by IDs, which each new database reuses
+        text_service._text_cache.clear()
+        ClauseCategoryCache.reset()
+
+    def tearDown(self):
+        """Clean up test environment."""
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.app_context.pop()
+        shutil.rmtree(self.directory)
+
+    def create_organization(self, name='Acme'):
+        """Create an organization."""
+        organization = Organization(name=name)
+        db.session.add(organization)
+        db.session.commit()
+        return organization
+
+    def create_document(self, organization, content='Either party may terminate this Agreement.', file_type='txt'):
+        """Store a file and create a document with a first version for it."""
+        file_path = os.path.join(self.directory, f"{organization.id}-{Document.query.count() + 1}.{file_type}")
+        with open(file_path, 'w') as f:
+            f.write(content)
+
+        document = Document(
+            organization_id=organization.id,
+            uploaded_by_user_id=None,
+            title='Master Services Agreement',
+            file_path=file_path,
+            file_type=file_type,
+            file_size=len(content)
+        )
+        db.session.add(document)
+        db.session.commit()
+
+        version = DocumentVersion(document_id=document.id, version_number=1, file_path=file_path)
+        db.session.add(version)
+        db.session.commit()
+        return document
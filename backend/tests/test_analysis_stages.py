@@ -0,0 +1,111 @@
+"""
+Tests for running analysis stages concurrently.
+"""
+
+import threading
+import unittest
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from src.models import db
+from src.models.analysis_run import AnalysisRun, AnalysisStage
+from src.services import ai_service
+from src.services.ai_service import AIService
+from src.services.analysis_tracker import AnalysisTracker
+from tests.db_base import DatabaseTestCase
+
+
+class AnalysisStagesTestCase(DatabaseTestCase):
+    """Test case for running analysis stages concurrently."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        super().setUp()
+        self.document = self.create_document(self.create_organization())
+        self.run = AnalysisTracker.create_run(self.document)
+        AnalysisTracker.start_run(self.run.id)
+        self.calls = []
+    
+    def tearDown(self):
+        """Clean up test environment."""
+        AnalysisTracker.finish_run(self.run.id, True)
+        super().tearDown()
+    
+    def _stage(self, name, fn, *args):
+        """Run a stage in a worker thread the way analyze_document does."""
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(copy_context().run, AIService._run_stage, self.app, name, fn, *args).result()
+    
+    def _stage_row(self, name):
+        db.session.expire_all()
+        return AnalysisStage.query.filter_by(run_id=self.run.id, name=name).one()
+    
+    def _summarize(self, text):
+        self.calls.append(threading.current_thread().name)
+        AnalysisTracker.record_usage(120, 30)
+        return {'summary': text.upper()}
+    
+    def test_stage_is_recorded_on_the_run(self):
+        """Test that a stage in a worker thread is timed and counted on the caller's run."""
+        result = self._stage('summary', self._summarize, 'net thirty')
+        
+        stage = self._stage_row('summary')
+        self.assertEqual(result, {'summary': 'NET THIRTY'})
+        self.assertNotEqual(self.calls, [threading.current_thread().name])
+        self.assertEqual(stage.status, 'completed')
+        self.assertIsNotNone(stage.started_at)
+        self.assertEqual((stage.model_requests, stage.prompt_tokens, stage.completion_tokens), (1, 120, 30))
+    
+    def test_context_is_not_shared_without_copy(self):
+        """Test that a worker started without the caller's context records nothing."""
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(AIService._run_stage, self.app, 'summary', self._summarize, 'net thirty').result()
+        
+        self.assertEqual(self._stage_row('summary').status, 'pending')
+    
+    def test_completed_stage_is_not_repeated(self):
+        """Test that a retried run loads the stage result instead of calling the model again."""
+        self._stage('summary', self._summarize, 'net thirty')
+        AnalysisTracker.finish_run(self.run.id, False, 'Worker lost')
+        AnalysisTracker.start_run(self.run.id)
+        
+        result = self._stage('summary', self._summarize, 'net thirty')
+        
+        self.assertEqual(result, {'summary': 'NET THIRTY'})
+        self.assertEqual(len(self.calls), 1)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(AnalysisRun, self.run.id).attempts, 2)
+    
+    def test_failed_stage(self):
+        """Test that a failing stage is recorded as failed and its error raised to the caller."""
+        def fail(text):
+            raise ValueError('Malformed model response')
+        
+        with self.assertRaises(ValueError):
+            self._stage('obligations', fail, 'net thirty')
+        
+        stage = self._stage_row('obligations')
+        self.assertEqual(stage.status, 'failed')
+        self.assertEqual(stage.error, 'Malformed model response')
+    
+    def test_client_is_shared(self):
+        """Test that every stage thread gets the same OpenAI client."""
+        def get_client():
+            with self.app.app_context():
+                return AIService.get_client()
+        
+        self.app.config['OPENAI_API_KEY'] = 'sk-test'
+        ai_service._client = None
+        try:
+            with patch('src.services.ai_service.OpenAI') as openai:
+                with ThreadPoolExecutor(max_workers=3) as executor:
+                    clients = [future.result() for future in [executor.submit(get_client) for _ in range(3)]]
+        finally:
+            ai_service._client = None
+        
+        self.assertEqual(openai.call_count, 1)
+        self.assertTrue(all(client is openai.return_value for client in clients))
+
+
+if __name__ == '__main__':
+    unittest.main()
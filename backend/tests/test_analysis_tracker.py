@@ -0,0 +1,102 @@
+"""
+Tests for recording analysis runs stage by stage.
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from src.models import db
+from src.models.analysis_run import AnalysisRun, ANALYSIS_STAGES
+from src.services.analysis_tracker import AnalysisTracker
+from tests.db_base import DatabaseTestCase
+
+
+class AnalysisTrackerTestCase(DatabaseTestCase):
+    """Test case for recording analysis runs stage by stage."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        super().setUp()
+        self.document = self.create_document(self.create_organization())
+        self.run = AnalysisTracker.create_run(self.document)
+    
+    def _run(self):
+        db.session.expire_all()
+        return db.session.get(AnalysisRun, self.run.id)
+    
+    def test_stage_rows_and_token_totals(self):
+        """Test that stages are timed and their token usage adds up on the run."""
+        AnalysisTracker.start_run(self.run.id)
+        with AnalysisTracker.stage('text_extraction'):
+            pass
+        with AnalysisTracker.stage('clause_extraction'):
+            AnalysisTracker.record_usage(1000, 200)
+            AnalysisTracker.record_usage(800, 150)
+            AnalysisTracker.record_usage(0, 0, cached=True)
+        with AnalysisTracker.stage('summary'):
+            AnalysisTracker.record_usage(500, 100)
+        AnalysisTracker.finish_run(self.run.id, True)
+        
+        data = self._run().to_dict()
+        stages = {stage['name']: stage for stage in data['stages']}
+        self.assertEqual([stage['name'] for stage in data['stages']], ANALYSIS_STAGES)
+        self.assertEqual(data['status'], 'completed')
+        self.assertEqual(data['attempts'], 1)
+        self.assertEqual((data['prompt_tokens'], data['completion_tokens']), (2300, 450))
+        self.assertEqual(stages['clause_extraction']['model_requests'], 2)
+        self.assertEqual(stages['clause_extraction']['cached_requests'], 1)
+        self.assertEqual(stages['text_extraction']['status'], 'completed')
+        self.assertIsNotNone(stages['summary']['duration_seconds'])
+        self.assertEqual(stages['download']['status'], 'skipped')
+        self.assertIsNone(data['lease_expires_at'])
+    
+    def test_failed_run(self):
+        """Test that a failing stage and the run record the error."""
+        AnalysisTracker.start_run(self.run.id)
+        with self.assertRaises(RuntimeError):
+            with AnalysisTracker.stage('summary'):
+                raise RuntimeError('Model unavailable')
+        AnalysisTracker.finish_run(self.run.id, False, 'Model unavailable')
+        
+        data = self._run().to_dict()
+        stages = {stage['name']: stage for stage in data['stages']}
+        self.assertEqual(data['status'], 'failed')
+        self.assertEqual(data['error'], 'Model unavailable')
+        self.assertEqual(stages['summary']['status'], 'failed')
+        self.assertEqual(stages['persistence']['status'], 'skipped')
+    
+    def test_retry_reuses_failed_run(self):
+        """Test that a failed run with attempts left is queued again and keeps completed stages."""
+        AnalysisTracker.start_run(self.run.id)
+        with AnalysisTracker.stage('text_extraction'):
+            pass
+        AnalysisTracker.finish_run(self.run.id, False, 'Worker lost')
+        
+        # The retry is requested from a new session, as a new request or task would be
+        db.session.expire_all()
+        retry = AnalysisTracker.create_run(self.document)
+        AnalysisTracker.start_run(retry.id)
+        
+        run = self._run()
+        stages = {stage.name: stage.status for stage in run.stages}
+        self.assertEqual(retry.id, self.run.id)
+        self.assertEqual((run.status, run.attempts), ('running', 2))
+        self.assertEqual(stages['text_extraction'], 'completed')
+        self.assertEqual(stages['summary'], 'pending')
+        AnalysisTracker.finish_run(retry.id, True)
+    
+    def test_claim_expired_runs(self):
+        """Test that a run whose lease expired is claimed once and requeued."""
+        # The worker dies without finishing, so the run stays 'running'
+        AnalysisTracker.start_run(self.run.id)
+        later = datetime.utcnow() + timedelta(seconds=self.app.config.get('ANALYSIS_LEASE_SECONDS', 900) + 1)
+        
+        claimed = AnalysisTracker.claim_expired_runs(now=later)
+        again = AnalysisTracker.claim_expired_runs(now=later)
+        
+        self.assertEqual([(run.id, retry) for run, retry in claimed], [(self.run.id, True)])
+        self.assertEqual(again, [])
+        self.assertEqual(self._run().status, 'queued')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Tests for data room archive scanning.
+"""
+
+import io
+import zipfile
+import unittest
+from src.utils.archive import scan_archive, entry_title
+
+
+class ArchiveTestCase(unittest.TestCase):
+    """Test case for data room archive scanning."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.buffer = io.BytesIO()
+        with zipfile.ZipFile(self.buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('Contracts/', '')
+            archive.writestr('Contracts/MSA - Acme.pdf', b'%PDF-1.4 contract')
+            archive.writestr('Contracts/NDA.docx', b'docx')
+            archive.writestr('Finance/model.xlsx', b'xlsx')
+            archive.writestr('Leases/lease.txt', b'A' * 2000)
+            archive.writestr('empty.txt', b'')
+            archive.writestr('__MACOSX/Contracts/._NDA.docx', b'meta')
+            archive.writestr('.DS_Store', b'meta')
+        self.buffer.seek(0)
+        self.archive = zipfile.ZipFile(self.buffer)
+    
+    def tearDown(self):
+        """Clean up test environment."""
+        self.archive.close()
+    
+    def scan(self, max_file_size=1000, max_files=None):
+        return scan_archive(self.archive, {'pdf', 'docx', 'txt'}, max_file_size, max_files)
+    
+    def test_accepts_supported_documents(self):
+        """Test that supported documents are accepted and metadata is ignored."""
+        accepted, skipped = self.scan()
+        
+        self.assertEqual([info.filename for info in accepted], ['Contracts/MSA - Acme.pdf', 'Contracts/NDA.docx'])
+        self.assertEqual(
+            {entry['name']: entry['reason'].split('.')[0] for entry in skipped},
+            {
+                'Finance/model.xlsx': 'File type not allowed',
+                'Leases/lease.txt': 'File too large',
+                'empty.txt': 'File is empty'
+            }
+        )
+    
+    def test_size_limit_uses_uncompressed_size(self):
+        """Test that compressible files are measured by their uncompressed size."""
+        info = self.archive.getinfo('Leases/lease.txt')
+        self.assertLess(info.compress_size, 1000)
+        
+        accepted, _ = self.scan(max_file_size=info.file_size)
+        self.assertIn('Leases/lease.txt', [entry.filename for entry in accepted])
+    
+    def test_max_files(self):
+        """Test that files beyond the limit are skipped."""
+        accepted, skipped = self.scan(max_files=1)
+        
+        self.assertEqual(len(accepted), 1)
+        self.assertIn('Contracts/NDA.docx', [entry['name'] for entry in skipped])
+    
+    def test_entry_title(self):
+        """Test titles derived from member names."""
+        self.assertEqual(entry_title('Contracts/MSA - Acme.pdf'), 'MSA - Acme')
+        self.assertEqual(entry_title('README'), 'README')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+Tests for ingesting data room archives.
+"""
+
+import io
+import os
+import zipfile
+import unittest
+from unittest.mock import patch
+from werkzeug.datastructures import FileStorage
+from src.models import db
+from src.models.document import Document
+from src.models.document_batch import DocumentBatch
+from src.services.batch_service import BatchService
+from src.services.event_bus import get_event_bus, init_events
+from src.services.task_service import TaskService
+from tests.db_base import DatabaseTestCase
+
+
+class BatchServiceTestCase(DatabaseTestCase):
+    """Test case for ingesting data room archives."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        super().setUp()
+        self.app.config.update(
+            ALLOWED_EXTENSIONS={'pdf', 'docx', 'txt'},
+            DATA_ROOM_COMMIT_SIZE=2
+        )
+        self.organization = self.create_organization()
+        self.queued = []
+        patcher = patch.object(TaskService, 'process_document_async', side_effect=lambda document_id, **kwargs: self.queued.append(document_id))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def _upload(self, members):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, content in members.items():
+                archive.writestr(name, content)
+        buffer.seek(0)
+        return FileStorage(stream=buffer, filename='falcon.zip')
+    
+    def _ingest(self, members):
+        with patch.object(TaskService, 'extract_batch_async') as extract_batch_async:
+            batch, error = BatchService.ingest_archive(self._upload(members), self.organization.id, None)
+        self.assertIsNone(error)
+        extract_batch_async.assert_called_once_with(batch.id)
+        return batch
+    
+    def test_upload_returns_before_extraction(self):
+        """Test that the upload stores the archive and leaves unpacking to the task backend."""
+        batch = self._ingest({'Contracts/MSA.txt': 'Terms', 'model.xlsx': 'xlsx'})
+        
+        self.assertEqual(batch.status, 'extracting')
+        self.assertTrue(os.path.exists(batch.archive_path))
+        self.assertEqual(batch.skipped_files, [{'name': 'model.xlsx', 'reason': 'File type not allowed'}])
+        self.assertEqual(Document.query.count(), 0)
+        self.assertEqual(BatchService.get_progress(batch)['complete'], False)
+    
+    def test_invalid_archive_is_rejected(self):
+        """Test that archives without supported documents are rejected in the request."""
+        batch, error = BatchService.ingest_archive(self._upload({'model.xlsx': 'xlsx'}), self.organization.id, None)
+        
+        self.assertIsNone(batch)
+        self.assertEqual(error, "Archive contains no supported documents")
+        self.assertEqual(DocumentBatch.query.count(), 0)
+    
+    def test_extract_batch(self):
+        """Test that the worker unpacks every member, queues it and deletes the archive."""
+        batch = self._ingest({'Contracts/MSA.txt': 'Terms', 'NDA.txt': 'Secrets', 'Leases/Lease.txt': 'Rent'})
+        archive_path = batch.archive_path
+        
+        self.assertTrue(BatchService.extract_batch(batch.id))
+        
+        db.session.expire_all()
+        batch = db.session.get(DocumentBatch, batch.id)
+        documents = Document.query.order_by(Document.id).all()
+        self.assertEqual([document.title for document in documents], ['MSA', 'NDA', 'Lease'])
+        self.assertEqual(self.queued, [document.id for document in documents])
+        self.assertEqual((batch.status, batch.total_files, batch.processed_files), ('extracted', 3, 3))
+        self.assertIsNone(batch.archive_path)
+        self.assertFalse(os.path.exists(archive_path))
+    
+    def test_extract_batch_publishes_progress(self):
+        """Test that documents inserted with Core statements and the batch's progress are published."""
+        init_events(db.session)
+        subscription = get_event_bus().subscribe(self.organization.id)
+        self.addCleanup(subscription.close)
+        batch = self._ingest({'A.txt': 'a', 'B.txt': 'b', 'C.txt': 'c'})
+        
+        BatchService.extract_batch(batch.id)
+        
+        events = []
+        while True:
+            message = subscription.get(timeout=0)
+            if message is None:
+                break
+            events.append((message['event'], message['data'].get('status'), message['data'].get('processed_files')))
+        self.assertEqual(events, [
+            ('document_status', 'queued', None),
+            ('document_status', 'queued', None),
+            ('batch_progress', 'extracting', 2),
+            ('document_status', 'queued', None),
+            ('batch_progress', 'extracting', 3),
+            ('batch_progress', 'extracted', 3)
+        ])
+    
+    def test_extract_batch_resumes_after_committed_groups(self):
+        """Test that a restarted task skips the members of groups already committed."""
+        batch = self._ingest({'A.txt': 'a', 'B.txt': 'b', 'C.txt': 'c'})
+        batch.processed_files = 2
+        db.session.commit()
+        
+        BatchService.extract_batch(batch.id)
+        
+        self.assertEqual([document.title for document in Document.query], ['C'])
+        self.assertFalse(BatchService.extract_batch(batch.id))
+    
+    def test_resume_queues_committed_documents_without_run(self):
+        """Test that documents committed by a worker that died before queueing them are queued on restart."""
+        batch = self._ingest({'A.txt': 'a', 'B.txt': 'b', 'C.txt': 'c'})
+        
+        # The worker is killed while queueing the first committed group
+        queue = TaskService.process_document_async.side_effect
+        TaskService.process_document_async.side_effect = SystemExit(1)
+        with self.assertRaises(SystemExit):
+            BatchService.extract_batch(batch.id)
+        TaskService.process_document_async.side_effect = queue
+        db.session.rollback()
+        
+        self.assertTrue(BatchService.extract_batch(batch.id))
+        
+        titles = {document.id: document.title for document in Document.query}
+        self.assertEqual([titles[document_id] for document_id in self.queued], ['A', 'B', 'C'])
+    
+    def test_failed_group_deletes_its_files(self):
+        """Test that the files of a group whose transaction rolls back are deleted."""
+        batch = self._ingest({'A.txt': 'a', 'B.txt': 'b'})
+        archive_path = batch.archive_path
+        
+        def publish(session, organization_id, event, data):
+            if event == 'document_status':
+                raise RuntimeError('Database is gone')
+        
+        with patch('src.services.batch_service.publish_on_commit', side_effect=publish):
+            self.assertFalse(BatchService.extract_batch(batch.id))
+        
+        self.assertEqual(Document.query.count(), 0)
+        self.assertFalse(os.path.exists(archive_path))
+        self.assertEqual([name for name in os.listdir(self.directory) if name.endswith('.txt')], [])
+    
+    def test_missing_archive_fails_batch(self):
+        """Test that a batch whose archive is gone is marked failed."""
+        batch = self._ingest({'A.txt': 'a'})
+        os.remove(batch.archive_path)
+        
+        self.assertFalse(BatchService.extract_batch(batch.id))
+        
+        db.session.expire_all()
+        batch = db.session.get(DocumentBatch, batch.id)
+        self.assertEqual(batch.status, 'failed')
+        self.assertIn('Archive not found', batch.error)
+
+
+if __name__ == '__main__':
+    unittest.main()
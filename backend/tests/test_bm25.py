@@ -0,0 +1,56 @@
+"""
+Tests for the BM25 passage index.
+"""
+
+import unittest
+from src.utils.bm25 import BM25Index, split_into_passages, tokenize
+
+
+class BM25TestCase(unittest.TestCase):
+    """Test case for the BM25 passage index."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        filler = 'The parties agree to cooperate in good faith. ' * 10
+        self.text = '\n\n'.join([
+            '1. Definitions\n' + filler,
+            '2. Payment\nCustomer shall pay all invoices within thirty days of receipt. ' + filler,
+            '3. Confidentiality\nEach party shall keep the other party\'s information confidential. ' + filler,
+            '4. Termination\nEither party may terminate this Agreement upon ninety days written notice. ' + filler,
+        ])
+    
+    def test_tokenize_drops_stopwords(self):
+        """Test tokenization."""
+        self.assertEqual(tokenize('The Termination of this Agreement'), ['termination', 'agreement'])
+    
+    def test_passages_cover_text(self):
+        """Test that passages cover the whole text without gaps."""
+        passages = split_into_passages(self.text, max_length=400, min_length=50)
+        
+        self.assertEqual(passages[0][0], 0)
+        self.assertEqual(passages[-1][1], len(self.text))
+        for (_, previous_end), (start, end) in zip(passages, passages[1:]):
+            self.assertEqual(previous_end, start)
+            self.assertLessEqual(end - start, 400)
+    
+    def test_search_ranks_relevant_passage_first(self):
+        """Test that the passage answering the query ranks first."""
+        index = BM25Index.build(self.text, max_length=800)
+        
+        passage_id, score = index.search('When can the agreement be terminated with notice?', top_k=1)[0]
+        start, end = index.passages[passage_id]
+        
+        self.assertGreater(score, 0)
+        self.assertIn('terminate this Agreement', self.text[start:end])
+    
+    def test_index_round_trip(self):
+        """Test serializing and loading the index."""
+        index = BM25Index.build(self.text)
+        loaded = BM25Index.from_dict(index.to_dict())
+        
+        self.assertEqual(loaded.search('invoices payment'), index.search('invoices payment'))
+        self.assertEqual(BM25Index.build('').search('anything'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Tests for the clause category cache and bulk clause inserts.
+"""
+
+import unittest
+from src.models import db
+from src.models.clause import Clause, ClauseCategory, ClauseCategoryMapping
+from src.services.ai_service import AIService
+from src.services.category_cache import ClauseCategoryCache, NAME_LENGTH
+from tests.db_base import DatabaseTestCase
+
+
+class ClauseCategoryCacheTestCase(DatabaseTestCase):
+    """Test case for the clause category cache and bulk clause inserts."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        super().setUp()
+        self.document = self.create_document(self.create_organization())
+    
+    def _clause(self, category, start):
+        return {
+            'category': category,
+            'text': f"Clause at {start}",
+            'start_position': start,
+            'end_position': start + 10,
+            'risk_level': 'high',
+            'risk_description': 'One-sided'
+        }
+    
+    def test_get_ids_creates_missing_categories(self):
+        """Test that unknown categories are created once and then served from the cache."""
+        db.session.add(ClauseCategory(name='termination'))
+        db.session.commit()
+        
+        ids = ClauseCategoryCache.get_ids(['termination', 'liability'])
+        again = ClauseCategoryCache.get_ids(['liability'])
+        
+        names = {category.id: category.name for category in ClauseCategory.query}
+        self.assertEqual(set(names.values()), {'termination', 'liability'})
+        self.assertEqual(names[ids['termination']], 'termination')
+        self.assertEqual(again['liability'], ids['liability'])
+    
+    def test_long_names_are_truncated(self):
+        """Test that a name longer than the column maps to its truncated category."""
+        long_name = 'indemnification ' * 10
+        
+        ids = ClauseCategoryCache.get_ids([long_name])
+        
+        category = db.session.get(ClauseCategory, ids[long_name])
+        self.assertEqual(category.name, long_name[:NAME_LENGTH])
+    
+    def test_save_clauses_in_open_transaction(self):
+        """Test that clauses and mappings are saved after the session already wrote."""
+        clauses_data = [self._clause('termination', 0), self._clause('payment', 20), self._clause('termination', 40)]
+        
+        category_ids = AIService._get_category_ids(clauses_data)
+        self.document.status = 'analyzing'
+        db.session.flush()
+        clause_ids = AIService._save_clauses(clauses_data, self.document.id, category_ids)
+        db.session.commit()
+        
+        clauses = Clause.query.order_by(Clause.id).all()
+        self.assertEqual([clause.id for clause in clauses], clause_ids)
+        self.assertEqual([clause.clause_type for clause in clauses], ['termination', 'payment', 'termination'])
+        self.assertEqual([clause.start_position for clause in clauses], [0, 20, 40])
+        mappings = {mapping.clause_id: mapping.category_id for mapping in ClauseCategoryMapping.query}
+        self.assertEqual(mappings, {
+            clause_ids[0]: category_ids['termination'],
+            clause_ids[1]: category_ids['payment'],
+            clause_ids[2]: category_ids['termination']
+        })
+    
+    def test_categories_survive_rolled_back_analysis(self):
+        """Test that the cache never points at categories rolled back with an analysis."""
+        clauses_data = [self._clause('confidentiality', 0)]
+        
+        category_ids = AIService._get_category_ids(clauses_data)
+        AIService._save_clauses(clauses_data, self.document.id, category_ids)
+        db.session.rollback()
+        
+        self.assertEqual(Clause.query.count(), 0)
+        self.assertIsNotNone(db.session.get(ClauseCategory, category_ids['confidentiality']))
+        self.assertEqual(ClauseCategoryCache.get_ids(['confidentiality']), category_ids)
+
+
+if __name__ == '__main__':
+    unittest.main()
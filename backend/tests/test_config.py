@@ -0,0 +1,38 @@
+"""
+Tests for choosing the application configuration.
+"""
+
+import os
+import unittest
+from unittest.mock import patch
+from src.config import get_config, DevelopmentConfig, ProductionConfig, TestingConfig
+
+
+class ConfigTestCase(unittest.TestCase):
+    """Test case for choosing the application configuration."""
+    
+    def test_config_from_environment(self):
+        """Test that FLASK_CONFIG, then FLASK_ENV, selects the configuration."""
+        with patch.dict(os.environ, {'FLASK_ENV': 'production'}):
+            os.environ.pop('FLASK_CONFIG', None)
+            self.assertIs(get_config(), ProductionConfig)
+        
+        with patch.dict(os.environ, {'FLASK_ENV': 'production', 'FLASK_CONFIG': 'testing'}):
+            self.assertIs(get_config(), TestingConfig)
+        
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertIs(get_config(), DevelopmentConfig)
+        
+        self.assertIs(get_config('production'), ProductionConfig)
+    
+    def test_production_shares_state_across_processes(self):
+        """Test that production governs rate limits and caches responses through Redis by default."""
+        if 'RATE_LIMIT_BACKEND' in os.environ or 'LLM_CACHE_BACKEND' in os.environ:
+            self.skipTest('Backends overridden in the environment')
+        
+        self.assertEqual(ProductionConfig.RATE_LIMIT_BACKEND, 'redis')
+        self.assertEqual(ProductionConfig.LLM_CACHE_BACKEND, 'redis')
+
+
+if __name__ == '__main__':
+    unittest.main()
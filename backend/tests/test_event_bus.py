@@ -0,0 +1,132 @@
+"""
+Tests for the organization event bus.
+"""
+
+import unittest
+from flask import Flask
+from src.models import db
+from src.services.analysis_tracker import AnalysisTracker
+from src.services.event_bus import EventBus, MemoryEventBackend, StreamLimitError, get_event_bus, init_events
+from tests.db_base import DatabaseTestCase
+
+
+class EventBusTestCase(unittest.TestCase):
+    """Test case for the organization event bus."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.app = Flask(__name__)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.bus = EventBus(MemoryEventBackend(max_size=2))
+    
+    def tearDown(self):
+        """Clean up test environment."""
+        self.app_context.pop()
+    
+    def test_events_reach_only_their_organization(self):
+        """Test that a client receives the events of its own organization."""
+        first = self.bus.subscribe(1)
+        second = self.bus.subscribe(2)
+        
+        self.bus.publish(1, 'document_status', {'document_id': 7, 'status': 'analyzed'})
+        
+        self.assertEqual(first.get(timeout=0), {'event': 'document_status', 'data': {'document_id': 7, 'status': 'analyzed'}})
+        self.assertIsNone(second.get(timeout=0))
+    
+    def test_slow_client_drops_events(self):
+        """Test that a client that does not keep up misses events instead of queueing them."""
+        subscription = self.bus.subscribe(1)
+        for status in ('queued', 'processing', 'analyzed'):
+            self.bus.publish(1, 'document_status', {'document_id': 7, 'status': status})
+        
+        self.assertEqual(subscription.get(timeout=0)['data']['status'], 'queued')
+        self.assertEqual(subscription.get(timeout=0)['data']['status'], 'processing')
+        self.assertIsNone(subscription.get(timeout=0))
+    
+    def test_close(self):
+        """Test that a closed subscription is forgotten."""
+        subscription = self.bus.subscribe(1)
+        self.assertEqual(self.bus.stats()['subscriptions'], 1)
+        
+        subscription.close()
+        self.bus.publish(1, 'document_status', {'document_id': 7, 'status': 'queued'})
+        
+        self.assertEqual(self.bus.stats()['subscriptions'], 0)
+        self.assertIsNone(subscription.get(timeout=0))
+    
+    def test_stream_limit(self):
+        """Test that a process refuses streams past its cap until one closes."""
+        bus = EventBus(MemoryEventBackend(max_size=2, max_subscriptions=2), retry_after=15)
+        first = bus.subscribe(1)
+        bus.subscribe(2)
+        
+        with self.assertRaises(StreamLimitError) as context:
+            bus.subscribe(1)
+        self.assertEqual(context.exception.retry_after, 15)
+        
+        first.close()
+        first.close()
+        self.assertIsNotNone(bus.subscribe(1))
+        self.assertEqual(bus.stats(), {'subscriptions': 2, 'max_subscriptions': 2})
+
+class EventPublishingTestCase(DatabaseTestCase):
+    """Test case for publishing committed status changes and analysis progress."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        super().setUp()
+        init_events(db.session)
+        self.document = self.create_document(self.create_organization())
+        self.subscription = get_event_bus().subscribe(self.document.organization_id)
+        self.addCleanup(self.subscription.close)
+    
+    def _events(self):
+        events = []
+        while True:
+            message = self.subscription.get(timeout=0)
+            if message is None:
+                return events
+            events.append(message)
+    
+    def test_status_change_is_published_on_commit(self):
+        """Test that a status change reaches subscribers once its transaction commits."""
+        self.document.status = 'queued'
+        db.session.flush()
+        self.assertEqual(self._events(), [])
+        
+        db.session.commit()
+        
+        self.assertEqual(self._events(), [
+            {'event': 'document_status', 'data': {'document_id': self.document.id, 'status': 'queued'}}
+        ])
+    
+    def test_rolled_back_status_change_is_not_published(self):
+        """Test that a status change rolled back with its transaction is never published."""
+        self.document.status = 'queued'
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+        
+        self.assertEqual(self._events(), [])
+    
+    def test_analysis_stages_are_published(self):
+        """Test that a run and its stages report each change to the document's organization."""
+        run = AnalysisTracker.create_run(self.document)
+        AnalysisTracker.start_run(run.id)
+        with AnalysisTracker.stage('summary'):
+            pass
+        AnalysisTracker.finish_run(run.id, True)
+        
+        events = [message for message in self._events() if message['event'] != 'document_status']
+        document_id = self.document.id
+        self.assertEqual(events, [
+            {'event': 'analysis_run', 'data': {'run_id': run.id, 'status': 'running', 'document_id': document_id}},
+            {'event': 'analysis_stage', 'data': {'run_id': run.id, 'stage': 'summary', 'status': 'running', 'document_id': document_id}},
+            {'event': 'analysis_stage', 'data': {'run_id': run.id, 'stage': 'summary', 'status': 'completed', 'document_id': document_id}},
+            {'event': 'analysis_run', 'data': {'run_id': run.id, 'status': 'completed', 'document_id': document_id}}
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+Tests for the text extraction process pool.
+"""
+
+import os
+import stat
+import shutil
+import tempfile
+import threading
+import unittest
+import multiprocessing
+from src.services import extraction_pool
+from src.services.extraction_pool import ExtractionPool, ExtractionError, extract_file, nested_workers
+from tests.test_file_processors import PDFTOTEXT, PDFINFO
+
+# pdftotext stand-in that logs its arguments, one invocation per line
+LOGGED_PDFTOTEXT = PDFTOTEXT.replace('import sys\n', "import sys\nopen(__file__ + '.log', 'a').write(' '.join(sys.argv[1:]) + '\\n')\n", 1)
+
+
+def _hold_first_attempt(started, marker):
+    """Block the first attempt until its process is killed; later attempts return at once."""
+    if os.path.exists(marker):
+        return 'resubmitted'
+    open(marker, 'w').close()
+    started.set()
+    threading.Event().wait()
+
+
+def _crash():
+    """Kill the process running the step, as the memory limit would."""
+    os._exit(1)
+
+
+class ExtractionPoolTestCase(unittest.TestCase):
+    """Test case for the text extraction process pool."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.directory = tempfile.mkdtemp()
+        self.pool = ExtractionPool(max_workers=1, timeout=1, memory_limit=512 * 1024 * 1024)
+    
+    def tearDown(self):
+        """Clean up test environment."""
+        self.pool.shutdown()
+        shutil.rmtree(self.directory)
+    
+    def test_extract_text(self):
+        """Test that text is extracted in a pool process."""
+        path = os.path.join(self.directory, 'contract.txt')
+        with open(path, 'w') as f:
+            f.write('Either party may terminate this Agreement.')
+        
+        self.assertEqual(self.pool.run(extract_file, ('txt', path)), ('Either party may terminate this Agreement.', [0], None, None))
+    
+    def test_timeout(self):
+        """Test that a file that blocks past the time limit is interrupted and the pool keeps working."""
+        # Opening a FIFO blocks until a writer appears, which never happens
+        fifo = os.path.join(self.directory, 'stuck.txt')
+        os.mkfifo(fifo)
+        
+        with self.assertRaises(ExtractionError):
+            self.pool.run(extract_file, ('txt', fifo))
+        
+        path = os.path.join(self.directory, 'contract.txt')
+        with open(path, 'w') as f:
+            f.write('Payment is due within 30 days.')
+        self.assertEqual(self.pool.run(extract_file, ('txt', path)), ('Payment is due within 30 days.', [0], None, None))
+
+    
+    def _hold_in_thread(self, pool):
+        """Run a step that blocks until the pool is recycled, in a thread; return the thread and its results."""
+        manager = multiprocessing.Manager()
+        self.addCleanup(manager.shutdown)
+        started = manager.Event()
+        results = []
+        thread = threading.Thread(target=lambda: results.append(
+            pool.run(_hold_first_attempt, (started, os.path.join(self.directory, 'attempted')))
+        ))
+        thread.start()
+        self.assertTrue(started.wait(timeout=30))
+        return thread, results
+    
+    def test_recycle_resubmits_other_files(self):
+        """Test that a file in flight when another file's failure recycles the pool is extracted again."""
+        pool = ExtractionPool(max_workers=1, timeout=10)
+        self.addCleanup(pool.shutdown)
+        thread, results = self._hold_in_thread(pool)
+        
+        pool._recycle(pool._executor)
+        thread.join(timeout=30)
+        
+        self.assertEqual(results, ['resubmitted'])
+    
+    def test_only_the_breaking_step_fails(self):
+        """Test that a step that kills its process fails alone, without failing a step resubmitted with it."""
+        pool = ExtractionPool(max_workers=2, timeout=10)
+        self.addCleanup(pool.shutdown)
+        thread, results = self._hold_in_thread(pool)
+        
+        with self.assertRaises(ExtractionError):
+            pool.run(_crash, ())
+        thread.join(timeout=30)
+        
+        self.assertEqual(results, ['resubmitted'])
+    
+    def _install_poppler(self):
+        for name, content in (('pdftotext', LOGGED_PDFTOTEXT), ('pdfinfo', PDFINFO)):
+            script = os.path.join(self.directory, name)
+            with open(script, 'w') as f:
+                f.write(content)
+            os.chmod(script, os.stat(script).st_mode | stat.S_IEXEC)
+        path = os.environ['PATH']
+        os.environ['PATH'] = self.directory + os.pathsep + path
+        self.addCleanup(os.environ.__setitem__, 'PATH', path)
+    
+    def _pdftotext_calls(self):
+        with open(os.path.join(self.directory, 'pdftotext.log')) as f:
+            return f.read().splitlines()
+    
+    def test_large_pdf_uses_idle_cpus(self):
+        """Test that a large PDF is split into page ranges on idle CPUs under the default configuration."""
+        self._install_poppler()
+        pages = [f'Section {number}.' for number in range(1, 61)]
+        path = os.path.join(self.directory, 'exhibit.pdf')
+        with open(path, 'w') as f:
+            f.write(''.join(page + '\f' for page in pages))
+        pool = ExtractionPool(max_workers=1, timeout=30, cpus=4)
+        self.addCleanup(pool.shutdown)
+        
+        text, offsets, _, _ = pool.run(extract_file, ('pdf', path))
+        
+        self.assertEqual(text, '\f'.join(pages))
+        self.assertEqual(len(offsets), 60)
+        ranges = [call.split()[:4] for call in self._pdftotext_calls() if call.startswith('-f')]
+        self.assertEqual(sorted(ranges, key=lambda call: int(call[1])), [['-f', '1', '-l', '15'], ['-f', '16', '-l', '30'], ['-f', '31', '-l', '45'], ['-f', '46', '-l', '60']])
+    
+    def test_nested_workers_share_idle_cpus(self):
+        """Test that steps take only the CPUs no other step is using, and give them back."""
+        idle_cpus = extraction_pool._idle_cpus
+        extraction_pool._idle_cpus = threading.BoundedSemaphore(4)
+        self.addCleanup(setattr, extraction_pool, '_idle_cpus', idle_cpus)
+        # The calling step's own CPU
+        extraction_pool._idle_cpus.acquire()
+        
+        with nested_workers({}, 'PDF_RANGE_WORKERS') as workers:
+            self.assertEqual(workers, 4)
+            with nested_workers({}, 'OCR_WORKERS') as busy:
+                self.assertEqual(busy, 1)
+        with nested_workers({'OCR_WORKERS': 2}, 'OCR_WORKERS') as workers:
+            self.assertEqual(workers, 2)
+            with nested_workers({'PDF_RANGE_WORKERS': 0}, 'PDF_RANGE_WORKERS') as workers:
+                self.assertEqual(workers, 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+"""
+Tests for page-aware text extraction.
+"""
+
+import io
+import os
+import stat
+import shutil
+import tempfile
+import zipfile
+import unittest
+from flask import Flask
+from src.utils.file_processors import PDFProcessor, DocxProcessor, TextProcessor, READ_SIZE
+
+# Stand in for poppler's tools, treating a file of form-feed separated pages as a PDF
+PDFTOTEXT = """#!/usr/bin/env python3
+import sys
+args = sys.argv[1:]
+first = last = None
+while args[0] in ('-f', '-l'):
+    if args[0] == '-f':
+        first = int(args[1])
+    else:
+        last = int(args[1])
+    args = args[2:]
+source, output = args
+try:
+    data = sys.stdin.read() if source == '-' else open(source).read()
+except OSError:
+    sys.exit(1)
+pages = data.split('\\f')[:-1]
+if first or last:
+    data = ''.join(page + '\\f' for page in pages[(first or 1) - 1:last or len(pages)])
+if output == '-':
+    sys.stdout.write(data)
+else:
+    open(output, 'w').write(data)
+"""
+
+PDFINFO = """#!/usr/bin/env python3
+import sys
+print('Pages:          %d' % open(sys.argv[1]).read().count('\\f'))
+"""
+
+WORDML = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+DOCUMENT_XML = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document {WORDML}><w:body>
+<w:p><w:pPr><w:tabs><w:tab w:val="left" w:pos="720"/></w:tabs></w:pPr><w:r><w:t>1.</w:t><w:tab/><w:t xml:space="preserve">Fees </w:t></w:r><w:del><w:r><w:delText>waived</w:delText></w:r></w:del><w:ins><w:r><w:t>apply</w:t></w:r></w:ins></w:p>
+<w:tbl><w:tr><w:tc><w:p><w:r><w:t>Service</w:t></w:r></w:p></w:tc><w:tc><w:p><w:r><w:t>Price</w:t></w:r></w:p></w:tc></w:tr>
+<w:tr><w:tc><w:p><w:r><w:t>Support</w:t></w:r></w:p><w:p><w:r><w:t>24/7</w:t></w:r></w:p></w:tc><w:tc><w:p><w:r><w:t>$100</w:t></w:r></w:p></w:tc></w:tr></w:tbl>
+<w:p><w:r><w:br w:type="page"/><w:t>Schedule A</w:t></w:r></w:p>
+<w:sectPr/></w:body></w:document>"""
+
+FOOTNOTES_XML = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:footnotes {WORDML}><w:footnote w:id="1"><w:p><w:r><w:t>Excluding taxes.</w:t></w:r></w:p></w:footnote></w:footnotes>"""
+
+HEADER_XML = f"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:hdr {WORDML}><w:p><w:r><w:t>Confidential</w:t></w:r></w:p></w:hdr>"""
+
+
+class FileProcessorsTestCase(unittest.TestCase):
+    """Test case for page-aware text extraction."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.directory = tempfile.mkdtemp()
+        for name, content in (('pdftotext', PDFTOTEXT), ('pdfinfo', PDFINFO)):
+            script = os.path.join(self.directory, name)
+            with open(script, 'w') as f:
+                f.write(content)
+            os.chmod(script, os.stat(script).st_mode | stat.S_IEXEC)
+        self.path = os.environ['PATH']
+        os.environ['PATH'] = self.directory + os.pathsep + self.path
+        
+        self.app = Flask(__name__)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+    
+    def tearDown(self):
+        """Clean up test environment."""
+        self.app_context.pop()
+        os.environ['PATH'] = self.path
+        shutil.rmtree(self.directory)
+    
+    def _write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+    
+    def test_pages_stream_across_reads(self):
+        """Test that pages longer than one read are reassembled in order."""
+        pages = ['Recitals. ' * 10, 'Term and termination. ' * (READ_SIZE // 10), 'Signatures.']
+        path = self._write('exhibit.pdf', '\f'.join(pages) + '\f')
+        
+        self.assertEqual(list(PDFProcessor.extract_pages(path)), pages)
+    
+    def test_page_offsets(self):
+        """Test that page offsets point at the first character of each page."""
+        path = self._write('contract.pdf', 'Page one\fPage two\f\fPage four\f')
+        
+        text, offsets = PDFProcessor.extract_paged_text(path)
+        
+        self.assertEqual(text, 'Page one\fPage two\f\fPage four')
+        self.assertEqual(offsets, [0, 9, 18, 19])
+        self.assertEqual(text[offsets[3]:], 'Page four')
+    
+    def test_failed_extraction(self):
+        """Test that a pdftotext failure yields no text."""
+        missing = os.path.join(self.directory, 'missing.pdf')
+        
+        self.assertEqual(PDFProcessor.extract_paged_text(missing), ('', [0]))
+        self.assertEqual(PDFProcessor.extract_text(missing), '')
+    
+    def test_text_file_is_one_page(self):
+        """Test that formats without pages are a single page."""
+        path = self._write('notes.txt', 'Either party may terminate.')
+        
+        self.assertEqual(TextProcessor.extract_paged_text(path), ('Either party may terminate.', [0]))
+    
+    def test_extract_from_file_object(self):
+        """Test that processors read a spooled file, as opened for S3 objects."""
+        pages = ['Recitals. ' * 10, 'Term and termination. ' * (READ_SIZE // 10)]
+        with tempfile.SpooledTemporaryFile(max_size=1024) as spool:
+            spool.write(('\f'.join(pages) + '\f').encode('utf-8'))
+            spool.seek(0)
+            
+            self.assertEqual(list(PDFProcessor.extract_pages(spool)), pages)
+        
+        source = io.BytesIO('Either party may terminate.'.encode('utf-8'))
+        self.assertEqual(TextProcessor.extract_paged_text(source), ('Either party may terminate.', [0]))
+
+    def test_page_ranges(self):
+        """Test that a large PDF split into page ranges matches a single pass."""
+        pages = [f'Section {number}.' if number % 3 else '' for number in range(1, 11)]
+        path = self._write('exhibit.pdf', ''.join(page + '\f' for page in pages))
+        single = PDFProcessor.extract_paged_text(path)
+        
+        self.app.config.update(PDF_RANGE_MIN_PAGES=4)
+        self.assertEqual(PDFProcessor.count_pages(path), 10)
+        self.assertEqual(list(PDFProcessor.extract_pages(path, workers=3)), pages)
+        self.assertEqual(PDFProcessor.extract_paged_text(path, workers=3), single)
+        with open(path, 'rb') as f:
+            self.assertEqual(list(PDFProcessor.extract_pages(f, workers=3)), pages)
+    
+    def _write_docx(self, parts):
+        path = os.path.join(self.directory, 'agreement.docx')
+        with zipfile.ZipFile(path, 'w') as archive:
+            for name, content in parts.items():
+                archive.writestr(name, content)
+        return path
+    
+    def test_docx_reading_order(self):
+        """Test that DOCX text includes tables, footnotes and headers in reading order."""
+        path = self._write_docx({
+            'word/header1.xml': HEADER_XML,
+            'word/document.xml': DOCUMENT_XML,
+            'word/footnotes.xml': FOOTNOTES_XML
+        })
+        
+        text, offsets = DocxProcessor.extract_paged_text(path)
+        
+        self.assertEqual(text, (
+            '1.\tFees apply\nService\tPrice\nSupport\n24/7\t$100'
+            '\fSchedule A\n\nExcluding taxes.\n\nConfidential'
+        ))
+        self.assertEqual(text[offsets[1]:].split('\n')[0], 'Schedule A')
+        with open(path, 'rb') as f:
+            self.assertEqual(DocxProcessor.extract_text(f), text)
+    
+    def test_docx_blocks(self):
+        """Test that paragraph and cell offsets point into the extracted text."""
+        path = self._write_docx({'word/document.xml': DOCUMENT_XML, 'word/footnotes.xml': FOOTNOTES_XML})
+        
+        text, offsets, blocks = DocxProcessor.extract_blocks(path)
+        
+        self.assertEqual((text, offsets), DocxProcessor.extract_paged_text(path))
+        self.assertEqual(
+            [(block['type'], block['part'], text[block['start']:block['end']]) for block in blocks],
+            [
+                ('paragraph', 'document', '1.\tFees apply'),
+                ('cell', 'document', 'Service'),
+                ('cell', 'document', 'Price'),
+                ('cell', 'document', 'Support\n24/7'),
+                ('cell', 'document', '$100'),
+                ('paragraph', 'document', 'Schedule A'),
+                ('paragraph', 'footnotes', 'Excluding taxes.')
+            ]
+        )
+    
+    def test_invalid_docx(self):
+        """Test that a file that is not a DOCX archive yields no text."""
+        path = self._write('agreement.docx', 'not a zip')
+        
+        self.assertEqual(DocxProcessor.extract_paged_text(path), ('', [0]))
+        self.assertEqual(DocxProcessor.extract_blocks(path), ('', [0], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
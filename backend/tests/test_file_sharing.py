@@ -0,0 +1,81 @@
+"""
+Tests for sharing stored files between identical uploads.
+"""
+
+import os
+import unittest
+from src.models import db
+from src.models.document import DocumentVersion
+from src.services.document_service import DocumentService
+from tests.db_base import DatabaseTestCase
+
+
+class FileSharingTestCase(DatabaseTestCase):
+    """Test case for sharing stored files between identical uploads."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        super().setUp()
+        self.organization = self.create_organization()
+        self.document = self.create_document(self.organization)
+        self.version = self.document.versions[0]
+        self.version.content_hash = 'a' * 64
+        db.session.commit()
+    
+    def _copy(self, name='copy.txt'):
+        file_path = os.path.join(self.directory, name)
+        with open(file_path, 'w') as f:
+            f.write('Either party may terminate this Agreement.')
+        return file_path
+    
+    def test_identical_upload_shares_file(self):
+        """Test that an identical upload points at the stored file and its copy is deleted."""
+        copy = self._copy()
+        
+        file_path = DocumentService.share_stored_file(self.organization.id, 'a' * 64, copy)
+        
+        self.assertEqual(file_path, self.document.file_path)
+        self.assertFalse(os.path.exists(copy))
+    
+    def test_other_organization_keeps_its_copy(self):
+        """Test that files are only shared within an organization."""
+        copy = self._copy()
+        other = self.create_organization('Globex')
+        
+        self.assertEqual(DocumentService.share_stored_file(other.id, 'a' * 64, copy), copy)
+        self.assertTrue(os.path.exists(copy))
+    
+    def test_release_keeps_referenced_files(self):
+        """Test that a file still referred to by another version is kept."""
+        second = self.create_document(self.organization)
+        shared = DocumentVersion(document_id=second.id, version_number=2, file_path=self.document.file_path)
+        db.session.add(shared)
+        db.session.commit()
+        file_path = self.document.file_path
+        
+        db.session.delete(self.document)
+        db.session.commit()
+        DocumentService.release_files({file_path})
+        self.assertTrue(os.path.exists(file_path))
+        
+        db.session.delete(shared)
+        db.session.commit()
+        DocumentService.release_files({file_path})
+        self.assertFalse(os.path.exists(file_path))
+    
+    def test_release_after_share_keeps_file(self):
+        """Test that a file shared by a committed upload survives the delete of its source."""
+        file_path = DocumentService.share_stored_file(self.organization.id, 'a' * 64, self._copy())
+        second = self.create_document(self.organization)
+        second.versions[0].file_path = file_path
+        db.session.commit()
+        
+        db.session.delete(self.document)
+        db.session.commit()
+        DocumentService.release_files({file_path})
+        
+        self.assertTrue(os.path.exists(file_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
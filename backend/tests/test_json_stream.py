@@ -0,0 +1,77 @@
+"""
+Tests for extracting string fields from streamed JSON.
+"""
+
+import json
+import unittest
+from src.utils.json_stream import JSONFieldStreamParser
+
+
+class JSONStreamTestCase(unittest.TestCase):
+    """Test case for extracting string fields from streamed JSON."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.response = json.dumps({
+            'answer': 'Net "thirty" days\\n\tfrom receipt é — \U0001F600/',
+            'context': {'section': '4.2', 'quote': 'ignored'},
+            'explanation': 'Clause 4.2 “Payment” applies.'
+        })
+        self.expected = json.loads(self.response)
+    
+    def _feed(self, fragments, fields=None):
+        """Feed fragments and collect the text each field gained."""
+        parser = JSONFieldStreamParser(fields)
+        received = {}
+        for fragment in fragments:
+            for field, text in parser.feed(fragment):
+                received[field] = received.get(field, '') + text
+        return parser, received
+    
+    def test_whole_response(self):
+        """Test that top-level string fields are decoded and nested objects skipped."""
+        parser, received = self._feed(['Here is the answer:\n' + self.response])
+        
+        self.assertEqual(received, {'answer': self.expected['answer'], 'explanation': self.expected['explanation']})
+        self.assertEqual(parser.values, received)
+    
+    def test_every_split_point(self):
+        """Test that splitting anywhere, including inside escapes, gives the same text."""
+        for split in range(1, len(self.response)):
+            _, received = self._feed([self.response[:split], self.response[split:]])
+            self.assertEqual(received['answer'], self.expected['answer'], split)
+            self.assertEqual(received['explanation'], self.expected['explanation'], split)
+    
+    def test_one_character_at_a_time(self):
+        """Test that single-character fragments emit text as it arrives."""
+        parser = JSONFieldStreamParser(['answer'])
+        emitted = []
+        for char in self.response:
+            emitted.extend(text for field, text in parser.feed(char))
+        
+        self.assertEqual(''.join(emitted), self.expected['answer'])
+        self.assertGreater(len(emitted), 20)
+        self.assertEqual(set(parser.values), {'answer'})
+    
+    def test_surrogate_pair_split(self):
+        """Test that a surrogate pair split between fragments becomes one encodable character."""
+        _, received = self._feed(['{"answer": "smile \\ud83d', '\\ude', '00!"}'])
+        
+        self.assertEqual(received['answer'], 'smile \U0001F600!')
+        received['answer'].encode('utf-8')
+    
+    def test_unpaired_surrogate(self):
+        """Test that an unpaired surrogate is replaced instead of breaking the stream."""
+        _, received = self._feed(['{"answer": "a\\ud83db", "context": "\\ude00', '", "explanation": "\\ud83d"}'])
+        
+        self.assertEqual(received, {'answer': 'a�b', 'context': '�', 'explanation': '�'})
+    
+    def test_escaped_key(self):
+        """Test that escapes in keys are decoded before the key is matched."""
+        _, received = self._feed(['{"ans\\u0077', 'er": "yes", "other": "no"}'], fields=['answer'])
+        
+        self.assertEqual(received, {'answer': 'yes'})
+
+
+if __name__ == '__main__':
+    unittest.main()
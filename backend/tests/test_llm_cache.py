@@ -0,0 +1,99 @@
+"""
+Tests for the LLM response cache.
+"""
+
+import os
+import time
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.services.llm_cache import LLMCache, MemoryCacheBackend, SQLiteCacheBackend, make_cache_key
+
+
+class LLMCacheTestCase(unittest.TestCase):
+    """Test case for the LLM response cache."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.messages = [{'role': 'user', 'content': 'Summarize this contract.'}]
+    
+    def tearDown(self):
+        """Tear down test environment."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+    
+    def test_cache_key_depends_on_request(self):
+        """Test that the key covers model, messages, temperature and max_tokens."""
+        key = make_cache_key('gpt-4', self.messages, 0.2, 1000)
+        
+        self.assertEqual(key, make_cache_key('gpt-4', list(self.messages), 0.2, 1000))
+        self.assertNotEqual(key, make_cache_key('gpt-4', self.messages, 0.2, 500))
+        self.assertNotEqual(key, make_cache_key('gpt-4', self.messages, 0.7, 1000))
+        self.assertNotEqual(key, make_cache_key('gpt-3.5-turbo', self.messages, 0.2, 1000))
+    
+    def test_memory_backend_evicts_least_recently_used(self):
+        """Test LRU eviction in the memory tier."""
+        memory = MemoryCacheBackend(max_size=2)
+        memory.set('a', '1')
+        memory.set('b', '2')
+        memory.get('a')
+        memory.set('c', '3')
+        
+        self.assertEqual(memory.get('a'), '1')
+        self.assertIsNone(memory.get('b'))
+        self.assertEqual(memory.get('c'), '3')
+    
+    def test_memory_backend_expires_entries(self):
+        """Test TTL expiry in the memory tier."""
+        memory = MemoryCacheBackend()
+        memory.set('a', '1', ttl=0.01)
+        time.sleep(0.02)
+        
+        self.assertIsNone(memory.get('a'))
+    
+    def test_backend_hit_after_memory_eviction(self):
+        """Test that the durable tier serves entries evicted from memory."""
+        cache = LLMCache(memory=MemoryCacheBackend(max_size=1), backend=SQLiteCacheBackend(self.db_path))
+        cache.set('key-1', 'first', namespace='org:1')
+        cache.set('key-2', 'second', namespace='org:1')
+        
+        self.assertEqual(cache.get('key-1', namespace='org:1'), 'first')
+        self.assertEqual(cache.stats()['org:1']['backend_hits'], 1)
+    
+    def test_sqlite_backend_closes_connections(self):
+        """Test that the durable tier closes each connection it opens and keeps what it wrote."""
+        connections = []
+        connect = sqlite3.connect
+        
+        def tracked_connect(*args, **kwargs):
+            connections.append(connect(*args, **kwargs))
+            return connections[-1]
+        
+        with patch('src.services.llm_cache.sqlite3.connect', side_effect=tracked_connect):
+            backend = SQLiteCacheBackend(self.db_path)
+            backend.set('key', 'value')
+            self.assertEqual(backend.get('key'), 'value')
+        
+        self.assertEqual(len(connections), 3)
+        for connection in connections:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                connection.execute('SELECT 1')
+        self.assertEqual(SQLiteCacheBackend(self.db_path).get('key'), 'value')
+    
+    def test_namespaces_are_isolated(self):
+        """Test that organizations do not share cache entries."""
+        cache = LLMCache(backend=SQLiteCacheBackend(self.db_path))
+        cache.set('key', 'value', namespace='org:1')
+        
+        self.assertIsNone(cache.get('key', namespace='org:2'))
+        self.assertEqual(cache.get('key', namespace='org:1'), 'value')
+        
+        stats = cache.stats()
+        self.assertEqual(stats['org:2']['misses'], 1)
+        self.assertEqual(stats['org:1']['memory_hits'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Tests for sweeping overdue obligations.
+"""
+
+import unittest
+from datetime import date
+from src.models import db
+from src.models.obligation import Obligation
+from src.models.obligation_sweep import ObligationSweep
+from src.services.obligation_service import ObligationService
+from src.services.event_bus import get_event_bus, init_events
+from tests.db_base import DatabaseTestCase
+
+
+TODAY = date(2024, 3, 15)
+
+
+class ObligationServiceTestCase(DatabaseTestCase):
+    """Test case for sweeping overdue obligations."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        super().setUp()
+        self.acme = self.create_organization('Acme')
+        self.globex = self.create_organization('Globex')
+        self.initech = self.create_organization('Initech')
+        self.acme_document = self.create_document(self.acme)
+        self.globex_document = self.create_document(self.globex)
+    
+    def _obligation(self, document, due_date, status='pending'):
+        obligation = Obligation(document_id=document.id, title='Supplier', description='Deliver reports.', due_date=due_date, status=status)
+        db.session.add(obligation)
+        db.session.commit()
+        return obligation.id
+    
+    def _status(self, obligation_id):
+        return db.session.get(Obligation, obligation_id).status
+    
+    def _sweeps(self):
+        db.session.expire_all()
+        return {
+            sweep.organization_id: (sweep.newly_overdue, sweep.overdue_count)
+            for sweep in ObligationSweep.query.filter_by(swept_on=TODAY)
+        }
+    
+    def test_sweep_marks_past_due_pending_obligations(self):
+        """Test that only pending obligations due before today become overdue."""
+        past = self._obligation(self.acme_document, date(2024, 3, 1))
+        due_today = self._obligation(self.acme_document, TODAY)
+        completed = self._obligation(self.acme_document, date(2024, 3, 1), status='completed')
+        undated = self._obligation(self.globex_document, None)
+        
+        result = ObligationService.sweep_overdue(today=TODAY)
+        
+        db.session.expire_all()
+        self.assertEqual(result, {'organizations': 3, 'newly_overdue': 1})
+        self.assertEqual(
+            [self._status(obligation_id) for obligation_id in (past, due_today, completed, undated)],
+            ['overdue', 'pending', 'completed', 'pending']
+        )
+    
+    def test_sweep_records_counts_per_organization(self):
+        """Test that each organization with overdue obligations gets its own counts, across batches."""
+        self._obligation(self.acme_document, date(2024, 3, 1))
+        self._obligation(self.acme_document, date(2024, 2, 1))
+        self._obligation(self.globex_document, date(2024, 3, 14))
+        self._obligation(self.globex_document, date(2024, 1, 1), status='overdue')
+        
+        result = ObligationService.sweep_overdue(today=TODAY, batch_size=1)
+        
+        self.assertEqual(result, {'organizations': 3, 'newly_overdue': 3})
+        self.assertEqual(self._sweeps(), {self.acme.id: (2, 2), self.globex.id: (1, 2)})
+    
+    def test_second_sweep_adds_to_the_days_row(self):
+        """Test that sweeping again on the same day adds to that day's counts."""
+        self._obligation(self.acme_document, date(2024, 3, 1))
+        ObligationService.sweep_overdue(today=TODAY)
+        
+        self._obligation(self.acme_document, date(2024, 3, 10))
+        self._obligation(self.acme_document, date(2024, 3, 11))
+        result = ObligationService.sweep_overdue(today=TODAY)
+        
+        self.assertEqual(result['newly_overdue'], 2)
+        self.assertEqual(self._sweeps(), {self.acme.id: (3, 3)})
+        self.assertEqual(ObligationSweep.query.count(), 1)
+        
+        self.assertEqual(ObligationService.sweep_overdue(today=TODAY)['newly_overdue'], 0)
+        self.assertEqual(self._sweeps(), {self.acme.id: (3, 3)})
+    
+    def test_sweep_publishes_overdue_counts(self):
+        """Test that organizations with newly overdue obligations are notified once the sweep commits."""
+        init_events(db.session)
+        subscription = get_event_bus().subscribe(self.acme.id)
+        self.addCleanup(subscription.close)
+        self._obligation(self.acme_document, date(2024, 3, 1))
+        
+        ObligationService.sweep_overdue(today=TODAY)
+        
+        self.assertEqual(subscription.get(timeout=0), {
+            'event': 'obligations_overdue',
+            'data': {'newly_overdue': 1, 'overdue_count': 1}
+        })
+        self.assertIsNone(subscription.get(timeout=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
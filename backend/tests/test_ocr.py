@@ -0,0 +1,89 @@
+"""
+Tests for the OCR fallback of scanned PDF pages.
+"""
+
+import os
+import stat
+import shutil
+import tempfile
+import unittest
+from src.utils.ocr import split_pages, join_pages, find_image_pages, render_pages, hash_page_image, recognize_images
+
+# Stand in for poppler's pdftoppm and tesseract, treating a file of form-feed
+# separated pages as a PDF and an image's content as its text
+PDFTOPPM = """#!/usr/bin/env python3
+import sys
+args = sys.argv[1:]
+page = int(args[args.index('-f') + 1])
+source, prefix = args[-2:]
+pages = open(source).read().split('\\f')
+if page > len(pages):
+    sys.exit(99)
+open(prefix + '.pgm', 'w').write(pages[page - 1])
+"""
+
+TESSERACT = """#!/usr/bin/env python3
+import sys
+image, output = sys.argv[1:3]
+open(output + '.txt', 'w').write(open(image).read().upper() + '\\n\\f')
+"""
+
+
+class OcrTestCase(unittest.TestCase):
+    """Test case for the OCR fallback of scanned PDF pages."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.directory = tempfile.mkdtemp()
+        for name, content in (('pdftoppm', PDFTOPPM), ('tesseract', TESSERACT)):
+            script = os.path.join(self.directory, name)
+            with open(script, 'w') as f:
+                f.write(content)
+            os.chmod(script, os.stat(script).st_mode | stat.S_IEXEC)
+        self.path = os.environ['PATH']
+        os.environ['PATH'] = self.directory + os.pathsep + self.path
+
+    def tearDown(self):
+        """Clean up test environment."""
+        os.environ['PATH'] = self.path
+        shutil.rmtree(self.directory)
+
+    def test_split_and_join_pages(self):
+        """Test that pages split at their offsets join back to the same text."""
+        text, offsets = 'Recitals\f\fTerm\f', [0, 9, 10, 15]
+
+        pages = split_pages(text, offsets)
+
+        self.assertEqual(pages, ['Recitals', '', 'Term', ''])
+        self.assertEqual(join_pages(pages), (text, offsets))
+        self.assertEqual(split_pages('', [0]), [''])
+
+    def test_find_image_pages(self):
+        """Test that pages with almost no text are selected for OCR."""
+        pages = ['The Supplier shall deliver.', '', ' 12 \n', 'Signed']
+
+        self.assertEqual(find_image_pages(pages, min_chars=10), [2, 3, 4])
+        self.assertEqual(find_image_pages(pages, min_chars=1), [2])
+
+    def test_render_and_recognize(self):
+        """Test that pages are rendered and recognized in parallel and keyed by page number."""
+        pdf_path = os.path.join(self.directory, 'scan.pdf')
+        with open(pdf_path, 'w') as f:
+            f.write('page one\fpage two\fpage one')
+        work = os.path.join(self.directory, 'work')
+        os.mkdir(work)
+
+        images = render_pages(pdf_path, [1, 2, 3, 4], work, workers=3)
+        texts = recognize_images(images, work, workers=3)
+
+        self.assertEqual(sorted(images), [1, 2, 3])
+        self.assertEqual(texts, {1: 'PAGE ONE', 2: 'PAGE TWO', 3: 'PAGE ONE'})
+
+        # Identical pages share a hash, which also depends on the OCR settings
+        self.assertEqual(hash_page_image(images[1], '300:eng'), hash_page_image(images[3], '300:eng'))
+        self.assertNotEqual(hash_page_image(images[1], '300:eng'), hash_page_image(images[2], '300:eng'))
+        self.assertNotEqual(hash_page_image(images[1], '300:eng'), hash_page_image(images[1], '300:deu'))
+
+
+if __name__ == '__main__':
+    unittest.main()
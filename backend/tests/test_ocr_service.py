@@ -0,0 +1,153 @@
+"""
+Tests for recognizing scanned PDF pages and reusing recognized pages.
+"""
+
+import io
+import os
+import stat
+import unittest
+from contextlib import contextmanager
+from unittest.mock import patch
+from src.models.ocr_page import OcrPage
+from src.services.ocr_service import OcrService
+from src.services.storage_service import StorageService
+from src.services.text_service import TextService
+from tests.db_base import DatabaseTestCase
+
+# Stand in for poppler and tesseract. A "PDF" is a file of form-feed
+# terminated pages; the text before '|' on a page is its text layer and the
+# text after it is what its image shows. tesseract logs each page it reads.
+PDFTOTEXT = """#!/usr/bin/env python3
+import sys
+source = sys.argv[1]
+data = sys.stdin.read() if source == '-' else open(source).read()
+sys.stdout.write(''.join(page.split('|')[0] + '\\f' for page in data.split('\\f')[:-1]))
+"""
+
+PDFTOPPM = """#!/usr/bin/env python3
+import sys
+args = sys.argv[1:]
+page = int(args[args.index('-f') + 1])
+source, prefix = args[-2:]
+pages = open(source).read().split('\\f')[:-1]
+if page > len(pages):
+    sys.exit(99)
+open(prefix + '.pgm', 'w').write(pages[page - 1].split('|')[-1])
+"""
+
+TESSERACT = """#!/usr/bin/env python3
+import os, sys
+image, output = sys.argv[1:3]
+with open(os.path.join(os.path.dirname(__file__), 'tesseract.log'), 'a') as log:
+    log.write(image + '\\n')
+open(output + '.txt', 'w').write(open(image).read().upper() + '\\n\\f')
+"""
+
+SCANNED_PAGE = '|either party may terminate on notice'
+
+
+class OcrServiceTestCase(DatabaseTestCase):
+    """Test case for recognizing scanned PDF pages and reusing recognized pages."""
+
+    def setUp(self):
+        """Set up test environment."""
+        super().setUp()
+        self.bin = os.path.join(self.directory, 'bin')
+        os.mkdir(self.bin)
+        for name, content in (('pdftotext', PDFTOTEXT), ('pdftoppm', PDFTOPPM), ('tesseract', TESSERACT)):
+            self._install(name, content)
+        self.path = os.environ['PATH']
+        os.environ['PATH'] = self.bin + os.pathsep + self.path
+
+        self.app.config.update(OCR_ENABLED=True, OCR_WORKERS=2, PDF_RANGE_WORKERS=1)
+        self.organization = self.create_organization()
+
+    def tearDown(self):
+        """Clean up test environment."""
+        os.environ['PATH'] = self.path
+        super().tearDown()
+
+    def _install(self, name, content):
+        script = os.path.join(self.bin, name)
+        with open(script, 'w') as f:
+            f.write(content)
+        os.chmod(script, os.stat(script).st_mode | stat.S_IEXEC)
+
+    def _write_pdf(self, pages):
+        path = os.path.join(self.directory, 'scan.pdf')
+        with open(path, 'w') as f:
+            f.write(''.join(page + '\f' for page in pages))
+        return path
+
+    def _recognized_pages(self):
+        log = os.path.join(self.bin, 'tesseract.log')
+        if not os.path.exists(log):
+            return 0
+        with open(log) as f:
+            return len(f.readlines())
+
+    def test_scanned_pages_are_recognized_once(self):
+        """Test that a page seen in an earlier extraction is taken from the cache without running tesseract."""
+        first = self.create_document(self.organization, f"The Supplier shall deliver the Services.\f{SCANNED_PAGE}\f", 'pdf')
+        second = self.create_document(self.organization, f"The Customer shall pay within 30 days.\f{SCANNED_PAGE}\f", 'pdf')
+
+        extracted = TextService.get_document_text(first)
+
+        self.assertEqual(extracted.text, 'The Supplier shall deliver the Services.\fEITHER PARTY MAY TERMINATE ON NOTICE')
+        self.assertEqual(extracted.page_for_offset(extracted.text.index('EITHER')), 2)
+        self.assertEqual(self._recognized_pages(), 1)
+        self.assertEqual(OcrPage.query.count(), 1)
+
+        extracted = TextService.get_document_text(second)
+
+        self.assertEqual(extracted.text, 'The Customer shall pay within 30 days.\fEITHER PARTY MAY TERMINATE ON NOTICE')
+        self.assertEqual(self._recognized_pages(), 1)
+        self.assertEqual(OcrPage.query.count(), 1)
+
+    def test_streamed_file_is_opened_once(self):
+        """Test that scanned pages of an S3 object are rendered from the download made for its text."""
+        opened = []
+
+        @contextmanager
+        def open_source(file_path):
+            opened.append(file_path)
+            yield io.BytesIO(f"Recitals\f{SCANNED_PAGE}\f".encode('utf-8'))
+
+        with patch.object(StorageService, 'open_source', side_effect=open_source):
+            text, offsets, blocks = TextService._extract('pdf', 's3://contracts/scan.pdf')
+
+        self.assertEqual(text, 'Recitals\fEITHER PARTY MAY TERMINATE ON NOTICE')
+        self.assertEqual(offsets, [0, 9])
+        self.assertIsNone(blocks)
+        self.assertEqual(opened, ['s3://contracts/scan.pdf'])
+
+    def test_fill_image_pages(self):
+        """Test that only pages without a text layer are recognized, and only replaced by longer text."""
+        pdf_path = self._write_pdf(['The Supplier shall deliver the Services.', SCANNED_PAGE, '7|7', '|'])
+        work = os.path.join(self.directory, 'work')
+        os.mkdir(work)
+
+        text, offsets = OcrService.fill_image_pages(
+            'The Supplier shall deliver the Services.\f\f7\f', [0, 41, 42, 44], pdf_path, work
+        )
+
+        self.assertEqual(text, 'The Supplier shall deliver the Services.\fEITHER PARTY MAY TERMINATE ON NOTICE\f7\f')
+        self.assertEqual(offsets, [0, 41, 78, 80])
+        self.assertEqual(self._recognized_pages(), 3)
+        self.assertEqual(OcrPage.query.count(), 3)
+
+    def test_fill_image_pages_without_tesseract(self):
+        """Test that the text is left as it was when pages cannot be recognized."""
+        os.remove(os.path.join(self.bin, 'tesseract'))
+        pdf_path = self._write_pdf(['Recitals', SCANNED_PAGE])
+        work = os.path.join(self.directory, 'work')
+        os.mkdir(work)
+
+        result = OcrService.fill_image_pages('Recitals\f', [0, 9], pdf_path, work)
+
+        self.assertEqual(result, ('Recitals\f', [0, 9]))
+        self.assertEqual(OcrPage.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
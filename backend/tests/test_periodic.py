@@ -0,0 +1,70 @@
+"""
+Tests for running maintenance jobs in the web process.
+"""
+
+import unittest
+from flask import Flask, current_app
+from src.services.periodic import PeriodicRunner, init_periodic_tasks
+
+
+class PeriodicTestCase(unittest.TestCase):
+    """Test case for running maintenance jobs in the web process."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.app = Flask(__name__)
+        self.calls = []
+    
+    def _job(self, name):
+        def job():
+            self.calls.append((name, current_app.name))
+        return job
+    
+    def _failing_job(self):
+        self.calls.append(('failing', None))
+        raise RuntimeError('Database unavailable')
+    
+    def test_jobs_run_at_their_intervals(self):
+        """Test that each job runs once at start and again after its interval."""
+        runner = PeriodicRunner(self.app, [('reap', self._job('reap'), 60), ('sweep', self._job('sweep'), 3600)])
+        runner._due = {'reap': 0, 'sweep': 0}
+        
+        self.assertEqual(runner.run_pending(0), ['reap', 'sweep'])
+        self.assertEqual(runner.run_pending(59), [])
+        self.assertEqual(runner.run_pending(60), ['reap'])
+        self.assertEqual(runner.run_pending(3600), ['reap', 'sweep'])
+        self.assertEqual(self.calls[0], ('reap', self.app.name))
+    
+    def test_failing_job_does_not_stop_others(self):
+        """Test that a job that raises is logged and the runner goes on."""
+        runner = PeriodicRunner(self.app, [('failing', self._failing_job, 60), ('sweep', self._job('sweep'), 60)])
+        
+        self.assertEqual(runner.run_pending(0), ['failing', 'sweep'])
+        self.assertEqual(runner.run_pending(60), ['failing', 'sweep'])
+    
+    def test_thread_runs_jobs(self):
+        """Test that a started runner runs its jobs in the background."""
+        runner = PeriodicRunner(self.app, [('reap', self._job('reap'), 60)], tick=0.01)
+        runner.start()
+        try:
+            for _ in range(200):
+                if self.calls:
+                    break
+                runner._stop.wait(0.01)
+        finally:
+            runner.stop(timeout=1)
+        
+        self.assertEqual(self.calls, [('reap', self.app.name)])
+    
+    def test_only_thread_backend_runs_schedule(self):
+        """Test that the Celery backend leaves the schedule to beat."""
+        self.app.config['TASK_BACKEND'] = 'celery'
+        self.assertIsNone(init_periodic_tasks(self.app))
+        
+        self.app.config['TASK_BACKEND'] = 'thread'
+        self.app.testing = True
+        self.assertIsNone(init_periodic_tasks(self.app))
+
+
+if __name__ == '__main__':
+    unittest.main()
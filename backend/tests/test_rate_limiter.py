@@ -0,0 +1,98 @@
+"""
+Tests for the model API rate governor.
+"""
+
+import unittest
+from unittest.mock import patch, MagicMock
+from src.services.rate_limiter import (
+    MemoryBucketBackend, RateGovernor, RateLimitTimeout, backoff_delay, get_retry_after
+)
+
+
+class RateLimiterTestCase(unittest.TestCase):
+    """Test case for the model API rate governor."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.governor = RateGovernor(
+            backend=None,
+            requests_per_minute=60,
+            tokens_per_minute=1000,
+            interactive_reserve=0.2,
+            max_wait=0.5
+        )
+    
+    def test_takes_from_both_buckets(self):
+        """Test that a request takes one request and its tokens."""
+        backend = MemoryBucketBackend()
+        buckets = [('requests', 1, 10, 1.0, 0), ('tokens', 600, 1000, 1.0, 0)]
+        
+        self.assertEqual(backend.acquire(buckets), 0)
+        self.assertGreater(backend.acquire(buckets), 0)
+    
+    def test_all_or_nothing(self):
+        """Test that a short bucket leaves the others untouched."""
+        backend = MemoryBucketBackend()
+        
+        backend.acquire([('tokens', 1000, 1000, 0.001, 0)])
+        self.assertGreater(backend.acquire([('requests', 1, 1, 0.001, 0), ('tokens', 10, 1000, 0.001, 0)]), 0)
+        self.assertEqual(backend.acquire([('requests', 1, 1, 0.001, 0)]), 0)
+    
+    def test_interactive_reserve(self):
+        """Test that background work cannot use the interactive reserve."""
+        self.governor.acquire(800, 'background')
+        
+        with self.assertRaises(RateLimitTimeout):
+            self.governor.acquire(100, 'background')
+        
+        self.governor.acquire(100, 'interactive')
+        stats = self.governor.stats()
+        self.assertEqual(stats['interactive']['requests'], 1)
+        self.assertEqual(stats['background']['requests'], 2)
+        self.assertEqual(stats['background']['throttled'], 1)
+    
+    def test_settle_returns_unused_tokens(self):
+        """Test that reporting lower usage frees capacity."""
+        self.governor.acquire(800, 'background')
+        self.governor.settle(800, 100)
+        
+        self.assertLess(self.governor.acquire(500, 'background'), 0.1)
+    
+    def test_pause(self):
+        """Test that a pause holds back every caller."""
+        self.governor.pause(10)
+        
+        with self.assertRaises(RateLimitTimeout):
+            self.governor.acquire(1, 'interactive')
+    
+    def test_backend_errors_fall_back(self):
+        """Test that a failing shared backend falls back to local buckets."""
+        backend = MagicMock()
+        backend.acquire.side_effect = ConnectionError('down')
+        governor = RateGovernor(backend, 60, 1000)
+        
+        self.assertLess(governor.acquire(10), 0.1)
+        self.assertEqual(governor.stats()['backend_errors'], 1)
+    
+    def test_backoff_delay(self):
+        """Test jittered exponential backoff."""
+        with patch('src.services.rate_limiter.random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual(backoff_delay(0), 1.0)
+            self.assertEqual(backoff_delay(3), 8.0)
+            self.assertEqual(backoff_delay(10, cap=60.0), 60.0)
+            self.assertEqual(backoff_delay(0, retry_after=20), 20)
+    
+    def test_get_retry_after(self):
+        """Test reading Retry-After headers."""
+        error = MagicMock()
+        error.response.headers = {'retry-after': '7'}
+        self.assertEqual(get_retry_after(error), 7.0)
+        
+        error.response.headers = {'retry-after-ms': '1500', 'retry-after': '2'}
+        self.assertEqual(get_retry_after(error), 1.5)
+        
+        self.assertIsNone(get_retry_after(ValueError()))
+
+
+if __name__ == '__main__':
+    unittest.main()
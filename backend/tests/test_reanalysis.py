@@ -0,0 +1,112 @@
+"""
+Tests for re-analyzing new versions of analyzed documents.
+"""
+
+import io
+import os
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from werkzeug.datastructures import FileStorage
+from src.models import db
+from src.models.document import DocumentVersion
+from src.models.document_share import DocumentShare
+from src.models.obligation import Obligation
+from src.services.ai_service import AIService
+from src.services.document_service import DocumentService
+from src.services.scheduler import INTERACTIVE
+from src.services.task_service import TaskService
+from tests.db_base import DatabaseTestCase
+
+
+FIRST = "1. Payment\n\nThe Customer shall pay each invoice within 30 days. The Customer shall keep payment records.\n\n2. Reports\n\nThe Supplier shall deliver a report each month."
+SECOND = "1. Payment\n\nThe Customer shall pay each invoice within 45 days. The Customer shall keep payment records.\n\n2. Reports\n\nThe Supplier shall deliver a report each month."
+
+
+class ReanalysisTestCase(DatabaseTestCase):
+    """Test case for re-analyzing new versions of analyzed documents."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        super().setUp()
+        self.document = self.create_document(self.create_organization(), content=FIRST)
+    
+    def _obligation(self, text, party, description):
+        start = text.index(description)
+        return {'party': party, 'description': description, 'start_position': start, 'end_position': start + len(description)}
+    
+    def _analyze(self, text):
+        obligations = [
+            self._obligation(text, 'Customer', text.split('\n\n')[1].split('. ')[0] + '.'),
+            self._obligation(text, 'Customer', 'The Customer shall keep payment records.'),
+            self._obligation(text, 'Supplier', 'The Supplier shall deliver a report each month.')
+        ]
+        with patch.object(AIService, '_collect_clauses', return_value=[]), \
+                patch.object(AIService, '_request_summary', return_value=None), \
+                patch.object(AIService, '_collect_obligations', side_effect=lambda text, organization_id, regions: [
+                    obligation for obligation in obligations
+                    if regions is None or any(start < obligation['end_position'] and obligation['start_position'] < end for start, end in regions)
+                ]):
+            self.assertTrue(AIService.analyze_document(self.document.id))
+    
+    def _add_version(self, content):
+        file_path = os.path.join(self.directory, 'second.txt')
+        with open(file_path, 'w') as f:
+            f.write(content)
+        self.document.file_path = file_path
+        db.session.add(DocumentVersion(document_id=self.document.id, version_number=2, file_path=file_path))
+        db.session.commit()
+    
+    def _statuses(self):
+        db.session.expire_all()
+        return {obligation.description: obligation.status for obligation in Obligation.query}
+    
+    def test_re_extracted_obligation_keeps_status(self):
+        """Test that an obligation in a changed section keeps its status when extracted again unchanged."""
+        self._analyze(FIRST)
+        for obligation in Obligation.query:
+            obligation.status = 'completed'
+        db.session.commit()
+        kept_id = Obligation.query.filter_by(description='The Customer shall keep payment records.').one().id
+        
+        self._add_version(SECOND)
+        self._analyze(SECOND)
+        
+        self.assertEqual(self._statuses(), {
+            'The Customer shall pay each invoice within 45 days.': 'pending',
+            'The Customer shall keep payment records.': 'completed',
+            'The Supplier shall deliver a report each month.': 'completed'
+        })
+        # Re-extracted, not carried over
+        self.assertIsNone(db.session.get(Obligation, kept_id))
+    
+    def test_new_version_is_reanalyzed_interactively(self):
+        """Test that uploading a new version of an analyzed document queues its re-analysis in the interactive lane."""
+        self.document.versions[0].analyzed_at = datetime.utcnow()
+        db.session.add(DocumentShare(self.document.id, 1, 'edit'))
+        db.session.commit()
+        self.app.config.update(ALLOWED_EXTENSIONS={'txt'}, MAX_CONTENT_LENGTH=1024 * 1024)
+        file = FileStorage(stream=io.BytesIO(SECOND.encode('utf-8')), filename='second.txt')
+        
+        with patch.object(TaskService, 'process_document_async') as process_document_async:
+            document, error = DocumentService.update_document(self.document.id, 1, file=file)
+        
+        self.assertIsNone(error)
+        process_document_async.assert_called_once_with(document.id, priority=INTERACTIVE)
+    
+    def test_save_obligations_matches_title_and_text(self):
+        """Test that only obligations with the same title and text inherit a status."""
+        previous = {('Supplier', 'Deliver reports.'): 'completed'}
+        
+        AIService._save_obligations([
+            {'party': 'Supplier', 'description': 'Deliver reports.'},
+            {'party': 'Customer', 'description': 'Deliver reports.'}
+        ], self.document.id, previous)
+        db.session.commit()
+        
+        statuses = {obligation.title: obligation.status for obligation in Obligation.query}
+        self.assertEqual(statuses, {'Supplier': 'completed', 'Customer': 'pending'})
+
+
+if __name__ == '__main__':
+    unittest.main()
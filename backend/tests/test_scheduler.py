@@ -0,0 +1,125 @@
+"""
+Tests for the fair-share analysis scheduler.
+"""
+
+import unittest
+from src.services.scheduler import (
+    FairScheduler, MemorySchedulerBackend, AnalysisJob, parse_weights,
+    INTERACTIVE, NORMAL, BULK
+)
+
+
+class SchedulerTestCase(unittest.TestCase):
+    """Test case for the fair-share analysis scheduler."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.scheduler = FairScheduler(MemorySchedulerBackend(), max_org_concurrency=0)
+    
+    def enqueue(self, organization_id, count, priority=NORMAL):
+        for _ in range(count):
+            self.scheduler.enqueue(AnalysisJob(document_id=0, organization_id=organization_id, priority=priority))
+    
+    def drain(self, count):
+        """Dispatch jobs, releasing each at once, and return their organizations."""
+        organizations = []
+        for _ in range(count):
+            job = self.scheduler.dispatch()
+            if not job:
+                break
+            organizations.append(job.organization_id)
+            self.scheduler.release(job)
+        return organizations
+    
+    def test_higher_priority_first(self):
+        """Test that higher classes are served before lower ones."""
+        self.enqueue(1, 3, BULK)
+        self.enqueue(2, 1, NORMAL)
+        self.enqueue(3, 1, INTERACTIVE)
+        
+        jobs = [self.scheduler.dispatch() for _ in range(3)]
+        self.assertEqual([job.priority for job in jobs], [INTERACTIVE, NORMAL, BULK])
+    
+    def test_organizations_take_turns(self):
+        """Test that a large backlog does not hold back another organization."""
+        self.enqueue(1, 100, BULK)
+        self.drain(10)
+        self.enqueue(2, 3, BULK)
+        
+        # The newcomer joins at the current virtual time instead of waiting behind the backlog
+        self.assertEqual(self.drain(6), [2, 1, 2, 1, 2, 1])
+    
+    def test_weighted_share(self):
+        """Test that organizations are served in proportion to their weight."""
+        self.scheduler.weights = parse_weights('1:3, 2:1')
+        self.enqueue(1, 30)
+        self.enqueue(2, 30)
+        
+        organizations = self.drain(20)
+        self.assertEqual(organizations.count(1), 15)
+        self.assertEqual(organizations.count(2), 5)
+    
+    def test_concurrency_cap(self):
+        """Test that an organization at its cap is skipped until a job is released."""
+        self.scheduler.max_org_concurrency = 2
+        self.enqueue(1, 5)
+        
+        first = self.scheduler.dispatch()
+        self.assertIsNotNone(self.scheduler.dispatch())
+        self.assertIsNone(self.scheduler.dispatch())
+        
+        self.enqueue(2, 1)
+        self.assertEqual(self.scheduler.dispatch().organization_id, 2)
+        
+        self.scheduler.release(first)
+        self.assertEqual(self.scheduler.dispatch().organization_id, 1)
+        self.assertEqual(self.scheduler.stats()['running_by_organization'], {'1': 2, '2': 1})
+    
+    def test_expired_lease_frees_slot(self):
+        """Test that a job whose worker died stops counting against the cap."""
+        self.scheduler.max_org_concurrency = 1
+        self.scheduler.lease = -1
+        self.enqueue(1, 2)
+        
+        self.assertIsNotNone(self.scheduler.dispatch())
+        self.assertIsNotNone(self.scheduler.dispatch())
+    
+    def test_unacknowledged_job_is_claimed(self):
+        """Test that a job whose worker died before starting it is handed back."""
+        self.scheduler.max_org_concurrency = 1
+        self.scheduler.ack_timeout = -1
+        self.enqueue(1, 1)
+        
+        job = self.scheduler.dispatch()
+        stalled = self.scheduler.claim_stalled()
+        
+        self.assertEqual([stalled_job.id for stalled_job in stalled], [job.id])
+        self.assertEqual(self.scheduler.claim_stalled(), [])
+        self.assertEqual(self.scheduler.stats()['running_by_organization'], {})
+    
+    def test_acknowledged_job_is_not_claimed(self):
+        """Test that started and finished jobs are not handed back."""
+        self.scheduler.ack_timeout = -1
+        self.enqueue(1, 2)
+        
+        started = self.scheduler.dispatch()
+        self.scheduler.acknowledge(started)
+        finished = self.scheduler.dispatch()
+        self.scheduler.release(finished)
+        
+        self.assertEqual(self.scheduler.claim_stalled(), [])
+    
+    def test_pending_counts_higher_classes(self):
+        """Test that capacity checks count the class and the ones above it."""
+        self.enqueue(1, 4, BULK)
+        self.enqueue(1, 2, NORMAL)
+        self.enqueue(1, 1, INTERACTIVE)
+        
+        self.assertEqual(self.scheduler.pending(INTERACTIVE), 1)
+        self.assertEqual(self.scheduler.pending(NORMAL), 3)
+        self.assertEqual(self.scheduler.pending(BULK), 7)
+        self.assertEqual(self.scheduler.pending(), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
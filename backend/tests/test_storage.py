@@ -0,0 +1,73 @@
+"""
+Tests for streaming file storage.
+"""
+
+import io
+import os
+import shutil
+import hashlib
+import tempfile
+import unittest
+from flask import Flask
+from src.services.storage_service import StorageService, HashingReader
+
+
+class StorageTestCase(unittest.TestCase):
+    """Test case for streaming file storage."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.upload_folder = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config.update(STORAGE_TYPE='local', UPLOAD_FOLDER=self.upload_folder)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.content = b'Either party may terminate this Agreement. ' * 50000
+    
+    def tearDown(self):
+        """Clean up test environment."""
+        self.app_context.pop()
+        shutil.rmtree(self.upload_folder)
+    
+    def test_hashing_reader(self):
+        """Test that the reader hashes exactly what was read."""
+        reader = HashingReader(io.BytesIO(self.content))
+        while reader.read(4096):
+            pass
+        
+        self.assertEqual(reader.size, len(self.content))
+        self.assertEqual(reader.hexdigest(), hashlib.sha256(self.content).hexdigest())
+    
+    def test_save_stream_returns_hash(self):
+        """Test that saving a stream stores it and reports its size and SHA-256."""
+        file_path, file_size, content_hash = StorageService.save_stream(io.BytesIO(self.content), 'NDA v2.pdf')
+        
+        self.assertTrue(file_path.startswith(self.upload_folder))
+        self.assertTrue(file_path.endswith('.pdf'))
+        self.assertEqual(file_size, len(self.content))
+        self.assertEqual(content_hash, hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(StorageService.hash_file(file_path), content_hash)
+        with open(file_path, 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+    
+    def test_identical_content_same_hash(self):
+        """Test that copies get distinct paths but the same hash."""
+        first = StorageService.save_stream(io.BytesIO(self.content), 'a.txt')
+        second = StorageService.save_stream(io.BytesIO(self.content), 'b.txt')
+        
+        self.assertNotEqual(first[0], second[0])
+        self.assertEqual(first[2], second[2])
+        self.assertEqual(len(os.listdir(self.upload_folder)), 2)
+    
+    def test_open_source_local(self):
+        """Test that local files are opened by path and missing ones as None."""
+        file_path = StorageService.save_stream(io.BytesIO(self.content), 'a.txt')[0]
+        
+        with StorageService.open_source(file_path) as source:
+            self.assertEqual(source, file_path)
+        with StorageService.open_source(os.path.join(self.upload_folder, 'missing.txt')) as source:
+            self.assertIsNone(source)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Tests for running scheduled analyses.
+"""
+
+import unittest
+from unittest.mock import patch
+from src.models import db
+from src.models.analysis_run import AnalysisRun
+from src.services import scheduler as scheduler_module
+from src.services.analysis_tracker import AnalysisTracker
+from src.services.scheduler import AnalysisJob, FairScheduler, MemorySchedulerBackend
+from src.services.task_service import TaskService
+from tests.db_base import DatabaseTestCase
+
+
+class TaskServiceTestCase(DatabaseTestCase):
+    """Test case for running scheduled analyses."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        super().setUp()
+        self.app.config['TASK_BACKEND'] = 'thread'
+        self.scheduler = FairScheduler(MemorySchedulerBackend(), max_org_concurrency=0, ack_timeout=-1)
+        patcher = patch.object(scheduler_module, '_scheduler', self.scheduler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        self.document = self.create_document(self.create_organization())
+        self.run = AnalysisTracker.create_run(self.document)
+        self.scheduler.enqueue(AnalysisJob(document_id=self.document.id, organization_id=self.document.organization_id, run_id=self.run.id))
+    
+    def test_job_of_dead_worker_is_requeued(self):
+        """Test that a job taken by a worker that died before starting it is enqueued again."""
+        self.scheduler.dispatch()
+        
+        with patch.object(TaskService, '_wake_worker'):
+            result = TaskService.reap_expired_runs()
+        
+        self.assertEqual(result, {'requeued': 1, 'failed': 0})
+        self.assertEqual(self.scheduler.pending(), 1)
+        self.assertEqual(self.scheduler.dispatch().run_id, self.run.id)
+    
+    def test_started_job_is_acknowledged(self):
+        """Test that a job is not handed back once its run is marked running."""
+        with patch('src.services.ai_service.AIService.analyze_document', return_value=True), \
+                patch.object(TaskService, '_wake_worker'):
+            self.assertTrue(TaskService.run_next_job())
+            result = TaskService.reap_expired_runs()
+        
+        self.assertEqual(result, {'requeued': 0, 'failed': 0})
+        self.assertEqual(self.scheduler.pending(), 0)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(AnalysisRun, self.run.id).status, 'completed')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Tests for the Celery task configuration.
+"""
+
+import unittest
+from celery import Celery
+from flask import Flask
+from src.tasks import FlaskTask, configure_celery, set_queue_concurrency
+
+
+class TasksTestCase(unittest.TestCase):
+    """Test case for the Celery task configuration."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.celery = Celery('test', task_cls=FlaskTask)
+        self.app = Flask(__name__)
+        self.app.config.update(
+            CELERY_BROKER_URL='memory://',
+            CELERY_TASK_ALWAYS_EAGER=True,
+            CELERY_QUEUE_CONCURRENCY={'analysis': 3, 'maintenance': 1}
+        )
+        configure_celery(self.celery, self.app.config)
+    
+    def test_durable_delivery(self):
+        """Test that tasks are acknowledged late and requeued on worker loss."""
+        conf = self.celery.conf
+        
+        self.assertTrue(conf.task_acks_late)
+        self.assertTrue(conf.task_reject_on_worker_lost)
+        self.assertEqual(conf.worker_prefetch_multiplier, 1)
+        self.assertEqual([queue.name for queue in conf.task_queues], ['analysis', 'maintenance'])
+    
+    def test_reaper_schedule(self):
+        """Test that expired analysis leases are reaped periodically on the maintenance queue."""
+        entry = self.celery.conf.beat_schedule['reap-expired-analyses']
+        
+        self.assertEqual(entry['task'], 'documents.reap_expired')
+        self.assertEqual(entry['schedule'], 60)
+        self.assertEqual(entry['options'], {'queue': 'maintenance'})
+    
+    def test_obligation_sweep_schedule(self):
+        """Test that overdue obligations are swept periodically on the maintenance queue."""
+        entry = self.celery.conf.beat_schedule['sweep-overdue-obligations']
+        
+        self.assertEqual(entry['task'], 'obligations.sweep_overdue')
+        self.assertEqual(entry['schedule'], 3600)
+        self.assertEqual(entry['options'], {'queue': 'maintenance'})
+    
+    def test_eager_task_runs_in_app_context(self):
+        """Test that eager tasks run inside the caller's application context."""
+        from flask import current_app
+        
+        @self.celery.task
+        def app_name():
+            return current_app.name
+        
+        with self.app.app_context():
+            self.assertEqual(app_name.delay().get(), self.app.name)
+    
+    def test_queue_concurrency(self):
+        """Test that workers are sized from their queues' settings."""
+        conf = self.celery.conf
+        
+        set_queue_concurrency(conf=conf, options={'queues': 'analysis', 'concurrency': None})
+        self.assertEqual(conf.worker_concurrency, 3)
+        
+        set_queue_concurrency(conf=conf, options={'queues': None, 'concurrency': None})
+        self.assertEqual(conf.worker_concurrency, 4)
+        
+        set_queue_concurrency(conf=conf, options={'queues': 'analysis', 'concurrency': 8})
+        self.assertEqual(conf.worker_concurrency, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Tests for the text chunking utilities.
+"""
+
+import unittest
+from src.utils.text_chunker import split_into_chunks, locate_span, merge_spans
+
+
+class TextChunkerTestCase(unittest.TestCase):
+    """Test case for text chunking utilities."""
+
+    def setUp(self):
+        """Set up test environment."""
+        self.text = '\n\n'.join(
+            f"{i}. Heading {i}\nThis is section {i}. " + 'word ' * 200
+            for i in range(1, 40)
+        )
+
+    def test_chunks_cover_whole_text(self):
+        """Test that chunks cover the whole text in order."""
+        chunks = split_into_chunks(self.text, chunk_size=3000, overlap=300)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(chunks[0]['start'], 0)
+        self.assertEqual(chunks[-1]['end'], len(self.text))
+        for previous, current in zip(chunks, chunks[1:]):
+            self.assertLessEqual(current['start'], previous['end'])
+            self.assertGreater(current['start'], previous['start'])
+
+    def test_chunks_respect_section_boundaries(self):
+        """Test that chunks start on section headings."""
+        chunks = split_into_chunks(self.text, chunk_size=3000, overlap=300)
+
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk['text']), 3000)
+            self.assertRegex(chunk['text'], r'^\d+\. Heading')
+
+    def test_chunks_overlap_without_boundaries(self):
+        """Test that chunks overlap when no section boundary is available."""
+        text = 'word ' * 2000
+        chunks = split_into_chunks(text, chunk_size=1000, overlap=100)
+
+        self.assertEqual(chunks[-1]['end'], len(text))
+        for previous, current in zip(chunks, chunks[1:]):
+            self.assertLess(current['start'], previous['end'])
+
+    def test_short_text_is_single_chunk(self):
+        """Test that short text is returned as a single chunk."""
+        chunks = split_into_chunks('Short contract.', chunk_size=8000)
+
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0]['text'], 'Short contract.')
+        self.assertEqual(split_into_chunks(''), [])
+
+    def test_locate_span_ignores_whitespace(self):
+        """Test locating a snippet whose whitespace was normalized."""
+        text = 'Either party may\nterminate  this Agreement.'
+        start, end = locate_span(text, 'Either party may terminate this Agreement.')
+
+        self.assertEqual((start, end), (0, len(text)))
+        self.assertEqual(locate_span(text, 'Missing clause'), (None, None))
+
+    def test_merge_spans_removes_duplicates(self):
+        """Test merging clauses seen by overlapping chunks."""
+        items = [
+            {'category': 'Termination', 'text': 'a', 'start_position': 0, 'end_position': 100},
+            {'category': 'Termination', 'text': 'a', 'start_position': 10, 'end_position': 120},
+            {'category': 'Payment', 'text': 'b', 'start_position': 10, 'end_position': 50},
+            {'category': 'Other', 'text': 'Some  text', 'start_position': None},
+            {'category': 'Other', 'text': 'some text', 'start_position': None},
+        ]
+
+        merged = merge_spans(items)
+
+        self.assertEqual(len(merged), 3)
+        self.assertEqual(merged[0]['end_position'], 120)
+        self.assertEqual(merged[1]['category'], 'Payment')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Tests for diffing document versions.
+"""
+
+import unittest
+from src.utils.text_diff import TextDiff
+
+
+class TextDiffTestCase(unittest.TestCase):
+    """Test case for diffing document versions."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.old_text = '\n\n'.join([
+            '1. Definitions\nTerms have the meanings given below.',
+            '2. Payment\nCustomer shall pay all invoices within thirty days.',
+            '3. Confidentiality\nEach party shall keep information confidential.',
+            '4. Termination\nEither party may terminate upon ninety days notice.',
+        ])
+        self.new_text = self.old_text.replace('within thirty days', 'within forty-five days of receipt')
+    
+    def test_identical(self):
+        """Test that identical texts have no changes."""
+        diff = TextDiff.compute(self.old_text, self.old_text)
+        
+        self.assertTrue(diff.is_identical)
+        self.assertEqual(diff.changed_sections(self.old_text), [])
+    
+    def test_remap_unchanged_span(self):
+        """Test that spans after a change are shifted."""
+        diff = TextDiff.compute(self.old_text, self.new_text)
+        snippet = 'Either party may terminate upon ninety days notice.'
+        start = self.old_text.index(snippet)
+        
+        new_start, new_end = diff.remap(start, start + len(snippet))
+        
+        self.assertEqual(self.new_text[new_start:new_end], snippet)
+    
+    def test_remap_changed_span(self):
+        """Test that spans touching a change are not remapped."""
+        diff = TextDiff.compute(self.old_text, self.new_text)
+        start = self.old_text.index('Customer shall pay')
+        
+        self.assertIsNone(diff.remap(start, start + 20))
+    
+    def test_changed_sections(self):
+        """Test that changes are expanded to the sections containing them."""
+        diff = TextDiff.compute(self.old_text, self.new_text)
+        sections = diff.changed_sections(self.new_text)
+        
+        self.assertEqual(len(sections), 1)
+        section = self.new_text[sections[0][0]:sections[0][1]]
+        self.assertIn('forty-five days', section)
+        self.assertNotIn('Termination', section)
+        self.assertNotIn('Definitions', section)
+    
+    def test_deletion_marks_section(self):
+        """Test that a deleted paragraph marks the surrounding text as changed."""
+        new_text = self.old_text.replace('3. Confidentiality\nEach party shall keep information confidential.\n\n', '')
+        diff = TextDiff.compute(self.old_text, new_text)
+        
+        self.assertFalse(diff.is_identical)
+        self.assertTrue(diff.changed_sections(new_text))
+
+
+if __name__ == '__main__':
+    unittest.main()
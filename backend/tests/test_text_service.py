@@ -0,0 +1,104 @@
+"""
+Tests for storing and reusing extracted document text.
+"""
+
+import shutil
+import zipfile
+import unittest
+from unittest.mock import patch
+from src.models import db
+from src.models.document_text import DocumentText
+from src.services.text_service import TextService
+from tests.db_base import DatabaseTestCase
+from tests.test_file_processors import DOCUMENT_XML
+
+CONTRACT = 'Recitals\n\nThe Supplier shall deliver the Services.\n\nEither party may terminate.'
+
+
+class TextServiceTestCase(DatabaseTestCase):
+    """Test case for storing and reusing extracted document text."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        super().setUp()
+        self.organization = self.create_organization()
+        self.app.config['TEXT_CACHE_SIZE'] = 8
+    
+    def tearDown(self):
+        """Clean up test environment."""
+        for version_id in [text.document_version_id for text in DocumentText.query.all()]:
+            TextService.invalidate(version_id)
+        super().tearDown()
+    
+    def _extract(self, document):
+        with patch.object(TextService, '_run_processor', wraps=TextService._run_processor) as run_processor:
+            extracted = TextService.get_document_text(document)
+        return extracted, run_processor.call_count
+    
+    def test_text_is_stored_once(self):
+        """Test that a version is extracted once and served from storage afterwards."""
+        document = self.create_document(self.organization, CONTRACT)
+        
+        extracted, extractions = self._extract(document)
+        version_id = extracted.version_id
+        TextService.invalidate(version_id)
+        stored, repeated = self._extract(document)
+        
+        self.assertEqual(extracted.text, CONTRACT)
+        self.assertEqual(extracted.page_offsets, [0])
+        self.assertEqual(extracted.page_for_offset(CONTRACT.index('Either')), 1)
+        self.assertEqual((extractions, repeated), (1, 0))
+        self.assertEqual(stored.text, CONTRACT)
+        self.assertEqual(TextService.get_page_offsets(document), [0])
+        self.assertEqual(DocumentText.query.filter_by(document_version_id=version_id).count(), 1)
+    
+    def test_identical_file_reuses_text(self):
+        """Test that a second file with the same content shares the first one's extraction."""
+        first = self.create_document(self.organization, CONTRACT)
+        second = self.create_document(self.organization, CONTRACT)
+        
+        self._extract(first)
+        extracted, extractions = self._extract(second)
+        
+        texts = DocumentText.query.order_by(DocumentText.id).all()
+        self.assertEqual(extractions, 0)
+        self.assertEqual(extracted.text, CONTRACT)
+        self.assertEqual(len(texts), 2)
+        self.assertEqual(texts[0].content_hash, texts[1].content_hash)
+        self.assertEqual(texts[0].compressed_text, texts[1].compressed_text)
+        self.assertEqual(texts[1].page_offsets, [0])
+    
+    def test_docx_blocks_are_stored(self):
+        """Test that DOCX paragraph and cell offsets are stored with the text and shared by identical files."""
+        first = self.create_document(self.organization, file_type='docx')
+        second = self.create_document(self.organization, file_type='docx')
+        with zipfile.ZipFile(first.file_path, 'w') as archive:
+            archive.writestr('word/document.xml', DOCUMENT_XML)
+        shutil.copyfile(first.file_path, second.file_path)
+        
+        extracted, _ = self._extract(first)
+        TextService.invalidate(extracted.version_id)
+        stored, _ = self._extract(first)
+        shared, extractions = self._extract(second)
+        
+        cells = [stored.text[block['start']:block['end']] for block in stored.blocks if block['type'] == 'cell']
+        self.assertEqual(cells, ['Service', 'Price', 'Support\n24/7', '$100'])
+        self.assertEqual(stored.blocks, extracted.blocks)
+        self.assertEqual(stored.page_for_offset(stored.blocks[-1]['start']), 2)
+        self.assertEqual(extractions, 0)
+        self.assertEqual(shared.blocks, extracted.blocks)
+    
+    def test_missing_file(self):
+        """Test that a version whose file is gone yields no text and stores nothing."""
+        document = self.create_document(self.organization, CONTRACT)
+        document.versions[0].file_path = document.file_path = document.file_path + '.missing'
+        db.session.commit()
+        
+        extracted, _ = self._extract(document)
+        
+        self.assertIsNone(extracted)
+        self.assertEqual(DocumentText.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Tests for token budgeting.
+"""
+
+import unittest
+from src.utils.token_budget import (
+    count_tokens, count_message_tokens, get_context_window, text_budget, truncate_to_tokens, estimate_cost
+)
+
+
+class TokenBudgetTestCase(unittest.TestCase):
+    """Test case for token budgeting."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.text = 'Customer shall pay all invoices within thirty (30) days of receipt. ' * 200
+    
+    def test_count_tokens(self):
+        """Test token counting."""
+        self.assertEqual(count_tokens(''), 0)
+        self.assertGreater(count_tokens(self.text), len(self.text) // 8)
+        self.assertLess(count_tokens(self.text), len(self.text) // 2)
+    
+    def test_message_overhead(self):
+        """Test that chat formatting tokens are counted."""
+        messages = [{'role': 'user', 'content': 'Hello'}]
+        self.assertGreater(count_message_tokens(messages), count_tokens('Hello'))
+    
+    def test_context_window(self):
+        """Test context window lookup."""
+        self.assertEqual(get_context_window('gpt-4'), 8192)
+        self.assertEqual(get_context_window('gpt-4o-2024-08-06'), 128000)
+        self.assertEqual(get_context_window('gpt-4', override=4096), 4096)
+    
+    def test_text_budget(self):
+        """Test the remaining budget after overhead and response."""
+        budget = text_budget(500, 1000, 'gpt-4')
+        self.assertLess(budget, 8192 - 1500)
+        self.assertGreater(budget, 6000)
+        self.assertEqual(text_budget(8000, 1000, 'gpt-4'), 0)
+    
+    def test_truncate_to_tokens(self):
+        """Test truncation to a token budget."""
+        truncated = truncate_to_tokens(self.text, 100)
+        
+        self.assertTrue(self.text.startswith(truncated))
+        self.assertLessEqual(count_tokens(truncated), 100)
+        self.assertGreater(count_tokens(truncated), 80)
+        self.assertEqual(truncate_to_tokens('short text', 100), 'short text')
+        self.assertEqual(truncate_to_tokens(self.text, 0), '')
+    
+    def test_estimate_cost(self):
+        """Test cost estimation."""
+        self.assertEqual(estimate_cost(1000, 1000, 'gpt-4'), 0.09)
+        self.assertIsNone(estimate_cost(1000, 1000, 'unknown-model'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+Tests for the bounded worker pool.
+"""
+
+import threading
+import unittest
+from src.services.worker_pool import WorkerPool, QueueFullError
+
+
+class WorkerPoolTestCase(unittest.TestCase):
+    """Test case for the bounded worker pool."""
+    
+    def setUp(self):
+        """Set up test environment."""
+        self.pool = WorkerPool(max_workers=2, max_queue_depth=1)
+        self.release = threading.Event()
+        self.started = threading.Semaphore(0)
+    
+    def tearDown(self):
+        """Clean up test environment."""
+        self.release.set()
+    
+    def _block(self):
+        self.started.release()
+        self.release.wait(5)
+    
+    def test_rejects_when_full(self):
+        """Test that submissions beyond workers plus queue depth are rejected."""
+        for _ in range(2):
+            self.pool.submit(self._block)
+        self.started.acquire(timeout=5)
+        self.started.acquire(timeout=5)
+        self.pool.submit(self._block)
+        
+        with self.assertRaises(QueueFullError) as context:
+            self.pool.submit(self._block)
+        self.assertGreaterEqual(context.exception.retry_after, 1)
+        
+        stats = self.pool.stats()
+        self.assertEqual(stats['active_workers'], 2)
+        self.assertEqual(stats['queue_depth'], 1)
+        self.assertEqual(stats['rejected'], 1)
+    
+    def test_slots_are_released(self):
+        """Test that finished and failed tasks free their slots."""
+        done = threading.Event()
+        
+        def fail():
+            raise ValueError('boom')
+        
+        for _ in range(3):
+            self.pool.submit(fail)
+        self.pool._executor.submit(done.set)
+        done.wait(5)
+        self.pool._executor.shutdown(wait=True)
+        
+        stats = self.pool.stats()
+        self.assertEqual(stats['completed'], 3)
+        self.assertEqual(stats['failed'], 3)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertEqual(stats['active_workers'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()